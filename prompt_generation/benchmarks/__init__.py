@@ -0,0 +1 @@
+# Offline benchmark suite (local stand-ins for every upstream API)
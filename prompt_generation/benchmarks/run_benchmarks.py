@@ -0,0 +1,505 @@
+#!/usr/bin/env python3
+# run_benchmarks.py - Offline Throughput/Latency Benchmarks
+#
+# Starts the local stand-in APIs (see stand_ins.py), points the pipeline at
+# them with the endpoint override variables, and measures:
+#
+#   static_prompts         Stages 1-3 - all six static prompts for one
+#                          spec variant (req/s = specs/second)
+#   call_openai            Stage 2b - one OpenAI call
+#   refine_prompts         Stage 2b - all four refined prompts
+#   refine_prompts_single  Stage 2b - same, one structured-output request
+#   generate_image         Stage 4  - one Gemini image
+#   generate_tpose_images  Stage 4  - front/side/back views
+#   generate_3d_model      Stage 5  - upload, submit, poll, download, extract
+#   generate_all           `all` command end-to-end (Stages 1-5, --auto-3d)
+#
+# Each scenario runs `iterations` times at every concurrency level (a
+# thread pool, like several users running the tool at once). The report
+# has p50/p95/mean/max latency, throughput, and error counts, and is
+# written as JSON so runs can be compared over time.
+#
+# Usage (from prompt_generation/):
+#   uv run python -m benchmarks.run_benchmarks
+#   uv run python -m benchmarks.run_benchmarks -s generate_all -c 1,4 -n 8
+#   uv run python -m benchmarks.run_benchmarks --latency-scale 0  # pure overhead
+#
+# NOTE: Tracing is process-global, so concurrent `generate_all` runs share
+# one tracer; their trace.json files are not meaningful in a benchmark.
+
+import io
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, redirect_stdout
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Annotated, Callable, Iterator, Optional
+
+import typer
+
+# Allow `python benchmarks/run_benchmarks.py` as well as `-m`
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+if str(PROJECT_DIR) not in sys.path:
+    sys.path.insert(0, str(PROJECT_DIR))
+
+from benchmarks.stand_ins import StandInConfig, StandInServer  # noqa: E402
+
+
+# -----------------------------------------------------------------------------
+# CONFIGURATION
+# -----------------------------------------------------------------------------
+
+DEFAULT_SPEC = PROJECT_DIR / "configs" / "aethel.yaml"
+DEFAULT_RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+# Poll fast - the stand-in job finishes in seconds, not minutes
+BENCH_POLL_INTERVAL = 0.2
+
+
+# -----------------------------------------------------------------------------
+# DATA CLASSES
+# -----------------------------------------------------------------------------
+
+@dataclass
+class BenchContext:
+    """
+    Shared inputs for every scenario call.
+
+    Attributes:
+        spec: Character spec used by the stage functions
+        spec_path: Path to the same spec (for the `all` command)
+        work_dir: Scratch directory (each call gets its own subfolder)
+        front_image: T-pose image on disk for the Stage 5 scenario
+    """
+    spec: object
+    spec_path: Path
+    work_dir: Path
+    front_image: Path
+
+
+@dataclass
+class ScenarioResult:
+    """
+    Measurements for one scenario at one concurrency level.
+
+    Attributes:
+        scenario: Scenario name
+        concurrency: Number of calls in flight at once
+        iterations: Number of calls made
+        errors: Calls that raised (first error message kept in error_sample)
+        wall_seconds: Time from first submit to last completion
+        latencies: Per-call latency in seconds (successful calls only)
+    """
+    scenario: str
+    concurrency: int
+    iterations: int
+    errors: int = 0
+    error_sample: Optional[str] = None
+    wall_seconds: float = 0.0
+    latencies: list[float] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        ordered = sorted(self.latencies)
+        completed = len(ordered)
+        return {
+            "scenario": self.scenario,
+            "concurrency": self.concurrency,
+            "iterations": self.iterations,
+            "completed": completed,
+            "errors": self.errors,
+            "error_sample": self.error_sample,
+            "wall_seconds": round(self.wall_seconds, 4),
+            "throughput_per_s": round(completed / self.wall_seconds, 4) if self.wall_seconds else 0.0,
+            "latency_ms": {
+                "p50": _ms(percentile(ordered, 50)),
+                "p95": _ms(percentile(ordered, 95)),
+                "mean": _ms(sum(ordered) / completed if completed else None),
+                "max": _ms(ordered[-1] if ordered else None),
+            },
+        }
+
+
+# -----------------------------------------------------------------------------
+# STATISTICS
+# -----------------------------------------------------------------------------
+
+def percentile(sorted_values: list[float], q: float) -> Optional[float]:
+    """
+    Percentile with linear interpolation between closest ranks.
+
+    Args:
+        sorted_values: Values in ascending order
+        q: Percentile (0-100)
+
+    Returns:
+        The percentile, or None for an empty list
+    """
+    if not sorted_values:
+        return None
+    rank = (len(sorted_values) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 2) if seconds is not None else None
+
+
+# -----------------------------------------------------------------------------
+# SCENARIOS
+# -----------------------------------------------------------------------------
+# Each scenario makes ONE call and raises on failure. Pipeline modules are
+# imported inside the functions so the endpoint overrides are already set.
+
+def _static_prompts(ctx: BenchContext, i: int) -> None:
+    from dataclasses import replace
+    from generate_prompts import generate_all_prompts
+
+    # A new variant per call, like an A/B prompt study (no field cache hits)
+    generate_all_prompts(replace(ctx.spec, extra_notes=f"{ctx.spec.extra_notes or ''} variant {i}"))
+
+
+def _call_openai(ctx: BenchContext, i: int) -> None:
+    from src.stage1_base_prompts import generate_base_2d_full_body
+    from src.stage2_llm_refiner import call_openai
+
+    call_openai(generate_base_2d_full_body(ctx.spec), api_key=os.environ["OPENAI_API_KEY"])
+
+
+def _refine_prompts(ctx: BenchContext, i: int) -> None:
+    from src.stage2_llm_refiner import refine_prompts_to_dict
+
+    refine_prompts_to_dict(ctx.spec, api_key=os.environ["OPENAI_API_KEY"])
+
+
+def _refine_prompts_single(ctx: BenchContext, i: int) -> None:
+    from src.stage2_llm_refiner import refine_prompts_with_llm
+
+    refined = refine_prompts_with_llm(ctx.spec, api_key=os.environ["OPENAI_API_KEY"], mode="single")
+    if refined.mode_used != "single":
+        raise RuntimeError("Single-call refinement fell back to per-view")
+
+
+def _generate_image(ctx: BenchContext, i: int) -> None:
+    from src.stage4_image_generation import build_tpose_prompt, generate_image_with_gemini
+
+    generate_image_with_gemini(build_tpose_prompt(ctx.spec, "front"), os.environ["GEMINI_API_KEY"])
+
+
+def _generate_tpose_images(ctx: BenchContext, i: int) -> None:
+    from src.stage4_image_generation import generate_tpose_images
+
+    generate_tpose_images(ctx.spec, "bench", os.environ["GEMINI_API_KEY"])
+
+
+def _generate_3d_model(ctx: BenchContext, i: int) -> None:
+    from src.stage5_hunyuan3d import generate_3d_model
+
+    result = generate_3d_model(
+        image=ctx.front_image,
+        output_dir=ctx.work_dir / f"3d_{i}",
+        poll_interval=BENCH_POLL_INTERVAL,
+        timeout=120,
+        verbose=False,
+        provider_type="http",
+    )
+    if result.status != "DONE" or not result.obj_path:
+        raise RuntimeError(f"3D generation ended with status {result.status}")
+
+
+def _generate_all(ctx: BenchContext, i: int) -> None:
+    from generate_prompts import generate_all_command
+
+    output_dir = ctx.work_dir / f"all_{i}"
+    generate_all_command(
+        input_file=ctx.spec_path,
+        output_dir=output_dir,
+        version="bench",
+        auto_3d=True,
+        provider_3d="http",
+        poll_interval_3d=BENCH_POLL_INTERVAL,
+        timeout_3d=120,
+        no_ledger=True,
+        job_registry=ctx.work_dir / "hunyuan_jobs.json",
+    )
+
+    # `all` reports stage failures as warnings, so check the outputs instead
+    if not list(output_dir.glob("*/hunyuan3d/*.obj")):
+        raise RuntimeError("Pipeline finished without a 3D model (see warnings)")
+
+
+SCENARIOS: dict[str, Callable[[BenchContext, int], None]] = {
+    "static_prompts": _static_prompts,
+    "call_openai": _call_openai,
+    "refine_prompts": _refine_prompts,
+    "refine_prompts_single": _refine_prompts_single,
+    "generate_image": _generate_image,
+    "generate_tpose_images": _generate_tpose_images,
+    "generate_3d_model": _generate_3d_model,
+    "generate_all": _generate_all,
+}
+
+
+# -----------------------------------------------------------------------------
+# RUNNER
+# -----------------------------------------------------------------------------
+
+@contextmanager
+def patched_environ(values: dict[str, str]) -> Iterator[None]:
+    """Temporarily set environment variables (restored afterwards)."""
+    saved = {key: os.environ.get(key) for key in values}
+    os.environ.update(values)
+    try:
+        yield
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+def run_scenario(
+    name: str,
+    func: Callable[[BenchContext, int], None],
+    ctx: BenchContext,
+    concurrency: int,
+    iterations: int,
+) -> ScenarioResult:
+    """
+    Run one scenario `iterations` times with `concurrency` calls in flight.
+
+    The pipeline's own print() output is discarded while it runs.
+
+    Args:
+        name: Scenario name (for the report)
+        func: Scenario function
+        ctx: Shared inputs
+        concurrency: Thread pool size
+        iterations: Total number of calls
+
+    Returns:
+        ScenarioResult with per-call latencies
+    """
+    result = ScenarioResult(scenario=name, concurrency=concurrency, iterations=iterations)
+
+    def timed_call(i: int) -> float:
+        start = time.perf_counter()
+        func(ctx, i)
+        return time.perf_counter() - start
+
+    # Unique call numbers across concurrency levels (separate output folders)
+    offset = concurrency * 100_000
+
+    with redirect_stdout(io.StringIO()):
+        wall_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            futures = [pool.submit(timed_call, offset + i) for i in range(iterations)]
+            for future in futures:
+                try:
+                    result.latencies.append(future.result())
+                except Exception as e:
+                    result.errors += 1
+                    if result.error_sample is None:
+                        result.error_sample = f"{type(e).__name__}: {e}"[:300]
+        result.wall_seconds = time.perf_counter() - wall_start
+
+    return result
+
+
+def run_benchmarks(
+    scenarios: list[str],
+    concurrency_levels: list[int],
+    iterations: int,
+    config: StandInConfig,
+    spec_path: Path = DEFAULT_SPEC,
+    on_result: Optional[Callable[[dict], None]] = None,
+) -> dict:
+    """
+    Run every scenario at every concurrency level against the stand-ins.
+
+    Args:
+        scenarios: Scenario names (keys of SCENARIOS)
+        concurrency_levels: e.g. [1, 4, 8]
+        iterations: Calls per scenario per concurrency level
+        config: Stand-in latency/payload settings
+        spec_path: Character spec YAML
+        on_result: Called with each result dict as it finishes (progress)
+
+    Returns:
+        The JSON-serializable report
+    """
+    unknown = [s for s in scenarios if s not in SCENARIOS]
+    if unknown:
+        raise ValueError(
+            f"Unknown scenario(s): {', '.join(unknown)}. "
+            f"Valid options: {', '.join(SCENARIOS)}"
+        )
+
+    from src.models import load_character_spec
+
+    spec = load_character_spec(spec_path)
+
+    # Per-request INFO logs from the HTTP clients would swamp the output
+    logging.getLogger().setLevel(logging.WARNING)
+
+    results: list[dict] = []
+    with tempfile.TemporaryDirectory(prefix="bench_") as tmp, StandInServer(config) as server:
+        work_dir = Path(tmp)
+        front_image = work_dir / "front.jpg"
+        front_image.write_bytes(server.image_bytes)
+        ctx = BenchContext(spec=spec, spec_path=spec_path, work_dir=work_dir, front_image=front_image)
+
+        with patched_environ(server.env()):
+            for name in scenarios:
+                for concurrency in concurrency_levels:
+                    entry = run_scenario(name, SCENARIOS[name], ctx, concurrency, iterations).to_dict()
+                    results.append(entry)
+                    if on_result:
+                        on_result(entry)
+
+        server_requests = server.stats["requests"]
+
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "stand_in_config": asdict(config),
+        "iterations": iterations,
+        "results": results,
+        "server_requests": server_requests,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PROJECT_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# -----------------------------------------------------------------------------
+# CLI
+# -----------------------------------------------------------------------------
+
+app = typer.Typer(
+    name="run_benchmarks",
+    help="Offline benchmarks against local stand-ins for OpenAI, Gemini, Hunyuan 3D, and COS.",
+    add_completion=False,
+)
+
+
+@app.command()
+def main(
+    scenario: Annotated[
+        Optional[list[str]],
+        typer.Option(
+            "--scenario", "-s",
+            help=f"Scenario to run (repeatable). Default: all of {', '.join(SCENARIOS)}",
+        ),
+    ] = None,
+    concurrency: Annotated[
+        str,
+        typer.Option(
+            "--concurrency", "-c",
+            help="Comma-separated concurrency levels, e.g. 1,4,8",
+        ),
+    ] = "1,4",
+    iterations: Annotated[
+        int,
+        typer.Option(
+            "--iterations", "-n",
+            help="Calls per scenario per concurrency level",
+        ),
+    ] = 8,
+    latency_scale: Annotated[
+        float,
+        typer.Option(
+            "--latency-scale",
+            help="Multiply every stand-in latency (0 = measure pure overhead)",
+        ),
+    ] = 1.0,
+    image_edge: Annotated[
+        int,
+        typer.Option("--image-edge", help="Edge (px) of images returned by the Gemini stand-in"),
+    ] = 1024,
+    image_bytes: Annotated[
+        int,
+        typer.Option("--image-bytes", help="Pad returned images to at least this many bytes"),
+    ] = 0,
+    model_faces: Annotated[
+        int,
+        typer.Option("--model-faces", help="Triangles in the OBJ returned by the Hunyuan stand-in"),
+    ] = 20_000,
+    output: Annotated[
+        Optional[Path],
+        typer.Option(
+            "--output", "-o",
+            help="Report path (default: benchmarks/results/bench_<timestamp>.json)",
+        ),
+    ] = None,
+) -> None:
+    """
+    Run the benchmark suite and write a JSON report.
+    """
+    try:
+        levels = [int(level) for level in concurrency.split(",") if level.strip()]
+        if not levels or min(levels) < 1:
+            raise ValueError("concurrency levels must be positive integers")
+        config = StandInConfig(
+            image_edge=image_edge,
+            image_bytes=image_bytes,
+            model_faces=model_faces,
+        ).scaled(latency_scale)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        raise typer.Exit(code=1)
+
+    scenarios = scenario or list(SCENARIOS)
+
+    print(f"Scenarios: {', '.join(scenarios)}")
+    print(f"Concurrency: {levels}, iterations: {iterations}, latency scale: {latency_scale}")
+    print()
+    print(f"{'scenario':<24}{'conc':>5}{'p50 ms':>10}{'p95 ms':>10}{'req/s':>9}{'errors':>8}")
+
+    def show(entry: dict) -> None:
+        latency = entry["latency_ms"]
+        print(
+            f"{entry['scenario']:<24}{entry['concurrency']:>5}"
+            f"{latency['p50'] or 0:>10.1f}{latency['p95'] or 0:>10.1f}"
+            f"{entry['throughput_per_s']:>9.2f}{entry['errors']:>8}"
+        )
+        if entry["error_sample"]:
+            print(f"    first error: {entry['error_sample']}")
+
+    try:
+        report = run_benchmarks(scenarios, levels, iterations, config, on_result=show)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        raise typer.Exit(code=1)
+
+    if output is None:
+        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        output = DEFAULT_RESULTS_DIR / f"bench_{timestamp}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    print(f"\nReport: {output}")
+
+
+if __name__ == "__main__":
+    app()
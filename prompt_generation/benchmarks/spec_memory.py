@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# spec_memory.py - Memory Benchmark for Large Spec Sets
+#
+# Builds the same sweep of N spec variants twice and measures, with
+# tracemalloc, how much memory holding them takes:
+#
+#   mutable   CharacterSpec with list fields (every variant has its own
+#             __dict__, three lists, and its own copy of each string)
+#   frozen    FrozenCharacterSpec (slots, tuples, interned strings) - what
+#             expand_sweep() yields now
+#
+# It also times de-duplication the way each representation allows it:
+# a set of spec_hash() strings for mutable specs, a set of the specs
+# themselves for frozen ones (they're hashable).
+#
+# Usage (from prompt_generation/):
+#   uv run python -m benchmarks.spec_memory
+#   uv run python -m benchmarks.spec_memory -n 100000
+
+import gc
+import itertools
+import json
+import sys
+import time
+import tracemalloc
+from dataclasses import replace
+from datetime import datetime
+from pathlib import Path
+from typing import Annotated, Callable, Optional
+
+import typer
+
+# Allow `python benchmarks/spec_memory.py` as well as `-m`
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+if str(PROJECT_DIR) not in sys.path:
+    sys.path.insert(0, str(PROJECT_DIR))
+
+from src.models import AnySpec, CharacterSpec, freeze_spec, spec_hash  # noqa: E402
+
+
+# -----------------------------------------------------------------------------
+# CONFIGURATION
+# -----------------------------------------------------------------------------
+
+DEFAULT_RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+BASE_SPEC = CharacterSpec(
+    name="Aethel",
+    role="Android archaeologist",
+    game_style="stylized sci-fi, slightly realistic",
+    silhouette="tall, long coat, mechanical arm",
+    color_palette=["teal", "black", "orange accents"],
+    key_props=["data tablet on left hip", "arm-mounted scanner"],
+    animation_focus=["walk", "idle scanning", "simple attack"],
+    extra_notes="Weathered coat, glowing visor.",
+)
+
+# Sweep axes; values are cycled, so any N gives a realistic amount of
+# repetition (few distinct styles, many combinations)
+AXES = {
+    "game_style": [f"style {i}" for i in range(10)],
+    "silhouette": [f"silhouette {i}" for i in range(10)],
+    "color_palette": [["teal", "black", f"accent {i}"] for i in range(10)],
+    "role": [f"role {i}" for i in range(10)],
+    "key_props": [["scanner", f"prop {i}"] for i in range(10)],
+}
+
+
+# -----------------------------------------------------------------------------
+# MEASUREMENT
+# -----------------------------------------------------------------------------
+
+def _variants(count: int, base: AnySpec) -> list[AnySpec]:
+    """count variants of base, built like a sweep does (fresh strings each)."""
+    names = list(AXES)
+    combos = itertools.islice(itertools.cycle(itertools.product(*AXES.values())), count)
+    variants = []
+    for values in combos:
+        # Copy strings and lists so nothing is shared by accident, the way
+        # specs parsed from separate files or sweep rows would be
+        overrides = {
+            name: [f"{item}" for item in value] if isinstance(value, list) else "".join(value)
+            for name, value in zip(names, values)
+        }
+        variants.append(replace(base, **overrides))
+    return variants
+
+
+def _measure(build: Callable[[], list], dedup: Callable[[list], int]) -> dict:
+    """Memory held by build()'s result, plus build and dedup time."""
+    # Memory first (tracemalloc slows allocation down, so it isn't timed)
+    gc.collect()
+    tracemalloc.start()
+    specs = build()
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del specs
+
+    gc.collect()
+    started = time.perf_counter()
+    specs = build()
+    build_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    unique = dedup(specs)
+    dedup_seconds = time.perf_counter() - started
+
+    return {
+        "specs": len(specs),
+        "unique": unique,
+        "bytes": held,
+        "bytes_per_spec": round(held / len(specs), 1) if specs else 0,
+        "build_seconds": round(build_seconds, 4),
+        "dedup_seconds": round(dedup_seconds, 4),
+    }
+
+
+def run_spec_memory(count: int) -> dict:
+    """
+    Measure both representations for count variants.
+
+    Args:
+        count: Number of spec variants to build
+
+    Returns:
+        {"count", "mutable": {...}, "frozen": {...}, "ratio"} where ratio is
+        mutable bytes / frozen bytes
+    """
+    mutable = _measure(
+        lambda: _variants(count, BASE_SPEC),
+        lambda specs: len({spec_hash(spec) for spec in specs}),
+    )
+    frozen = _measure(
+        lambda: _variants(count, freeze_spec(BASE_SPEC)),
+        lambda specs: len(set(specs)),
+    )
+    return {
+        "count": count,
+        "mutable": mutable,
+        "frozen": frozen,
+        "ratio": round(mutable["bytes"] / frozen["bytes"], 2) if frozen["bytes"] else None,
+    }
+
+
+# -----------------------------------------------------------------------------
+# CLI
+# -----------------------------------------------------------------------------
+
+app = typer.Typer(
+    name="spec_memory",
+    help="Memory used by large sets of CharacterSpec vs FrozenCharacterSpec.",
+    add_completion=False,
+)
+
+
+@app.command()
+def main(
+    count: Annotated[
+        int,
+        typer.Option("--count", "-n", help="Number of spec variants to hold in memory"),
+    ] = 20_000,
+    output: Annotated[
+        Optional[Path],
+        typer.Option(
+            "--output", "-o",
+            help="Report path (default: benchmarks/results/spec_memory_<timestamp>.json)",
+        ),
+    ] = None,
+) -> None:
+    """
+    Build N sweep variants both ways and report bytes per spec.
+    """
+    if count < 1:
+        print("Error: --count must be at least 1", file=sys.stderr)
+        raise typer.Exit(code=1)
+
+    report = run_spec_memory(count)
+
+    print(f"{'representation':<16}{'bytes/spec':>12}{'total MB':>10}{'build s':>9}{'dedup s':>9}")
+    for name in ("mutable", "frozen"):
+        entry = report[name]
+        print(
+            f"{name:<16}{entry['bytes_per_spec']:>12.0f}{entry['bytes'] / 1e6:>10.1f}"
+            f"{entry['build_seconds']:>9.3f}{entry['dedup_seconds']:>9.3f}"
+        )
+    print(f"\nFrozen specs use {report['ratio']}x less memory")
+
+    if output is None:
+        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        output = DEFAULT_RESULTS_DIR / f"spec_memory_{timestamp}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    print(f"Report: {output}")
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,718 @@
+# stand_ins.py - Local Stand-In Servers for Every Upstream API
+#
+# The real pipeline talks to four services:
+#
+#   Stage 2b  OpenAI Responses API        POST /v1/responses
+#   Stage 2b  OpenAI Files + Batch API    POST /v1/files, /v1/batches (refine --batch)
+#   Stage 4   Gemini generateContent      POST /v1beta/models/{model}:generateContent
+#   Stage 5   Tencent Hunyuan 3D          POST /  (X-TC-Action: Submit.../Query...)
+#   Stage 5   Tencent COS                 PUT  /hunyuan3d/{key}
+#
+# plus a GET for the result ZIP. This module serves all of them from ONE
+# local HTTP server with configurable latency and payload sizes, so the
+# benchmarks in run_benchmarks.py measure OUR overhead (serialization,
+# encoding, uploads, polling, disk I/O) without API keys, cost, or
+# network noise.
+#
+# The responses are shaped exactly like the real APIs, so the unmodified
+# SDK clients (openai, google-genai) and our raw HTTP providers parse them.
+# Point the pipeline at the server with the endpoint override variables:
+#
+#   OPENAI_BASE_URL          = {base_url}/v1
+#   GOOGLE_GEMINI_BASE_URL   = {base_url}
+#   HUNYUAN3D_API_ENDPOINT   = {base_url}
+#   TENCENT_COS_ENDPOINT     = {base_url}
+#
+# (StandInServer.env() returns that mapping, with fake credentials.)
+#
+# Usage:
+#   with StandInServer(StandInConfig(gemini_latency=0.5)) as server:
+#       os.environ.update(server.env())
+#       ...run pipeline code...
+#       print(server.stats)
+
+import base64
+import io
+import json
+import random
+import threading
+import time
+import uuid
+import zipfile
+from collections import Counter
+from dataclasses import dataclass, fields, replace
+from email import policy
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+
+# -----------------------------------------------------------------------------
+# CONFIGURATION
+# -----------------------------------------------------------------------------
+
+# Streaming OpenAI responses: the first text arrives after this share of
+# openai_latency, the rest in STREAM_CHUNKS evenly spaced deltas
+STREAM_FIRST_TOKEN_SHARE = 0.2
+STREAM_CHUNKS = 8
+
+
+@dataclass
+class StandInConfig:
+    """
+    Latency and payload settings for the stand-in servers.
+
+    Latencies are per request, in seconds. Defaults are scaled-down
+    versions of what we see in production so a full benchmark finishes
+    in about a minute; use scaled() to stretch or shrink them all.
+
+    Attributes:
+        openai_latency: OpenAI Responses / Chat Completions call
+        gemini_latency: Gemini generateContent call
+        tencent_latency: One Hunyuan Submit/Query API call
+        cos_latency: One COS PUT
+        download_latency: Result ZIP download
+        job_seconds: Time from Submit until Query reports DONE
+        batch_seconds: Time from batch creation until it is completed
+        batch_fail_every: Make every Nth batch request fail (0 = none)
+        jitter: Random +/- fraction applied to every latency (0 = none)
+        openai_output_chars: Length of the generated prompt text
+        image_edge: Edge (px) of the square T-pose image Gemini returns
+        image_bytes: Pad the image to at least this many bytes (0 = natural size)
+        model_faces: Triangle count of the OBJ in the result ZIP
+        texture_edge: Edge (px) of the texture PNG in the result ZIP
+    """
+    openai_latency: float = 0.5
+    gemini_latency: float = 1.0
+    tencent_latency: float = 0.05
+    cos_latency: float = 0.05
+    download_latency: float = 0.1
+    job_seconds: float = 2.0
+    batch_seconds: float = 1.0
+    batch_fail_every: int = 0
+    jitter: float = 0.1
+    openai_output_chars: int = 1500
+    image_edge: int = 1024
+    image_bytes: int = 0
+    model_faces: int = 20_000
+    texture_edge: int = 1024
+
+    def scaled(self, factor: float) -> "StandInConfig":
+        """Copy with every latency (and the job duration) multiplied by factor."""
+        timing = {
+            f.name: getattr(self, f.name) * factor
+            for f in fields(self)
+            if f.name.endswith("_latency") or f.name in ("job_seconds", "batch_seconds")
+        }
+        return replace(self, **timing)
+
+
+# -----------------------------------------------------------------------------
+# PAYLOADS (built once per server)
+# -----------------------------------------------------------------------------
+
+def build_tpose_image(edge: int, min_bytes: int = 0) -> bytes:
+    """
+    Draw a stick-figure T-pose on white and encode it as JPEG.
+
+    The figure is centered and symmetric with horizontal arms, so it
+    passes the Stage 4 → 5 preflight like a good Gemini image would.
+
+    Args:
+        edge: Image width and height in pixels
+        min_bytes: Pad with trailing bytes after the JPEG end marker up to
+                   this size (decoders ignore them; simulates busy images)
+
+    Returns:
+        JPEG bytes
+    """
+    from PIL import Image, ImageDraw
+
+    img = Image.new("RGB", (edge, edge), (255, 255, 255))
+    draw = ImageDraw.Draw(img)
+    s = edge / 512
+    cx = edge // 2
+    color = (60, 60, 90)
+
+    draw.ellipse([cx - 25 * s, 40 * s, cx + 25 * s, 90 * s], fill=color)
+    draw.rectangle([cx - 40 * s, 90 * s, cx + 40 * s, 280 * s], fill=color)
+    draw.rectangle([cx - 35 * s, 280 * s, cx - 10 * s, 470 * s], fill=color)
+    draw.rectangle([cx + 10 * s, 280 * s, cx + 35 * s, 470 * s], fill=color)
+    draw.rectangle([cx - 200 * s, 100 * s, cx + 200 * s, 125 * s], fill=color)
+
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=92)
+    data = buffer.getvalue()
+
+    if len(data) < min_bytes:
+        data += b"\x00" * (min_bytes - len(data))
+    return data
+
+
+def build_model_zip(faces: int, texture_edge: int) -> bytes:
+    """
+    Build a Hunyuan-style result ZIP: model.obj + material.mtl + texture.png.
+
+    The OBJ is a flat triangulated grid with roughly `faces` triangles.
+    The texture is random noise so it doesn't compress away.
+    """
+    from PIL import Image
+
+    cols = max(1, int((faces / 2) ** 0.5))
+    lines = ["mtllib material.mtl", "usemtl material_0"]
+    for y in range(cols + 1):
+        for x in range(cols + 1):
+            lines.append(f"v {x / cols:.4f} {y / cols:.4f} 0.0000")
+            lines.append(f"vt {x / cols:.4f} {y / cols:.4f}")
+    for y in range(cols):
+        for x in range(cols):
+            a = y * (cols + 1) + x + 1
+            b, c, d = a + 1, a + cols + 1, a + cols + 2
+            lines.append(f"f {a}/{a} {b}/{b} {d}/{d}")
+            lines.append(f"f {a}/{a} {d}/{d} {c}/{c}")
+    obj = ("\n".join(lines) + "\n").encode()
+
+    mtl = b"newmtl material_0\nKd 1.0 1.0 1.0\nmap_Kd texture.png\n"
+
+    rng = random.Random(0)
+    noise = rng.randbytes(texture_edge * texture_edge * 3)
+    texture = io.BytesIO()
+    Image.frombytes("RGB", (texture_edge, texture_edge), noise).save(texture, format="PNG")
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("model.obj", obj)
+        zf.writestr("material.mtl", mtl)
+        zf.writestr("texture.png", texture.getvalue())
+    return buffer.getvalue()
+
+
+def build_prompt_text(chars: int) -> str:
+    """Plausible refined-prompt text of the given length."""
+    sentence = (
+        "Full-body T-pose character sheet, arms extended horizontally, "
+        "neutral expression, flat even lighting, plain white background. "
+    )
+    return (sentence * (chars // len(sentence) + 1))[:chars]
+
+
+# -----------------------------------------------------------------------------
+# REQUEST HANDLER
+# -----------------------------------------------------------------------------
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    """Routes requests to the fake OpenAI / Gemini / Tencent / COS APIs."""
+
+    # Keep-alive, like the real APIs (the SDK clients pool connections)
+    protocol_version = "HTTP/1.1"
+
+    server: "_StandInHTTPServer"
+
+    def log_message(self, format, *args):  # noqa: A002 - stdlib signature
+        pass  # Keep benchmark output clean
+
+    # --- helpers -------------------------------------------------------------
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length", 0) or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send(self, status: int, body: bytes, content_type: str = "application/json") -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, data: dict, status: int = 200) -> None:
+        self._send(status, json.dumps(data).encode())
+
+    def _delay(self, seconds: float) -> None:
+        jitter = self.server.config.jitter
+        if jitter:
+            seconds *= 1 + random.uniform(-jitter, jitter)
+        if seconds > 0:
+            time.sleep(seconds)
+
+    # --- routing -------------------------------------------------------------
+
+    def do_POST(self):
+        body = self._read_body()
+        path = self.path.split("?", 1)[0]
+
+        if path.endswith("/responses"):
+            self._handle("openai.responses", body, self._openai_responses)
+        elif path.endswith("/v1/files"):
+            self._handle("openai.files", body, self._openai_file_upload)
+        elif path.endswith("/v1/batches"):
+            self._handle("openai.batches", body, self._openai_batch_create)
+        elif path.endswith("/chat/completions"):
+            self._handle("openai.chat_completions", body, self._openai_chat)
+        elif ":generateContent" in path:
+            self._handle("gemini.generateContent", body, self._gemini_generate)
+        elif path == "/" and self.headers.get("X-TC-Action"):
+            self._handle(f"hunyuan3d.{self.headers['X-TC-Action']}", body, self._tencent_action)
+        else:
+            self._send_json({"error": f"no stand-in for POST {path}"}, status=404)
+
+    def do_PUT(self):
+        body = self._read_body()
+        self._handle("cos.put", body, self._cos_put)
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path.startswith("/files/") and path.endswith(".zip"):
+            self._handle("hunyuan3d.download", b"", self._download)
+        elif path.startswith("/v1/batches/"):
+            self._handle("openai.batches.retrieve", b"", lambda _: self._openai_batch_retrieve(path))
+        elif path.startswith("/v1/files/") and path.endswith("/content"):
+            self._handle("openai.files.content", b"", lambda _: self._openai_file_content(path))
+        else:
+            self._send_json({"error": f"no stand-in for GET {path}"}, status=404)
+
+    def _handle(self, route: str, body: bytes, handler) -> None:
+        self.server.count(route, len(body))
+        handler(body)
+
+    # --- OpenAI --------------------------------------------------------------
+
+    def _openai_responses(self, body: bytes) -> None:
+        request = json.loads(body or b"{}")
+        response = self.server.responses_object(request, len(body))
+        text = response["output"][0]["content"][0]["text"]
+
+        if request.get("stream"):
+            self._openai_responses_stream(response, text)
+        else:
+            self._delay(self.server.config.openai_latency)
+            self._send_json(response)
+
+    def _openai_responses_stream(self, response: dict, text: str) -> None:
+        """
+        Server-sent events, like `responses.create(stream=True)`.
+
+        The same total latency as a normal call, but the first text
+        arrives after STREAM_FIRST_TOKEN_SHARE of it and the rest trickles
+        in - which is what makes streaming feel faster.
+        """
+        latency = self.server.config.openai_latency
+        chunk_size = max(1, -(-len(text) // STREAM_CHUNKS))
+        chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def send_event(data: dict) -> None:
+            payload = f"event: {data['type']}\ndata: {json.dumps(data)}\n\n".encode()
+            self.wfile.write(f"{len(payload):x}\r\n".encode() + payload + b"\r\n")
+            self.wfile.flush()
+
+        in_progress = {**response, "status": "in_progress", "output": []}
+        send_event({"type": "response.created", "sequence_number": 0, "response": in_progress})
+        self._delay(latency * STREAM_FIRST_TOKEN_SHARE)
+        for number, chunk in enumerate(chunks, start=1):
+            if number > 1:
+                self._delay(latency * (1 - STREAM_FIRST_TOKEN_SHARE) / len(chunks))
+            send_event({
+                "type": "response.output_text.delta",
+                "sequence_number": number,
+                "item_id": response["output"][0]["id"],
+                "output_index": 0,
+                "content_index": 0,
+                "delta": chunk,
+                "logprobs": [],
+            })
+        send_event({
+            "type": "response.completed",
+            "sequence_number": len(chunks) + 1,
+            "response": response,
+        })
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _openai_file_upload(self, body: bytes) -> None:
+        # multipart/form-data with "purpose" and "file" fields
+        message = BytesParser(policy=policy.default).parsebytes(
+            f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + body
+        )
+        filename, data = "upload.jsonl", b""
+        for part in message.iter_parts():
+            if part.get_param("name", header="content-disposition") == "file":
+                filename = part.get_filename() or filename
+                data = part.get_payload(decode=True)
+        self._send_json(self.server.store_file(filename, data, purpose="batch"))
+
+    def _openai_batch_create(self, body: bytes) -> None:
+        request = json.loads(body or b"{}")
+        batch = self.server.create_batch(request)
+        if batch is None:
+            self._send_json({"error": {"message": "input file not found"}}, status=404)
+        else:
+            self._send_json(batch)
+
+    def _openai_batch_retrieve(self, path: str) -> None:
+        batch = self.server.batch(path.rsplit("/", 1)[-1])
+        if batch is None:
+            self._send_json({"error": {"message": "batch not found"}}, status=404)
+        else:
+            self._send_json(batch)
+
+    def _openai_file_content(self, path: str) -> None:
+        data = self.server.file_content(path.split("/")[-2])
+        if data is None:
+            self._send_json({"error": {"message": "file not found"}}, status=404)
+        else:
+            self._send(200, data, content_type="application/octet-stream")
+
+    def _openai_chat(self, body: bytes) -> None:
+        request = json.loads(body or b"{}")
+        self._delay(self.server.config.openai_latency)
+        text = self.server.prompt_text
+        self._send_json({
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "gpt-5"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": len(body) // 4,
+                "completion_tokens": len(text) // 4,
+                "total_tokens": (len(body) + len(text)) // 4,
+            },
+        })
+
+    # --- Gemini --------------------------------------------------------------
+
+    def _gemini_generate(self, body: bytes) -> None:
+        self._delay(self.server.config.gemini_latency)
+        self._send_json({
+            "candidates": [{
+                "content": {
+                    "role": "model",
+                    "parts": [{
+                        "inlineData": {
+                            "mimeType": "image/jpeg",
+                            "data": self.server.image_b64,
+                        },
+                    }],
+                },
+                "finishReason": "STOP",
+                "index": 0,
+            }],
+            "usageMetadata": {"promptTokenCount": len(body) // 4},
+        })
+
+    # --- Tencent Hunyuan 3D --------------------------------------------------
+
+    def _tencent_action(self, body: bytes) -> None:
+        action = self.headers["X-TC-Action"]
+        request = json.loads(body or b"{}")
+        request_id = str(uuid.uuid4())
+        self._delay(self.server.config.tencent_latency)
+
+        if action.startswith("Submit"):
+            job_id = self.server.submit_job()
+            self._send_json({"Response": {"JobId": job_id, "RequestId": request_id}})
+            return
+
+        if action.startswith("Query"):
+            job_id = request.get("JobId", "")
+            status = self.server.job_status(job_id)
+            response: dict = {"Status": status, "RequestId": request_id}
+            if status == "DONE":
+                response["ResultFile3Ds"] = [{
+                    "Type": "OBJ",
+                    "Url": f"{self.server.base_url}/files/{job_id}.zip",
+                }]
+            elif status == "FAIL":
+                response["ErrorCode"] = "ResourceNotFound"
+                response["ErrorMessage"] = f"Unknown job {job_id}"
+            self._send_json({"Response": response})
+            return
+
+        self._send_json({
+            "Response": {
+                "Error": {"Code": "InvalidAction", "Message": f"No stand-in for {action}"},
+                "RequestId": request_id,
+            },
+        })
+
+    def _download(self, body: bytes) -> None:
+        self._delay(self.server.config.download_latency)
+        self._send(200, self.server.model_zip, content_type="application/zip")
+
+    # --- COS -----------------------------------------------------------------
+
+    def _cos_put(self, body: bytes) -> None:
+        self._delay(self.server.config.cos_latency)
+        self.send_response(200)
+        self.send_header("ETag", f'"{uuid.uuid4().hex}"')
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+class _StandInHTTPServer(ThreadingHTTPServer):
+    """HTTP server holding the shared payloads, job table, and counters."""
+
+    daemon_threads = True
+
+    def __init__(self, address, config: StandInConfig):
+        super().__init__(address, _StandInHandler)
+        self.config = config
+        self._lock = threading.Lock()
+        self._jobs: dict[str, float] = {}
+        self._files: dict[str, bytes] = {}
+        self._batches: dict[str, dict] = {}
+        self.requests: Counter = Counter()
+        self.bytes_received: Counter = Counter()
+
+        # Build payloads up front so they aren't part of any measurement
+        self.prompt_text = build_prompt_text(config.openai_output_chars)
+        self.image_bytes = build_tpose_image(config.image_edge, config.image_bytes)
+        self.image_b64 = base64.b64encode(self.image_bytes).decode("ascii")
+        self.model_zip = build_model_zip(config.model_faces, config.texture_edge)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, route: str, body_bytes: int) -> None:
+        with self._lock:
+            self.requests[route] += 1
+            self.bytes_received[route] += body_bytes
+
+    # --- OpenAI responses and batches ----------------------------------------
+
+    def responses_object(self, request: dict, body_bytes: int) -> dict:
+        """A completed Responses API object for a request body."""
+        text = self.prompt_text
+
+        # Structured output (refine --mode single): one object per schema field
+        text_format = (request.get("text") or {}).get("format") or {}
+        if text_format.get("type") == "json_schema":
+            fields = text_format.get("schema", {}).get("properties", {})
+            text = json.dumps({name: self.prompt_text for name in fields})
+
+        return {
+            "id": f"resp_{uuid.uuid4().hex}",
+            "object": "response",
+            "created_at": int(time.time()),
+            "model": request.get("model", "gpt-5"),
+            "status": "completed",
+            "output": [{
+                "type": "message",
+                "id": f"msg_{uuid.uuid4().hex}",
+                "status": "completed",
+                "role": "assistant",
+                "content": [{"type": "output_text", "text": text, "annotations": []}],
+            }],
+            "parallel_tool_calls": True,
+            "tool_choice": "auto",
+            "tools": [],
+            "usage": {
+                "input_tokens": body_bytes // 4,
+                "input_tokens_details": {"cached_tokens": 0},
+                "output_tokens": len(text) // 4,
+                "output_tokens_details": {"reasoning_tokens": 0},
+                "total_tokens": (body_bytes + len(text)) // 4,
+            },
+        }
+
+    def store_file(self, filename: str, data: bytes, purpose: str) -> dict:
+        file_id = f"file-{uuid.uuid4().hex}"
+        with self._lock:
+            self._files[file_id] = data
+        return {
+            "id": file_id,
+            "object": "file",
+            "bytes": len(data),
+            "created_at": int(time.time()),
+            "filename": filename,
+            "purpose": purpose,
+            "status": "processed",
+        }
+
+    def file_content(self, file_id: str) -> Optional[bytes]:
+        with self._lock:
+            return self._files.get(file_id)
+
+    def create_batch(self, request: dict) -> Optional[dict]:
+        data = self.file_content(request.get("input_file_id", ""))
+        if data is None:
+            return None
+        lines = [json.loads(line) for line in data.decode("utf-8").splitlines() if line.strip()]
+        batch = {
+            "id": f"batch_{uuid.uuid4().hex}",
+            "object": "batch",
+            "endpoint": request.get("endpoint"),
+            "input_file_id": request["input_file_id"],
+            "completion_window": request.get("completion_window", "24h"),
+            "status": "validating",
+            "output_file_id": None,
+            "error_file_id": None,
+            "created_at": int(time.time()),
+            "metadata": request.get("metadata"),
+            "request_counts": {"total": len(lines), "completed": 0, "failed": 0},
+        }
+        with self._lock:
+            self._batches[batch["id"]] = {"batch": batch, "lines": lines, "created": time.monotonic()}
+        return batch
+
+    def batch(self, batch_id: str) -> Optional[dict]:
+        """validating → in_progress → completed after batch_seconds."""
+        with self._lock:
+            entry = self._batches.get(batch_id)
+        if entry is None:
+            return None
+
+        batch = entry["batch"]
+        elapsed = time.monotonic() - entry["created"]
+        if batch["status"] == "completed":
+            return batch
+        if elapsed < self.config.batch_seconds * 0.1:
+            return batch
+        if elapsed < self.config.batch_seconds:
+            batch["status"] = "in_progress"
+            return batch
+
+        # Done: answer every line (or fail every Nth) and store the files
+        outputs, errors = [], []
+        for number, line in enumerate(entry["lines"], start=1):
+            result = {"id": f"batch_req_{uuid.uuid4().hex}", "custom_id": line["custom_id"]}
+            fail_every = self.config.batch_fail_every
+            if fail_every and number % fail_every == 0:
+                result.update(response=None, error={"code": "server_error", "message": "stand-in failure"})
+                errors.append(result)
+            else:
+                body = self.responses_object(line["body"], len(json.dumps(line["body"])))
+                result.update(response={"status_code": 200, "request_id": uuid.uuid4().hex, "body": body},
+                              error=None)
+                outputs.append(result)
+
+        def jsonl(rows: list[dict]) -> bytes:
+            return "".join(json.dumps(row) + "\n" for row in rows).encode()
+
+        batch["output_file_id"] = self.store_file("output.jsonl", jsonl(outputs), "batch_output")["id"]
+        if errors:
+            batch["error_file_id"] = self.store_file("errors.jsonl", jsonl(errors), "batch_output")["id"]
+        batch["request_counts"] = {
+            "total": len(entry["lines"]), "completed": len(outputs), "failed": len(errors),
+        }
+        batch["status"] = "completed"
+        return batch
+
+    # --- Hunyuan jobs --------------------------------------------------------
+
+    def submit_job(self) -> str:
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._jobs[job_id] = time.monotonic()
+        return job_id
+
+    def job_status(self, job_id: str) -> str:
+        """WAIT for the first 20% of job_seconds, RUN until done, then DONE."""
+        with self._lock:
+            submitted = self._jobs.get(job_id)
+        if submitted is None:
+            return "FAIL"
+        elapsed = time.monotonic() - submitted
+        if elapsed >= self.config.job_seconds:
+            return "DONE"
+        return "WAIT" if elapsed < self.config.job_seconds * 0.2 else "RUN"
+
+
+# -----------------------------------------------------------------------------
+# PUBLIC SERVER WRAPPER
+# -----------------------------------------------------------------------------
+
+class StandInServer:
+    """
+    Runs the stand-in APIs on a background thread.
+
+    Example:
+        >>> with StandInServer(StandInConfig(job_seconds=0.5)) as server:
+        ...     os.environ.update(server.env())
+    """
+
+    def __init__(self, config: Optional[StandInConfig] = None, port: int = 0):
+        self.config = config or StandInConfig()
+        self._port = port
+        self._httpd: Optional[_StandInHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "StandInServer":
+        """Bind to 127.0.0.1 (port 0 = any free port) and start serving."""
+        self._httpd = _StandInHTTPServer(("127.0.0.1", self._port), self.config)
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever,
+            name="stand-in-apis",
+            daemon=True,
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving and release the port."""
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def __enter__(self) -> "StandInServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    @property
+    def base_url(self) -> str:
+        if self._httpd is None:
+            raise RuntimeError("Stand-in server is not running")
+        return self._httpd.base_url
+
+    @property
+    def image_bytes(self) -> bytes:
+        """The T-pose image Gemini stand-in returns (handy as a Stage 5 input)."""
+        if self._httpd is None:
+            raise RuntimeError("Stand-in server is not running")
+        return self._httpd.image_bytes
+
+    @property
+    def stats(self) -> dict:
+        """Requests and request-body bytes per route since start()."""
+        if self._httpd is None:
+            return {"requests": {}, "bytes_received": {}}
+        with self._httpd._lock:
+            return {
+                "requests": dict(self._httpd.requests),
+                "bytes_received": dict(self._httpd.bytes_received),
+            }
+
+    def env(self) -> dict[str, str]:
+        """
+        Environment variables that point the whole pipeline at this server.
+
+        Includes fake credentials so the "missing env var" checks pass.
+        """
+        base = self.base_url
+        return {
+            "OPENAI_API_KEY": "sk-benchmark",
+            "OPENAI_BASE_URL": f"{base}/v1",
+            "GEMINI_API_KEY": "benchmark",
+            "GOOGLE_GEMINI_BASE_URL": base,
+            "TENCENT_SECRET_ID": "benchmark-id",
+            "TENCENT_SECRET_KEY": "benchmark-key",
+            "TENCENT_COS_BUCKET": "benchmark-1250000000",
+            "TENCENT_COS_REGION": "ap-guangzhou",
+            "TENCENT_COS_ENDPOINT": base,
+            "HUNYUAN3D_API_ENDPOINT": base,
+        }
@@ -25,7 +25,10 @@ from pathlib import Path
 from typing import Annotated, Optional
 from datetime import datetime
 import sys
+import time
 import os
+import json
+import sqlite3
 
 # Load environment variables from .env file (if it exists)
 # This allows storing API keys in a .env file instead of exporting them manually
@@ -44,13 +47,47 @@ import typer
 from src.models import CharacterSpec, load_character_spec
 
 # stage*_*.py: Prompt generators for each pipeline stage
+from src.prompt_templates import spec_fields                  # Stages 1-3: Shared fields
 from src.stage1_base_prompts import generate_base_prompts      # Stage 1: Base prompts
 from src.stage2_gemini_prompts import generate_gemini_prompts  # Stage 2a: Gemini meta-prompts
 from src.stage2_llm_refiner import (                           # Stage 2b: LLM refinement
     refine_prompts_to_dict,
     preview_llm_requests,
+    estimate_request_sizes,
     OPENAI_API_KEY_ENV,
+    PROMPT_CACHE_MIN_TOKENS,
+    REFINE_MODES,
+    DEFAULT_REFINE_MODE,
+    PROMPT_FILE_KEYS,
 )
+from src.spec_sweep import (                                    # Spec variant sweeps
+    load_sweep,
+    expand_sweep,
+    read_finished_hashes,
+    record_finished_variant,
+    VARIANTS_LOG_NAME,
+)
+from src.spec_library import load_spec_library                  # Input: Spec folders
+from src.batch_refiner import (                                # Stage 2b: Batch API
+    refine_prompts_batch,
+    find_spec_files,
+    DEFAULT_BATCH_POLL_INTERVAL,
+)
+from src.incremental import (                                  # --incremental runs
+    IncrementalPlan,
+    STAGE_IMAGES,
+    STAGE_REFINE,
+    STAGE_STATIC,
+    STATIC_TEMPLATES,
+    find_previous_run,
+    forget_outputs,
+    image_paths,
+    plan_incremental,
+    record_outputs,
+    render_static_prompts,
+    track_outputs,
+)
+from src.pipeline_graph import Node, NodeSkipped, PipelineGraph  # `all`: stages as a graph
 from src.stage3_common_prompts import generate_common_prompts  # Stage 3: Checklist/Notes
 from src.stage4_image_generation import (                       # Stage 4: Image Gen
     generate_tpose_images,
@@ -58,8 +95,12 @@ from src.stage4_image_generation import (                       # Stage 4: Image
     save_generated_images,
     edit_image_with_gemini,
     regenerate_single_view,
+    generate_view_candidates,
+    save_image_candidates,
+    find_image_candidates,
     GeneratedImage,
     GEMINI_API_KEY_ENV,
+    CANDIDATES_DIR_NAME,
 )
 from src.stage5_hunyuan3d import (                              # Stage 5: Hunyuan 3D
     generate_3d_model,
@@ -69,11 +110,72 @@ from src.stage5_hunyuan3d import (                              # Stage 5: Hunyu
     TENCENT_SECRET_KEY_ENV,
     VALID_PROVIDERS,
     is_sdk_available,
+    TextureOptions,
+    ViewFeed,
+    TPOSE_VIEW_TYPES,
+)
+from src.job_registry import (                                 # Stage 5: Job registry
+    JobRegistry,
+    JobEntry,
+    handle_interrupts,
+    DEFAULT_JOB_REGISTRY_NAME,
+    OPEN_STATUSES,
+)
+from src.background_review import (                             # Stage 4 → 5: Review
+    ReviewWorker,
+    REVIEW_MODES,
+    DEFAULT_REVIEW_MODE,
 )
 from src.providers import TENCENT_COS_BUCKET_ENV, TENCENT_COS_REGION_ENV
+from src.turntable_renderer import (                            # Stage 5: Previews
+    render_turntables,
+    find_model_objs,
+    DEFAULT_VIEW_COUNT,
+    DEFAULT_FRAME_SIZE,
+)
+
+# image_encoding.py: Image format detection and output encoding
+from src.image_encoding import (                                # Stage 4/5: Encoding
+    ImageEncoding,
+    UploadTransform,
+    DEFAULT_UPLOAD_MAX_EDGE,
+    encode_image,
+    extension_for,
+)
+
+# image_preflight.py: Quality checks on generated images before Stage 5
+from src.image_preflight import (                               # Stage 4 → 5 gate
+    run_preflight,
+    preflight_with_retries,
+    rank_images,
+    PreflightReport,
+)
+
+# tracing.py, metrics.py, run_ledger.py: Timing, metrics, and run history
+from src.tracing import start_trace, stop_trace, get_tracer     # Timing for every stage
+from src.metrics import (                                       # Prometheus metrics
+    MetricsServer,
+    enable_metrics,
+    get_metrics,
+    start_metrics_server,
+)
+from src.run_ledger import (                                    # Cross-run analytics
+    DEFAULT_LEDGER_NAME,
+    RunLedger,
+    RunRecord,
+    outcome_from_spans,
+    parse_since,
+    spec_hash,
+)
 
 # file_utils.py: File output utilities
-from src.file_utils import write_prompts, print_prompts_to_stdout
+from src.file_utils import (
+    write_prompts,
+    print_prompts_to_stdout,
+    resolve_output_path,
+    sanitize_filename,
+    PARTIAL_SUFFIX,
+)
 
 
 # -----------------------------------------------------------------------------
@@ -107,6 +209,223 @@ def create_timestamped_output_dir(base_dir: Path) -> Path:
     return timestamped_dir
 
 
+# -----------------------------------------------------------------------------
+# INCREMENTAL RUNS (inputs.json)
+# -----------------------------------------------------------------------------
+
+def prepare_run_output_dir(
+    output_dir: Path,
+    spec: CharacterSpec,
+    version: str,
+    incremental: bool,
+    tracked: dict,
+) -> tuple[Path, IncrementalPlan]:
+    """
+    Pick the run folder and decide which outputs to (re)generate.
+    
+    Without --incremental every run gets a new timestamped folder and
+    everything is generated. With it, the latest folder for this
+    character and version is reused, and only outputs whose inputs
+    changed are regenerated (see src/incremental.py).
+    
+    Args:
+        output_dir: Base output directory
+        spec: The character specification
+        version: Version string for filenames
+        incremental: Reuse the previous run folder if there is one
+        tracked: track_outputs() for this spec and the run's settings
+        
+    Returns:
+        (run folder, plan of what to regenerate)
+    """
+    previous = find_previous_run(output_dir, spec, version) if incremental else None
+    plan = plan_incremental(previous, spec, version, tracked)
+    
+    if previous is None:
+        if incremental:
+            print("Incremental: no previous run for this character, generating everything")
+        return create_timestamped_output_dir(output_dir), plan
+    
+    print(f"Incremental: updating {previous}/")
+    if plan.changed_fields:
+        print(f"  Changed spec fields: {', '.join(plan.changed_fields)}")
+    print(f"  {len(plan.unchanged)} outputs unchanged, {len(plan.changed)} to regenerate")
+    for key in plan.changed:
+        print(f"    ↻ {key}")
+    return previous, plan
+
+
+def generate_planned_prompts(spec: CharacterSpec, plan: IncrementalPlan) -> dict[str, str]:
+    """Generate the static prompts the plan says are out of date."""
+    keys = plan.stage_keys(STAGE_STATIC)
+    if len(keys) == len(STATIC_TEMPLATES):
+        return generate_all_prompts(spec)
+    return render_static_prompts(keys, spec_fields(spec))
+
+
+# -----------------------------------------------------------------------------
+# RUN TRACE (trace.json)
+# -----------------------------------------------------------------------------
+
+def write_run_trace(run_output_dir: Path) -> Optional[Path]:
+    """
+    Stop tracing and write trace.json into the run folder.
+    
+    The file uses the Chrome trace format - open it in chrome://tracing
+    or https://ui.perfetto.dev to see a timeline of the run.
+    
+    Args:
+        run_output_dir: The timestamped output folder for this run
+        
+    Returns:
+        Path to trace.json, or None if nothing was traced
+    """
+    tracer = stop_trace()
+    if tracer is None or not tracer.spans:
+        return None
+    
+    trace_path = tracer.write(run_output_dir / "trace.json")
+    
+    print(f"\n⏱️  Trace: {trace_path} (open in https://ui.perfetto.dev)")
+    for name, count, seconds in tracer.summary(top=5):
+        print(f"  {seconds:8.1f}s  {name} (x{count})")
+    opened, reused = tracer.connection_counts()
+    if opened or reused:
+        print(f"  HTTP connections: {opened} opened, {reused} reused from the pool")
+    
+    return trace_path
+
+
+def refined_prompt_paths(run_output_dir: Path, spec: CharacterSpec, version: str) -> dict[str, Path]:
+    """Where write_prompts() puts the refined prompts (used for streaming into them)."""
+    return {
+        key: resolve_output_path(run_output_dir, spec, version, key)
+        for key in PROMPT_FILE_KEYS.values()
+    }
+
+
+def report_partial_files(run_output_dir: Path) -> None:
+    """After a failed streaming refine, list the partial outputs that were kept."""
+    partials = sorted(run_output_dir.rglob(f"*{PARTIAL_SUFFIX}"))
+    if partials:
+        print("Partial output kept for inspection:", file=sys.stderr)
+        for path in partials:
+            print(f"  {path}", file=sys.stderr)
+
+
+# -----------------------------------------------------------------------------
+# RUN LEDGER (ledger.sqlite)
+# -----------------------------------------------------------------------------
+
+def record_run_in_ledger(
+    ledger_path: Optional[Path],
+    command: str,
+    started_at: datetime,
+    spec: Optional[CharacterSpec],
+    version: Optional[str],
+    run_output_dir: Optional[Path],
+    outcome: Optional[str] = None,
+    error: Optional[str] = None,
+) -> None:
+    """
+    Append this run to the SQLite ledger.
+    
+    Must be called BEFORE write_run_trace(), which stops the tracer
+    the ledger reads its stage/API numbers from.
+    
+    Args:
+        ledger_path: Ledger file (None = ledger disabled)
+        command: CLI command name
+        started_at: When the command started
+        spec: Character spec (None for prompt/image-only runs)
+        version: Version tag
+        run_output_dir: Run folder (scanned for images and metadata.json)
+        outcome: "ok", "partial", or "failed" (None = derive from spans)
+        error: Error message for failed runs
+    """
+    if ledger_path is None:
+        return
+    
+    tracer = get_tracer()
+    spans = list(tracer.spans) if tracer else []
+    
+    record = RunRecord(
+        command=command,
+        started_at=started_at.isoformat(),
+        finished_at=datetime.now().isoformat(),
+        outcome=outcome or outcome_from_spans(spans),
+        character=spec.name if spec else None,
+        spec_hash=spec_hash(spec) if spec else None,
+        version=version,
+        error=error,
+        output_dir=str(run_output_dir) if run_output_dir else None,
+    )
+    
+    try:
+        with RunLedger(ledger_path) as run_ledger:
+            run_ledger.record_run(record, spans, run_output_dir)
+    except (sqlite3.Error, RuntimeError, OSError) as e:
+        # Analytics must never fail a run that otherwise succeeded
+        print(f"Warning: Could not write run ledger: {e}")
+        return
+    
+    print(f"📒 Ledger: {ledger_path} ({record.outcome})")
+
+
+# One ledger for every command (images/ and hunyuan3d/ default to
+# subfolders of output/, so output_dir can't be used to place it)
+DEFAULT_LEDGER_PATH = Path("output") / DEFAULT_LEDGER_NAME
+
+# Same for the Hunyuan job registry (one list of jobs to re-attach to)
+DEFAULT_JOB_REGISTRY_PATH = Path("output") / DEFAULT_JOB_REGISTRY_NAME
+
+
+def resolve_ledger_path(ledger: Optional[Path], no_ledger: bool) -> Optional[Path]:
+    """The ledger file for a command (None when disabled)."""
+    if no_ledger:
+        return None
+    return ledger or DEFAULT_LEDGER_PATH
+
+
+def start_run_metrics(
+    metrics_port: int,
+    metrics_textfile: Optional[Path],
+) -> Optional[MetricsServer]:
+    """
+    Enable Prometheus metrics for this command if requested.
+    
+    Args:
+        metrics_port: Local port for GET /metrics (0 = no endpoint)
+        metrics_textfile: node_exporter textfile (rewritten after every stage)
+        
+    Returns:
+        The running endpoint, or None
+    """
+    if not metrics_port and metrics_textfile is None:
+        return None
+    
+    enable_metrics(textfile=metrics_textfile)
+    if not metrics_port:
+        return None
+    
+    server = start_metrics_server(metrics_port)
+    print(f"📈 Metrics: {server.url}")
+    return server
+
+
+def finish_run_metrics(
+    server: Optional[MetricsServer],
+    metrics_textfile: Optional[Path],
+) -> None:
+    """Write the final metrics textfile and stop the endpoint."""
+    metrics = get_metrics()
+    if metrics is not None and metrics_textfile is not None:
+        metrics.write_textfile(metrics_textfile)
+        print(f"📈 Metrics written: {metrics_textfile}")
+    if server is not None:
+        server.stop()
+
+
 # -----------------------------------------------------------------------------
 # CLI APPLICATION SETUP
 # -----------------------------------------------------------------------------
@@ -151,21 +470,185 @@ def generate_all_prompts(spec: CharacterSpec) -> dict[str, str]:
     # Create an empty dictionary to hold all prompts
     all_prompts: dict[str, str] = {}
     
+    # Format the spec's fields once; every stage's templates share them
+    fields = spec_fields(spec)
+    
     # Stage 1: Generate base 2D prompts
-    base_prompts = generate_base_prompts(spec)
+    base_prompts = generate_base_prompts(spec, fields)
     all_prompts.update(base_prompts)
     
     # Stage 2: Generate Gemini meta-prompts
-    gemini_prompts = generate_gemini_prompts(spec)
+    gemini_prompts = generate_gemini_prompts(spec, fields)
     all_prompts.update(gemini_prompts)
     
     # Stage 3: Generate common documents
-    common_prompts = generate_common_prompts(spec)
+    common_prompts = generate_common_prompts(spec, fields)
     all_prompts.update(common_prompts)
     
     return all_prompts
 
 
+# -----------------------------------------------------------------------------
+# UPLOAD TRANSFORM OPTIONS (Stage 5)
+# -----------------------------------------------------------------------------
+
+def build_upload_transform(
+    max_edge: int,
+    output_format: str,
+    quality: int,
+    keep_metadata: bool,
+) -> Optional[UploadTransform]:
+    """
+    Turn the --upload-* CLI options into an UploadTransform.
+    
+    Args:
+        max_edge: Longest edge in pixels (0 = no transform, upload originals)
+        output_format: "jpeg" or "webp"
+        quality: Lossy quality (1-100)
+        keep_metadata: Keep EXIF/ICC metadata
+        
+    Returns:
+        UploadTransform, or None if disabled
+        
+    Raises:
+        typer.Exit: If the options are invalid
+    """
+    if max_edge <= 0:
+        return None
+    
+    try:
+        return UploadTransform(
+            max_edge=max_edge,
+            format=output_format,
+            quality=quality,
+            strip_metadata=not keep_metadata,
+        )
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        raise typer.Exit(code=1)
+
+
+def resolve_3d_provider(provider: str) -> str:
+    """The provider `all` uses: "sdk" falls back to "http" if the SDK isn't installed."""
+    if provider == "sdk" and not is_sdk_available():
+        return "http"
+    return provider
+
+
+# -----------------------------------------------------------------------------
+# IMAGE PREFLIGHT (Stage 4 → 5 gate)
+# -----------------------------------------------------------------------------
+
+def preflight_front_image(
+    images: list,
+    spec: CharacterSpec,
+    version: str,
+    api_key: str,
+    max_regenerations: int,
+) -> bool:
+    """
+    Run the preflight checks on the front view and regenerate it if needed.
+    
+    The front image is what Stage 5 uploads, so it's the only one gated.
+    If a regenerated candidate scores better, it replaces the front image
+    in the list (in place) before the images are saved.
+    
+    Args:
+        images: GeneratedImage list from generate_tpose_images()
+        spec: The character specification
+        version: Version string for filenames
+        api_key: Gemini API key (used for regeneration)
+        max_regenerations: How many times to regenerate on failure
+        
+    Returns:
+        True if the (final) front image passed every check
+    """
+    front = next((img for img in images if img.view == "front"), None)
+    if front is None:
+        return False
+    
+    def regenerate() -> bytes:
+        return regenerate_single_view(
+            spec=spec,
+            view="front",
+            version=version,
+            api_key=api_key,
+        ).image_data
+    
+    def show(attempt: int, report) -> None:
+        label = "Preflight" if attempt == 0 else f"Preflight (regeneration {attempt})"
+        status = "passed" if report.passed else "FAILED"
+        print(f"\n🔍 {label} {status}:")
+        for line in report.summary().splitlines():
+            print(f"  {line}")
+    
+    image_data, report, _ = preflight_with_retries(
+        front.image_data,
+        view="front",
+        regenerate=regenerate,
+        max_regenerations=max_regenerations,
+        on_report=show,
+    )
+    front.image_data = image_data
+    
+    if not report.passed:
+        print("\n⚠️  Front image failed preflight.")
+    
+    return report.passed
+
+
+# -----------------------------------------------------------------------------
+# IMAGE CANDIDATES (best-of-N, Stage 4)
+# -----------------------------------------------------------------------------
+
+def generate_ranked_candidates(
+    spec: CharacterSpec,
+    view: str,
+    count: int,
+    api_key: str,
+) -> list[GeneratedImage]:
+    """
+    Generate N candidates of a view at once and rank them with the preflight checks.
+    
+    Args:
+        spec: The character specification
+        view: "front", "side", or "back"
+        count: Number of candidates
+        api_key: Gemini API key
+        
+    Returns:
+        The candidates, best first (the ranking is printed)
+    """
+    candidates = generate_view_candidates(spec, view, count, api_key)
+    ranked = rank_images([candidate.image_data for candidate in candidates], view=view)
+    
+    print(f"\n🏆 {len(ranked)} {view} candidates, best first:")
+    for place, candidate in enumerate(ranked, 1):
+        print(f"  #{place}  score {candidate.score:.2f}  {describe_preflight(candidate.report)}")
+    return [candidates[candidate.index] for candidate in ranked]
+
+
+def describe_preflight(report: PreflightReport) -> str:
+    """"✓ passed" or the failed checks, for one-line listings."""
+    if report.passed:
+        return "✓ passed"
+    return "✗ " + ", ".join(check.name for check in report.failures)
+
+
+def keep_other_candidates(
+    ranked: list[GeneratedImage],
+    spec: CharacterSpec,
+    images_dir: Path,
+    version: str,
+    encoding: ImageEncoding,
+) -> None:
+    """Save every candidate but the best to images/candidates/."""
+    if len(ranked) < 2:
+        return
+    paths = save_image_candidates(ranked[1:], spec, images_dir, version, encoding=encoding)
+    print(f"  Kept {len(paths)} other candidate(s) in {images_dir / CANDIDATES_DIR_NAME}/")
+
+
 # -----------------------------------------------------------------------------
 # COMMAND: prompts (Stages 1-3)
 # -----------------------------------------------------------------------------
@@ -204,6 +687,13 @@ def generate_prompts_command(
             help="Print prompts to stdout instead of writing files",
         ),
     ] = False,
+    incremental: Annotated[
+        bool,
+        typer.Option(
+            "--incremental",
+            help="Update the latest run folder, regenerating only prompts whose inputs changed",
+        ),
+    ] = False,
 ) -> None:
     """
     Generate text prompts (Stages 1-3).
@@ -213,6 +703,10 @@ def generate_prompts_command(
     \b
     Example:
       uv run generate_prompts.py prompts -i configs/aethel.yaml -o prompts -v v1
+    
+    \b
+    Example (edit the spec, then only rewrite the prompts that changed):
+      uv run generate_prompts.py prompts -i configs/aethel.yaml --incremental
     """
     # Step 1: Load the character specification
     print(f"Loading character spec from: {input_file}")
@@ -227,26 +721,130 @@ def generate_prompts_command(
     
     # Step 2: Generate all prompts
     print(f"Generating prompts (version: {version})...")
-    prompts = generate_all_prompts(spec)
     
     # Step 3: Output
     if dry_run:
+        prompts = generate_all_prompts(spec)
         print("\n[DRY RUN] Printing prompts to stdout:\n")
         print_prompts_to_stdout(prompts)
     else:
-        # Create timestamped output directory
-        run_output_dir = create_timestamped_output_dir(output_dir)
+        # Timestamped output directory (or the previous one, --incremental)
+        tracked = track_outputs(spec)
+        run_output_dir, plan = prepare_run_output_dir(
+            output_dir, spec, version, incremental, tracked,
+        )
         print(f"Writing prompts to: {run_output_dir}/")
         
+        prompts = generate_planned_prompts(spec, plan)
         written_paths = write_prompts(prompts, spec, run_output_dir, version)
+        record_outputs(run_output_dir, spec, version, tracked, list(tracked))
         
-        print(f"\nGenerated {len(written_paths)} files:")
-        for path in written_paths:
-            print(f"  ✓ {path}")
+        if written_paths:
+            print(f"\nGenerated {len(written_paths)} files:")
+            for path in written_paths:
+                print(f"  ✓ {path}")
+        if plan.unchanged:
+            print(f"Kept {len(plan.unchanged)} unchanged files")
     
     print("\nDone!")
 
 
+# -----------------------------------------------------------------------------
+# COMMAND: sweep (Stages 1-3 for many spec variants)
+# -----------------------------------------------------------------------------
+
+# Print a progress line every N variants (big sweeps would flood the console)
+SWEEP_PROGRESS_EVERY = 100
+
+
+@app.command("sweep")
+def sweep_command(
+    input_file: Annotated[
+        Path,
+        typer.Option(
+            "--input", "-i",
+            help="Path to sweep file (YAML or JSON) with 'base' and 'axes'",
+            exists=True,
+            file_okay=True,
+            dir_okay=False,
+            readable=True,
+        ),
+    ],
+    output_dir: Annotated[
+        Path,
+        typer.Option(
+            "--output-dir", "-o",
+            help="Base output directory (the sweep gets a subfolder named after the file)",
+        ),
+    ] = Path("output") / "sweeps",
+    version: Annotated[
+        str,
+        typer.Option(
+            "--version", "-v",
+            help="Version string suffix for filenames (e.g., v1, v2)",
+        ),
+    ] = "v1",
+    limit: Annotated[
+        Optional[int],
+        typer.Option(
+            "--limit",
+            help="Stop after this many new variants (run again to continue)",
+            min=1,
+        ),
+    ] = None,
+) -> None:
+    """
+    Generate text prompts (Stages 1-3) for every variant of a sweep.
+    
+    Variants are expanded and written one at a time, each into a folder
+    named after its content hash. Finished variants are logged in
+    variants.jsonl, so re-running the same command skips them.
+    
+    \b
+    Example:
+      uv run generate_prompts.py sweep -i configs/sweeps/aethel_study.yaml
+    """
+    try:
+        sweep = load_sweep(input_file)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        raise typer.Exit(code=1)
+    
+    sweep_dir = output_dir / input_file.stem
+    sweep_dir.mkdir(parents=True, exist_ok=True)
+    finished = read_finished_hashes(sweep_dir)
+    
+    axes = " x ".join(f"{name} ({len(values)})" for name, values in sweep.axes.items())
+    print(f"Sweep: {sweep.base.name} - {axes} = {sweep.num_combinations} combinations")
+    print(f"Output directory: {sweep_dir}/")
+    if finished:
+        print(f"Resuming: {len(finished)} variants already done")
+    
+    start_time = time.time()
+    written = 0
+    for variant in expand_sweep(sweep, skip_hashes=finished):
+        if limit is not None and written >= limit:
+            print(f"\nStopped after --limit {limit} variants (run again to continue)")
+            break
+        
+        # Stages 1-3 for this variant, written before the next is expanded
+        prompts = generate_all_prompts(variant.spec)
+        write_prompts(prompts, variant.spec, sweep_dir / variant.content_hash, version)
+        record_finished_variant(sweep_dir, variant)
+        written += 1
+        
+        if written % SWEEP_PROGRESS_EVERY == 0:
+            print(f"  {written} variants written ({written / (time.time() - start_time):.0f}/s)")
+    
+    elapsed = time.time() - start_time
+    skipped = sweep.num_combinations - written - len(finished)
+    print(f"\nWrote {written} new variants in {elapsed:.1f}s", end="")
+    print(f" ({len(finished)} already done)" if finished else "")
+    if skipped > 0 and (limit is None or written < limit):
+        print(f"Skipped {skipped} duplicate combinations (same spec as another variant)")
+    print(f"Variant log: {sweep_dir / VARIANTS_LOG_NAME}")
+
+
 # -----------------------------------------------------------------------------
 # COMMAND: refine (Stage 2b - LLM Refinement)
 # -----------------------------------------------------------------------------
@@ -257,10 +855,10 @@ def refine_prompts_command(
         Path,
         typer.Option(
             "--input", "-i",
-            help="Path to character spec file (YAML or JSON)",
+            help="Path to character spec file (YAML or JSON); with --batch, also a folder of specs",
             exists=True,
             file_okay=True,
-            dir_okay=False,
+            dir_okay=True,
             readable=True,
         ),
     ],
@@ -307,6 +905,41 @@ def refine_prompts_command(
             help="Preview requests without making API calls",
         ),
     ] = False,
+    mode: Annotated[
+        str,
+        typer.Option(
+            "--mode",
+            help="per-view (4 requests) or single (1 request, JSON output)",
+        ),
+    ] = DEFAULT_REFINE_MODE,
+    stream: Annotated[
+        bool,
+        typer.Option(
+            "--stream",
+            help="Stream responses: live progress, files written as text arrives",
+        ),
+    ] = False,
+    batch: Annotated[
+        bool,
+        typer.Option(
+            "--batch",
+            help="Use the OpenAI Batch API (about half the cost, results within 24h)",
+        ),
+    ] = False,
+    batch_id: Annotated[
+        Optional[str],
+        typer.Option(
+            "--batch-id",
+            help="With --batch: wait for an already-submitted batch instead of submitting",
+        ),
+    ] = None,
+    batch_poll_interval: Annotated[
+        float,
+        typer.Option(
+            "--batch-poll-interval",
+            help="With --batch: seconds between batch status checks",
+        ),
+    ] = DEFAULT_BATCH_POLL_INTERVAL,
 ) -> None:
     """
     Refine prompts using OpenAI GPT (Stage 2b).
@@ -326,7 +959,35 @@ def refine_prompts_command(
     \b
     Preview mode (no API calls):
       uv run generate_prompts.py refine -i configs/aethel.yaml --preview
+    
+    \b
+    All four prompts from one request (structured JSON output):
+      uv run generate_prompts.py refine -i configs/aethel.yaml --mode single
+    
+    \b
+    Streaming (watch refined/*.txt.partial fill up):
+      uv run generate_prompts.py refine -i configs/aethel.yaml --stream
+    
+    \b
+    Overnight batch for a folder of specs (OpenAI Batch API):
+      uv run generate_prompts.py refine -i configs/ --batch
     """
+    if mode not in REFINE_MODES:
+        print(f"Error: Invalid mode: {mode}", file=sys.stderr)
+        print(f"Valid options: {', '.join(REFINE_MODES)}", file=sys.stderr)
+        raise typer.Exit(code=1)
+    
+    if batch:
+        run_batch_refine(
+            input_file, output_dir, version, model, web_search, api_key, mode,
+            batch_id, batch_poll_interval,
+        )
+        return
+    
+    if input_file.is_dir():
+        print(f"Error: {input_file} is a folder. Use --batch to refine many specs.", file=sys.stderr)
+        raise typer.Exit(code=1)
+    
     # Step 1: Load the character specification
     print(f"Loading character spec from: {input_file}")
     
@@ -342,7 +1003,7 @@ def refine_prompts_command(
     if preview_only:
         # Preview mode: show what would be sent to the LLM
         print("\n[PREVIEW] Requests that would be sent to LLM:\n")
-        requests = preview_llm_requests(spec)
+        requests = preview_llm_requests(spec, mode=mode)
         
         for key, request in requests.items():
             print(f"{'='*60}")
@@ -351,6 +1012,23 @@ def refine_prompts_command(
             print(request)
             print()
         
+        # Prompt-size budget (rough: ~4 characters per token)
+        sizes = estimate_request_sizes(spec, use_web_search=web_search)
+        print(f"{'='*60}")
+        print("=== Estimated input size ===")
+        print(f"{'='*60}\n")
+        print(f"  System prompt (instructions): ~{sizes['system']:,} tokens")
+        print(f"  Concept request:              ~{sizes['concept_request']:,} tokens")
+        print(f"  T-pose request (per view):    ~{sizes['tpose_request']:,} tokens")
+        print(f"  Total input (per-view, 4):    ~{sizes['total_input']:,} tokens")
+        print(f"  Total input (single, 1 call): ~{sizes['single_total_input']:,} tokens")
+        cacheable = sizes["tpose_shared_prefix"] >= PROMPT_CACHE_MIN_TOKENS
+        print(
+            f"  T-pose shared prefix:         ~{sizes['tpose_shared_prefix']:,} tokens "
+            f"({'cacheable' if cacheable else f'below the {PROMPT_CACHE_MIN_TOKENS:,}-token cache minimum'})"
+        )
+        print()
+        
         print("Done! (No API calls made)")
         
     else:
@@ -370,6 +1048,11 @@ def refine_prompts_command(
             print(f"\nOr use --preview to just see the requests.", file=sys.stderr)
             raise typer.Exit(code=1)
         
+        # Create timestamped output directory (up front, so streaming can
+        # write into it)
+        run_output_dir = create_timestamped_output_dir(output_dir)
+        stream_paths = refined_prompt_paths(run_output_dir, spec, version) if stream else None
+        
         try:
             # Refine prompts using LLM
             refined_prompts = refine_prompts_to_dict(
@@ -377,13 +1060,14 @@ def refine_prompts_command(
                 api_key=api_key,
                 model=model,
                 use_web_search=web_search,
+                mode=mode,
+                stream_to=stream_paths,
             )
             
-            # Create timestamped output directory
-            run_output_dir = create_timestamped_output_dir(output_dir)
-            
-            # Save refined prompts
-            print(f"\nWriting refined prompts to: {run_output_dir}/")
+            # Save refined prompts (when streaming, the files are already
+            # there - this only adds them to the manifest)
+            if stream_paths is None:
+                print(f"\nWriting refined prompts to: {run_output_dir}/")
             written_paths = write_prompts(refined_prompts, spec, run_output_dir, version)
             
             print(f"\nGenerated {len(written_paths)} refined prompt files:")
@@ -396,11 +1080,99 @@ def refine_prompts_command(
             
         except Exception as e:
             print(f"\nError refining prompts: {e}", file=sys.stderr)
+            report_partial_files(run_output_dir)
             raise typer.Exit(code=1)
     
     print("\nDone!")
 
 
+def run_batch_refine(
+    input_path: Path,
+    output_dir: Path,
+    version: str,
+    model: str,
+    web_search: bool,
+    api_key: Optional[str],
+    mode: str,
+    batch_id: Optional[str],
+    poll_interval: float,
+) -> None:
+    """
+    `refine --batch`: refine every spec with one Batch API job.
+    
+    Prompts are written per character with write_prompts(), into one
+    timestamped folder (batch/ inside it keeps the raw batch files).
+    """
+    try:
+        find_spec_files(input_path)  # Fails early for a folder without specs
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        raise typer.Exit(code=1)
+    
+    # Check every spec before submitting - a bad file would waste the batch.
+    # Folders go through the spec library (parallel parsing + parsed-spec cache).
+    library = load_spec_library(input_path, recursive=False)
+    for path, error in library.errors.items():
+        print(f"Error: {path.name}: {error}", file=sys.stderr)
+    if library.errors:
+        raise typer.Exit(code=1)
+    for line in library.warning_summary():
+        print(f"Warning: {line}")
+    spec_files = list(library.specs)
+    specs = list(library.specs.values())
+    
+    # Prompt files are named after the character, so names must be unique
+    names = [sanitize_filename(spec.name) for spec in specs]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        print(f"Error: Several specs use the same name: {', '.join(duplicates)}", file=sys.stderr)
+        raise typer.Exit(code=1)
+    
+    print(f"Loaded {len(specs)} character specs from: {input_path}")
+    
+    run_output_dir = create_timestamped_output_dir(output_dir)
+    print(f"Output directory: {run_output_dir}/")
+    
+    print(f"\nRefining prompts with the OpenAI Batch API (version: {version})...")
+    start_trace()
+    
+    try:
+        result = refine_prompts_batch(
+            specs=specs,
+            work_dir=run_output_dir / "batch",
+            api_key=api_key,
+            model=model,
+            use_web_search=web_search,
+            mode=mode,
+            poll_interval=poll_interval,
+            batch_id=batch_id,
+        )
+    except ImportError as e:
+        print(f"\nError: {e}", file=sys.stderr)
+        raise typer.Exit(code=1)
+    except Exception as e:
+        print(f"\nError running batch: {e}", file=sys.stderr)
+        raise typer.Exit(code=1)
+    finally:
+        write_run_trace(run_output_dir)
+    
+    # Fan the results back out, one character at a time
+    print(f"\nBatch {result.batch_id} {result.status} after {result.elapsed_seconds:.0f}s")
+    for index, prompts in sorted(result.prompts.items()):
+        refined = {PROMPT_FILE_KEYS[name]: text for name, text in prompts.items()}
+        paths = write_prompts(refined, specs[index], run_output_dir, version)
+        print(f"  ✓ {specs[index].name}: {len(paths)} refined prompt files")
+    for index, reason in sorted(result.failures.items()):
+        print(f"  ✗ {specs[index].name} ({spec_files[index].name}): {reason}")
+    
+    if result.usage.calls:
+        print(f"\nTokens: {result.usage.summary()}")
+    print(f"\n{len(result.prompts)}/{len(specs)} characters refined")
+    
+    if result.failures:
+        raise typer.Exit(code=1)
+
+
 # -----------------------------------------------------------------------------
 # COMMAND: images (Stage 4)
 # -----------------------------------------------------------------------------
@@ -454,11 +1226,60 @@ def generate_images_command(
             help="Only generate image prompts, don't call API",
         ),
     ] = False,
-) -> None:
-    """
-    Generate T-pose images using Gemini API (Stage 4).
-    
-    Generates 3-view T-pose images (front, side, back) for 3D modeling.
+    image_format: Annotated[
+        str,
+        typer.Option(
+            "--image-format",
+            help="Saved image format: keep, png, jpeg, webp",
+        ),
+    ] = "keep",
+    image_quality: Annotated[
+        int,
+        typer.Option(
+            "--image-quality",
+            help="JPEG/WebP quality (1-100)",
+        ),
+    ] = 92,
+    lossless: Annotated[
+        bool,
+        typer.Option(
+            "--lossless",
+            help="Lossless recompression (PNG optimize / WebP lossless)",
+        ),
+    ] = False,
+    metrics_port: Annotated[
+        int,
+        typer.Option(
+            "--metrics-port",
+            help="Serve Prometheus metrics on this local port while running (0 = off)",
+        ),
+    ] = 0,
+    metrics_textfile: Annotated[
+        Optional[Path],
+        typer.Option(
+            "--metrics-textfile",
+            help="Write metrics to this file for node_exporter's textfile collector",
+        ),
+    ] = None,
+    ledger: Annotated[
+        Optional[Path],
+        typer.Option(
+            "--ledger",
+            help="SQLite run ledger (default: output/ledger.sqlite)",
+        ),
+    ] = None,
+    no_ledger: Annotated[
+        bool,
+        typer.Option(
+            "--no-ledger",
+            help="Don't record this run in the ledger",
+        ),
+    ] = False,
+) -> None:
+    """
+    Generate T-pose images using Gemini API (Stage 4).
+    
+    Generates 3-view T-pose images (front, side, back) for 3D modeling.
     Requires GEMINI_API_KEY environment variable or --api-key option.
     
     \b
@@ -469,6 +1290,10 @@ def generate_images_command(
     \b
     Prompts-only mode (no API calls):
       uv run generate_prompts.py images -i configs/aethel.yaml --prompts-only
+    
+    \b
+    Convert every image to WebP (smaller COS uploads):
+      uv run generate_prompts.py images -i configs/aethel.yaml --image-format webp
     """
     # Step 1: Load the character specification
     print(f"Loading character spec from: {input_file}")
@@ -491,6 +1316,12 @@ def generate_images_command(
     
     print(f"Views to generate: {', '.join(view_list)}")
     
+    try:
+        encoding = ImageEncoding(format=image_format, quality=image_quality, lossless=lossless)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        raise typer.Exit(code=1)
+    
     # Step 2: Generate images or prompts
     if prompts_only:
         # Prompts-only mode: just show the prompts that would be used
@@ -523,6 +1354,12 @@ def generate_images_command(
             print(f"\nOr use --prompts-only to just see the prompts.", file=sys.stderr)
             raise typer.Exit(code=1)
         
+        metrics_server = start_run_metrics(metrics_port, metrics_textfile)
+        ledger_path = resolve_ledger_path(ledger, no_ledger)
+        started_at = datetime.now()
+        run_output_dir: Optional[Path] = None
+        start_trace()
+        
         try:
             # Generate images
             images = generate_tpose_images(
@@ -537,23 +1374,463 @@ def generate_images_command(
             
             # Save images
             print(f"\nSaving images to: {run_output_dir}/")
-            saved_paths = save_generated_images(images, spec, run_output_dir, version)
+            saved_paths = save_generated_images(
+                images, spec, run_output_dir, version, encoding=encoding,
+            )
             
             print(f"\nGenerated {len(saved_paths)} images:")
             for path in saved_paths:
                 print(f"  ✓ {path}")
             
+            record_run_in_ledger(
+                ledger_path, "images", started_at, spec, version, run_output_dir,
+            )
+            write_run_trace(run_output_dir)
+            
         except ImportError as e:
             print(f"\nError: {e}", file=sys.stderr)
             raise typer.Exit(code=1)
             
         except Exception as e:
             print(f"\nError generating images: {e}", file=sys.stderr)
+            record_run_in_ledger(
+                ledger_path, "images", started_at, spec, version, run_output_dir,
+                outcome="failed", error=str(e),
+            )
             raise typer.Exit(code=1)
+        
+        finally:
+            finish_run_metrics(metrics_server, metrics_textfile)
     
     print("\nDone!")
 
 
+# -----------------------------------------------------------------------------
+# IMAGE REVIEW (Stage 4 → 5, human in the loop)
+# -----------------------------------------------------------------------------
+
+def find_front_image(paths: list[Path]) -> Optional[Path]:
+    """The front view among saved image paths (None if there is none)."""
+    return next((p for p in paths if "front" in p.name.lower()), None)
+
+
+def view_of_image(path: Path) -> Optional[str]:
+    """The T-pose view ("front", "side", "back") a saved image shows."""
+    name = path.name.lower()
+    return next((view for view in ("front", "side", "back") if f"_tpose_{view}_" in name), None)
+
+
+def print_review_screen(images_dir: Path, saved_image_paths: list[Path], front_image_path: Path) -> None:
+    """The list of generated images, with the front image for 3D marked."""
+    print(f"\n{'='*60}")
+    print("REVIEW GENERATED IMAGES")
+    print(f"{'='*60}")
+    print(f"\n📁 Images saved to: {images_dir}/")
+    print(f"\n📷 Generated images:")
+    for img_path in saved_image_paths:
+        marker = "→" if img_path == front_image_path else " "
+        print(f"  {marker} {img_path.name}")
+    print(f"\n🎯 Front image for 3D: {front_image_path.name}")
+
+
+def print_preflight_report(image_data: bytes) -> None:
+    """Run the preflight checks on a new front image and print them."""
+    report = run_preflight(image_data, view="front")
+    print(f"\n🔍 Preflight {'passed' if report.passed else 'FAILED'}:")
+    for line in report.summary().splitlines():
+        print(f"  {line}")
+
+
+def ask_edit_prompt() -> Optional[str]:
+    """Ask what to change in the front image (None if nothing was entered)."""
+    print(f"\n{'='*60}")
+    print("MODIFY FRONT IMAGE WITH GEMINI")
+    print(f"{'='*60}")
+    print("\nDescribe the changes you want to make to the front image.")
+    print("Examples:")
+    print("  - 'Make the coat shorter to expose the knees'")
+    print("  - 'Change the pose to have arms more horizontal'")
+    print("  - 'Remove the hat and show the hair'")
+    print("  - 'Make the background pure white'")
+    
+    edit_prompt = typer.prompt(
+        "\nEdit prompt",
+        type=str,
+    )
+    
+    if not edit_prompt.strip():
+        print("\nNo edit prompt provided, returning to menu.")
+        return None
+    return edit_prompt
+
+
+def regenerate_front_data(
+    spec: CharacterSpec,
+    version: str,
+    api_key: str,
+    encoding: ImageEncoding,
+    candidates: int = 1,
+    images_dir: Optional[Path] = None,
+) -> bytes:
+    """
+    A new front image, encoded for saving (not written yet).
+    
+    With candidates > 1, N images are generated at once and the best one
+    is returned; the others are kept in images_dir/candidates/.
+    """
+    if candidates > 1:
+        ranked = generate_ranked_candidates(spec, "front", candidates, api_key)
+        keep_other_candidates(ranked, spec, images_dir, version, encoding)
+        return encode_image(ranked[0].image_data, encoding)
+    
+    new_image = regenerate_single_view(
+        spec=spec,
+        view="front",
+        version=version,
+        api_key=api_key,
+    )
+    return encode_image(new_image.image_data, encoding)
+
+
+def edit_front_data(front_image_path: Path, edit_prompt: str, api_key: str, encoding: ImageEncoding) -> bytes:
+    """The front image edited with Gemini, encoded for saving (not written yet)."""
+    edited_data = edit_image_with_gemini(
+        source_image_path=front_image_path,
+        edit_prompt=edit_prompt,
+        api_key=api_key,
+    )
+    return encode_image(edited_data, encoding)
+
+
+def save_new_front(
+    data: bytes,
+    kind: str,
+    source: Path,
+    spec: CharacterSpec,
+    version: str,
+    images_dir: Path,
+    saved_image_paths: list[Path],
+) -> Path:
+    """
+    Save a regenerated or edited front image and update the image list.
+    
+    A regenerated image replaces the front image file; an edited one is
+    saved next to its source (<source>_edited) to preserve the original.
+    """
+    if kind == "regenerate":
+        new_path = images_dir / GeneratedImage("front", data, "").get_filename(spec.name, version)
+        new_path.write_bytes(data)
+        for i, p in enumerate(saved_image_paths):
+            if "front" in p.name.lower():
+                saved_image_paths[i] = new_path
+                break
+    else:
+        new_path = images_dir / (source.stem + "_edited" + extension_for(data))
+        new_path.write_bytes(data)
+        saved_image_paths.append(new_path)
+    return new_path
+
+
+def pick_saved_candidate(
+    spec: CharacterSpec,
+    version: str,
+    images_dir: Path,
+    saved_image_paths: list[Path],
+    front_image_path: Path,
+) -> Optional[Path]:
+    """
+    Let the user swap the front image with a kept candidate (no API call).
+    
+    The candidates are listed ranked by the preflight score. The replaced
+    front image takes the candidate's place, so nothing is lost.
+    saved_image_paths is updated in place.
+    
+    Returns:
+        The new front image path (new extension if the formats differ),
+        or None if the user kept the current image
+    """
+    paths = find_image_candidates(spec, images_dir, version)
+    ranked = rank_images([path.read_bytes() for path in paths], view="front")
+    current = rank_images([front_image_path.read_bytes()], view="front")[0]
+    
+    print(f"\n{'='*60}")
+    print("SAVED CANDIDATES")
+    print(f"{'='*60}")
+    print(f"\n  Current front image: score {current.score:.2f}  {describe_preflight(current.report)}\n")
+    for place, candidate in enumerate(ranked, 1):
+        print(f"  [{place}] {paths[candidate.index].name}  score {candidate.score:.2f}  {describe_preflight(candidate.report)}")
+    
+    choice = typer.prompt("\nCandidate to use (0 = keep the current image)", type=int, default=1)
+    if not 1 <= choice <= len(ranked):
+        return None
+    
+    # Swap: the candidate becomes the front image and vice versa
+    picked = ranked[choice - 1]
+    picked_path = paths[picked.index]
+    old_front_data = front_image_path.read_bytes()
+    picked_path.unlink()
+    picked_path.with_suffix(extension_for(old_front_data)).write_bytes(old_front_data)
+    
+    new_front_path = front_image_path.with_suffix(extension_for(picked.image_data))
+    if new_front_path != front_image_path:
+        front_image_path.unlink()
+    new_front_path.write_bytes(picked.image_data)
+    saved_image_paths[:] = [new_front_path if p == front_image_path else p for p in saved_image_paths]
+    
+    print(f"\n✓ {picked_path.name} is now the front image ({new_front_path.name})")
+    return new_front_path
+
+
+def review_images_before_3d(
+    spec: CharacterSpec,
+    version: str,
+    images_dir: Path,
+    saved_image_paths: list[Path],
+    front_image_path: Path,
+    encoding: ImageEncoding,
+    preflight: bool,
+    candidates: int = 1,
+) -> Optional[Path]:
+    """
+    Show the generated images and ask whether to continue to 3D.
+    
+    The user can regenerate the front image or edit it with Gemini until
+    they are happy with it. saved_image_paths is updated in place.
+    
+    Args:
+        spec: The character specification
+        version: Version string for filenames
+        images_dir: Folder the images were saved to
+        saved_image_paths: Saved images (the list shown to the user)
+        front_image_path: Front image that Stage 5 would use
+        encoding: How regenerated/edited images are saved
+        preflight: Run the preflight checks on a regenerated front image
+        candidates: Regenerate this many front images at once (best-of-N)
+        
+    Returns:
+        The (possibly regenerated or edited) front image to use for 3D,
+        or None if the user skipped 3D generation
+    """
+    while True:
+        print_review_screen(images_dir, saved_image_paths, front_image_path)
+        print(f"\n💡 Please review the generated images before proceeding.")
+        print(f"   Open the images folder to check quality and accuracy.")
+        
+        # Prompt for confirmation
+        print()
+        if typer.confirm("Proceed with 3D model generation?", default=True):
+            return front_image_path  # User approved, proceed with 3D
+        
+        # User declined - offer regeneration options
+        print(f"\n{'='*60}")
+        print("REGENERATION OPTIONS")
+        print(f"{'='*60}")
+        print("\nThe front image will be used for 3D model generation.")
+        print("Choose how to proceed:\n")
+        print("  [1] Regenerate front image entirely (new generation)")
+        print("  [2] Modify front image with Gemini (edit with text prompt)")
+        print("  [3] Skip 3D generation (exit)")
+        saved_candidates = find_image_candidates(spec, images_dir, version)
+        if saved_candidates:
+            print(f"  [4] Use a saved candidate instead ({len(saved_candidates)} kept, no API call)")
+        
+        choice = typer.prompt(
+            "\nYour choice",
+            type=str,
+            default="3",
+        )
+        
+        if choice == "1":
+            # Regenerate front image entirely
+            print(f"\n{'='*60}")
+            print("REGENERATING FRONT IMAGE")
+            print(f"{'='*60}")
+            
+            gemini_key = os.environ.get(GEMINI_API_KEY_ENV)
+            if not gemini_key:
+                print(f"\nError: {GEMINI_API_KEY_ENV} not set.")
+                continue
+            
+            try:
+                # Save the new image, overwriting the old one
+                data = regenerate_front_data(spec, version, gemini_key, encoding, candidates, images_dir)
+                front_image_path = save_new_front(
+                    data, "regenerate", front_image_path, spec, version, images_dir, saved_image_paths,
+                )
+                print(f"\n✓ New front image saved: {front_image_path.name}")
+                print("  Please review the new image.")
+                
+                if preflight:
+                    print_preflight_report(data)
+                
+            except Exception as e:
+                print(f"\nError regenerating image: {e}")
+            
+            continue  # Loop back to show the review screen
+            
+        elif choice == "2":
+            # Modify front image with Gemini
+            edit_prompt = ask_edit_prompt()
+            if edit_prompt is None:
+                continue
+            
+            gemini_key = os.environ.get(GEMINI_API_KEY_ENV)
+            if not gemini_key:
+                print(f"\nError: {GEMINI_API_KEY_ENV} not set.")
+                continue
+            
+            try:
+                print(f"\n  Editing image with prompt: '{edit_prompt}'")
+                print(f"  Using model: gemini-3-pro-image-preview (Nano Banana Pro)")
+                
+                # Save edited image with a new name to preserve original,
+                # and use the edited version from now on
+                data = edit_front_data(front_image_path, edit_prompt, gemini_key, encoding)
+                front_image_path = save_new_front(
+                    data, "edit", front_image_path, spec, version, images_dir, saved_image_paths,
+                )
+                
+                print(f"\n✓ Edited image saved: {front_image_path.name}")
+                print("  Please review the edited image.")
+                
+            except Exception as e:
+                print(f"\nError editing image: {e}")
+            
+            continue  # Loop back to show the review screen
+            
+        elif choice == "4" and saved_candidates:
+            front_image_path = pick_saved_candidate(
+                spec, version, images_dir, saved_image_paths, front_image_path,
+            ) or front_image_path
+            continue  # Loop back to show the review screen
+            
+        else:
+            # Skip 3D generation
+            print(f"\nYou can generate the 3D model later with:")
+            print(f"  uv run generate_prompts.py hunyuan3d --image {front_image_path}")
+            return None
+
+
+def review_images_in_background(
+    spec: CharacterSpec,
+    version: str,
+    images_dir: Path,
+    saved_image_paths: list[Path],
+    front_image_path: Path,
+    encoding: ImageEncoding,
+    preflight: bool,
+    worker: ReviewWorker,
+    candidates: int = 1,
+) -> Optional[Path]:
+    """
+    Like review_images_before_3d(), but nothing waits for the user.
+    
+    The front candidate is uploaded (and with `speculative`, submitted) by
+    the worker while the menu is shown, and regenerations and edits run in
+    the background - the menu comes back at once, and finished work shows
+    up on the next refresh (the newest result becomes the front image).
+    
+    Args:
+        (as review_images_before_3d)
+        worker: ReviewWorker doing the background work
+        candidates: Regenerate this many front images at once (best-of-N)
+        
+    Returns:
+        The approved front image (worker.use() gives its prepared upload),
+        or None if the user skipped 3D generation
+    """
+    worker.prepare(front_image_path)
+    
+    while True:
+        # Apply what finished since the last screen
+        for task in worker.finished():
+            try:
+                data = task.future.result()
+            except Exception as e:
+                print(f"\nError: {task.label} failed: {e}")
+                continue
+            front_image_path = save_new_front(
+                data, task.kind, task.source, spec, version, images_dir, saved_image_paths,
+            )
+            worker.prepare(front_image_path)
+            print(f"\n✓ {task.label} finished: {front_image_path.name}")
+            if task.kind == "regenerate" and preflight:
+                print_preflight_report(data)
+        
+        print_review_screen(images_dir, saved_image_paths, front_image_path)
+        status = worker.status_lines(front_image_path)
+        if status:
+            print()
+            for line in status:
+                print(f"  {line}")
+        
+        pending = worker.running()
+        print(f"\n{'='*60}")
+        print("  [y] Proceed with 3D model generation")
+        print("  [1] Regenerate front image (in the background)")
+        print("  [2] Modify front image with Gemini (in the background)")
+        print("  [r] Refresh (show finished background work)")
+        print("  [3] Skip 3D generation (exit)")
+        saved_candidates = find_image_candidates(spec, images_dir, version)
+        if saved_candidates:
+            print(f"  [4] Use a saved candidate instead ({len(saved_candidates)} kept, no API call)")
+        
+        choice = typer.prompt(
+            "\nYour choice",
+            type=str,
+            default="r" if pending else "y",
+        ).strip().lower()
+        
+        if choice == "y":
+            if pending and not typer.confirm(
+                f"{len(pending)} background task(s) still running - use {front_image_path.name} anyway?",
+                default=False,
+            ):
+                continue
+            return front_image_path
+        
+        elif choice in ("1", "2"):
+            gemini_key = os.environ.get(GEMINI_API_KEY_ENV)
+            if not gemini_key:
+                print(f"\nError: {GEMINI_API_KEY_ENV} not set.")
+                continue
+            
+            # Bind the current values: the lambdas run after the loop moves on
+            if choice == "1":
+                worker.start(
+                    "Regenerating the front image", "regenerate", front_image_path,
+                    lambda key=gemini_key: regenerate_front_data(
+                        spec, version, key, encoding, candidates, images_dir,
+                    ),
+                )
+            else:
+                edit_prompt = ask_edit_prompt()
+                if edit_prompt is None:
+                    continue
+                worker.start(
+                    f"Edit '{edit_prompt}'", "edit", front_image_path,
+                    lambda source=front_image_path, prompt=edit_prompt, key=gemini_key: edit_front_data(
+                        source, prompt, key, encoding,
+                    ),
+                )
+            print("\n  Started in the background - keep reviewing, or refresh later.")
+        
+        elif choice == "4" and saved_candidates:
+            picked = pick_saved_candidate(spec, version, images_dir, saved_image_paths, front_image_path)
+            if picked is not None:
+                front_image_path = picked
+                worker.prepare(front_image_path)
+        
+        elif choice == "r":
+            continue
+        
+        else:
+            # Skip 3D generation
+            print(f"\nYou can generate the 3D model later with:")
+            print(f"  uv run generate_prompts.py hunyuan3d --image {front_image_path}")
+            return None
+
+
 # -----------------------------------------------------------------------------
 # COMMAND: all (Full pipeline)
 # -----------------------------------------------------------------------------
@@ -599,6 +1876,20 @@ def generate_all_command(
             help="Enable web search for LLM refinement",
         ),
     ] = False,
+    refine_mode: Annotated[
+        str,
+        typer.Option(
+            "--refine-mode",
+            help="LLM refinement: per-view (4 requests) or single (1 request, JSON output)",
+        ),
+    ] = DEFAULT_REFINE_MODE,
+    stream_refine: Annotated[
+        bool,
+        typer.Option(
+            "--stream-refine",
+            help="Stream LLM refinement (live progress, files written as text arrives)",
+        ),
+    ] = False,
     skip_images: Annotated[
         bool,
         typer.Option(
@@ -634,12 +1925,147 @@ def generate_all_command(
             help="Timeout in seconds for 3D generation",
         ),
     ] = 600,
+    poll_interval_3d: Annotated[
+        float,
+        typer.Option(
+            "--poll-interval-3d",
+            help="Initial seconds between 3D status polls",
+        ),
+    ] = 10.0,
+    preflight: Annotated[
+        bool,
+        typer.Option(
+            "--preflight/--no-preflight",
+            help="Check the front image (background, margins, symmetry, arms) before 3D",
+        ),
+    ] = True,
+    preflight_retries: Annotated[
+        int,
+        typer.Option(
+            "--preflight-retries",
+            help="Auto-regenerate the front image up to N times if preflight fails",
+        ),
+    ] = 0,
+    image_format: Annotated[
+        str,
+        typer.Option(
+            "--image-format",
+            help="Saved image format: keep, png, jpeg, webp",
+        ),
+    ] = "keep",
+    image_quality: Annotated[
+        int,
+        typer.Option(
+            "--image-quality",
+            help="JPEG/WebP quality (1-100)",
+        ),
+    ] = 92,
+    lossless: Annotated[
+        bool,
+        typer.Option(
+            "--lossless",
+            help="Lossless recompression (PNG optimize / WebP lossless)",
+        ),
+    ] = False,
+    upload_max_edge: Annotated[
+        int,
+        typer.Option(
+            "--upload-max-edge",
+            help="Downscale images to this longest edge before COS upload (0 = upload original)",
+        ),
+    ] = DEFAULT_UPLOAD_MAX_EDGE,
+    upload_format: Annotated[
+        str,
+        typer.Option(
+            "--upload-format",
+            help="Format for uploaded images: jpeg or webp",
+        ),
+    ] = "jpeg",
+    upload_quality: Annotated[
+        int,
+        typer.Option(
+            "--upload-quality",
+            help="JPEG/WebP quality for uploaded images (1-100)",
+        ),
+    ] = 90,
+    keep_metadata: Annotated[
+        bool,
+        typer.Option(
+            "--keep-metadata",
+            help="Keep EXIF/ICC metadata in uploaded images",
+        ),
+    ] = False,
+    metrics_port: Annotated[
+        int,
+        typer.Option(
+            "--metrics-port",
+            help="Serve Prometheus metrics on this local port while running (0 = off)",
+        ),
+    ] = 0,
+    metrics_textfile: Annotated[
+        Optional[Path],
+        typer.Option(
+            "--metrics-textfile",
+            help="Write metrics to this file for node_exporter's textfile collector",
+        ),
+    ] = None,
+    ledger: Annotated[
+        Optional[Path],
+        typer.Option(
+            "--ledger",
+            help="SQLite run ledger (default: output/ledger.sqlite)",
+        ),
+    ] = None,
+    no_ledger: Annotated[
+        bool,
+        typer.Option(
+            "--no-ledger",
+            help="Don't record this run in the ledger",
+        ),
+    ] = False,
+    incremental: Annotated[
+        bool,
+        typer.Option(
+            "--incremental",
+            help="Update the latest run folder, skipping prompts, LLM calls, and images whose inputs are unchanged",
+        ),
+    ] = False,
+    view_window: Annotated[
+        float,
+        typer.Option(
+            "--view-window",
+            help="Seconds to wait for the side/back views to add them to the 3D job (0 = front view only)",
+        ),
+    ] = 0.0,
+    review_mode: Annotated[
+        str,
+        typer.Option(
+            "--review-mode",
+            help="Image review: blocking, background (upload/edit while you review), or speculative (also submit the 3D job)",
+        ),
+    ] = DEFAULT_REVIEW_MODE,
+    candidates: Annotated[
+        int,
+        typer.Option(
+            "--candidates",
+            help="Generate N front images at once, use the best (preflight score), keep the rest to pick from",
+        ),
+    ] = 1,
+    job_registry: Annotated[
+        Optional[Path],
+        typer.Option(
+            "--job-registry",
+            help="Record submitted Hunyuan jobs here (default: output/hunyuan_jobs.json)",
+        ),
+    ] = None,
 ) -> None:
     """
     Run the full pipeline (Stages 1-5).
     
     Generates static prompts, refines with LLM, creates T-pose images,
-    and generates a 3D model from the front view image.
+    and generates a 3D model from the front view image. Stages that don't
+    need each other run at the same time (e.g., LLM refinement runs while
+    the images and the 3D model are generated).
     
     After Stage 4 (image generation), you'll be prompted to review the images
     before proceeding to 3D generation. Use --auto-3d to skip this confirmation.
@@ -662,303 +2088,386 @@ def generate_all_command(
     \b
     Example (skip 3D generation):
       uv run generate_prompts.py all -i configs/aethel.yaml --skip-3d
+    
+    \b
+    Example (regenerate a bad front image up to 2 times automatically):
+      uv run generate_prompts.py all -i configs/aethel.yaml --preflight-retries 2
+    
+    \b
+    Example (after a spec edit, only redo the stages it affects):
+      uv run generate_prompts.py all -i configs/aethel.yaml --incremental
+    
+    \b
+    Example (multi-view 3D: start on the front image, add side/back views
+    that are ready within 60 seconds):
+      uv run generate_prompts.py all -i configs/aethel.yaml --auto-3d --view-window 60
+    
+    \b
+    Example (upload and submit the 3D job while you review the images):
+      uv run generate_prompts.py all -i configs/aethel.yaml --review-mode speculative
+    
+    \b
+    Example (best of 4 front images; the others can be picked at review):
+      uv run generate_prompts.py all -i configs/aethel.yaml --candidates 4
     """
+    if refine_mode not in REFINE_MODES:
+        print(f"Error: Invalid refine mode: {refine_mode}", file=sys.stderr)
+        print(f"Valid options: {', '.join(REFINE_MODES)}", file=sys.stderr)
+        raise typer.Exit(code=1)
+    
+    if view_window < 0:
+        print("Error: --view-window must be 0 or more", file=sys.stderr)
+        raise typer.Exit(code=1)
+    
+    if review_mode not in REVIEW_MODES:
+        print(f"Error: Invalid review mode: {review_mode}", file=sys.stderr)
+        print(f"Valid options: {', '.join(REVIEW_MODES)}", file=sys.stderr)
+        raise typer.Exit(code=1)
+    
+    if candidates < 1:
+        print("Error: --candidates must be 1 or more", file=sys.stderr)
+        raise typer.Exit(code=1)
+    
     # Step 1: Load spec
     print(f"Loading character spec from: {input_file}")
     
     try:
         spec = load_character_spec(input_file)
+        encoding = ImageEncoding(format=image_format, quality=image_quality, lossless=lossless)
     except (FileNotFoundError, ValueError) as e:
         print(f"Error: {e}", file=sys.stderr)
         raise typer.Exit(code=1)
     
+    upload_transform = build_upload_transform(
+        upload_max_edge, upload_format, upload_quality, keep_metadata,
+    )
+    
     print(f"Character: {spec.name} ({spec.role})")
     
-    # Create timestamped output directory for this run
-    run_output_dir = create_timestamped_output_dir(output_dir)
+    # What each output depends on (skipped stages have no outputs)
+    tracked = track_outputs(
+        spec,
+        refine=None if skip_refine else {"mode": refine_mode, "use_web_search": web_search},
+        images=None if skip_images else {
+            "format": encoding.format, "quality": encoding.quality, "lossless": encoding.lossless,
+        },
+    )
+    
+    # Create timestamped output directory for this run (or reuse the
+    # previous one with --incremental)
+    run_output_dir, plan = prepare_run_output_dir(output_dir, spec, version, incremental, tracked)
+    images_dir = run_output_dir / "images"
+    view_feed = ViewFeed()  # Stage 4 → 5: saved views, as they arrive
+    prepared_3d = {}        # Review → Stage 5: front image → PreparedInput
+    held_back = []          # --auto-3d: front image kept from Stage 5 (failed preflight)
+    registry_3d = JobRegistry(job_registry or DEFAULT_JOB_REGISTRY_PATH)  # Stage 5: submitted jobs
     print(f"\nOutput directory: {run_output_dir}/")
     
-    # Step 2: Generate static prompts (Stages 1, 2a, 3)
-    print(f"\n{'='*60}")
-    print("STAGE 1 & 3: Generating static prompts...")
-    print(f"{'='*60}")
-    
-    prompts = generate_all_prompts(spec)
-    written_prompt_paths = write_prompts(prompts, spec, run_output_dir, version)
-    
-    print(f"Generated {len(written_prompt_paths)} static prompt files")
-    
-    # Step 3: LLM Refinement (Stage 2b)
-    if not skip_refine:
+    # Record a span for every stage and API call (written as trace.json)
+    metrics_server = start_run_metrics(metrics_port, metrics_textfile)
+    ledger_path = resolve_ledger_path(ledger, no_ledger)
+    started_at = datetime.now()
+    start_trace()
+    
+    # Step 2: Describe the stages as a graph. Each node starts as soon as
+    # the nodes it needs are done, so refinement runs next to images and
+    # 3D. With --incremental, cached() reuses outputs that are current.
+    def static_prompts_node(inputs: dict) -> list[Path]:
+        """Stages 1, 2a, 3: template prompts (only the changed ones)."""
         print(f"\n{'='*60}")
-        print("STAGE 2: Refining prompts with LLM...")
+        print("STAGE 1 & 3: Generating static prompts...")
         print(f"{'='*60}")
         
+        prompts = generate_planned_prompts(spec, plan)
+        written_prompt_paths = write_prompts(prompts, spec, run_output_dir, version)
+        record_outputs(run_output_dir, spec, version, tracked, plan.stage_keys(STAGE_STATIC, changed_only=False))
+        print(f"Generated {len(written_prompt_paths)} static prompt files")
+        return written_prompt_paths
+    
+    def refine_node(inputs: dict) -> list[Path]:
+        """Stage 2b: LLM refinement."""
         openai_key = os.environ.get(OPENAI_API_KEY_ENV)
-        
         if not openai_key:
-            print(f"\nWarning: {OPENAI_API_KEY_ENV} not set. Skipping LLM refinement.")
-            print("Set the environment variable to enable LLM refinement.")
-        else:
-            try:
-                refined_prompts = refine_prompts_to_dict(
-                    spec=spec,
-                    api_key=openai_key,
-                    use_web_search=web_search,
-                )
-                refined_paths = write_prompts(refined_prompts, spec, run_output_dir, version)
-                print(f"Generated {len(refined_paths)} refined prompt files")
-            except Exception as e:
-                print(f"Warning: LLM refinement failed: {e}")
-                print("Static prompts were still generated successfully.")
-    else:
-        print("\n(LLM refinement skipped)")
-    
-    # Step 4: Generate images (Stage 4)
-    front_image_path: Optional[Path] = None
+            raise NodeSkipped(f"{OPENAI_API_KEY_ENV} not set")
+        
+        print(f"\n{'='*60}")
+        print("STAGE 2: Refining prompts with LLM...")
+        print(f"{'='*60}")
+        
+        # The refined prompts are requested together, so any change
+        # redoes all four
+        refine_keys = plan.stage_keys(STAGE_REFINE, changed_only=False)
+        forget_outputs(run_output_dir, refine_keys)
+        stream_paths = refined_prompt_paths(run_output_dir, spec, version) if stream_refine else None
+        try:
+            refined_prompts = refine_prompts_to_dict(
+                spec=spec,
+                api_key=openai_key,
+                use_web_search=web_search,
+                mode=refine_mode,
+                stream_to=stream_paths,
+            )
+        except Exception:
+            report_partial_files(run_output_dir)
+            raise
+        # Streamed files are rewritten with the same text, which also
+        # records them in the run's manifest
+        refined_paths = write_prompts(refined_prompts, spec, run_output_dir, version)
+        record_outputs(run_output_dir, spec, version, tracked, refine_keys)
+        print(f"Generated {len(refined_paths)} refined prompt files")
+        return refined_paths
+    
+    def images_node(inputs: dict) -> list[Path]:
+        """Stage 4: T-pose images (front image preflighted before 3D)."""
+        try:
+            return generate_and_save_images()
+        finally:
+            view_feed.close()  # Stage 5 stops waiting for views
     
-    if not skip_images:
+    def generate_and_save_images() -> list[Path]:
+        gemini_key = os.environ.get(GEMINI_API_KEY_ENV)
+        if not gemini_key:
+            raise NodeSkipped(f"{GEMINI_API_KEY_ENV} not set")
+        
         print(f"\n{'='*60}")
         print("STAGE 4: Generating T-pose images...")
         print(f"{'='*60}")
         
-        gemini_key = os.environ.get(GEMINI_API_KEY_ENV)
-        images_dir = run_output_dir / "images"
+        image_keys = plan.stage_keys(STAGE_IMAGES, changed_only=False)
+        forget_outputs(run_output_dir, image_keys)
+        old_images = image_paths(run_output_dir, spec, version)
+        saved_image_paths: list[Path] = []
         
-        if not gemini_key:
-            print(f"\nWarning: {GEMINI_API_KEY_ENV} not set. Skipping image generation.")
-            print("Set the environment variable to enable image generation.")
+        def save_as_generated(image: GeneratedImage) -> None:
+            """Save each view as soon as it lands, so Stage 5 can start on the front."""
+            # Cheap local checks before the front image can reach Stage 5
+            passed = True
+            if image.view == "front" and preflight and not skip_3d:
+                passed = preflight_front_image([image], spec, version, gemini_key, preflight_retries)
+            # The old image may have another extension (format changed)
+            for old_path in old_images:
+                if view_of_image(old_path) == image.view and old_path.exists():
+                    old_path.unlink()
+            path = save_generated_images([image], spec, images_dir, version, encoding=encoding)[0]
+            saved_image_paths.append(path)
+            if passed:
+                publish_view(path)
+            elif auto_3d:
+                # No review step would catch it, so don't start a billed job
+                print("   Not starting a 3D job with it (--auto-3d has no review step).")
+                print(f"   Check it, then run: hunyuan3d --image {path}")
+                held_back.append(path)
+                view_feed.close()
+            else:
+                print("   Review it before spending a 3D job.")
+                publish_view(path)
+        
+        # Candidates of the previous run belong to the images being replaced
+        for old_candidate in find_image_candidates(spec, images_dir, version):
+            old_candidate.unlink()
+        
+        views = ["front", "side", "back"]
+        if candidates > 1:
+            # Best-of-N front view: N requests at once; the best one is
+            # saved (and can start Stage 5), the others are kept for review
+            ranked = generate_ranked_candidates(spec, "front", candidates, gemini_key)
+            save_as_generated(ranked[0])
+            keep_other_candidates(ranked, spec, images_dir, version, encoding)
+            views = ["side", "back"]
+        
+        generate_tpose_images(spec, version, gemini_key, views=views, on_image=save_as_generated)
+        record_outputs(run_output_dir, spec, version, tracked, image_keys)
+        print(f"Generated {len(saved_image_paths)} images")
+        return saved_image_paths
+    
+    def cached_images() -> Optional[list[Path]]:
+        """Images of the previous run, if they are up to date."""
+        if not plan.stage_is_current(STAGE_IMAGES):
+            return None
+        saved_image_paths = image_paths(run_output_dir, spec, version)
+        for path in saved_image_paths:
+            publish_view(path)
+        view_feed.close()
+        return saved_image_paths or None
+    
+    def publish_view(path: Path) -> None:
+        """Hand a saved image to Stage 5 (which may already be waiting for it)."""
+        view = view_of_image(path)
+        if view == "front":
+            view_feed.put("front", path)
+        elif view in TPOSE_VIEW_TYPES:
+            view_feed.put(TPOSE_VIEW_TYPES[view], path)
+    
+    def review_node(inputs: dict) -> Optional[Path]:
+        """Human in the loop: approve, regenerate, or edit the front image."""
+        saved_image_paths = list(inputs["images"])
+        front_image_path = find_front_image(saved_image_paths)
+        if front_image_path is None or not front_image_path.exists():
+            raise NodeSkipped("no front image was generated")
+        
+        if review_mode != "blocking" and check_required_env_vars(include_cos=True):
+            print(f"\n(--review-mode {review_mode} needs the 3D environment variables - reviewing in blocking mode)")
+        elif review_mode != "blocking":
+            return review_in_background(saved_image_paths, front_image_path)
+        return review_images_before_3d(
+            spec, version, images_dir, saved_image_paths, front_image_path, encoding, preflight, candidates,
+        )
+    
+    def review_in_background(saved_image_paths: list[Path], front_image_path: Path) -> Optional[Path]:
+        """--review-mode background/speculative: upload (and submit) while the user decides."""
+        # The side/back views are already saved; add them like Stage 5 would
+        extra_views = {}
+        if view_window > 0:
+            for view_type in TPOSE_VIEW_TYPES.values():
+                path = view_feed.get(view_type, timeout=0)
+                if path is not None:
+                    extra_views[view_type] = path
+        
+        worker = ReviewWorker(
+            submit=review_mode == "speculative",
+            extra_views=extra_views,
+            upload_transform=upload_transform,
+            provider_type=resolve_3d_provider(provider_3d),
+            registry=registry_3d,
+        )
+        approved = None
+        try:
+            approved = review_images_in_background(
+                spec, version, images_dir, saved_image_paths, front_image_path, encoding, preflight, worker,
+                candidates,
+            )
+            if approved is not None:
+                prepared = worker.use(approved)
+                if prepared is not None:
+                    prepared_3d[approved] = prepared
+        finally:
+            worker.close(used=approved)
+        return approved
+    
+    def model_3d_node(inputs: dict) -> Path:
+        """Stage 5: Hunyuan 3D from the front image (+ side/back within the view window)."""
+        if "review" in inputs:
+            front_image_path = inputs["review"]
+            if front_image_path is None:
+                raise NodeSkipped("declined at review")
         else:
-            try:
-                images = generate_tpose_images(spec, version, gemini_key)
-                saved_image_paths = save_generated_images(images, spec, images_dir, version)
-                print(f"Generated {len(saved_image_paths)} images")
-                
-                # Find the front view image for Stage 5
-                for img_path in saved_image_paths:
-                    if "front" in img_path.name.lower():
-                        front_image_path = img_path
-                        break
-                
-            except Exception as e:
-                print(f"Warning: Image generation failed: {e}")
-                print("Prompts were still generated successfully.")
+            # --auto-3d: start as soon as Stage 4 saves the front view
+            front_image_path = view_feed.get("front")
+            if front_image_path is None and held_back:
+                raise NodeSkipped("front image failed preflight")
+        if front_image_path is None or not front_image_path.exists():
+            raise NodeSkipped("no front image was generated")
+        
+        # Check required env vars for 3D generation (with COS since we're uploading an image)
+        missing_vars = check_required_env_vars(include_cos=True)
+        if missing_vars:
+            print(f"\nWarning: Missing environment variables for 3D generation:")
+            for var in missing_vars:
+                print(f"  - {var}")
+            raise NodeSkipped("missing environment variables")
+        
+        print(f"\n{'='*60}")
+        print("STAGE 5: Generating 3D model with Hunyuan API...")
+        print(f"{'='*60}")
+        
+        # Check provider availability
+        actual_provider = resolve_3d_provider(provider_3d)
+        if actual_provider != provider_3d:
+            print("Warning: SDK provider not available, falling back to HTTP.")
+        
+        print(f"Using front image: {front_image_path}")
+        
+        # Create output directory for 3D model
+        hunyuan3d_dir = run_output_dir / "hunyuan3d"
+        hunyuan3d_dir.mkdir(parents=True, exist_ok=True)
+        
+        result = generate_3d_model(
+            image=front_image_path,
+            output_dir=hunyuan3d_dir,
+            poll_interval=poll_interval_3d,
+            timeout=timeout_3d,
+            verbose=True,
+            provider_type=actual_provider,
+            upload_transform=upload_transform,
+            view_feed=view_feed,
+            view_window=view_window,
+            prepared=prepared_3d.get(front_image_path),
+            registry=registry_3d,
+        )
+        
+        if result.status != "DONE" or not result.obj_path:
+            raise RuntimeError(
+                f"status {result.status}" + (f" ({result.error_message})" if result.error_message else "")
+            )
+        print(f"\n3D Model generated successfully!")
+        print(f"  OBJ: {result.obj_path}")
+        print(f"  Time: {result.elapsed_seconds:.1f}s")
+        return result.obj_path
+    
+    graph = PipelineGraph([Node("static_prompts", static_prompts_node, title="static prompts")])
+    
+    if skip_refine:
+        print("\n(LLM refinement skipped)")
     else:
+        graph.add(Node(
+            "refine", refine_node, title="LLM refinement",
+            cached=lambda: (
+                list(refined_prompt_paths(run_output_dir, spec, version).values())
+                if plan.stage_is_current(STAGE_REFINE) else None
+            ),
+        ))
+    
+    if skip_images:
         print("\n(Image generation skipped)")
-    
-    # Step 5: Generate 3D model (Stage 5)
-    if not skip_3d:
-        # Human-in-the-loop: Ask user to review images before 3D generation
-        proceed_with_3d = True
-        
-        if front_image_path and front_image_path.exists() and not auto_3d:
-            # Loop for regeneration options
-            while True:
-                print(f"\n{'='*60}")
-                print("REVIEW GENERATED IMAGES")
-                print(f"{'='*60}")
-                print(f"\n📁 Images saved to: {images_dir}/")
-                print(f"\n📷 Generated images:")
-                if 'saved_image_paths' in dir() and saved_image_paths:
-                    for img_path in saved_image_paths:
-                        marker = "→" if img_path == front_image_path else " "
-                        print(f"  {marker} {img_path.name}")
-                print(f"\n🎯 Front image for 3D: {front_image_path.name}")
-                print(f"\n💡 Please review the generated images before proceeding.")
-                print(f"   Open the images folder to check quality and accuracy.")
-                
-                # Prompt for confirmation
-                print()
-                proceed_with_3d = typer.confirm(
-                    "Proceed with 3D model generation?",
-                    default=True,
-                )
-                
-                if proceed_with_3d:
-                    break  # User approved, proceed with 3D
-                
-                # User declined - offer regeneration options
-                print(f"\n{'='*60}")
-                print("REGENERATION OPTIONS")
-                print(f"{'='*60}")
-                print("\nThe front image will be used for 3D model generation.")
-                print("Choose how to proceed:\n")
-                print("  [1] Regenerate front image entirely (new generation)")
-                print("  [2] Modify front image with Gemini (edit with text prompt)")
-                print("  [3] Skip 3D generation (exit)")
-                
-                choice = typer.prompt(
-                    "\nYour choice",
-                    type=str,
-                    default="3",
-                )
-                
-                if choice == "1":
-                    # Regenerate front image entirely
-                    print(f"\n{'='*60}")
-                    print("REGENERATING FRONT IMAGE")
-                    print(f"{'='*60}")
-                    
-                    gemini_key = os.environ.get(GEMINI_API_KEY_ENV)
-                    if not gemini_key:
-                        print(f"\nError: {GEMINI_API_KEY_ENV} not set.")
-                        continue
-                    
-                    try:
-                        new_image = regenerate_single_view(
-                            spec=spec,
-                            view="front",
-                            version=version,
-                            api_key=gemini_key,
-                        )
-                        
-                        # Save the new image, overwriting the old one
-                        new_path = images_dir / new_image.get_filename(spec.name, version)
-                        new_path.write_bytes(new_image.image_data)
-                        front_image_path = new_path
-                        
-                        # Update saved_image_paths if it exists
-                        if 'saved_image_paths' in dir() and saved_image_paths:
-                            for i, p in enumerate(saved_image_paths):
-                                if "front" in p.name.lower():
-                                    saved_image_paths[i] = new_path
-                                    break
-                        
-                        print(f"\n✓ New front image saved: {new_path.name}")
-                        print("  Please review the new image.")
-                        
-                    except Exception as e:
-                        print(f"\nError regenerating image: {e}")
-                    
-                    continue  # Loop back to show the review screen
-                    
-                elif choice == "2":
-                    # Modify front image with Gemini
-                    print(f"\n{'='*60}")
-                    print("MODIFY FRONT IMAGE WITH GEMINI")
-                    print(f"{'='*60}")
-                    print("\nDescribe the changes you want to make to the front image.")
-                    print("Examples:")
-                    print("  - 'Make the coat shorter to expose the knees'")
-                    print("  - 'Change the pose to have arms more horizontal'")
-                    print("  - 'Remove the hat and show the hair'")
-                    print("  - 'Make the background pure white'")
-                    
-                    edit_prompt = typer.prompt(
-                        "\nEdit prompt",
-                        type=str,
-                    )
-                    
-                    if not edit_prompt.strip():
-                        print("\nNo edit prompt provided, returning to menu.")
-                        continue
-                    
-                    gemini_key = os.environ.get(GEMINI_API_KEY_ENV)
-                    if not gemini_key:
-                        print(f"\nError: {GEMINI_API_KEY_ENV} not set.")
-                        continue
-                    
-                    try:
-                        print(f"\n  Editing image with prompt: '{edit_prompt}'")
-                        print(f"  Using model: gemini-3-pro-image-preview (Nano Banana Pro)")
-                        
-                        edited_data = edit_image_with_gemini(
-                            source_image_path=front_image_path,
-                            edit_prompt=edit_prompt,
-                            api_key=gemini_key,
-                        )
-                        
-                        # Save edited image with a new name to preserve original
-                        edited_filename = front_image_path.stem + "_edited" + front_image_path.suffix
-                        edited_path = images_dir / edited_filename
-                        edited_path.write_bytes(edited_data)
-                        
-                        # Update front_image_path to use the edited version
-                        front_image_path = edited_path
-                        
-                        # Update saved_image_paths if it exists
-                        if 'saved_image_paths' in dir() and saved_image_paths:
-                            saved_image_paths.append(edited_path)
-                        
-                        print(f"\n✓ Edited image saved: {edited_path.name}")
-                        print("  Please review the edited image.")
-                        
-                    except Exception as e:
-                        print(f"\nError editing image: {e}")
-                    
-                    continue  # Loop back to show the review screen
-                    
-                else:
-                    # Skip 3D generation
-                    proceed_with_3d = False
-                    print("\n(3D generation skipped by user)")
-                    print(f"\nYou can generate the 3D model later with:")
-                    print(f"  uv run generate_prompts.py hunyuan3d --image {front_image_path}")
-                    break
-        
-        if proceed_with_3d:
-            print(f"\n{'='*60}")
-            print("STAGE 5: Generating 3D model with Hunyuan API...")
-            print(f"{'='*60}")
-            
-            # Check if we have a front image from Stage 4
-            if front_image_path and front_image_path.exists():
-                # Check required env vars for 3D generation (with COS since we're uploading an image)
-                missing_vars = check_required_env_vars(include_cos=True)
-                
-                if missing_vars:
-                    print(f"\nWarning: Missing environment variables for 3D generation:")
-                    for var in missing_vars:
-                        print(f"  - {var}")
-                    print("Skipping 3D model generation.")
-                else:
-                    # Check provider availability
-                    if provider_3d == "sdk" and not is_sdk_available():
-                        print("Warning: SDK provider not available, falling back to HTTP.")
-                        actual_provider = "http"
-                    else:
-                        actual_provider = provider_3d
-                    
-                    try:
-                        print(f"Using front image: {front_image_path}")
-                        
-                        # Create output directory for 3D model
-                        hunyuan3d_dir = run_output_dir / "hunyuan3d"
-                        hunyuan3d_dir.mkdir(parents=True, exist_ok=True)
-                        
-                        result = generate_3d_model(
-                            image=front_image_path,
-                            output_dir=hunyuan3d_dir,
-                            timeout=timeout_3d,
-                            verbose=True,
-                            provider_type=actual_provider,
-                        )
-                        
-                        if result.status == "DONE" and result.obj_path:
-                            print(f"\n3D Model generated successfully!")
-                            print(f"  OBJ: {result.obj_path}")
-                            print(f"  Time: {result.elapsed_seconds:.1f}s")
-                        else:
-                            print(f"\nWarning: 3D generation completed with status: {result.status}")
-                            if result.error_message:
-                                print(f"  Error: {result.error_message}")
-                                
-                    except Exception as e:
-                        print(f"Warning: 3D model generation failed: {e}")
-                        print("Previous stages completed successfully.")
-            else:
-                if skip_images:
-                    print("\n(3D generation skipped - no image available, Stage 4 was skipped)")
-                else:
-                    print("\nWarning: No front image available for 3D generation.")
-                    print("Either image generation failed or no front view was created.")
     else:
+        graph.add(Node("images", images_node, title="image generation", cached=cached_images))
+    
+    if skip_3d:
         print("\n(3D model generation skipped)")
+    elif skip_images:
+        print("\n(3D generation skipped - no image available, Stage 4 was skipped)")
+    elif auto_3d:
+        # No graph input: the node waits on view_feed for the front image,
+        # so Stage 5 overlaps with the side and back views
+        graph.add(Node("model_3d", model_3d_node, title="3D model generation"))
+    else:
+        # Interactive: nothing else prints while the menu is open
+        graph.add(Node("review", review_node, inputs=("images",), title="image review", exclusive=True))
+        graph.add(Node("model_3d", model_3d_node, inputs=("review",), title="3D model generation"))
+    
+    # Step 3: Run it (Ctrl-C also stops Stage 5 polling on its worker thread)
+    outcome: Optional[str] = None  # None = derive from the spans
+    error: Optional[str] = None
+    try:
+        with handle_interrupts():
+            graph_run = graph.run()
+        
+        print(f"\n{'='*60}")
+        print("PIPELINE COMPLETE!")
+        print(f"{'='*60}")
+        print(f"  Output: {run_output_dir}/")
+        print(f"  {graph_run.summary()}")
+        
+    except KeyboardInterrupt:
+        # Submitted jobs are in the registry as interrupted
+        outcome, error = "failed", "interrupted"
+        raise typer.Exit(code=130)
+        
+    except typer.Exit as e:
+        # Raised by the exclusive review node
+        if e.exit_code:
+            outcome, error = "failed", f"stopped (exit code {e.exit_code})"
+        raise
+    
+    finally:
+        # Written for stopped runs too, like `images` and `hunyuan3d`
+        record_run_in_ledger(
+            ledger_path, "all", started_at, spec, version, run_output_dir,
+            outcome=outcome, error=error,
+        )
+        write_run_trace(run_output_dir)
+        finish_run_metrics(metrics_server, metrics_textfile)
     
-    print(f"\n{'='*60}")
-    print("PIPELINE COMPLETE!")
-    print(f"{'='*60}")
-    print(f"  Output: {run_output_dir}/")
     print("\nDone!")
 
 
@@ -1065,6 +2574,90 @@ def hunyuan3d_command(
             help="API provider: 'sdk' (default) or 'http' (fallback)",
         ),
     ] = "sdk",
+    texture_format: Annotated[
+        Optional[str],
+        typer.Option(
+            "--texture-format",
+            help="Post-process textures to: webp, png, or ktx2-png (default: keep as-is)",
+        ),
+    ] = None,
+    texture_max_size: Annotated[
+        int,
+        typer.Option(
+            "--texture-max-size",
+            help="Longest texture edge in pixels (with --texture-format)",
+        ),
+    ] = 2048,
+    texture_mips: Annotated[
+        bool,
+        typer.Option(
+            "--texture-mips",
+            help="Also write a mip chain for each texture (with --texture-format)",
+        ),
+    ] = False,
+    upload_max_edge: Annotated[
+        int,
+        typer.Option(
+            "--upload-max-edge",
+            help="Downscale images to this longest edge before COS upload (0 = upload original)",
+        ),
+    ] = DEFAULT_UPLOAD_MAX_EDGE,
+    upload_format: Annotated[
+        str,
+        typer.Option(
+            "--upload-format",
+            help="Format for uploaded images: jpeg or webp",
+        ),
+    ] = "jpeg",
+    upload_quality: Annotated[
+        int,
+        typer.Option(
+            "--upload-quality",
+            help="JPEG/WebP quality for uploaded images (1-100)",
+        ),
+    ] = 90,
+    keep_metadata: Annotated[
+        bool,
+        typer.Option(
+            "--keep-metadata",
+            help="Keep EXIF/ICC metadata in uploaded images",
+        ),
+    ] = False,
+    metrics_port: Annotated[
+        int,
+        typer.Option(
+            "--metrics-port",
+            help="Serve Prometheus metrics on this local port while running (0 = off)",
+        ),
+    ] = 0,
+    metrics_textfile: Annotated[
+        Optional[Path],
+        typer.Option(
+            "--metrics-textfile",
+            help="Write metrics to this file for node_exporter's textfile collector",
+        ),
+    ] = None,
+    ledger: Annotated[
+        Optional[Path],
+        typer.Option(
+            "--ledger",
+            help="SQLite run ledger (default: output/ledger.sqlite)",
+        ),
+    ] = None,
+    no_ledger: Annotated[
+        bool,
+        typer.Option(
+            "--no-ledger",
+            help="Don't record this run in the ledger",
+        ),
+    ] = False,
+    job_registry: Annotated[
+        Optional[Path],
+        typer.Option(
+            "--job-registry",
+            help="Record submitted Hunyuan jobs here (default: output/hunyuan_jobs.json)",
+        ),
+    ] = None,
 ) -> None:
     """
     Generate 3D model using Hunyuan 3D API (Stage 5).
@@ -1119,8 +2712,14 @@ def hunyuan3d_command(
     \b
     Example (using HTTP fallback):
       uv run generate_prompts.py hunyuan3d --prompt "A robot" --provider http
+    
+    \b
+    Example (shrink textures to 1K WebP with mips):
+      uv run generate_prompts.py hunyuan3d --image front.png \\
+        --texture-format webp --texture-max-size 1024 --texture-mips
     """
     # Step 1: Determine input mode
+    spec: Optional[CharacterSpec] = None
     final_prompt: Optional[str] = None
     final_image: Optional[Path] = None
     final_image_url: Optional[str] = None
@@ -1190,6 +2789,23 @@ def hunyuan3d_command(
         print("Or use --provider http as a fallback.", file=sys.stderr)
         raise typer.Exit(code=1)
     
+    # Validate texture post-processing options
+    texture_options: Optional[TextureOptions] = None
+    if texture_format:
+        try:
+            texture_options = TextureOptions(
+                max_size=texture_max_size,
+                output_format=texture_format,
+                generate_mips=texture_mips,
+            )
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            raise typer.Exit(code=1)
+    
+    upload_transform = build_upload_transform(
+        upload_max_edge, upload_format, upload_quality, keep_metadata,
+    )
+    
     # Step 3: Check environment variables
     # COS is needed for local image uploads (main or multi-view)
     include_cos = final_image is not None or has_multi_view
@@ -1211,20 +2827,30 @@ def hunyuan3d_command(
     print(f"STAGE 5: Generating 3D model with Hunyuan API ({provider})...")
     print(f"{'='*60}\n")
     
+    metrics_server = start_run_metrics(metrics_port, metrics_textfile)
+    ledger_path = resolve_ledger_path(ledger, no_ledger)
+    started_at = datetime.now()
+    outcome, error = "failed", None
+    start_trace()
+    
     try:
-        result = generate_3d_model(
-            prompt=final_prompt,
-            image=final_image,
-            image_url=final_image_url,
-            left_view=left_view,
-            right_view=right_view,
-            back_view=back_view,
-            output_dir=run_output_dir,
-            timeout=timeout,
-            poll_interval=poll_interval,
-            verbose=True,
-            provider_type=provider,
-        )
+        with handle_interrupts():
+            result = generate_3d_model(
+                prompt=final_prompt,
+                image=final_image,
+                image_url=final_image_url,
+                left_view=left_view,
+                right_view=right_view,
+                back_view=back_view,
+                output_dir=run_output_dir,
+                timeout=timeout,
+                poll_interval=poll_interval,
+                verbose=True,
+                provider_type=provider,
+                texture_options=texture_options,
+                upload_transform=upload_transform,
+                registry=JobRegistry(job_registry or DEFAULT_JOB_REGISTRY_PATH),
+            )
         
         if result.status == "DONE" and result.obj_path:
             print(f"\n{'='*60}")
@@ -1235,26 +2861,477 @@ def hunyuan3d_command(
             print(f"  Files: {len(result.all_files)}")
             print(f"\n  Main OBJ: {result.obj_path}")
             print(f"  Metadata: {result.metadata_path}")
+            outcome = "ok"
         elif result.status == "FAIL":
             print(f"\nError: Job failed: {result.error_message}", file=sys.stderr)
+            error = result.error_message
             raise typer.Exit(code=1)
         else:
             print(f"\nWarning: Job completed but no .obj file found.", file=sys.stderr)
             print(f"  Status: {result.status}")
             print(f"  Files: {[str(f) for f in result.all_files]}")
+            outcome = "partial"
             
     except TimeoutError as e:
         print(f"\nError: {e}", file=sys.stderr)
         print("Try increasing --timeout value.", file=sys.stderr)
+        error = str(e)
         raise typer.Exit(code=1)
         
+    except KeyboardInterrupt:
+        # The job is in the registry as interrupted (see generate_3d_model)
+        error = "interrupted"
+        raise typer.Exit(code=130)
+        
     except Exception as e:
         print(f"\nError generating 3D model: {e}", file=sys.stderr)
+        error = error or str(e)
+        raise typer.Exit(code=1)
+    
+    finally:
+        # Written even for failed/timed-out jobs - that's when it's most useful
+        record_run_in_ledger(
+            ledger_path, "hunyuan3d", started_at, spec, None, run_output_dir,
+            outcome=outcome, error=error,
+        )
+        write_run_trace(run_output_dir)
+        finish_run_metrics(metrics_server, metrics_textfile)
+    
+    print("\nDone!")
+
+
+# -----------------------------------------------------------------------------
+# COMMAND: jobs (Submitted Hunyuan 3D jobs - list and re-attach)
+# -----------------------------------------------------------------------------
+
+def describe_job(entry: JobEntry, id_width: int = 24) -> str:
+    """One line of the `jobs` list."""
+    status = f"{entry.status} (orphan)" if entry.is_orphan else entry.status
+    submitted = entry.submitted_at[:19].replace("T", " ")
+    value = entry.input_value if len(entry.input_value) <= 40 else entry.input_value[:37] + "..."
+    return f"{entry.job_id:<{id_width}}{status:<22}{submitted:<21}{entry.input_type or '-':<10}{value}"
+
+
+def attach_inputs(entry: JobEntry) -> dict:
+    """generate_3d_model() inputs for re-attaching (nothing is uploaded again)."""
+    if entry.input_type == "prompt":
+        return {"prompt": entry.input_value}
+    if entry.image_url:
+        return {"image_url": entry.image_url}
+    return {}
+
+
+@app.command("jobs")
+def jobs_command(
+    attach: Annotated[
+        Optional[str],
+        typer.Option(
+            "--attach",
+            help="Re-attach to this job ID: poll it, then download the result",
+        ),
+    ] = None,
+    orphans: Annotated[
+        bool,
+        typer.Option(
+            "--orphans",
+            help="Re-attach to every orphaned job, one after another",
+        ),
+    ] = False,
+    forget: Annotated[
+        Optional[str],
+        typer.Option(
+            "--forget",
+            help="Remove this job ID from the registry",
+        ),
+    ] = None,
+    output_dir: Annotated[
+        Path,
+        typer.Option(
+            "--output-dir", "-o",
+            help="Base output directory for jobs that don't have one yet",
+        ),
+    ] = Path("output/hunyuan3d"),
+    timeout: Annotated[
+        int,
+        typer.Option(
+            "--timeout",
+            help="Maximum seconds to wait for each job",
+        ),
+    ] = 600,
+    poll_interval: Annotated[
+        int,
+        typer.Option(
+            "--poll-interval",
+            help="Initial seconds between status polls",
+        ),
+    ] = 10,
+    provider: Annotated[
+        str,
+        typer.Option(
+            "--provider",
+            help="API provider for a job that isn't in the registry: 'sdk' or 'http'",
+        ),
+    ] = "sdk",
+    job_registry: Annotated[
+        Path,
+        typer.Option(
+            "--job-registry",
+            help="Job registry to read",
+        ),
+    ] = DEFAULT_JOB_REGISTRY_PATH,
+) -> None:
+    """
+    List submitted Hunyuan 3D jobs and re-attach to orphaned ones.
+    
+    `hunyuan3d` and `all` record every job right after submit. A job
+    whose polling stopped (--timeout, Ctrl-C, a crash) keeps running on
+    Hunyuan's side; it is an orphan until its result is downloaded.
+    Re-attaching polls it and downloads the result, without submitting
+    (or paying for) a new job.
+    
+    \b
+    Example:
+      uv run generate_prompts.py jobs
+    
+    \b
+    Example (download one job, then all remaining orphans):
+      uv run generate_prompts.py jobs --attach 1234567890
+      uv run generate_prompts.py jobs --orphans --timeout 1200
+    """
+    if sum([attach is not None, orphans, forget is not None]) > 1:
+        print("Error: Use only one of --attach, --orphans, --forget.", file=sys.stderr)
+        raise typer.Exit(code=1)
+    
+    try:
+        registry = JobRegistry(job_registry)
+        entries = registry.entries()
+    except RuntimeError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        raise typer.Exit(code=1)
+    
+    if forget is not None:
+        if not registry.forget(forget):
+            print(f"Error: Job {forget} is not in {job_registry}", file=sys.stderr)
+            raise typer.Exit(code=1)
+        print(f"Forgot job {forget}")
+        return
+    
+    # No action: list the jobs
+    if attach is None and not orphans:
+        if not entries:
+            print(f"No jobs recorded in {job_registry}")
+            return
+        print(f"Job registry: {job_registry}\n")
+        id_width = max(24, max(len(entry.job_id) for entry in entries) + 2)
+        print(f"{'JOB ID':<{id_width}}{'STATUS':<22}{'SUBMITTED':<21}{'INPUT':<10}")
+        for entry in entries:
+            print(describe_job(entry, id_width))
+            if entry.error and entry.status in OPEN_STATUSES:
+                print(f"{'':<{id_width}}{entry.error}")
+        open_jobs = [entry for entry in entries if entry.is_orphan]
+        if open_jobs:
+            print(f"\n{len(open_jobs)} orphaned job(s) - download with --attach <job id> or --orphans")
+        return
+    
+    # Jobs to re-attach to (an unknown ID is attached to with --provider)
+    if attach is not None:
+        targets = [registry.get(attach) or JobEntry(
+            job_id=attach, provider=provider, status="", submitted_at="", updated_at="",
+        )]
+    else:
+        targets = registry.orphans()
+        if not targets:
+            print("No orphaned jobs.")
+            return
+    
+    missing_vars = check_required_env_vars(include_cos=False)
+    if missing_vars:
+        print(f"Error: Missing required environment variables:", file=sys.stderr)
+        for var in missing_vars:
+            print(f"  - {var}", file=sys.stderr)
+        print(get_env_var_help(), file=sys.stderr)
+        raise typer.Exit(code=1)
+    
+    failures = 0
+    for entry in targets:
+        if entry.provider not in VALID_PROVIDERS:
+            print(f"Error: Invalid provider '{entry.provider}'.", file=sys.stderr)
+            raise typer.Exit(code=1)
+        job_output_dir = Path(entry.output_dir) if entry.output_dir else create_timestamped_output_dir(output_dir)
+        job_output_dir.mkdir(parents=True, exist_ok=True)
+        
+        print(f"\n{'='*60}")
+        print(f"Re-attaching to job {entry.job_id} → {job_output_dir}/")
+        print(f"{'='*60}\n")
+        
+        try:
+            with handle_interrupts():
+                result = generate_3d_model(
+                    **attach_inputs(entry),
+                    output_dir=job_output_dir,
+                    timeout=timeout,
+                    poll_interval=poll_interval,
+                    verbose=True,
+                    provider_type=resolve_3d_provider(entry.provider),
+                    registry=registry,
+                    existing_job_id=entry.job_id,
+                )
+        except KeyboardInterrupt:
+            raise typer.Exit(code=130)
+        except Exception as e:
+            print(f"\nError: {e}", file=sys.stderr)
+            failures += 1
+            continue
+        
+        if result.status == "DONE" and result.obj_path:
+            print(f"\n  Main OBJ: {result.obj_path}")
+        else:
+            print(f"\nError: Job {entry.job_id} ended with status {result.status}: {result.error_message}", file=sys.stderr)
+            failures += 1
+    
+    if failures:
+        raise typer.Exit(code=1)
+    print("\nDone!")
+
+
+# -----------------------------------------------------------------------------
+# COMMAND: turntable (Preview renders of finished 3D models)
+# -----------------------------------------------------------------------------
+
+@app.command("turntable")
+def turntable_command(
+    input_dir: Annotated[
+        Path,
+        typer.Option(
+            "--input-dir", "-i",
+            help="Folder to search for finished models (e.g., output/hunyuan3d)",
+            exists=True,
+            file_okay=False,
+            dir_okay=True,
+            readable=True,
+        ),
+    ] = Path("output/hunyuan3d"),
+    output_dir: Annotated[
+        Optional[Path],
+        typer.Option(
+            "--output-dir", "-o",
+            help="Where to write contact_sheet.png (default: the input folder)",
+        ),
+    ] = None,
+    views: Annotated[
+        int,
+        typer.Option(
+            "--views",
+            help="Number of turntable frames per model",
+            min=1,
+        ),
+    ] = DEFAULT_VIEW_COUNT,
+    size: Annotated[
+        int,
+        typer.Option(
+            "--size",
+            help="Frame size in pixels",
+            min=1,
+        ),
+    ] = DEFAULT_FRAME_SIZE,
+    workers: Annotated[
+        Optional[int],
+        typer.Option(
+            "--workers",
+            help="Parallel render processes (default: one per CPU)",
+        ),
+    ] = None,
+) -> None:
+    """
+    Render turntable thumbnails and a contact sheet for finished 3D models.
+    
+    Uses a CPU-only software rasterizer (no GPU or display needed).
+    Each model gets a turntable.png strip next to its .obj, and all
+    strips are stacked into one contact_sheet.png for quick review.
+    
+    \b
+    Example:
+      uv run generate_prompts.py turntable -i output/hunyuan3d --views 8
+    """
+    obj_paths = find_model_objs(input_dir)
+    
+    if not obj_paths:
+        print(f"Error: No .obj files found under {input_dir}", file=sys.stderr)
+        raise typer.Exit(code=1)
+    
+    print(f"Rendering {len(obj_paths)} model(s), {views} views at {size}px...")
+    
+    try:
+        results, sheet_path = render_turntables(
+            obj_paths,
+            output_dir or input_dir,
+            views=views,
+            size=size,
+            max_workers=workers,
+        )
+    except ImportError as e:
+        print(f"\nError: {e}", file=sys.stderr)
         raise typer.Exit(code=1)
     
+    for result in results:
+        if result.error_message:
+            print(f"  ✗ {result.obj_path}: {result.error_message}")
+        else:
+            print(
+                f"  ✓ {result.image_path} "
+                f"({result.triangle_count} triangles, {result.elapsed_seconds:.1f}s)"
+            )
+    
+    if sheet_path:
+        print(f"\nContact sheet: {sheet_path}")
+    
     print("\nDone!")
 
 
+# -----------------------------------------------------------------------------
+# COMMAND: stats (Cross-run analytics from the run ledger)
+# -----------------------------------------------------------------------------
+
+def _fmt(value, suffix: str = "") -> str:
+    """Format a number for the stats tables ("-" for missing values)."""
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:,.1f}{suffix}"
+    return f"{value:,}{suffix}"
+
+
+@app.command("stats")
+def stats_command(
+    ledger: Annotated[
+        Path,
+        typer.Option(
+            "--ledger",
+            help="SQLite run ledger to read",
+        ),
+    ] = DEFAULT_LEDGER_PATH,
+    since: Annotated[
+        Optional[str],
+        typer.Option(
+            "--since",
+            help="Only runs newer than this: 24h, 7d, 2w, or a date (2025-01-31)",
+        ),
+    ] = None,
+    character: Annotated[
+        Optional[str],
+        typer.Option(
+            "--character", "-c",
+            help="Only runs for this character name",
+        ),
+    ] = None,
+    as_json: Annotated[
+        bool,
+        typer.Option(
+            "--json",
+            help="Print the aggregations as JSON",
+        ),
+    ] = False,
+) -> None:
+    """
+    Summarize past runs from the run ledger.
+    
+    Every `images`, `all`, and `hunyuan3d` run appends to
+    output/ledger.sqlite. This command aggregates it: runs and
+    outcomes, stage timings, Hunyuan time per setting, tokens per
+    character, and image sizes.
+    
+    \b
+    Example:
+      uv run generate_prompts.py stats
+    
+    \b
+    Example (last week, one character, machine-readable):
+      uv run generate_prompts.py stats --since 7d -c Aethel --json
+    """
+    if not ledger.exists():
+        print(f"Error: No ledger found at {ledger}", file=sys.stderr)
+        print("Run `images`, `all`, or `hunyuan3d` first, or pass --ledger.", file=sys.stderr)
+        raise typer.Exit(code=1)
+    
+    try:
+        since_dt = parse_since(since) if since else None
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        raise typer.Exit(code=1)
+    
+    with RunLedger(ledger) as run_ledger:
+        report = {
+            "runs": run_ledger.run_summary(since_dt, character),
+            "stages": run_ledger.stage_summary(since_dt, character),
+            "hunyuan3d": run_ledger.hunyuan_summary(since_dt, character),
+            "tokens": run_ledger.token_summary(since_dt, character),
+            "images": run_ledger.image_summary(since_dt, character),
+        }
+    
+    if as_json:
+        print(json.dumps(report, indent=2))
+        return
+    
+    scope = []
+    if since_dt:
+        scope.append(f"since {since_dt:%Y-%m-%d %H:%M}")
+    if character:
+        scope.append(f"character {character}")
+    print(f"Ledger: {ledger}" + (f" ({', '.join(scope)})" if scope else ""))
+    
+    if not report["runs"]:
+        print("\nNo matching runs.")
+        return
+    
+    print(f"\n{'RUNS':<14}{'runs':>6}{'ok':>6}{'partial':>9}{'failed':>8}{'median':>10}{'p95':>10}")
+    for row in report["runs"]:
+        print(
+            f"{row['command']:<14}{row['runs']:>6}{row['ok']:>6}{row['partial']:>9}"
+            f"{row['failed']:>8}{_fmt(row['median_seconds'], 's'):>10}{_fmt(row['p95_seconds'], 's'):>10}"
+        )
+    
+    print(f"\n{'STAGES':<40}{'runs':>6}{'median':>10}{'p95':>10}")
+    for row in report["stages"][:12]:
+        print(
+            f"{row['stage']:<40}{row['runs']:>6}"
+            f"{_fmt(row['median_seconds'], 's'):>10}{_fmt(row['p95_seconds'], 's'):>10}"
+        )
+    
+    if report["hunyuan3d"]:
+        print(
+            f"\n{'HUNYUAN 3D':<12}{'polygon':<15}{'faces':>10}{'pbr':>6}{'jobs':>6}"
+            f"{'median':>10}{'queue':>9}{'run':>9}"
+        )
+        for row in report["hunyuan3d"]:
+            print(
+                f"{row['generate_type'] or '-':<12}{row['polygon_type'] or '-':<15}"
+                f"{_fmt(row['face_count']):>10}{'yes' if row['enable_pbr'] else 'no':>6}{row['jobs']:>6}"
+                f"{_fmt(row['median_seconds'], 's'):>10}{_fmt(row['median_queue_seconds'], 's'):>9}"
+                f"{_fmt(row['median_run_seconds'], 's'):>9}"
+            )
+    
+    if report["tokens"]:
+        print(
+            f"\n{'TOKENS':<24}{'model':<16}{'runs':>6}{'calls':>7}{'input':>12}{'cached':>12}"
+            f"{'output':>12}{'reasoning':>12}"
+        )
+        for row in report["tokens"]:
+            print(
+                f"{row['character'] or '-':<24}{row['model'] or '-':<16}{row['runs']:>6}{row['calls']:>7}"
+                f"{_fmt(row['input_tokens']):>12}{_fmt(row['cached_tokens']):>12}"
+                f"{_fmt(row['output_tokens']):>12}{_fmt(row['reasoning_tokens']):>12}"
+            )
+    
+    if report["images"]:
+        print(f"\n{'IMAGES':<10}{'format':<8}{'count':>7}{'median size':>14}")
+        for row in report["images"]:
+            median_kb = row["median_bytes"] / 1024 if row["median_bytes"] is not None else None
+            print(
+                f"{row['view'] or '-':<10}{row['format'] or '-':<8}{row['images']:>7}"
+                f"{_fmt(median_kb, ' KB'):>14}"
+            )
+
+
 # -----------------------------------------------------------------------------
 # SCRIPT ENTRY POINT
 # -----------------------------------------------------------------------------
@@ -7,18 +7,34 @@
 # Package structure (matching the pipeline):
 #   src/
 #   ├── models.py                  - Data models (CharacterSpec dataclass)
+#   ├── spec_sweep.py              - Input: Sweep files → lazy spec variants
+#   ├── spec_library.py            - Input: Spec folders (parallel + cached parsing)
+#   ├── prompt_templates.py        - Stages 1-3: Compiled templates + shared fields
 #   ├── stage1_base_prompts.py     - Stage 1: Base 2D prompts (static)
 #   ├── stage2_gemini_prompts.py   - Stage 2a: Gemini meta-prompts (static)
 #   ├── stage2_llm_refiner.py      - Stage 2b: LLM-refined prompts (OpenAI API)
+#   ├── batch_refiner.py           - Stage 2b: Many specs via the OpenAI Batch API
 #   ├── stage3_common_prompts.py   - Stage 3: Checklist and design notes
 #   ├── stage4_image_generation.py - Stage 4: Gemini image generation
+#   ├── image_encoding.py          - Stage 4: Format detection + re-encoding
+#   ├── image_preflight.py         - Stage 4 → 5: Front image sanity checks
+#   ├── stage5_hunyuan3d.py        - Stage 5: Hunyuan 3D orchestration
+#   ├── texture_processing.py      - Stage 5: Texture resize/mips/format
+#   ├── turntable_renderer.py      - Stage 5: CPU turntable thumbnails
+#   ├── tracing.py                 - Span tracing (trace.json)
+#   ├── metrics.py                 - Prometheus/OpenMetrics exporter
+#   ├── run_ledger.py              - SQLite run ledger (cross-run stats)
+#   ├── incremental.py             - Per-output dependencies (--incremental)
+#   ├── pipeline_graph.py          - Stage graph for `all` (concurrent stages)
+#   ├── background_review.py       - Stage 4 → 5: Work during the image review
+#   ├── job_registry.py            - Stage 5: Submitted Hunyuan jobs (`jobs`)
 #   └── file_utils.py              - File output utilities
 
 # We can optionally re-export commonly used items here for convenience.
 # This allows users to do: from src import CharacterSpec
 # Instead of: from src.models import CharacterSpec
 
-from .models import CharacterSpec, load_character_spec
+from .models import CharacterSpec, FrozenCharacterSpec, load_character_spec
 from .stage1_base_prompts import generate_base_prompts
 from .stage2_gemini_prompts import generate_gemini_prompts
 from .stage2_llm_refiner import (
@@ -41,6 +57,7 @@ from .file_utils import write_prompts, print_prompts_to_stdout
 __all__ = [
     # Data models
     "CharacterSpec",
+    "FrozenCharacterSpec",
     "load_character_spec",
     # Stage 1: Base prompts
     "generate_base_prompts",
@@ -0,0 +1,258 @@
+# background_review.py - Keep Working While the User Reviews the Images
+#
+# Pipeline Stage: 4 → 5 (the review menu of the `all` command)
+#
+# The review menu waits for a person, which can take minutes. In the
+# default (blocking) mode nothing happens meanwhile, and a Gemini edit
+# blocks the menu until it is done. With `--review-mode`:
+#
+#   background    the current front candidate is uploaded to COS at once,
+#                 and regenerations/edits run on worker threads while the
+#                 menu stays usable
+#   speculative   as background, plus a Hunyuan job is submitted for the
+#                 candidate, so approving it skips straight to polling
+#
+# When the candidate changes (regenerated or edited), the work done for
+# the old one is abandoned. An upload costs nothing; a submitted job
+# can't be cancelled, so every unused job is reported (and, with a job
+# registry, stays downloadable via the `jobs` command).
+#
+# Usage:
+#   worker = ReviewWorker(submit=True)
+#   worker.prepare(front_path)                   # Upload (+ submit) now
+#   task = worker.start("Edit", "edit", front_path, lambda: edit(...))
+#   ...
+#   prepared = worker.use(front_path)            # After approval
+#   generate_3d_model(image=front_path, prepared=prepared, ...)
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Optional
+
+from .image_encoding import UploadTransform
+from .job_registry import JobRegistry
+from .stage5_hunyuan3d import PreparedInput, prepare_3d_input
+
+
+# -----------------------------------------------------------------------------
+# CONFIGURATION
+# -----------------------------------------------------------------------------
+
+REVIEW_MODES = ("blocking", "background", "speculative")
+DEFAULT_REVIEW_MODE = "blocking"
+
+# Uploads/submits and edits can run side by side
+REVIEW_WORKERS = 3
+
+
+# -----------------------------------------------------------------------------
+# DATA CLASSES
+# -----------------------------------------------------------------------------
+
+@dataclass
+class BackgroundTask:
+    """
+    A regeneration or edit running while the menu is shown.
+
+    Attributes:
+        label: Shown in the menu (e.g., "Edit 'shorter coat'")
+        kind: "regenerate" or "edit"
+        source: The front candidate the task started from
+        future: Resolves to the new image bytes
+        started: time.monotonic() at start
+    """
+    label: str
+    kind: str
+    source: Path
+    future: Future
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the task started."""
+        return time.monotonic() - self.started
+
+
+@dataclass
+class _Candidate:
+    """Upload (and speculative job) for one front candidate."""
+    image: Path
+    future: Future
+    abandoned: bool = False
+    reported: bool = False
+
+
+# -----------------------------------------------------------------------------
+# WORKER
+# -----------------------------------------------------------------------------
+
+class ReviewWorker:
+    """
+    Runs uploads, speculative submits, and image edits during the review.
+
+    Args:
+        submit: Also submit a speculative Hunyuan job for each candidate
+        extra_views: Views uploaded with every candidate (Hunyuan view
+                     type → image), e.g. the side and back views
+        upload_transform: Pre-upload transform (None = upload original)
+        provider_type: Hunyuan provider for speculative jobs
+        registry: Records speculative jobs (an unused one can still be
+                  downloaded with the `jobs` command)
+    """
+
+    def __init__(
+        self,
+        submit: bool = False,
+        extra_views: Optional[dict[str, Path]] = None,
+        upload_transform: Optional[UploadTransform] = None,
+        provider_type: str = "sdk",
+        registry: Optional[JobRegistry] = None,
+    ):
+        self.submit = submit
+        self.extra_views = dict(extra_views or {})
+        self.upload_transform = upload_transform
+        self.provider_type = provider_type
+        self.registry = registry
+        self._pool = ThreadPoolExecutor(max_workers=REVIEW_WORKERS, thread_name_prefix="review")
+        self._lock = threading.Lock()
+        self._candidate: Optional[_Candidate] = None
+        self._candidates: list[_Candidate] = []
+        self._tasks: list[BackgroundTask] = []
+
+    # -------------------------------------------------------------------------
+    # Front candidate: upload / speculative job
+    # -------------------------------------------------------------------------
+
+    def prepare(self, image: Path) -> None:
+        """
+        Start uploading (and submitting) a new front candidate.
+
+        The previous candidate is abandoned. Always starts fresh, even for
+        the same path: a regenerated front image overwrites the old file.
+        """
+        future = self._pool.submit(
+            prepare_3d_input,
+            image,
+            extra_views=self.extra_views,
+            upload_transform=self.upload_transform,
+            submit=self.submit,
+            provider_type=self.provider_type,
+            registry=self.registry,
+        )
+        candidate = _Candidate(image=Path(image), future=future)
+        with self._lock:
+            if self._candidate is not None:
+                self._candidate.abandoned = True
+            previous, self._candidate = self._candidate, candidate
+            self._candidates.append(candidate)
+        if previous is not None:
+            self._report_if_abandoned(previous)
+        future.add_done_callback(lambda _: self._report_if_abandoned(candidate))
+
+    def use(self, image: Path) -> Optional[PreparedInput]:
+        """
+        The prepared input for the approved image (waits if still running).
+
+        Returns:
+            PreparedInput, or None if the image isn't the current candidate
+            or its upload/submit failed (generate_3d_model() then simply
+            does the work itself)
+        """
+        with self._lock:
+            candidate = self._candidate
+        if candidate is None or candidate.image != Path(image):
+            return None
+        try:
+            return candidate.future.result()
+        except Exception as e:
+            print(f"  Background upload failed ({e}) - uploading again")
+            return None
+
+    def status_lines(self, image: Path) -> list[str]:
+        """What is happening in the background, for the review screen."""
+        lines = []
+        with self._lock:
+            candidate = self._candidate
+            tasks = list(self._tasks)
+        if candidate is not None and candidate.image == Path(image):
+            future = candidate.future
+            if not future.done():
+                action = "Uploading + submitting a speculative 3D job" if self.submit else "Uploading for 3D"
+                lines.append(f"☁️  {action}...")
+            elif future.exception() is not None:
+                lines.append(f"⚠️  Background upload failed: {future.exception()}")
+            elif future.result().job_id:
+                lines.append(f"🧊 Speculative 3D job running: {future.result().job_id}")
+            else:
+                lines.append("☁️  Uploaded - 3D can start right away")
+        for task in tasks:
+            state = "done - refresh to see it" if task.future.done() else f"{task.elapsed:.0f}s"
+            lines.append(f"⏳ {task.label} ({state})")
+        return lines
+
+    def _report_if_abandoned(self, candidate: _Candidate) -> None:
+        """Print an unused speculative job once (it still runs and counts)."""
+        future = candidate.future
+        if not candidate.abandoned or not future.done() or future.exception() is not None:
+            return
+        job_id = future.result().job_id
+        with self._lock:
+            if not job_id or candidate.reported:
+                return
+            candidate.reported = True
+        print(f"\n  (Speculative 3D job {job_id} for {candidate.image.name} is not used)")
+        if self.registry is not None:
+            print(f"  (Download it anyway: uv run generate_prompts.py jobs --attach {job_id})")
+
+    # -------------------------------------------------------------------------
+    # Regenerations and edits
+    # -------------------------------------------------------------------------
+
+    def start(self, label: str, kind: str, source: Path, work: Callable[[], bytes]) -> BackgroundTask:
+        """
+        Run a regeneration or edit in the background.
+
+        Args:
+            label: Shown in the menu
+            kind: "regenerate" or "edit"
+            source: Front candidate the task starts from
+            work: Returns the new image bytes
+
+        Returns:
+            The BackgroundTask (also listed by running()/finished())
+        """
+        task = BackgroundTask(label=label, kind=kind, source=Path(source), future=self._pool.submit(work))
+        with self._lock:
+            self._tasks.append(task)
+        task.future.add_done_callback(lambda _: print(f"\n  ({label} finished - refresh the menu to see it)"))
+        return task
+
+    def running(self) -> list[BackgroundTask]:
+        """Tasks that haven't finished yet."""
+        with self._lock:
+            return [task for task in self._tasks if not task.future.done()]
+
+    def finished(self) -> list[BackgroundTask]:
+        """Tasks that finished since the last call (in start order)."""
+        with self._lock:
+            done = [task for task in self._tasks if task.future.done()]
+            self._tasks = [task for task in self._tasks if not task.future.done()]
+        return done
+
+    def close(self, used: Optional[Path] = None) -> None:
+        """
+        Stop the worker; every candidate except `used` is abandoned.
+
+        Running uploads/edits finish on their own, nothing new starts.
+        """
+        with self._lock:
+            candidates = list(self._candidates)
+            for candidate in candidates:
+                if used is None or candidate is not self._candidate or candidate.image != Path(used):
+                    candidate.abandoned = True
+        for candidate in candidates:
+            self._report_if_abandoned(candidate)
+        self._pool.shutdown(wait=False, cancel_futures=True)
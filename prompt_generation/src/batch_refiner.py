@@ -0,0 +1,476 @@
+# batch_refiner.py - Stage 2b: Bulk Prompt Refinement via the OpenAI Batch API
+#
+# Pipeline Stage: Text Spec → Base Prompts → [LLM REFINEMENT] → Checklist → Image Gen
+#                                              ^^^^^^^^^^^^^^^^
+#                                              THIS STAGE (many characters)
+#
+# For overnight runs over hundreds of characters we don't need answers in
+# seconds. The Batch API takes a JSONL file of requests, processes it
+# within 24 hours, and bills it at about half the normal per-token price,
+# with much higher rate limits than interactive calls.
+#
+# Flow:
+#   1. build_batch_requests()  one line per request - the SAME request body
+#                              stage2_llm_refiner.call_openai() would send
+#                              (build_responses_request)
+#   2. submit_batch()          upload the JSONL (purpose="batch"), create the batch
+#   3. wait_for_batch()        poll until completed / failed / expired / cancelled
+#   4. collect_batch_results() download the output + error files and map
+#                              every line back to (character, prompt) by custom_id
+#
+# The CLI (refine --batch) then writes each character's prompts with
+# write_prompts(), exactly like an interactive run.
+#
+# Everything the batch needs to be resumed is saved in the work directory
+# (requests.jsonl, batch.json), and `refine --batch --batch-id ID` attaches
+# to a batch that was already submitted.
+#
+# REQUIRES:
+#   - OPENAI_API_KEY environment variable set
+#   - openai package installed (pip install openai)
+#
+# See: https://platform.openai.com/docs/guides/batch
+
+import json
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Optional
+
+from .file_utils import sanitize_filename
+from .models import SPEC_FILE_EXTENSIONS, CharacterSpec
+from .spec_library import discover_spec_files
+from .stage2_llm_refiner import (
+    DEFAULT_MODEL,
+    DEFAULT_REFINE_MODE,
+    PROMPT_FIELDS,
+    REFINE_MODES,
+    REFINED_PROMPTS_SCHEMA,
+    TokenUsage,
+    build_combined_request,
+    build_concept_request,
+    build_responses_request,
+    build_tpose_request,
+    get_openai_api_key,
+    parse_refined_json,
+)
+from .tracing import span, traced
+
+
+# -----------------------------------------------------------------------------
+# CONFIGURATION
+# -----------------------------------------------------------------------------
+
+# Batch requests go to the same endpoint as interactive refinement
+BATCH_ENDPOINT = "/v1/responses"
+
+# The only completion window the Batch API offers
+BATCH_COMPLETION_WINDOW = "24h"
+
+# Batches take minutes to hours; no point polling more often than this
+DEFAULT_BATCH_POLL_INTERVAL = 60.0
+
+# Give up waiting after the completion window plus some slack (the batch
+# keeps running server-side; resume with --batch-id)
+DEFAULT_BATCH_TIMEOUT = 25 * 3600
+
+# Batch statuses that won't change any more
+BATCH_TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+# Files written to the work directory
+BATCH_INPUT_NAME = "requests.jsonl"
+BATCH_INFO_NAME = "batch.json"
+BATCH_OUTPUT_NAME = "results.jsonl"
+BATCH_ERRORS_NAME = "errors.jsonl"
+
+
+# -----------------------------------------------------------------------------
+# DATA CLASSES
+# -----------------------------------------------------------------------------
+
+@dataclass
+class BatchRefinementResult:
+    """
+    Outcome of a batch refinement.
+
+    Attributes:
+        batch_id: OpenAI batch ID
+        status: Final batch status (completed, failed, expired, cancelled)
+        prompts: Spec index → {PROMPT_FIELDS name → prompt text}, only for
+                 characters where every prompt came back
+        failures: Spec index → reason, for characters that are incomplete
+        usage: Token usage summed over all successful requests
+        elapsed_seconds: Time from submission (or attach) to results
+    """
+    batch_id: str
+    status: str
+    prompts: dict[int, dict[str, str]] = field(default_factory=dict)
+    failures: dict[int, str] = field(default_factory=dict)
+    usage: TokenUsage = field(default_factory=TokenUsage)
+    elapsed_seconds: float = 0.0
+
+
+# -----------------------------------------------------------------------------
+# SPEC DISCOVERY
+# -----------------------------------------------------------------------------
+
+def find_spec_files(path: Path) -> list[Path]:
+    """
+    Resolve --input for a batch: a single spec file or a folder of them.
+
+    Args:
+        path: Spec file, or directory containing *.yaml / *.yml / *.json specs
+              (names starting with "_" or "." are skipped)
+
+    Returns:
+        Sorted list of spec files
+
+    Raises:
+        ValueError: If a directory contains no spec files
+    """
+    files = discover_spec_files(path, recursive=False)
+    if not files:
+        raise ValueError(f"No spec files ({', '.join(SPEC_FILE_EXTENSIONS)}) found in {path}")
+    return files
+
+
+# -----------------------------------------------------------------------------
+# BUILDING THE BATCH
+# -----------------------------------------------------------------------------
+
+def _custom_id(index: int, spec: CharacterSpec, name: str) -> str:
+    """custom_id for one request: "<spec index>:<prompt or 'all'>:<character>"."""
+    return f"{index:05d}:{name}:{sanitize_filename(spec.name)}"[:64]
+
+
+def _parse_custom_id(custom_id: str) -> tuple[int, str]:
+    """(spec index, prompt name or "all") from a custom_id."""
+    index, name, _ = custom_id.split(":", 2)
+    return int(index), name
+
+
+def build_batch_requests(
+    specs: list[CharacterSpec],
+    model: str = DEFAULT_MODEL,
+    use_web_search: bool = False,
+    mode: str = DEFAULT_REFINE_MODE,
+) -> list[dict[str, Any]]:
+    """
+    Build the Batch API input lines for many characters.
+
+    per-view mode: four requests per character (concept + 3 T-pose views)
+    single mode:   one structured-output request per character
+
+    Args:
+        specs: Character specifications
+        model: OpenAI model to use
+        use_web_search: Enable the web_search tool
+        mode: "per-view" or "single" (see REFINE_MODES)
+
+    Returns:
+        List of {"custom_id", "method", "url", "body"} dictionaries
+
+    Raises:
+        ValueError: If mode is not one of REFINE_MODES
+    """
+    if mode not in REFINE_MODES:
+        raise ValueError(
+            f"Invalid refinement mode: {mode}. "
+            f"Valid options: {', '.join(REFINE_MODES)}"
+        )
+
+    lines = []
+    for index, spec in enumerate(specs):
+        if mode == "single":
+            requests = {"all": (build_combined_request(spec), REFINED_PROMPTS_SCHEMA)}
+        else:
+            requests = {"concept_prompt": (build_concept_request(spec), None)}
+            for view in ("front", "side", "back"):
+                requests[f"tpose_{view}"] = (build_tpose_request(spec, view), None)
+
+        for name, (user_message, json_schema) in requests.items():
+            lines.append({
+                "custom_id": _custom_id(index, spec, name),
+                "method": "POST",
+                "url": BATCH_ENDPOINT,
+                "body": build_responses_request(user_message, model, use_web_search, json_schema),
+            })
+
+    return lines
+
+
+def write_batch_input(lines: list[dict[str, Any]], path: Path) -> Path:
+    """Write the Batch API input file (one JSON object per line)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as f:
+        for line in lines:
+            f.write(json.dumps(line, ensure_ascii=False) + "\n")
+    return path
+
+
+# -----------------------------------------------------------------------------
+# OPENAI BATCH API
+# -----------------------------------------------------------------------------
+
+def create_openai_client(api_key: Optional[str] = None):
+    """Create an OpenAI client (lazy import, like stage2_llm_refiner)."""
+    try:
+        from openai import OpenAI
+    except ImportError:
+        raise ImportError(
+            "openai package is required for LLM prompt refinement.\n"
+            "Install it with: pip install openai\n"
+            "Or: uv add openai"
+        )
+    return OpenAI(api_key=api_key or get_openai_api_key())
+
+
+def submit_batch(client, input_path: Path, description: str = "") -> str:
+    """
+    Upload the input file and create the batch.
+
+    Args:
+        client: OpenAI client
+        input_path: JSONL written by write_batch_input()
+        description: Stored as batch metadata (shown in the dashboard)
+
+    Returns:
+        The batch ID
+    """
+    with span("openai.batch_upload", category="api") as s:
+        s.record(bytes_out=input_path.stat().st_size)
+        with input_path.open("rb") as f:
+            input_file = client.files.create(file=f, purpose="batch")
+
+    with span("openai.batch_create", category="api"):
+        batch = client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window=BATCH_COMPLETION_WINDOW,
+            metadata={"description": description} if description else None,
+        )
+    return batch.id
+
+
+def wait_for_batch(
+    client,
+    batch_id: str,
+    poll_interval: float = DEFAULT_BATCH_POLL_INTERVAL,
+    timeout: float = DEFAULT_BATCH_TIMEOUT,
+    verbose: bool = True,
+):
+    """
+    Poll a batch until it reaches a terminal status.
+
+    Args:
+        client: OpenAI client
+        batch_id: Batch to wait for
+        poll_interval: Seconds between status checks
+        timeout: Maximum seconds to wait
+        verbose: Print status changes and progress
+
+    Returns:
+        The final batch object
+
+    Raises:
+        TimeoutError: If the batch is still running after timeout (it keeps
+                      running server-side; attach again with its ID)
+    """
+    start_time = time.time()
+    last_line = None
+
+    while True:
+        with span("openai.batch_poll", category="api"):
+            batch = client.batches.retrieve(batch_id)
+
+        counts = batch.request_counts
+        if verbose and counts is not None:
+            line = f"  Batch {batch.status}: {counts.completed + counts.failed}/{counts.total} done"
+            if counts.failed:
+                line += f" ({counts.failed} failed)"
+            if line != last_line:
+                print(line)
+                last_line = line
+
+        if batch.status in BATCH_TERMINAL_STATUSES:
+            return batch
+
+        elapsed = time.time() - start_time
+        if elapsed > timeout:
+            raise TimeoutError(
+                f"Batch {batch_id} still {batch.status} after {elapsed:.0f}s. "
+                f"Resume later with --batch-id {batch_id}"
+            )
+
+        time.sleep(poll_interval)
+
+
+def _download_file(client, file_id: Optional[str], path: Path) -> Optional[str]:
+    """Download a batch output/error file to path (returns its text)."""
+    if not file_id:
+        return None
+    with span("openai.batch_download", category="api") as s:
+        text = client.files.content(file_id).text
+        s.record(bytes_in=len(text.encode("utf-8")))
+    path.write_text(text, encoding="utf-8")
+    return text
+
+
+def _output_text(body: dict) -> str:
+    """Concatenated output_text of a Responses API response body."""
+    parts = []
+    for item in body.get("output") or []:
+        if item.get("type") == "message":
+            for content in item.get("content") or []:
+                if content.get("type") == "output_text":
+                    parts.append(content.get("text", ""))
+    return "".join(parts).strip()
+
+
+def _usage_from_body(body: dict) -> TokenUsage:
+    """Token usage from a Responses API response body (a dict here, not an SDK object)."""
+    usage = body.get("usage") or {}
+    return TokenUsage(
+        input_tokens=usage.get("input_tokens", 0),
+        output_tokens=usage.get("output_tokens", 0),
+        cached_tokens=(usage.get("input_tokens_details") or {}).get("cached_tokens", 0),
+        reasoning_tokens=(usage.get("output_tokens_details") or {}).get("reasoning_tokens", 0),
+        calls=1,
+    )
+
+
+def parse_batch_results(
+    output_text: Optional[str],
+    error_text: Optional[str],
+    num_specs: int,
+    mode: str = DEFAULT_REFINE_MODE,
+) -> tuple[dict[int, dict[str, str]], dict[int, str], TokenUsage]:
+    """
+    Map batch output lines back to characters.
+
+    A character only counts as done when ALL of its prompts came back;
+    anything else is reported as a failure with the first reason seen.
+
+    Args:
+        output_text: Contents of the batch output file (may be None)
+        error_text: Contents of the batch error file (may be None)
+        num_specs: Number of characters in the batch
+        mode: The mode the batch was built with
+
+    Returns:
+        (prompts by spec index, failure reason by spec index, token usage)
+    """
+    collected: dict[int, dict[str, str]] = {}
+    failures: dict[int, str] = {}
+    usage = TokenUsage()
+
+    for raw in (output_text or "").splitlines() + (error_text or "").splitlines():
+        if not raw.strip():
+            continue
+        line = json.loads(raw)
+        index, name = _parse_custom_id(line["custom_id"])
+        response = line.get("response") or {}
+        body = response.get("body") or {}
+
+        if line.get("error") or response.get("status_code", 200) != 200:
+            error = line.get("error") or body.get("error") or {}
+            failures.setdefault(index, f"{name}: {error.get('message', 'request failed')}")
+            continue
+
+        usage.add(_usage_from_body(body))
+        text = _output_text(body)
+
+        if name == "all":
+            try:
+                collected[index] = parse_refined_json(text)
+            except ValueError as e:
+                failures.setdefault(index, f"invalid JSON output ({e})")
+        else:
+            collected.setdefault(index, {})[name] = text
+
+    prompts = {}
+    for index in range(num_specs):
+        found = collected.get(index, {})
+        missing = [name for name in PROMPT_FIELDS if not found.get(name)]
+        if not missing:
+            prompts[index] = found
+        else:
+            failures.setdefault(index, f"no result for {', '.join(missing)}")
+
+    return prompts, failures, usage
+
+
+# -----------------------------------------------------------------------------
+# MAIN BATCH FUNCTION
+# -----------------------------------------------------------------------------
+
+@traced("stage2b.refine_prompts_batch")
+def refine_prompts_batch(
+    specs: list[CharacterSpec],
+    work_dir: Path,
+    api_key: Optional[str] = None,
+    model: str = DEFAULT_MODEL,
+    use_web_search: bool = False,
+    mode: str = DEFAULT_REFINE_MODE,
+    poll_interval: float = DEFAULT_BATCH_POLL_INTERVAL,
+    timeout: float = DEFAULT_BATCH_TIMEOUT,
+    batch_id: Optional[str] = None,
+) -> BatchRefinementResult:
+    """
+    Refine prompts for many characters with one Batch API job.
+
+    Args:
+        specs: Character specifications (order defines the custom_ids)
+        work_dir: Where requests.jsonl, batch.json and the raw results go
+        api_key: Optional API key (uses OPENAI_API_KEY env var if not provided)
+        model: OpenAI model to use
+        use_web_search: Enable the web_search tool
+        mode: "per-view" (4 requests per character) or "single" (1)
+        poll_interval: Seconds between status checks
+        timeout: Maximum seconds to wait for the batch
+        batch_id: Attach to this already-submitted batch instead of
+                  submitting a new one (pass the same specs, same order)
+
+    Returns:
+        BatchRefinementResult with prompts per spec index
+
+    Raises:
+        ValueError: If mode is invalid
+        TimeoutError: If the batch doesn't finish within timeout
+    """
+    client = create_openai_client(api_key)
+    work_dir.mkdir(parents=True, exist_ok=True)
+    start_time = time.time()
+
+    if batch_id is None:
+        lines = build_batch_requests(specs, model, use_web_search, mode)
+        input_path = write_batch_input(lines, work_dir / BATCH_INPUT_NAME)
+        print(f"  Submitting {len(lines)} requests for {len(specs)} characters ({mode})...")
+        batch_id = submit_batch(client, input_path, description=f"refine {len(specs)} characters")
+    else:
+        print(f"  Attaching to batch {batch_id}...")
+
+    (work_dir / BATCH_INFO_NAME).write_text(json.dumps({
+        "batch_id": batch_id,
+        "model": model,
+        "mode": mode,
+        "web_search": use_web_search,
+        "characters": [spec.name for spec in specs],
+    }, indent=2), encoding="utf-8")
+    print(f"  Batch ID: {batch_id}")
+
+    batch = wait_for_batch(client, batch_id, poll_interval, timeout)
+
+    # Expired/cancelled batches still return whatever finished
+    output_text = _download_file(client, batch.output_file_id, work_dir / BATCH_OUTPUT_NAME)
+    error_text = _download_file(client, batch.error_file_id, work_dir / BATCH_ERRORS_NAME)
+    prompts, failures, usage = parse_batch_results(output_text, error_text, len(specs), mode)
+
+    return BatchRefinementResult(
+        batch_id=batch_id,
+        status=batch.status,
+        prompts=prompts,
+        failures=failures,
+        usage=usage,
+        elapsed_seconds=time.time() - start_time,
+    )
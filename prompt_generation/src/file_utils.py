@@ -3,17 +3,36 @@
 # This module handles all file I/O operations for the prompt pipeline:
 #   - Resolving output paths based on prompt keys
 #   - Creating directories as needed
-#   - Writing prompt files to disk
+#   - Writing prompt files to disk (atomically, with a manifest.json)
+#   - Streaming text into a file as it arrives (refine --stream)
 #   - Printing prompts to stdout (for --dry-run mode)
 #
 # Separation of concerns: This module knows nothing about prompt content,
 # only about how to save strings to the right file paths.
 
+import hashlib
+import json
+import os
+import threading
+import uuid
 from pathlib import Path
+from typing import Optional, TextIO
 
 from .models import CharacterSpec
 
 
+# Suffix for files that are still being written (or were cut off)
+PARTIAL_SUFFIX = ".partial"
+
+# One manifest per output folder: relative path → key, size, SHA-256
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+# write_prompts() does read-modify-write on the manifest; several threads
+# may write prompts into the same run folder
+_manifest_lock = threading.Lock()
+
+
 # -----------------------------------------------------------------------------
 # OUTPUT PATH CONFIGURATION
 # -----------------------------------------------------------------------------
@@ -132,30 +151,98 @@ def resolve_output_path(
 # FILE WRITING
 # -----------------------------------------------------------------------------
 
+def atomic_write_bytes(path: Path, data: bytes) -> None:
+    """
+    Write a file so readers only ever see the old or the new content.
+    
+    The data goes to a temp file in the same directory, which is then
+    renamed over the target with os.replace() (atomic on POSIX and
+    Windows when both are on the same filesystem). If anything fails, the
+    temp file is removed and the old file is left untouched.
+    
+    Args:
+        path: Final file path (its directory must exist)
+        data: File content
+    """
+    # Unique per writer; "x" mode refuses to reuse an existing file.
+    # (Not tempfile.mkstemp: it creates 0600 files, and prompt files
+    # should get the same permissions as any other file we write.)
+    temp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex[:12]}.tmp")
+    try:
+        with temp_path.open("xb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+
+
+def load_manifest(base_dir: Path) -> dict[str, dict]:
+    """
+    Read the manifest of an output folder.
+    
+    Args:
+        base_dir: Output folder that may contain manifest.json
+        
+    Returns:
+        Relative path (POSIX style) → {"key", "size", "sha256", "mtime_ns"};
+        empty if there is no manifest or it can't be parsed
+    """
+    try:
+        data = json.loads((base_dir / MANIFEST_NAME).read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("version") != MANIFEST_VERSION:
+        return {}
+    return data.get("files", {})
+
+
+def _is_unchanged(path: Path, entry: Optional[dict], size: int, sha256: str) -> bool:
+    """
+    True if the file on disk is still the one the manifest describes.
+    
+    Only stat() is used - same hash in the manifest plus the same size and
+    mtime on disk means nobody has touched the file since we wrote it.
+    """
+    if entry is None or entry.get("sha256") != sha256 or entry.get("size") != size:
+        return False
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return False
+    return stat.st_size == size and stat.st_mtime_ns == entry.get("mtime_ns")
+
+
 def write_prompts(
     prompts: dict[str, str],
     spec: CharacterSpec,
     base_dir: Path,
-    version: str
+    version: str,
+    skip_unchanged: bool = True,
 ) -> list[Path]:
     """
     Write all prompts to their respective files.
     
     This function:
-        1. Iterates through all prompts in the dictionary
-        2. Resolves the output path for each prompt
-        3. Creates the directory if it doesn't exist
-        4. Writes the content to the file
-        5. Returns a list of all written file paths
+        1. Resolves the output path for each prompt
+        2. Creates each distinct directory once
+        3. Writes each file atomically (temp file + rename), so an
+           interrupted run never leaves a half-written file behind
+        4. Skips files whose content is unchanged since the last write
+           (checked against manifest.json, without reading the file)
+        5. Records key, size, and SHA-256 for every file in
+           <base_dir>/manifest.json
+        6. Returns a list of all prompt file paths
     
     Args:
         prompts: Dictionary mapping keys to prompt content
         spec: The character specification
         base_dir: The base output directory
         version: The version string for filenames
+        skip_unchanged: Don't rewrite files the manifest says are current
         
     Returns:
-        List of Path objects for all written files
+        List of Path objects for all prompt files (written or unchanged)
         
     Example:
         >>> paths = write_prompts(prompts, spec, Path("prompts"), "v1")
@@ -165,30 +252,114 @@ def write_prompts(
         prompts/gemini/aethel_tpose_prompt_v1.txt
         ...
     """
-    # Keep track of all files we write
-    written_paths: list[Path] = []
+    # Step 1: Figure out where each prompt goes and what it will contain
+    planned: list[tuple[str, Path, bytes]] = [
+        (key, resolve_output_path(base_dir, spec, version, key), content.encode("utf-8"))
+        for key, content in prompts.items()
+    ]
     
-    # Iterate through each prompt in the dictionary
-    for key, content in prompts.items():
+    # Step 2: Create each directory once (not once per file)
+    for directory in {path.parent for _, path, _ in planned}:
+        directory.mkdir(parents=True, exist_ok=True)
+    
+    written_paths: list[Path] = []
+    with _manifest_lock:
+        manifest = load_manifest(base_dir)
         
-        # Step 1: Figure out where this prompt should be saved
-        output_path = resolve_output_path(base_dir, spec, version, key)
+        for key, path, data in planned:
+            relative = path.relative_to(base_dir).as_posix()
+            sha256 = hashlib.sha256(data).hexdigest()
+            
+            # Steps 3-4: Write atomically, unless the file is already current
+            entry = manifest.get(relative)
+            if not (skip_unchanged and _is_unchanged(path, entry, len(data), sha256)):
+                atomic_write_bytes(path, data)
+                entry = {
+                    "key": key,
+                    "size": len(data),
+                    "sha256": sha256,
+                    "mtime_ns": path.stat().st_mtime_ns,
+                }
+            manifest[relative] = entry
+            written_paths.append(path)
         
-        # Step 2: Create the parent directory if it doesn't exist
-        # .parent gets the directory part: prompts/base/file.txt -> prompts/base
-        # mkdir() creates the directory
-        # parents=True also creates parent directories if needed
-        # exist_ok=True doesn't error if directory already exists
-        output_path.parent.mkdir(parents=True, exist_ok=True)
+        # Step 5: One manifest write per call, also atomic
+        payload = {"version": MANIFEST_VERSION, "files": dict(sorted(manifest.items()))}
+        atomic_write_bytes(
+            base_dir / MANIFEST_NAME,
+            (json.dumps(payload, indent=2, ensure_ascii=False) + "\n").encode("utf-8"),
+        )
+    
+    return written_paths
+
+
+# -----------------------------------------------------------------------------
+# STREAMING WRITES
+# -----------------------------------------------------------------------------
+
+class StreamingFileWriter:
+    """
+    Write a text file progressively, then publish it atomically.
+    
+    Text goes to "<path>.partial" as it arrives and is flushed after
+    every write, so `tail -f` shows progress. commit() renames the
+    partial file over the final path with os.replace(), so the final
+    file is either absent or complete - never half-written.
+    
+    If the stream fails (timeout, network error), just don't commit:
+    the .partial file stays on disk for inspection.
+    
+    Example:
+        >>> writer = StreamingFileWriter(Path("refined/aethel_refined_concept_v1.txt"))
+        >>> for delta in stream:
+        ...     writer.write(delta)
+        >>> writer.commit()
+    """
+    
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.partial_path = self.path.with_name(self.path.name + PARTIAL_SUFFIX)
+        self.chars_written = 0
+        self._file: Optional[TextIO] = None
+    
+    def write(self, text: str) -> None:
+        """Append text to the partial file (opened on first write)."""
+        if self._file is None:
+            self.partial_path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = self.partial_path.open("w", encoding="utf-8")
+        self._file.write(text)
+        self._file.flush()
+        self.chars_written += len(text)
+    
+    def commit(self, final_text: Optional[str] = None) -> Path:
+        """
+        Publish the file at its final path.
         
-        # Step 3: Write the prompt content to the file
-        # encoding="utf-8" ensures special characters are handled correctly
-        output_path.write_text(content, encoding="utf-8")
+        Args:
+            final_text: If given, replaces whatever was streamed (e.g., the
+                        stripped text, or the result of a non-streaming retry)
+                        
+        Returns:
+            The final path
+        """
+        if final_text is not None:
+            self.close()
+            self._file = None
+            self.chars_written = 0
+            self.write(final_text)
+        elif self._file is None:
+            self.write("")  # Nothing streamed: publish an empty file
         
-        # Step 4: Add to our list of written files
-        written_paths.append(output_path)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.close()
+        os.replace(self.partial_path, self.path)
+        return self.path
     
-    return written_paths
+    def close(self) -> None:
+        """Close the partial file without publishing it."""
+        if self._file is not None and not self._file.closed:
+            self._file.close()
 
 
 # -----------------------------------------------------------------------------
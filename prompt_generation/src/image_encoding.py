@@ -0,0 +1,346 @@
+# image_encoding.py - Image Format Detection and Output Encoding
+#
+# Pipeline Stage: ... → Gemini Image Gen → [ENCODING] → Save → Hunyuan 3D
+#                                          ^^^^^^^^^^
+#                                          THIS STEP
+#
+# Gemini returns image bytes in whatever format it chose (usually JPEG,
+# sometimes PNG). Before this module existed, every image was written as
+# "*.jpg" no matter what was inside, so PNG data ended up in .jpg files
+# and was uploaded to COS with the wrong Content-Type.
+#
+# This module:
+#   1. Detects the real format from the file's magic bytes
+#   2. Optionally re-encodes to PNG / JPEG / WebP with quality settings
+#   3. Optionally recompresses losslessly (PNG optimize, WebP lossless)
+#   4. Encodes several images in parallel (thread pool)
+#   5. Shrinks images in memory before they're uploaded to COS for Stage 5
+#      (see UploadTransform / transform_for_upload)
+#
+# Filenames are then derived from the actual content (see
+# GeneratedImage.get_filename in stage4_image_generation.py).
+#
+# REQUIRES:
+#   - Pillow package installed (pip install Pillow) - only for re-encoding
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Optional
+
+from .tracing import traced
+
+
+# -----------------------------------------------------------------------------
+# CONFIGURATION
+# -----------------------------------------------------------------------------
+
+# Output formats accepted by ImageEncoding ("keep" = don't re-encode)
+VALID_IMAGE_FORMATS = ("keep", "png", "jpeg", "webp")
+
+# File extension and MIME type for each detectable format
+FORMAT_EXTENSIONS = {
+    "png": ".png",
+    "jpeg": ".jpg",
+    "webp": ".webp",
+    "gif": ".gif",
+}
+
+FORMAT_MIME_TYPES = {
+    "png": "image/png",
+    "jpeg": "image/jpeg",
+    "webp": "image/webp",
+    "gif": "image/gif",
+}
+
+# Extension used when the format can't be detected (historic default)
+DEFAULT_EXTENSION = ".jpg"
+
+# Formats accepted for pre-upload transforms (Hunyuan 3D accepts both)
+VALID_UPLOAD_FORMATS = ("jpeg", "webp")
+
+# Hunyuan 3D doesn't need more than this for image-to-3D (longest edge)
+DEFAULT_UPLOAD_MAX_EDGE = 1536
+
+
+# -----------------------------------------------------------------------------
+# FORMAT DETECTION
+# -----------------------------------------------------------------------------
+
+def detect_image_format(data: bytes) -> Optional[str]:
+    """
+    Detect an image format from its magic bytes.
+
+    Only looks at the first few bytes, so it's effectively free
+    (no decoding, no Pillow needed).
+
+    Args:
+        data: Encoded image bytes
+
+    Returns:
+        "png", "jpeg", "webp", "gif", or None if unknown
+
+    Example:
+        >>> detect_image_format(b"\\x89PNG\\r\\n\\x1a\\n...")
+        'png'
+    """
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if data.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if len(data) >= 12 and data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    return None
+
+
+def extension_for(data: bytes) -> str:
+    """File extension (with dot) matching the image content."""
+    return FORMAT_EXTENSIONS.get(detect_image_format(data), DEFAULT_EXTENSION)
+
+
+def mime_type_for(data: bytes) -> str:
+    """MIME type matching the image content."""
+    return FORMAT_MIME_TYPES.get(detect_image_format(data), "application/octet-stream")
+
+
+# -----------------------------------------------------------------------------
+# ENCODING SETTINGS
+# -----------------------------------------------------------------------------
+
+@dataclass
+class ImageEncoding:
+    """
+    Output encoding settings for generated images.
+
+    Attributes:
+        format: One of VALID_IMAGE_FORMATS ("keep" leaves bytes untouched
+                unless lossless recompression is requested)
+        quality: Lossy quality for JPEG/WebP (1-100)
+        lossless: Recompress without quality loss (PNG optimize pass,
+                  WebP lossless mode). Ignored for JPEG.
+        max_workers: Thread pool size (None = one per image, capped at CPUs)
+    """
+    format: str = "keep"
+    quality: int = 92
+    lossless: bool = False
+    max_workers: Optional[int] = None
+
+    def __post_init__(self):
+        if self.format not in VALID_IMAGE_FORMATS:
+            raise ValueError(
+                f"Invalid image format: {self.format}. "
+                f"Valid options: {', '.join(VALID_IMAGE_FORMATS)}"
+            )
+        if not 1 <= self.quality <= 100:
+            raise ValueError(f"quality must be between 1 and 100, got {self.quality}")
+
+    @property
+    def is_noop(self) -> bool:
+        """True if encoding would return the input unchanged."""
+        return self.format == "keep" and not self.lossless
+
+
+# -----------------------------------------------------------------------------
+# ENCODING (runs in a worker thread)
+# -----------------------------------------------------------------------------
+
+def encode_image(data: bytes, encoding: ImageEncoding) -> bytes:
+    """
+    Re-encode one image according to the encoding settings.
+
+    Args:
+        data: Encoded image bytes (any format Pillow can read)
+        encoding: Output settings
+
+    Returns:
+        The encoded bytes (the input itself if nothing needs to change)
+
+    Raises:
+        ImportError: If Pillow is not installed
+    """
+    if encoding.is_noop:
+        return data
+
+    source_format = detect_image_format(data)
+    target_format = source_format if encoding.format == "keep" else encoding.format
+
+    # Re-encoding a JPEG as JPEG (or "losslessly") would only lose quality;
+    # leave it alone
+    if source_format == "jpeg" and target_format == "jpeg":
+        return data
+
+    try:
+        from PIL import Image
+    except ImportError:
+        raise ImportError(
+            "Pillow package is required for image encoding.\n"
+            "Install it with: pip install Pillow\n"
+            "Or: uv add Pillow"
+        )
+
+    with Image.open(BytesIO(data)) as img:
+        img.load()
+        buffer = BytesIO()
+
+        if target_format == "jpeg":
+            # JPEG has no alpha channel
+            if img.mode != "RGB":
+                img = img.convert("RGB")
+            img.save(buffer, format="JPEG", quality=encoding.quality, optimize=True)
+        elif target_format == "webp":
+            if img.mode not in ("RGB", "RGBA"):
+                img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+            img.save(
+                buffer,
+                format="WEBP",
+                quality=encoding.quality,
+                lossless=encoding.lossless,
+                method=4,  # Good speed/size tradeoff
+            )
+        else:
+            # PNG (or an unknown source with "keep") - optimize = extra zlib pass
+            img.save(buffer, format="PNG", optimize=True)
+
+    encoded = buffer.getvalue()
+
+    # A lossless recompression that didn't help isn't worth keeping
+    if encoding.format == "keep" and len(encoded) >= len(data):
+        return data
+
+    return encoded
+
+
+@traced("encoding.encode_images")
+def encode_images(images: list[bytes], encoding: ImageEncoding) -> list[bytes]:
+    """
+    Encode several images, in parallel when there is more than one.
+
+    Pillow releases the GIL while it decodes and encodes, so a thread
+    pool runs the three T-pose views side by side without copying the
+    image bytes to worker processes.
+
+    Args:
+        images: Encoded image bytes
+        encoding: Output settings
+
+    Returns:
+        Encoded bytes, in the same order as the input
+    """
+    if encoding.is_noop or not images:
+        return list(images)
+
+    # A pool is only worth its startup cost with more than one image
+    if len(images) == 1:
+        return [encode_image(images[0], encoding)]
+
+    workers = encoding.max_workers or min(len(images), os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(encode_image, images, [encoding] * len(images)))
+
+
+# -----------------------------------------------------------------------------
+# PRE-UPLOAD TRANSFORM (Stage 5)
+# -----------------------------------------------------------------------------
+
+@dataclass
+class UploadTransform:
+    """
+    In-memory transform applied to images before they're uploaded to COS.
+
+    Stage 4 output is 2K-4K; Hunyuan 3D fetches the image back from COS,
+    so every extra byte is paid twice (our upload + Hunyuan's download).
+
+    Attributes:
+        max_edge: Longest edge in pixels (never upscales)
+        format: "jpeg" or "webp"
+        quality: Lossy quality (1-100)
+        strip_metadata: Drop EXIF/ICC/text chunks
+    """
+    max_edge: int = DEFAULT_UPLOAD_MAX_EDGE
+    format: str = "jpeg"
+    quality: int = 90
+    strip_metadata: bool = True
+
+    def __post_init__(self):
+        if self.format not in VALID_UPLOAD_FORMATS:
+            raise ValueError(
+                f"Invalid upload format: {self.format}. "
+                f"Valid options: {', '.join(VALID_UPLOAD_FORMATS)}"
+            )
+        if self.max_edge < 1:
+            raise ValueError(f"max_edge must be positive, got {self.max_edge}")
+        if not 1 <= self.quality <= 100:
+            raise ValueError(f"quality must be between 1 and 100, got {self.quality}")
+
+
+@traced("encoding.transform_for_upload")
+def transform_for_upload(data: bytes, transform: UploadTransform) -> bytes:
+    """
+    Downscale and recompress an image for upload.
+
+    If the result is not smaller than the input (e.g., an already small
+    JPEG), the original bytes are returned unchanged.
+
+    Args:
+        data: Encoded image bytes
+        transform: Upload settings
+
+    Returns:
+        Bytes to upload
+
+    Raises:
+        ImportError: If Pillow is not installed
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        raise ImportError(
+            "Pillow package is required for image upload transforms.\n"
+            "Install it with: pip install Pillow\n"
+            "Or: uv add Pillow"
+        )
+
+    with Image.open(BytesIO(data)) as img:
+        # draft() lets JPEG decode at reduced size (no-op for other formats)
+        img.draft("RGB", (transform.max_edge, transform.max_edge))
+        exif = img.info.get("exif")
+        icc_profile = img.info.get("icc_profile")
+
+        # Flatten alpha onto white - the T-pose prompt asks for a white background
+        if img.mode in ("RGBA", "LA", "P"):
+            rgba = img.convert("RGBA")
+            img = Image.new("RGB", rgba.size, (255, 255, 255))
+            img.paste(rgba, mask=rgba.getchannel("A"))
+        elif img.mode != "RGB":
+            img = img.convert("RGB")
+
+        resized = False
+        if max(img.size) > transform.max_edge:
+            scale = transform.max_edge / max(img.size)
+            new_size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+            img = img.resize(new_size, Image.LANCZOS)
+            resized = True
+
+        save_kwargs: dict = {"quality": transform.quality}
+        if not transform.strip_metadata:
+            if exif:
+                save_kwargs["exif"] = exif
+            if icc_profile:
+                save_kwargs["icc_profile"] = icc_profile
+
+        buffer = BytesIO()
+        if transform.format == "jpeg":
+            img.save(buffer, format="JPEG", optimize=True, **save_kwargs)
+        else:
+            img.save(buffer, format="WEBP", method=4, **save_kwargs)
+
+    encoded = buffer.getvalue()
+
+    # Don't upload a bigger file than we started with
+    if not resized and len(encoded) >= len(data):
+        return data
+
+    return encoded
@@ -0,0 +1,461 @@
+# image_preflight.py - Preflight Checks for T-pose Images Before Stage 5
+#
+# Pipeline Stage: ... → T-pose Images → [PREFLIGHT] → Hunyuan 3D
+#                                       ^^^^^^^^^^^
+#                                       THIS STEP
+#
+# Hunyuan 3D jobs are slow (minutes) and billed per job. A bad input image
+# (cropped feet, busy background, off-center subject, arms down) wastes the
+# whole job. This module runs a few cheap, local checks on the image bytes
+# BEFORE anything is uploaded:
+#
+#   1. Background uniformity - border pixels should be one light, flat color
+#   2. Subject margins       - the silhouette must not touch the image edges
+#   3. Centering             - the silhouette should sit in the middle
+#   4. Symmetry (front view) - a T-pose seen from the front is mirror-symmetric
+#   5. Arm extension         - in a T-pose the arm span is roughly the height
+#
+# Everything runs on a small downscaled copy with NumPy, so a check takes
+# a few milliseconds - nothing compared to a 10-minute 3D job.
+#
+# The same checks rank best-of-N candidates (rank_images): each passed
+# check is a point, and the measured values break ties.
+#
+# REQUIRES:
+#   - Pillow (decode image bytes)
+#   - numpy (mask math)
+
+from dataclasses import dataclass, field
+from io import BytesIO
+from typing import Callable, Optional
+
+import numpy as np
+
+from .tracing import traced
+
+
+# -----------------------------------------------------------------------------
+# CONFIGURATION
+# -----------------------------------------------------------------------------
+
+# Images are analyzed at this size (longest edge, pixels)
+ANALYSIS_SIZE = 256
+
+# Border strip used to estimate the background (fraction of each edge)
+BORDER_FRACTION = 0.03
+
+# A pixel is "subject" if any channel differs from the background by more than this
+FOREGROUND_THRESHOLD = 40
+
+# Views where the arms should be extended sideways in the image
+ARM_CHECK_VIEWS = ("front", "back")
+
+# Subject coverage that earns full marks when ranking candidates (a
+# larger subject gives Hunyuan more pixels; margins catch cropping)
+GOOD_COVERAGE = 0.15
+
+
+@dataclass
+class PreflightThresholds:
+    """
+    Pass/fail limits for the preflight checks.
+
+    Attributes:
+        min_background_brightness: Mean border brightness (0-255), white/light gray
+        max_background_std: Max std-dev of border pixels (flat background)
+        min_margin: Min gap between subject and each edge (fraction of size)
+        max_center_offset: Max horizontal offset of the subject center (fraction)
+        min_symmetry: Min mirror overlap (IoU) of the front silhouette
+        min_arm_span_ratio: Min silhouette width / height in front/back views
+        min_coverage: Min fraction of pixels that belong to the subject
+    """
+    min_background_brightness: float = 200.0
+    max_background_std: float = 12.0
+    min_margin: float = 0.01
+    max_center_offset: float = 0.08
+    min_symmetry: float = 0.70
+    min_arm_span_ratio: float = 0.75
+    min_coverage: float = 0.03
+
+
+# -----------------------------------------------------------------------------
+# DATA CLASSES
+# -----------------------------------------------------------------------------
+
+@dataclass
+class PreflightCheck:
+    """
+    Outcome of a single check.
+
+    Attributes:
+        name: Check identifier (e.g., "background")
+        passed: Whether the check passed
+        value: Measured value
+        message: Human-readable explanation
+    """
+    name: str
+    passed: bool
+    value: float
+    message: str
+
+
+@dataclass
+class PreflightReport:
+    """
+    All check results for one image.
+
+    Attributes:
+        view: The view that was checked ("front", "side", "back")
+        checks: Individual check results
+        bbox: Subject bounding box (left, top, right, bottom) as fractions
+    """
+    view: str
+    checks: list[PreflightCheck] = field(default_factory=list)
+    bbox: Optional[tuple[float, float, float, float]] = None
+
+    @property
+    def passed(self) -> bool:
+        """True if every check passed."""
+        return all(check.passed for check in self.checks)
+
+    @property
+    def failures(self) -> list[PreflightCheck]:
+        """The checks that failed."""
+        return [check for check in self.checks if not check.passed]
+
+    def summary(self) -> str:
+        """One line per check, e.g. for CLI output."""
+        return "\n".join(
+            f"{'✓' if check.passed else '✗'} {check.name}: {check.message}"
+            for check in self.checks
+        )
+
+
+@dataclass
+class RankedImage:
+    """
+    One candidate of a view, scored by rank_images().
+
+    Attributes:
+        image_data: Encoded image bytes
+        report: Its preflight report
+        score: preflight_score() of the report (higher is better)
+        index: Position in the list passed to rank_images()
+    """
+    image_data: bytes
+    report: PreflightReport
+    score: float
+    index: int
+
+
+# -----------------------------------------------------------------------------
+# IMAGE DECODING
+# -----------------------------------------------------------------------------
+
+def _load_rgb_array(image_data: bytes) -> np.ndarray:
+    """Decode image bytes into a small RGB float array."""
+    try:
+        from PIL import Image
+    except ImportError:
+        raise ImportError(
+            "Pillow package is required for image preflight checks.\n"
+            "Install it with: pip install Pillow\n"
+            "Or: uv add Pillow"
+        )
+
+    with Image.open(BytesIO(image_data)) as img:
+        # draft() lets JPEG decode at reduced size - much faster for 2K/4K
+        # (no-op for other formats)
+        img.draft("RGB", (ANALYSIS_SIZE, ANALYSIS_SIZE))
+        img = img.convert("RGB")
+        img.thumbnail((ANALYSIS_SIZE, ANALYSIS_SIZE))
+        return np.asarray(img, dtype=np.float32)
+
+
+# -----------------------------------------------------------------------------
+# INDIVIDUAL CHECKS
+# -----------------------------------------------------------------------------
+
+def _border_pixels(pixels: np.ndarray) -> np.ndarray:
+    """Collect the outer strip of pixels on all four sides."""
+    h, w, _ = pixels.shape
+    bh = max(1, int(h * BORDER_FRACTION))
+    bw = max(1, int(w * BORDER_FRACTION))
+    return np.concatenate([
+        pixels[:bh].reshape(-1, 3),
+        pixels[-bh:].reshape(-1, 3),
+        pixels[:, :bw].reshape(-1, 3),
+        pixels[:, -bw:].reshape(-1, 3),
+    ])
+
+
+def _check_background(border: np.ndarray, limits: PreflightThresholds) -> PreflightCheck:
+    """Border pixels should be light and flat."""
+    brightness = float(border.mean())
+    spread = float(border.std(axis=0).max())
+    passed = (
+        brightness >= limits.min_background_brightness
+        and spread <= limits.max_background_std
+    )
+    if passed:
+        message = f"uniform light background (mean {brightness:.0f}, std {spread:.1f})"
+    elif brightness < limits.min_background_brightness:
+        message = f"background too dark (mean {brightness:.0f} < {limits.min_background_brightness:.0f})"
+    else:
+        message = f"background not uniform (std {spread:.1f} > {limits.max_background_std:.1f})"
+    return PreflightCheck("background", passed, spread, message)
+
+
+def _check_margins(
+    bbox: tuple[float, float, float, float],
+    limits: PreflightThresholds,
+) -> PreflightCheck:
+    """The subject must not touch any edge (cropped feet, hands, head)."""
+    left, top, right, bottom = bbox
+    margins = {
+        "left (hand)": left,
+        "top (head)": top,
+        "right (hand)": 1.0 - right,
+        "bottom (feet)": 1.0 - bottom,
+    }
+    smallest_side = min(margins, key=margins.get)
+    smallest = margins[smallest_side]
+    passed = smallest >= limits.min_margin
+    message = (
+        f"smallest margin {smallest:.1%} ({smallest_side})"
+        if passed
+        else f"subject touches {smallest_side} edge - likely cropped"
+    )
+    return PreflightCheck("margins", passed, smallest, message)
+
+
+def _check_centering(
+    bbox: tuple[float, float, float, float],
+    limits: PreflightThresholds,
+) -> PreflightCheck:
+    """The subject should be horizontally centered."""
+    center_x = (bbox[0] + bbox[2]) / 2
+    offset = abs(center_x - 0.5)
+    passed = offset <= limits.max_center_offset
+    message = f"center offset {offset:.1%}" + ("" if passed else " - subject off-center")
+    return PreflightCheck("centering", passed, offset, message)
+
+
+def _check_symmetry(mask: np.ndarray, limits: PreflightThresholds) -> PreflightCheck:
+    """Mirror the silhouette around its own center column and measure overlap."""
+    cols = np.flatnonzero(mask.any(axis=0))
+    # Crop to the subject's columns so the mirror axis is the subject center
+    cropped = mask[:, cols[0]:cols[-1] + 1]
+    mirrored = cropped[:, ::-1]
+    union = np.logical_or(cropped, mirrored).sum()
+    iou = float(np.logical_and(cropped, mirrored).sum() / union) if union else 0.0
+    passed = iou >= limits.min_symmetry
+    message = f"mirror overlap {iou:.2f}" + ("" if passed else " - pose not symmetric")
+    return PreflightCheck("symmetry", passed, iou, message)
+
+
+def _check_arm_extension(
+    mask: np.ndarray,
+    bbox_px: tuple[int, int, int, int],
+    limits: PreflightThresholds,
+) -> PreflightCheck:
+    """
+    Estimate arm span from the silhouette.
+
+    In a T-pose the widest row sits at shoulder height (upper half of the
+    body) and spans roughly the full height. Arms-down poses are much
+    narrower than they are tall.
+    """
+    left, top, right, bottom = bbox_px
+    height = max(1, bottom - top)
+
+    # Widest row within the upper 60% of the body (shoulders/arms)
+    upper = mask[top:top + max(1, int(height * 0.6))]
+    row_extent = 0
+    for row in upper:
+        cols = np.flatnonzero(row)
+        if cols.size:
+            row_extent = max(row_extent, int(cols[-1] - cols[0] + 1))
+
+    ratio = row_extent / height
+    passed = ratio >= limits.min_arm_span_ratio
+    message = f"arm span / height {ratio:.2f}" + ("" if passed else " - arms not extended")
+    return PreflightCheck("arm_extension", passed, ratio, message)
+
+
+# -----------------------------------------------------------------------------
+# MAIN ENTRY POINT
+# -----------------------------------------------------------------------------
+
+@traced("preflight.run_preflight")
+def run_preflight(
+    image_data: bytes,
+    view: str = "front",
+    thresholds: Optional[PreflightThresholds] = None,
+) -> PreflightReport:
+    """
+    Run all preflight checks on an image.
+
+    Args:
+        image_data: Encoded image bytes (e.g., GeneratedImage.image_data)
+        view: "front", "side", or "back" (controls which checks apply)
+        thresholds: Pass/fail limits (defaults are tuned for T-pose sheets)
+
+    Returns:
+        PreflightReport with one entry per check
+
+    Example:
+        >>> report = run_preflight(front_image.image_data, view="front")
+        >>> if not report.passed:
+        ...     print(report.summary())
+    """
+    limits = thresholds or PreflightThresholds()
+    pixels = _load_rgb_array(image_data)
+    h, w, _ = pixels.shape
+
+    report = PreflightReport(view=view)
+
+    # Step 1: Background estimate from the border strip
+    border = _border_pixels(pixels)
+    report.checks.append(_check_background(border, limits))
+
+    # Step 2: Foreground mask = pixels that differ from the background color
+    background_color = np.median(border, axis=0)
+    mask = np.abs(pixels - background_color).max(axis=2) > FOREGROUND_THRESHOLD
+
+    coverage = float(mask.mean())
+    if coverage < limits.min_coverage:
+        report.checks.append(PreflightCheck(
+            "subject", False, coverage, f"no subject found (coverage {coverage:.1%})",
+        ))
+        return report
+    report.checks.append(PreflightCheck(
+        "subject", True, coverage, f"subject covers {coverage:.1%} of the image",
+    ))
+
+    # Step 3: Bounding box (pixels and fractions)
+    rows = np.flatnonzero(mask.any(axis=1))
+    cols = np.flatnonzero(mask.any(axis=0))
+    bbox_px = (int(cols[0]), int(rows[0]), int(cols[-1]) + 1, int(rows[-1]) + 1)
+    report.bbox = (bbox_px[0] / w, bbox_px[1] / h, bbox_px[2] / w, bbox_px[3] / h)
+
+    report.checks.append(_check_margins(report.bbox, limits))
+    report.checks.append(_check_centering(report.bbox, limits))
+
+    # Step 4: View-specific pose checks
+    if view == "front":
+        report.checks.append(_check_symmetry(mask, limits))
+    if view in ARM_CHECK_VIEWS:
+        report.checks.append(_check_arm_extension(mask, bbox_px, limits))
+
+    return report
+
+
+def preflight_with_retries(
+    image_data: bytes,
+    view: str,
+    regenerate: Callable[[], bytes],
+    max_regenerations: int = 0,
+    thresholds: Optional[PreflightThresholds] = None,
+    on_report: Optional[Callable[[int, PreflightReport], None]] = None,
+) -> tuple[bytes, PreflightReport, int]:
+    """
+    Check an image and regenerate it until it passes (or retries run out).
+
+    Args:
+        image_data: The first candidate's bytes
+        view: View name for run_preflight()
+        regenerate: Callable returning new image bytes (e.g., wraps
+                    regenerate_single_view)
+        max_regenerations: How many times regenerate may be called
+        thresholds: Pass/fail limits
+        on_report: Optional callback(attempt, report) for progress output
+
+    Returns:
+        Tuple of (best image bytes, its report, regenerations used).
+        If nothing passes, the candidate with the highest preflight_score()
+        is returned (not the fewest failures: a blank image stops at the
+        failed subject check, so it has fewer failures than a real one).
+    """
+    best_data = image_data
+    best_report = run_preflight(image_data, view, thresholds)
+    best_score = preflight_score(best_report, thresholds)
+    if on_report:
+        on_report(0, best_report)
+
+    attempts = 0
+    while not best_report.passed and attempts < max_regenerations:
+        attempts += 1
+        candidate = regenerate()
+        report = run_preflight(candidate, view, thresholds)
+        if on_report:
+            on_report(attempts, report)
+
+        score = preflight_score(report, thresholds)
+        if score > best_score:
+            best_data, best_report, best_score = candidate, report, score
+
+    return best_data, best_report, attempts
+
+
+# -----------------------------------------------------------------------------
+# RANKING (best-of-N candidates)
+# -----------------------------------------------------------------------------
+
+def preflight_score(report: PreflightReport, thresholds: Optional[PreflightThresholds] = None) -> float:
+    """
+    One number for comparing candidates of the same view (higher is better).
+
+    Every passed check is worth a point, so fewer failures always rank
+    higher. Below one point on top breaks ties: a flatter background, a
+    larger subject, and (front view) a more symmetric pose.
+
+    Args:
+        report: run_preflight() result
+        thresholds: The limits the report was made with
+
+    Returns:
+        Score between 0 and the number of checks + 1
+    """
+    limits = thresholds or PreflightThresholds()
+    values = {check.name: check.value for check in report.checks}
+
+    quality = []
+    if "background" in values:
+        quality.append(1.0 - min(values["background"] / limits.max_background_std, 1.0))
+    if "subject" in values:
+        quality.append(min(values["subject"] / GOOD_COVERAGE, 1.0))
+    if "symmetry" in values:
+        quality.append(max(values["symmetry"], 0.0))
+
+    passed = sum(1 for check in report.checks if check.passed)
+    return passed + (0.99 * sum(quality) / len(quality) if quality else 0.0)
+
+
+@traced("preflight.rank_images")
+def rank_images(
+    images: list[bytes],
+    view: str = "front",
+    thresholds: Optional[PreflightThresholds] = None,
+) -> list[RankedImage]:
+    """
+    Score candidates of one view and sort them, best first.
+
+    Args:
+        images: Encoded image bytes, one per candidate
+        view: View name for run_preflight()
+        thresholds: Pass/fail limits
+
+    Returns:
+        RankedImage list sorted by score (ties keep the input order)
+
+    Example:
+        >>> ranked = rank_images([img.image_data for img in candidates])
+        >>> best = ranked[0]
+    """
+    ranked = []
+    for index, image_data in enumerate(images):
+        report = run_preflight(image_data, view, thresholds)
+        ranked.append(RankedImage(image_data, report, preflight_score(report, thresholds), index))
+    ranked.sort(key=lambda candidate: (-candidate.score, candidate.index))
+    return ranked
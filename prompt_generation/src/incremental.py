@@ -0,0 +1,481 @@
+# incremental.py - Incremental Regeneration (only redo what changed)
+#
+# Pipeline Stage: ALL (decides which outputs of a run are still current)
+#
+# Every output of the pipeline is a function of SOME spec fields:
+#
+#   base_2d_sheet          ← name, role, game_style, silhouette
+#                            (not color_palette - the template never uses it)
+#   common_2d_refinement_  ← name, role, silhouette, color_palette,
+#   criteria                 key_props
+#   refined_*              ← the fields its LLM request mentions
+#                            + model, mode, web search
+#   images                 ← the fields the Stage 4 image prompts mention
+#                            + image model, size, encoding
+#
+# This module records those dependencies - read from the compiled
+# templates for the static prompts, and by watching which attributes the
+# request builders touch for the LLM and image stages - and turns them
+# into one fingerprint per output. The fingerprints of a finished run are
+# kept in <run>/inputs.json. With `--incremental`, the next run of the
+# same character goes into that folder again and only regenerates the
+# outputs whose fingerprint changed:
+#
+#   edit extra_notes → 3 static prompts, 4 refined prompts, and the images
+#                      are redone; both base prompts and the checklist are kept
+#   edit nothing     → nothing is redone (not even the API calls)
+#
+# A fingerprint also covers the template/request TEXT, so editing a
+# template in code invalidates exactly the outputs that use it.
+#
+# Usage:
+#   uv run generate_prompts.py prompts -i configs/aethel.yaml --incremental
+#   uv run generate_prompts.py all -i configs/aethel.yaml --incremental
+
+import hashlib
+import json
+import threading
+from dataclasses import dataclass, field, fields
+from pathlib import Path
+from typing import Any, Callable, Mapping, Optional
+
+from .file_utils import atomic_write_bytes, resolve_output_path, sanitize_filename
+from .models import CharacterSpec, spec_to_dict
+from .prompt_templates import PromptTemplate
+from .stage1_base_prompts import BASE_2D_FULL_BODY_TEMPLATE, BASE_2D_SHEET_TEMPLATE
+from .stage2_gemini_prompts import GEMINI_2D_REFINER_TEMPLATE, GEMINI_TPOSE_TEMPLATE
+from .stage2_llm_refiner import (
+    DEFAULT_MODEL,
+    DEFAULT_REFINE_MODE,
+    PROMPT_FILE_KEYS,
+    build_combined_request,
+    build_concept_request,
+    build_tpose_request,
+    system_prompt_for,
+)
+from .stage3_common_prompts import DESIGN_NOTES_TEMPLATE, REFINEMENT_CRITERIA_TEMPLATE
+from .stage4_image_generation import (
+    IMAGE_ASPECT_RATIO,
+    IMAGE_MODEL,
+    IMAGE_SIZE,
+    build_tpose_prompt,
+)
+
+
+# -----------------------------------------------------------------------------
+# CONFIGURATION
+# -----------------------------------------------------------------------------
+
+# Fingerprints of the outputs in a run folder (next to manifest.json)
+INPUTS_NAME = "inputs.json"
+INPUTS_VERSION = 1
+
+# record_outputs()/forget_outputs() do read-modify-write on inputs.json;
+# the `all` command runs stages on several threads
+_inputs_lock = threading.Lock()
+
+# Stage names used in TrackedOutput.stage
+STAGE_STATIC = "static"    # Stages 1, 2a, 3 (templates)
+STAGE_REFINE = "refine"    # Stage 2b (LLM)
+STAGE_IMAGES = "images"    # Stage 4 (Gemini images)
+
+# Key for the Stage 4 images (the prompt keys come from PROMPT_FILE_MAP)
+IMAGES_KEY = "images"
+
+# Static prompt key → its compiled template
+STATIC_TEMPLATES: dict[str, PromptTemplate] = {
+    template.name: template
+    for template in (
+        BASE_2D_FULL_BODY_TEMPLATE,
+        BASE_2D_SHEET_TEMPLATE,
+        GEMINI_2D_REFINER_TEMPLATE,
+        GEMINI_TPOSE_TEMPLATE,
+        REFINEMENT_CRITERIA_TEMPLATE,
+        DESIGN_NOTES_TEMPLATE,
+    )
+}
+
+# Template placeholder → the CharacterSpec fields it is formatted from
+# (placeholders not listed here are spec fields of the same name)
+PLACEHOLDER_SOURCES: dict[str, tuple[str, ...]] = {
+    "colors": ("color_palette",),
+    "props": ("key_props",),
+    "props_clause": ("key_props",),
+    "animations": ("animation_focus",),
+    "notes": ("extra_notes",),
+}
+
+# Views each T-pose prompt/image is built for
+_TPOSE_VIEWS = ("front", "side", "back")
+
+_SPEC_FIELDS = frozenset(f.name for f in fields(CharacterSpec))
+
+
+# -----------------------------------------------------------------------------
+# DEPENDENCY TRACKING
+# -----------------------------------------------------------------------------
+
+class _RecordingSpec:
+    """Stand-in for a CharacterSpec that remembers which fields were read."""
+
+    def __init__(self, spec: CharacterSpec):
+        self._spec = spec
+        self.read: set[str] = set()
+
+    def __getattr__(self, name: str) -> Any:
+        if name in _SPEC_FIELDS:
+            self.read.add(name)
+        return getattr(self._spec, name)
+
+
+def fields_read(build: Callable[[Any], Any], spec: CharacterSpec) -> tuple[str, ...]:
+    """
+    Which spec fields a prompt builder reads.
+
+    The builder is called once with a stand-in that records attribute
+    access, so the answer is always in sync with the code - including
+    fields that are only read for some specs.
+
+    Args:
+        build: Function taking a spec, e.g. build_concept_request
+        spec: The spec to build for
+
+    Returns:
+        Field names read, in CharacterSpec order
+
+    Example:
+        >>> fields_read(lambda s: build_tpose_prompt(s, "front"), spec)
+        ('name', 'role', 'game_style', 'silhouette', 'color_palette', 'key_props', 'extra_notes')
+    """
+    recorder = _RecordingSpec(spec)
+    build(recorder)
+    return tuple(f.name for f in fields(CharacterSpec) if f.name in recorder.read)
+
+
+def template_dependencies(template: PromptTemplate) -> tuple[str, ...]:
+    """Spec fields a static template depends on (from its placeholders)."""
+    used: set[str] = set()
+    for placeholder in template.fields:
+        used.update(PLACEHOLDER_SOURCES.get(placeholder, (placeholder,)))
+    return tuple(f.name for f in fields(CharacterSpec) if f.name in used)
+
+
+@dataclass
+class TrackedOutput:
+    """
+    One output of the pipeline and what it was made from.
+
+    Attributes:
+        key: Prompt key (see PROMPT_FILE_MAP) or IMAGES_KEY
+        stage: STAGE_STATIC, STAGE_REFINE, or STAGE_IMAGES
+        fields: Spec fields the output depends on
+        fingerprint: Hash of those fields' values, the template/request
+                     text, and the stage settings
+    """
+    key: str
+    stage: str
+    fields: tuple[str, ...]
+    fingerprint: str
+
+
+def _fingerprint(spec: CharacterSpec, deps: tuple[str, ...], code: str, settings: Mapping[str, Any]) -> str:
+    """Hash of everything an output depends on (16 hex chars, like spec_hash)."""
+    payload = {
+        "fields": {name: getattr(spec, name) for name in deps},
+        "code": code,
+        "settings": dict(settings),
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:16]
+
+
+def _tracked(
+    key: str,
+    stage: str,
+    spec: CharacterSpec,
+    builds: list[Callable[[Any], str]],
+    settings: Mapping[str, Any],
+) -> TrackedOutput:
+    """Track an output made by one or more builder calls (LLM/image stages)."""
+    deps: set[str] = set()
+    for build in builds:
+        deps.update(fields_read(build, spec))
+    ordered = tuple(f.name for f in fields(CharacterSpec) if f.name in deps)
+    # The built text covers edits to the builder code as well
+    code = "\n".join(build(spec) for build in builds)
+    return TrackedOutput(key, stage, ordered, _fingerprint(spec, ordered, code, settings))
+
+
+def track_outputs(
+    spec: CharacterSpec,
+    refine: Optional[Mapping[str, Any]] = None,
+    images: Optional[Mapping[str, Any]] = None,
+) -> dict[str, TrackedOutput]:
+    """
+    Dependencies and fingerprints for every output of a run.
+
+    Args:
+        spec: The character specification
+        refine: Stage 2b settings ("model", "mode", "use_web_search"),
+                or None if the run doesn't refine
+        images: Extra Stage 4 settings (e.g. the image encoding), or None
+                if the run doesn't generate images
+
+    Returns:
+        Output key → TrackedOutput (static prompts always included)
+    """
+    tracked: dict[str, TrackedOutput] = {}
+
+    # Static prompts: the template's placeholders are its dependencies
+    for key, template in STATIC_TEMPLATES.items():
+        deps = template_dependencies(template)
+        tracked[key] = TrackedOutput(key, STAGE_STATIC, deps, _fingerprint(spec, deps, template.text, {}))
+
+    # LLM refinement: one request per prompt, or one for all four
+    if refine is not None:
+        settings = {
+            "model": refine.get("model", DEFAULT_MODEL),
+            "mode": refine.get("mode", DEFAULT_REFINE_MODE),
+            "use_web_search": bool(refine.get("use_web_search", False)),
+        }
+        settings["system_prompt"] = system_prompt_for(settings["use_web_search"])
+        for name, key in PROMPT_FILE_KEYS.items():
+            if settings["mode"] == "single":
+                builds = [build_combined_request]
+            elif name == "concept_prompt":
+                builds = [build_concept_request]
+            else:
+                view = name.removeprefix("tpose_")
+                builds = [lambda s, view=view: build_tpose_request(s, view)]
+            tracked[key] = _tracked(key, STAGE_REFINE, spec, builds, settings)
+
+    # Images: one prompt per view, all saved together in images/
+    if images is not None:
+        settings = {
+            "model": IMAGE_MODEL,
+            "aspect_ratio": IMAGE_ASPECT_RATIO,
+            "image_size": IMAGE_SIZE,
+            **images,
+        }
+        builds = [lambda s, view=view: build_tpose_prompt(s, view) for view in _TPOSE_VIEWS]
+        tracked[IMAGES_KEY] = _tracked(IMAGES_KEY, STAGE_IMAGES, spec, builds, settings)
+
+    return tracked
+
+
+def render_static_prompts(keys: list[str], fields: Mapping[str, str]) -> dict[str, str]:
+    """
+    Render only the given static prompts.
+
+    Args:
+        keys: Static prompt keys to render (see STATIC_TEMPLATES)
+        fields: spec_fields(spec)
+
+    Returns:
+        Key → prompt text, same as generate_all_prompts() for those keys
+    """
+    return {key: STATIC_TEMPLATES[key].render(fields) for key in keys}
+
+
+# -----------------------------------------------------------------------------
+# inputs.json
+# -----------------------------------------------------------------------------
+
+@dataclass
+class RunInputs:
+    """
+    What the outputs in a run folder were made from.
+
+    Attributes:
+        spec: The spec of the latest run into this folder (as a dict)
+        version: Version string of the output filenames
+        outputs: Output key → fingerprint, for outputs that were completed
+    """
+    spec: dict[str, Any]
+    version: str
+    outputs: dict[str, str] = field(default_factory=dict)
+
+
+def load_run_inputs(run_dir: Path) -> Optional[RunInputs]:
+    """
+    Read <run_dir>/inputs.json.
+
+    Returns:
+        RunInputs, or None if the file is missing, unreadable, or from
+        another format version
+    """
+    try:
+        data = json.loads((run_dir / INPUTS_NAME).read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get("version") != INPUTS_VERSION:
+        return None
+    try:
+        return RunInputs(spec=data["spec"], version=data["output_version"], outputs=dict(data["outputs"]))
+    except (KeyError, TypeError):
+        return None
+
+
+def _save_run_inputs(run_dir: Path, inputs: RunInputs) -> None:
+    payload = {
+        "version": INPUTS_VERSION,
+        "spec": inputs.spec,
+        "output_version": inputs.version,
+        "outputs": dict(sorted(inputs.outputs.items())),
+    }
+    atomic_write_bytes(
+        run_dir / INPUTS_NAME,
+        (json.dumps(payload, indent=2, ensure_ascii=False) + "\n").encode("utf-8"),
+    )
+
+
+def record_outputs(
+    run_dir: Path,
+    spec: CharacterSpec,
+    version: str,
+    tracked: Mapping[str, TrackedOutput],
+    keys: list[str],
+) -> None:
+    """
+    Mark outputs as finished, so a later --incremental run can keep them.
+
+    Call this only AFTER the files are written: an output that failed
+    keeps no fingerprint and is regenerated next time.
+
+    Args:
+        run_dir: The run folder
+        spec: The spec the outputs were made from
+        version: Version string of the output filenames
+        tracked: track_outputs() for this spec
+        keys: The outputs that were just written (or kept)
+    """
+    with _inputs_lock:
+        inputs = load_run_inputs(run_dir) or RunInputs(spec=spec_to_dict(spec), version=version)
+        inputs.spec = spec_to_dict(spec)
+        inputs.version = version
+        for key in keys:
+            inputs.outputs[key] = tracked[key].fingerprint
+        _save_run_inputs(run_dir, inputs)
+
+
+def forget_outputs(run_dir: Path, keys: list[str]) -> None:
+    """
+    Drop fingerprints before their outputs are regenerated.
+
+    If the regeneration then fails halfway, the folder doesn't claim the
+    half-updated files match any spec.
+    """
+    with _inputs_lock:
+        inputs = load_run_inputs(run_dir)
+        if inputs is None or not any(key in inputs.outputs for key in keys):
+            return
+        for key in keys:
+            inputs.outputs.pop(key, None)
+        _save_run_inputs(run_dir, inputs)
+
+
+def find_previous_run(output_dir: Path, spec: CharacterSpec, version: str) -> Optional[Path]:
+    """
+    The latest run folder with outputs for this character and version.
+
+    Run folders are named by timestamp, so the last one in name order is
+    the latest.
+
+    Args:
+        output_dir: Base output directory (e.g., Path("output"))
+        spec: The character specification (matched by name)
+        version: Version string of the output filenames
+
+    Returns:
+        Path to the run folder, or None if there is none
+    """
+    if not output_dir.is_dir():
+        return None
+    for run_dir in sorted((p for p in output_dir.iterdir() if p.is_dir()), reverse=True):
+        inputs = load_run_inputs(run_dir)
+        if inputs is not None and inputs.version == version and inputs.spec.get("name") == spec.name:
+            return run_dir
+    return None
+
+
+# -----------------------------------------------------------------------------
+# PLANNING
+# -----------------------------------------------------------------------------
+
+def image_paths(run_dir: Path, spec: CharacterSpec, version: str) -> list[Path]:
+    """Stage 4 images of this character already in <run_dir>/images/."""
+    images_dir = run_dir / "images"
+    if not images_dir.is_dir():
+        return []
+    return sorted(images_dir.glob(f"{sanitize_filename(spec.name)}_tpose_*_{version}.*"))
+
+
+def _output_exists(run_dir: Path, spec: CharacterSpec, version: str, key: str) -> bool:
+    if key == IMAGES_KEY:
+        return bool(image_paths(run_dir, spec, version))
+    return resolve_output_path(run_dir, spec, version, key).exists()
+
+
+@dataclass
+class IncrementalPlan:
+    """
+    Which outputs of a run must be regenerated.
+
+    Attributes:
+        tracked: track_outputs() for the current spec and settings
+        changed: Keys to regenerate (new, changed, missing on disk)
+        unchanged: Keys whose output on disk is still current
+        changed_fields: Spec fields that differ from the previous run
+    """
+    tracked: dict[str, TrackedOutput]
+    changed: list[str] = field(default_factory=list)
+    unchanged: list[str] = field(default_factory=list)
+    changed_fields: list[str] = field(default_factory=list)
+
+    def stage_keys(self, stage: str, changed_only: bool = True) -> list[str]:
+        """Keys of one stage (only the ones to regenerate by default)."""
+        keys = self.changed if changed_only else list(self.tracked)
+        return [key for key in keys if self.tracked[key].stage == stage]
+
+    def stage_is_current(self, stage: str) -> bool:
+        """True if the stage has outputs and none of them need regenerating."""
+        return bool(self.stage_keys(stage, changed_only=False)) and not self.stage_keys(stage)
+
+
+def plan_incremental(
+    run_dir: Optional[Path],
+    spec: CharacterSpec,
+    version: str,
+    tracked: dict[str, TrackedOutput],
+) -> IncrementalPlan:
+    """
+    Compare the current fingerprints with those of a previous run.
+
+    Args:
+        run_dir: Previous run folder (None = everything is new)
+        spec: The character specification
+        version: Version string of the output filenames
+        tracked: track_outputs() for this spec and these settings
+
+    Returns:
+        IncrementalPlan listing what to regenerate and what to keep
+    """
+    plan = IncrementalPlan(tracked=tracked)
+    previous = load_run_inputs(run_dir) if run_dir is not None else None
+    if previous is None:
+        plan.changed = list(tracked)
+        return plan
+
+    current_spec = spec_to_dict(spec)
+    plan.changed_fields = [
+        name for name in current_spec if previous.spec.get(name) != current_spec[name]
+    ]
+    for key, output in tracked.items():
+        if (
+            previous.outputs.get(key) == output.fingerprint
+            and _output_exists(run_dir, spec, version, key)
+        ):
+            plan.unchanged.append(key)
+        else:
+            plan.changed.append(key)
+    return plan
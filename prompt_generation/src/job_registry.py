@@ -0,0 +1,291 @@
+# job_registry.py - Local Registry of Submitted Hunyuan 3D Jobs
+#
+# Pipeline Stage: 5 (Hunyuan 3D)
+#
+# A Hunyuan job runs (and is billed) on Tencent's side from the moment it
+# is submitted. If the CLI stops polling - TimeoutError, Ctrl-C, a crash -
+# the job used to be forgotten, and the only way to get a model was to
+# submit (and pay for) it again.
+#
+# generate_3d_model() now records every job right after submit, before
+# polling starts, in a small JSON file (default: output/hunyuan_jobs.json):
+#
+#   submitted    being polled by the process `pid` (if that process is
+#                gone, the job is an orphan)
+#   interrupted  polling stopped by Ctrl-C
+#   timed_out    polling gave up after --timeout
+#   errored      polling or the download failed on our side (network,
+#                disk, ...) - the result may still be there
+#   done         result downloaded to output_dir
+#   failed       Hunyuan reported FAIL
+#
+# The `jobs` command lists them and re-attaches to orphans (polls, then
+# downloads). Ctrl-C is routed through handle_interrupts(): polling loops
+# on any thread stop, record their job as interrupted, and the usual
+# KeyboardInterrupt follows.
+#
+# Usage:
+#   registry = JobRegistry(Path("output/hunyuan_jobs.json"))
+#   with handle_interrupts():
+#       generate_3d_model(image=front, output_dir=out, registry=registry)
+#   for entry in registry.orphans():
+#       print(entry.job_id, entry.status)
+
+import json
+import os
+import signal
+import threading
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, fields
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, Optional
+
+from .file_utils import atomic_write_bytes
+
+
+# -----------------------------------------------------------------------------
+# CONFIGURATION
+# -----------------------------------------------------------------------------
+
+# Registry file name (next to the timestamped run folders by default)
+DEFAULT_JOB_REGISTRY_NAME = "hunyuan_jobs.json"
+
+# Bump when the file layout changes
+REGISTRY_VERSION = 1
+
+# Job statuses
+SUBMITTED = "submitted"
+INTERRUPTED = "interrupted"
+TIMED_OUT = "timed_out"
+ERRORED = "errored"
+DONE = "done"
+FAILED = "failed"
+
+# Statuses whose result hasn't been downloaded (and still can be)
+OPEN_STATUSES = (SUBMITTED, INTERRUPTED, TIMED_OUT, ERRORED)
+
+# Set by Ctrl-C (see handle_interrupts); polling loops wait on it
+stop_polling = threading.Event()
+
+
+# -----------------------------------------------------------------------------
+# DATA CLASSES
+# -----------------------------------------------------------------------------
+
+@dataclass
+class JobEntry:
+    """
+    One submitted Hunyuan 3D job.
+
+    Attributes:
+        job_id: Hunyuan job ID
+        provider: Provider that submitted it ("sdk" or "http")
+        status: SUBMITTED, INTERRUPTED, TIMED_OUT, ERRORED, DONE, or FAILED
+        submitted_at: ISO timestamp of the submit
+        updated_at: ISO timestamp of the last status change
+        input_type: "prompt", "image", or "image_url"
+        input_value: The prompt, local image path, or URL
+        image_url: Uploaded front image URL (None for prompt jobs)
+        output_dir: Where the result goes (None = decided on re-attach)
+        pid: Process that polls (polled) the job
+        error: Why polling stopped or the job failed
+    """
+    job_id: str
+    provider: str
+    status: str
+    submitted_at: str
+    updated_at: str
+    input_type: str = ""
+    input_value: str = ""
+    image_url: Optional[str] = None
+    output_dir: Optional[str] = None
+    pid: Optional[int] = None
+    error: Optional[str] = None
+
+    @property
+    def is_orphan(self) -> bool:
+        """Not downloaded, and nothing is polling it anymore."""
+        if self.status in (INTERRUPTED, TIMED_OUT, ERRORED):
+            return True
+        return self.status == SUBMITTED and not _process_alive(self.pid)
+
+
+def _process_alive(pid: Optional[int]) -> bool:
+    """True if a process with this ID is running (ours always is)."""
+    if pid is None:
+        return False
+    if pid == os.getpid():
+        return True
+    if os.name == "nt":
+        return True  # os.kill(pid, 0) would terminate it on Windows
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True  # Exists, but belongs to someone else
+    return True
+
+
+# -----------------------------------------------------------------------------
+# REGISTRY
+# -----------------------------------------------------------------------------
+
+class JobRegistry:
+    """
+    Submitted jobs, kept in a JSON file.
+
+    Every change re-reads the file and rewrites it atomically, so several
+    threads (and, outside of exact races, processes) can share it.
+
+    Args:
+        path: Registry file (created on the first record)
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict[str, JobEntry]:
+        try:
+            payload = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {}
+        except (OSError, json.JSONDecodeError) as e:
+            raise RuntimeError(f"Could not read job registry {self.path}: {e}") from e
+        known = {f.name for f in fields(JobEntry)}
+        return {
+            job_id: JobEntry(**{k: v for k, v in data.items() if k in known})
+            for job_id, data in payload.get("jobs", {}).items()
+        }
+
+    def _save(self, entries: dict[str, JobEntry]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {"version": REGISTRY_VERSION, "jobs": {job_id: asdict(e) for job_id, e in entries.items()}}
+        atomic_write_bytes(self.path, (json.dumps(payload, indent=2) + "\n").encode("utf-8"))
+
+    # -------------------------------------------------------------------------
+    # Writing
+    # -------------------------------------------------------------------------
+
+    def record_submit(
+        self,
+        job_id: str,
+        provider: str,
+        input_type: str = "",
+        input_value: str = "",
+        image_url: Optional[str] = None,
+        output_dir: Optional[Path] = None,
+    ) -> JobEntry:
+        """
+        Record a job right after submit (before polling starts).
+
+        Returns:
+            The new entry (status SUBMITTED, owned by this process)
+        """
+        now = datetime.now().isoformat()
+        entry = JobEntry(
+            job_id=job_id,
+            provider=provider,
+            status=SUBMITTED,
+            submitted_at=now,
+            updated_at=now,
+            input_type=input_type,
+            input_value=input_value,
+            image_url=image_url,
+            output_dir=str(output_dir) if output_dir is not None else None,
+            pid=os.getpid(),
+        )
+        with self._lock:
+            entries = self._load()
+            entries[job_id] = entry
+            self._save(entries)
+        return entry
+
+    def update(
+        self,
+        job_id: str,
+        status: str,
+        error: Optional[str] = None,
+        output_dir: Optional[Path] = None,
+    ) -> Optional[JobEntry]:
+        """
+        Change a job's status (SUBMITTED again means this process polls it now).
+
+        Returns:
+            The updated entry, or None if the job isn't in the registry
+        """
+        with self._lock:
+            entries = self._load()
+            entry = entries.get(job_id)
+            if entry is None:
+                return None
+            entry.status = status
+            entry.error = error
+            entry.updated_at = datetime.now().isoformat()
+            if status == SUBMITTED:
+                entry.pid = os.getpid()
+            if output_dir is not None:
+                entry.output_dir = str(output_dir)
+            self._save(entries)
+        return entry
+
+    def forget(self, job_id: str) -> bool:
+        """Remove a job from the registry (True if it was there)."""
+        with self._lock:
+            entries = self._load()
+            if entries.pop(job_id, None) is None:
+                return False
+            self._save(entries)
+        return True
+
+    # -------------------------------------------------------------------------
+    # Reading
+    # -------------------------------------------------------------------------
+
+    def get(self, job_id: str) -> Optional[JobEntry]:
+        """The entry for a job, or None."""
+        with self._lock:
+            return self._load().get(job_id)
+
+    def entries(self) -> list[JobEntry]:
+        """All jobs, oldest first."""
+        with self._lock:
+            return sorted(self._load().values(), key=lambda e: e.submitted_at)
+
+    def orphans(self) -> list[JobEntry]:
+        """Jobs that may still have a result to download, with nobody polling them."""
+        return [entry for entry in self.entries() if entry.is_orphan]
+
+
+# -----------------------------------------------------------------------------
+# CTRL-C
+# -----------------------------------------------------------------------------
+
+@contextmanager
+def handle_interrupts() -> Iterator[None]:
+    """
+    Make Ctrl-C stop every polling loop, not just the main thread.
+
+    Polling threads (e.g. Stage 5 in the `all` graph) wait on
+    stop_polling; on Ctrl-C they record their job as interrupted and
+    stop, and the main thread gets the usual KeyboardInterrupt.
+
+    Signal handlers can only be installed on the main thread; entered
+    on any other thread (e.g. a benchmark worker), this does nothing.
+    """
+    def on_sigint(signum, frame):
+        stop_polling.set()
+        signal.default_int_handler(signum, frame)
+
+    if threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    previous = signal.signal(signal.SIGINT, on_sigint)
+    try:
+        yield
+    finally:
+        signal.signal(signal.SIGINT, previous)
+        stop_polling.clear()
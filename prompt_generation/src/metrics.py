@@ -0,0 +1,451 @@
+# metrics.py - Prometheus/OpenMetrics Exporter for Pipeline Workers
+#
+# trace.json (tracing.py) answers "where did THIS run spend its time?".
+# When the pipeline runs as a long-lived service we also need aggregate
+# numbers a monitoring system can scrape:
+#
+#   pipeline_api_calls_total{provider,call,outcome}     API calls per provider
+#   pipeline_api_call_duration_seconds{provider,call}   API latency histogram
+#   pipeline_api_retries_total{provider}                Retries / API fallbacks
+#   pipeline_bytes_uploaded_total{provider}             Request bytes sent
+#   pipeline_bytes_downloaded_total{provider}           Response bytes received
+#   pipeline_stage_duration_seconds{stage}              Stage duration histogram
+#   pipeline_hunyuan3d_job_phase_seconds{phase}         Hunyuan WAIT (queue) vs RUN time
+#   pipeline_cache_lookups_total{cache,result}          Cache hits / misses
+#   pipeline_llm_tokens_total{provider,model,kind}      input/cached/output/reasoning tokens
+#   pipeline_http_connections_total{provider,connection} Requests on new vs pooled connections
+#
+# Nothing here talks to the pipeline directly: metrics are derived from the
+# spans tracing.py already records (via add_span_listener), so every
+# @traced function and span() block is counted automatically.
+#
+# Two ways to expose them:
+#   1. HTTP endpoint:  start_metrics_server(9464) → GET /metrics
+#   2. Textfile:       write_textfile(path) for node_exporter's textfile
+#                      collector (written atomically, Prometheus format)
+#
+# No prometheus_client dependency - the text format is simple enough to
+# write directly, and the module stays importable everywhere.
+#
+# Usage (worker process):
+#   from src.metrics import enable_metrics, start_metrics_server
+#   enable_metrics()
+#   start_metrics_server(9464)
+#   ...run pipeline functions...
+
+import math
+import threading
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+
+from .file_utils import atomic_write_bytes
+from .tracing import Span, add_span_listener, remove_span_listener
+
+
+# -----------------------------------------------------------------------------
+# CONFIGURATION
+# -----------------------------------------------------------------------------
+
+# Latency buckets (seconds): sub-second API calls up to 10-minute 3D jobs
+DEFAULT_BUCKETS = (
+    0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+    30.0, 60.0, 120.0, 300.0, 600.0, 1200.0,
+)
+
+# Default port for the /metrics endpoint (the usual "custom exporter" range)
+DEFAULT_METRICS_PORT = 9464
+
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# -----------------------------------------------------------------------------
+# METRIC TYPES
+# -----------------------------------------------------------------------------
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+@dataclass
+class Counter:
+    """
+    A monotonically increasing count, one series per label combination.
+
+    Attributes:
+        name: Metric name WITHOUT the _total suffix
+        help: One-line description
+        labelnames: Label names, in order
+    """
+    name: str
+    help: str
+    labelnames: tuple[str, ...] = ()
+    _values: dict[tuple[str, ...], float] = field(default_factory=dict, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """Add amount (must be >= 0) to the series for these labels."""
+        if amount < 0:
+            raise ValueError(f"Counter {self.name} can only increase, got {amount}")
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, **labels: str) -> float:
+        """Current value for these labels (0 if never incremented)."""
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0.0)
+
+    def render(self, openmetrics: bool) -> list[str]:
+        # OpenMetrics names the family without _total; Prometheus 0.0.4 with it
+        family = self.name if openmetrics else f"{self.name}_total"
+        lines = [f"# HELP {family} {self.help}", f"# TYPE {family} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(
+                f"{self.name}_total{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            )
+        return lines
+
+
+@dataclass
+class Histogram:
+    """
+    Observations bucketed by upper bound, one series per label combination.
+
+    Attributes:
+        name: Metric name
+        help: One-line description
+        labelnames: Label names, in order
+        buckets: Upper bounds in ascending order (+Inf is added automatically)
+    """
+    name: str
+    help: str
+    labelnames: tuple[str, ...] = ()
+    buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    # key → [bucket counts..., sum, count]
+    _values: dict[tuple[str, ...], list[float]] = field(default_factory=dict, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Record one observation for these labels."""
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, **labels: str) -> int:
+        """Number of observations for these labels."""
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        with self._lock:
+            series = self._values.get(key)
+            return int(series[-1]) if series else 0
+
+    def render(self, openmetrics: bool) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._values.items())
+        for key, series in items:
+            for bound, cumulative in zip(self.buckets, series):
+                le = f'le="{float(bound)!r}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} "
+                    f"{_format_value(cumulative)}"
+                )
+            inf_labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{inf_labels} {_format_value(series[-1])}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(series[-1])}")
+        return lines
+
+
+# -----------------------------------------------------------------------------
+# PIPELINE METRICS
+# -----------------------------------------------------------------------------
+
+class PipelineMetrics:
+    """
+    All pipeline metrics, fed from finished spans.
+
+    Span → metric mapping:
+        category "api"   → calls, latency, retries, bytes, connections (provider = name prefix,
+                           e.g. "hunyuan3d.poll" → provider "hunyuan3d", call "poll")
+        category "stage"/"io" → stage duration
+        args queue_seconds/run_seconds → Hunyuan job phase histogram
+        args cache + cache_hit → cache lookups
+    """
+
+    def __init__(self):
+        self.api_calls = Counter(
+            "pipeline_api_calls", "Outbound API calls", ("provider", "call", "outcome"),
+        )
+        self.api_duration = Histogram(
+            "pipeline_api_call_duration_seconds", "Outbound API call latency", ("provider", "call"),
+        )
+        self.api_retries = Counter(
+            "pipeline_api_retries", "API retries and fallbacks", ("provider",),
+        )
+        self.bytes_uploaded = Counter(
+            "pipeline_bytes_uploaded", "Request bytes sent to APIs", ("provider",),
+        )
+        self.bytes_downloaded = Counter(
+            "pipeline_bytes_downloaded", "Response bytes received from APIs", ("provider",),
+        )
+        self.stage_duration = Histogram(
+            "pipeline_stage_duration_seconds", "Stage and local I/O duration", ("stage",),
+        )
+        self.job_phase = Histogram(
+            "pipeline_hunyuan3d_job_phase_seconds",
+            "Hunyuan 3D job time queued (WAIT) vs running (RUN)",
+            ("phase",),
+        )
+        self.cache_lookups = Counter(
+            "pipeline_cache_lookups", "Cache lookups by result", ("cache", "result"),
+        )
+        self.llm_tokens = Counter(
+            "pipeline_llm_tokens", "LLM tokens by kind (cached/reasoning are subsets of input/output)",
+            ("provider", "model", "kind"),
+        )
+        self.http_connections = Counter(
+            "pipeline_http_connections", "HTTP requests by connection (new or reused from the pool)",
+            ("provider", "connection"),
+        )
+
+        # Rewritten after every stage span when set (see enable_metrics)
+        self.textfile: Optional[Path] = None
+
+    @property
+    def all_metrics(self) -> list:
+        return [
+            self.api_calls,
+            self.api_duration,
+            self.api_retries,
+            self.bytes_uploaded,
+            self.bytes_downloaded,
+            self.stage_duration,
+            self.job_phase,
+            self.cache_lookups,
+            self.llm_tokens,
+            self.http_connections,
+        ]
+
+    def observe_span(self, s: Span) -> None:
+        """Update metrics from one finished span (a tracing listener)."""
+        args = s.args
+
+        if s.category == "api":
+            provider, _, call = s.name.partition(".")
+            call = call or provider
+            outcome = "error" if "error" in args else "ok"
+            self.api_calls.inc(provider=provider, call=call, outcome=outcome)
+            self.api_duration.observe(s.duration, provider=provider, call=call)
+            if args.get("retries"):
+                self.api_retries.inc(args["retries"], provider=provider)
+            if args.get("bytes_out"):
+                self.bytes_uploaded.inc(args["bytes_out"], provider=provider)
+            if args.get("bytes_in"):
+                self.bytes_downloaded.inc(args["bytes_in"], provider=provider)
+            for connection in ("new", "reused"):
+                if args.get(f"connections_{connection}"):
+                    self.http_connections.inc(
+                        args[f"connections_{connection}"], provider=provider, connection=connection,
+                    )
+            for kind in ("input", "cached", "output", "reasoning"):
+                if args.get(f"{kind}_tokens"):
+                    self.llm_tokens.inc(
+                        args[f"{kind}_tokens"],
+                        provider=provider, model=args.get("model", ""), kind=kind,
+                    )
+        elif s.category in ("stage", "io"):
+            self.stage_duration.observe(s.duration, stage=s.name)
+
+        if args.get("queue_seconds") is not None:
+            self.job_phase.observe(args["queue_seconds"], phase="queue")
+        if args.get("run_seconds") is not None:
+            self.job_phase.observe(args["run_seconds"], phase="run")
+
+        if "cache" in args and "cache_hit" in args:
+            self.record_cache_lookup(args["cache"], bool(args["cache_hit"]))
+
+        # Keep the node_exporter file fresh during long runs
+        if self.textfile is not None and s.category == "stage":
+            self.write_textfile(self.textfile)
+
+    def record_cache_lookup(self, cache: str, hit: bool) -> None:
+        """Count one cache lookup (hit rate = hit / (hit + miss))."""
+        self.cache_lookups.inc(cache=cache, result="hit" if hit else "miss")
+
+    def render(self, openmetrics: bool = True) -> str:
+        """
+        Render every metric in text exposition format.
+
+        Args:
+            openmetrics: OpenMetrics 1.0 (True) or Prometheus 0.0.4 (False,
+                         what node_exporter's textfile collector expects)
+        """
+        lines: list[str] = []
+        for metric in self.all_metrics:
+            lines.extend(metric.render(openmetrics))
+        if openmetrics:
+            lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: Path) -> Path:
+        """
+        Write metrics for node_exporter's textfile collector.
+
+        The file is written to a temp file in the same directory and then
+        renamed, so node_exporter never reads a half-written file. It gets
+        the usual (umask) permissions, not mkstemp's 0600 - the collector
+        usually runs as another user.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_bytes(path, self.render(openmetrics=False).encode("utf-8"))
+        return path
+
+
+# -----------------------------------------------------------------------------
+# PROCESS-WIDE METRICS
+# -----------------------------------------------------------------------------
+
+_metrics: Optional[PipelineMetrics] = None
+_metrics_lock = threading.Lock()
+
+
+def enable_metrics(textfile: Optional[Path] = None) -> PipelineMetrics:
+    """
+    Start collecting metrics for this process (idempotent).
+
+    Args:
+        textfile: Optional node_exporter textfile, rewritten after every stage
+
+    Returns:
+        The process-wide PipelineMetrics
+    """
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = PipelineMetrics()
+            add_span_listener(_metrics.observe_span)
+        if textfile is not None:
+            _metrics.textfile = Path(textfile)
+        return _metrics
+
+
+def disable_metrics() -> Optional[PipelineMetrics]:
+    """Stop collecting metrics and return the final values."""
+    global _metrics
+    with _metrics_lock:
+        metrics, _metrics = _metrics, None
+    if metrics is not None:
+        remove_span_listener(metrics.observe_span)
+    return metrics
+
+
+def get_metrics() -> Optional[PipelineMetrics]:
+    """The process-wide metrics, or None if metrics are off."""
+    return _metrics
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    """Count a cache hit/miss (no-op when metrics are off)."""
+    metrics = _metrics
+    if metrics is not None:
+        metrics.record_cache_lookup(cache, hit)
+
+
+# -----------------------------------------------------------------------------
+# HTTP ENDPOINT
+# -----------------------------------------------------------------------------
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """Serves GET /metrics in the format the scraper asks for."""
+
+    def log_message(self, format, *args):  # noqa: A002 - stdlib signature
+        pass  # Scrapes every 15s would flood the console
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+
+        metrics = _metrics or PipelineMetrics()
+        openmetrics = "application/openmetrics-text" in self.headers.get("Accept", "")
+        body = metrics.render(openmetrics=openmetrics).encode("utf-8")
+
+        self.send_response(200)
+        self.send_header(
+            "Content-Type",
+            OPENMETRICS_CONTENT_TYPE if openmetrics else PROMETHEUS_CONTENT_TYPE,
+        )
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MetricsServer:
+    """A /metrics endpoint running on a daemon thread."""
+
+    def __init__(self, port: int = DEFAULT_METRICS_PORT, host: str = "127.0.0.1"):
+        self._httpd = ThreadingHTTPServer((host, port), _MetricsHandler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name="metrics-server", daemon=True,
+        )
+        self._thread.start()
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def stop(self) -> None:
+        """Stop serving and release the port."""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self._thread.join(timeout=5)
+
+
+def start_metrics_server(port: int = DEFAULT_METRICS_PORT, host: str = "127.0.0.1") -> MetricsServer:
+    """
+    Enable metrics and serve them at http://host:port/metrics.
+
+    Binds to localhost by default; pass host="0.0.0.0" to let a remote
+    Prometheus scrape the worker.
+
+    Args:
+        port: TCP port (0 = any free port, see MetricsServer.url)
+        host: Interface to bind
+
+    Returns:
+        The running MetricsServer
+    """
+    enable_metrics()
+    return MetricsServer(port=port, host=host)
@@ -5,15 +5,26 @@
 #
 # Pipeline role: This is the INPUT stage - we load character specs from files.
 
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
 from pathlib import Path
-from typing import Optional
+from typing import Any, Optional, Union
+import hashlib
 import json
 import logging
+import sys
 
 # We use PyYAML to parse YAML files (human-friendly config format)
 import yaml
 
+# PyYAML's C loader (libyaml) is several times faster than the pure-Python
+# one and accepts the same documents. Wheels include it on most platforms;
+# fall back to the Python loader where it wasn't compiled in.
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# Spec file extensions (files starting with "_", like configs/_template.yaml,
+# are skipped when a whole folder is loaded)
+SPEC_FILE_EXTENSIONS = (".yaml", ".yml", ".json")
+
 # -----------------------------------------------------------------------------
 # LOGGING SETUP
 # -----------------------------------------------------------------------------
@@ -85,6 +96,101 @@ class CharacterSpec:
     extra_notes: Optional[str] = None
 
 
+# Field names, in declaration order (shared by both spec classes below)
+CHARACTER_SPEC_FIELDS = tuple(f.name for f in fields(CharacterSpec))
+
+
+# -----------------------------------------------------------------------------
+# FROZEN CHARACTER SPECIFICATION (for large spec sets)
+# -----------------------------------------------------------------------------
+# A CharacterSpec costs a __dict__ plus three lists per instance. That is
+# nothing for one character, but sweeps and spec libraries keep tens of
+# thousands of specs in memory, and most of that memory is overhead:
+#
+#   - slots=True       → no per-instance __dict__
+#   - tuples           → smaller than lists, and hashable
+#   - sys.intern()     → "stylized sci-fi" is stored ONCE, however many
+#                        variants share it
+#
+# frozen=True makes instances immutable and hashable, so a spec can be a
+# dict key or go into a set for de-duplication. Everything that reads a
+# spec (the stage generators, the LLM request builders, ...) only reads
+# attributes and iterates the list fields, so a FrozenCharacterSpec can be
+# passed wherever a CharacterSpec is expected.
+
+# Fields whose values repeat a lot across specs (names and notes don't)
+INTERNED_FIELDS = ("role", "game_style", "silhouette")
+
+# List fields (tuples in FrozenCharacterSpec); their items are interned too
+LIST_FIELDS = ("color_palette", "key_props", "animation_focus")
+
+
+@dataclass(frozen=True, slots=True)
+class FrozenCharacterSpec:
+    """
+    Immutable, memory-efficient CharacterSpec.
+    
+    Same fields as CharacterSpec, but the list fields are tuples. Lists
+    passed in are converted (and strings interned) by __post_init__, so
+    FrozenCharacterSpec(**fields) and dataclasses.replace(spec, key_props=[...])
+    both work.
+    
+    hash() is based on the content, so equal specs are interchangeable as
+    dict keys. Python randomizes string hashes per process, so use
+    content_hash (the same value as spec_hash()) for anything stored on
+    disk or sent to another process.
+    """
+    
+    name: str
+    role: str = ""
+    game_style: str = ""
+    silhouette: str = ""
+    color_palette: tuple[str, ...] = ()
+    key_props: tuple[str, ...] = ()
+    animation_focus: tuple[str, ...] = ()
+    extra_notes: Optional[str] = None
+    
+    def __post_init__(self):
+        # frozen=True blocks normal assignment, so go through object
+        for name in INTERNED_FIELDS:
+            value = getattr(self, name)
+            if type(value) is str:
+                object.__setattr__(self, name, sys.intern(value))
+        for name in LIST_FIELDS:
+            value = getattr(self, name) or ()  # None (an empty YAML key) → ()
+            object.__setattr__(
+                self, name,
+                tuple(sys.intern(item) if type(item) is str else item for item in value),
+            )
+    
+    @property
+    def content_hash(self) -> str:
+        """Stable content hash (same as spec_hash() of the mutable spec)."""
+        return spec_hash(self)
+    
+    def thaw(self) -> CharacterSpec:
+        """Mutable copy as a regular CharacterSpec."""
+        return CharacterSpec(**spec_to_dict(self))
+
+
+AnySpec = Union[CharacterSpec, FrozenCharacterSpec]
+
+
+def freeze_spec(spec: AnySpec) -> FrozenCharacterSpec:
+    """
+    Convert a spec to a FrozenCharacterSpec (frozen specs are returned as-is).
+    
+    Args:
+        spec: A CharacterSpec or FrozenCharacterSpec
+        
+    Returns:
+        FrozenCharacterSpec with the same content
+    """
+    if isinstance(spec, FrozenCharacterSpec):
+        return spec
+    return FrozenCharacterSpec(**{name: getattr(spec, name) for name in CHARACTER_SPEC_FIELDS})
+
+
 # -----------------------------------------------------------------------------
 # FILE LOADING FUNCTION
 # -----------------------------------------------------------------------------
@@ -125,19 +231,43 @@ def load_character_spec(path: Path) -> CharacterSpec:
     # encoding="utf-8" ensures we handle special characters correctly.
     content = path.read_text(encoding="utf-8")
     
+    # Steps 3-4: Parse the content based on the file extension
+    data = parse_spec_content(content, path.suffix)
+    
+    # Steps 5-7 are shared with other loaders (e.g., sweep files)
+    return spec_from_dict(data)
+
+
+def parse_spec_content(content: str, suffix: str) -> dict[str, Any]:
+    """
+    Parse the text of a spec file.
+    
+    Args:
+        content: File content
+        suffix: File extension, e.g. ".yaml" (case-insensitive)
+        
+    Returns:
+        Dictionary of spec fields (empty for an empty YAML file)
+        
+    Raises:
+        ValueError: If the format is unsupported or the file doesn't parse
+    """
     # Step 3: Determine file format by looking at the extension.
-    # .suffix returns ".yaml", ".json", etc.
     # .lower() makes it case-insensitive (handles .YAML, .Yaml, etc.)
-    suffix = path.suffix.lower()
+    suffix = suffix.lower()
     
     # Step 4: Parse the content based on file type.
     if suffix in (".yaml", ".yml"):
-        # yaml.safe_load() is safer than yaml.load() - it doesn't execute code.
+        # A safe loader doesn't execute code (unlike a plain yaml.load()).
         # The "or {}" handles the case where the file is empty (returns None).
-        data = yaml.safe_load(content) or {}
+        try:
+            data = yaml.load(content, Loader=YAML_LOADER) or {}
+        except yaml.YAMLError as e:
+            raise ValueError(f"Invalid YAML: {e}") from e
         
     elif suffix == ".json":
         # json.loads() parses a JSON string into a Python dictionary.
+        # (json.JSONDecodeError is a ValueError.)
         data = json.loads(content)
         
     else:
@@ -147,6 +277,26 @@ def load_character_spec(path: Path) -> CharacterSpec:
             "Use .yaml, .yml, or .json"
         )
     
+    if not isinstance(data, dict):
+        raise ValueError("Character spec must be a mapping of fields")
+    return data
+
+
+def spec_from_dict(data: dict[str, Any], missing: Optional[list[str]] = None) -> CharacterSpec:
+    """
+    Build a CharacterSpec from parsed YAML/JSON data.
+    
+    Args:
+        data: Dictionary of spec fields (as loaded from a spec file)
+        missing: If given, names of missing optional fields are appended
+                 here instead of being logged (bulk loaders summarize them)
+        
+    Returns:
+        A CharacterSpec instance
+        
+    Raises:
+        ValueError: If 'name' is missing or empty
+    """
     # Step 5: Validate the required 'name' field.
     # A character without a name is not useful - we need it for filenames.
     if "name" not in data or not data["name"]:
@@ -166,8 +316,11 @@ def load_character_spec(path: Path) -> CharacterSpec:
     
     for field_name in optional_fields:
         if field_name not in data:
-            # logger.warning() outputs to stderr with "WARNING:" prefix.
-            logger.warning(f"Missing field '{field_name}' - using default value")
+            if missing is not None:
+                missing.append(field_name)
+            else:
+                # logger.warning() outputs to stderr with "WARNING:" prefix.
+                logger.warning(f"Missing field '{field_name}' - using default value")
     
     # Step 7: Create and return the CharacterSpec instance.
     # .get(key, default) returns the value if key exists, otherwise default.
@@ -182,3 +335,37 @@ def load_character_spec(path: Path) -> CharacterSpec:
         extra_notes=data.get("extra_notes"),  # None if missing (no default needed)
     )
 
+
+# -----------------------------------------------------------------------------
+# CONTENT HASH
+# -----------------------------------------------------------------------------
+
+def spec_to_dict(spec: AnySpec) -> dict[str, Any]:
+    """
+    The spec's fields as a JSON-ready dictionary.
+    
+    List fields are always lists (also for a FrozenCharacterSpec), so the
+    result is the same for both spec classes. A None list (an empty
+    `key_props:` in YAML) becomes [], as it does in FrozenCharacterSpec.
+    """
+    data = {name: getattr(spec, name) for name in CHARACTER_SPEC_FIELDS}
+    for name in LIST_FIELDS:
+        data[name] = list(data[name] or ())
+    return data
+
+
+def spec_hash(spec: AnySpec) -> str:
+    """
+    Short content hash of a character spec.
+    
+    Hashes the parsed fields (not the file), so reformatting the YAML
+    or switching to JSON doesn't change it.
+    
+    Args:
+        spec: The character specification
+        
+    Returns:
+        16 hex characters (first 64 bits of a SHA-256)
+    """
+    payload = json.dumps(spec_to_dict(spec), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
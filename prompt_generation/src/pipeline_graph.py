@@ -0,0 +1,310 @@
+# pipeline_graph.py - Run Pipeline Stages as a Dependency Graph
+#
+# Pipeline Stage: ALL (decides which stage runs when)
+#
+# The `all` command used to run its stages one after another, although
+# most of them don't need each other:
+#
+#   static prompts ──────────────────────────────
+#   LLM refinement ──────────────────────────────      (OpenAI)
+#   T-pose images ─────→ review ─────→ 3D model        (Gemini → Hunyuan)
+#
+# Here each stage is a Node that names the nodes whose results it needs.
+# PipelineGraph.run() starts every node as soon as its inputs are done,
+# on a thread pool (the stages mostly wait on HTTP), so the run takes as
+# long as its longest chain - the critical path - instead of the sum of
+# all stages. With --auto-3d that is images → 3D; refinement runs next
+# to it.
+#
+# Per node:
+#   - cached()     returns the result of a previous run (or None); the
+#                  `all` command uses it with --incremental, which is also
+#                  how an interrupted run is resumed
+#   - NodeSkipped  raised by run() when the node can't run (missing API
+#                  key, user declined); nodes that need it are skipped too
+#   - exceptions   are reported as warnings and only stop the nodes that
+#                  need the failed one - the rest of the run continues
+#   - exclusive    nodes (interactive review) run on the main thread while
+#                  nothing else runs, so prompts aren't interleaved with
+#                  progress output
+#
+# Example:
+#   >>> graph = PipelineGraph([
+#   ...     Node("images", run=lambda inputs: make_images()),
+#   ...     Node("model_3d", run=lambda inputs: make_model(inputs["images"]), inputs=("images",)),
+#   ...     Node("refine", run=lambda inputs: refine()),
+#   ... ])
+#   >>> result = graph.run()
+#   >>> print(result.summary())
+
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, Optional
+
+from .tracing import span
+
+
+# -----------------------------------------------------------------------------
+# CONFIGURATION
+# -----------------------------------------------------------------------------
+
+# Node statuses
+DONE = "done"          # run() returned
+CACHED = "cached"      # cached() returned a result, run() was not called
+SKIPPED = "skipped"    # run() raised NodeSkipped, or an input has no result
+FAILED = "failed"      # run() raised an exception
+
+
+# -----------------------------------------------------------------------------
+# DATA CLASSES
+# -----------------------------------------------------------------------------
+
+class NodeSkipped(Exception):
+    """Raised by Node.run() when the node can't run; the message says why."""
+
+
+@dataclass
+class Node:
+    """
+    One stage of a pipeline graph.
+
+    Attributes:
+        name: Unique name, used in other nodes' inputs and in results
+        run: Called with {input name: result} for every input; its return
+             value is the node's result
+        inputs: Nodes whose results this one needs
+        title: Shown in progress and warning lines (default: name)
+        cached: Returns a previous run's result, or None to run the node
+        exclusive: Run on the calling thread with no other node running
+                   (for interactive prompts)
+    """
+    name: str
+    run: Callable[[dict[str, Any]], Any]
+    inputs: tuple[str, ...] = ()
+    title: str = ""
+    cached: Optional[Callable[[], Any]] = None
+    exclusive: bool = False
+
+    def __post_init__(self):
+        self.inputs = tuple(self.inputs)
+        self.title = self.title or self.name
+
+
+@dataclass
+class NodeResult:
+    """
+    What happened to one node.
+
+    Attributes:
+        name: Node name
+        status: DONE, CACHED, SKIPPED, or FAILED
+        value: run() (or cached()) result; None unless DONE or CACHED
+        reason: Why the node was skipped, or the error it failed with
+        start: Seconds after the graph started (0 if never started)
+        seconds: How long run() took (0 unless it ran)
+    """
+    name: str
+    status: str
+    value: Any = None
+    reason: str = ""
+    start: float = 0.0
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        """True if the node has a result."""
+        return self.status in (DONE, CACHED)
+
+
+@dataclass
+class GraphRun:
+    """
+    The results of PipelineGraph.run().
+
+    Attributes:
+        results: Node name → NodeResult, in the order nodes finished
+        seconds: Wall-clock time of the whole run
+        critical_path: The chain of dependent nodes that took longest
+    """
+    results: dict[str, NodeResult] = field(default_factory=dict)
+    seconds: float = 0.0
+    critical_path: list[str] = field(default_factory=list)
+
+    def value(self, name: str, default: Any = None) -> Any:
+        """The node's result, or default if it has none (or isn't in the graph)."""
+        result = self.results.get(name)
+        return result.value if result is not None and result.ok else default
+
+    @property
+    def work_seconds(self) -> float:
+        """Time the nodes spent running, added up (the serial run time)."""
+        return sum(result.seconds for result in self.results.values())
+
+    def summary(self) -> str:
+        """One line: total work, wall time, and the critical path."""
+        path_seconds = sum(self.results[name].seconds for name in self.critical_path)
+        return (
+            f"{len(self.results)} stages: {self.work_seconds:.1f}s of work in {self.seconds:.1f}s"
+            f" (critical path: {' → '.join(self.critical_path) or '-'}, {path_seconds:.1f}s)"
+        )
+
+
+# -----------------------------------------------------------------------------
+# GRAPH
+# -----------------------------------------------------------------------------
+
+class PipelineGraph:
+    """
+    A set of nodes, run concurrently in dependency order.
+
+    Args:
+        nodes: Initial nodes (more can be added with add())
+        max_workers: Threads for non-exclusive nodes (default: one per node)
+    """
+
+    def __init__(self, nodes: Iterable[Node] = (), max_workers: Optional[int] = None):
+        self.nodes: dict[str, Node] = {}
+        self.max_workers = max_workers
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node: Node) -> Node:
+        """
+        Add a node.
+
+        Raises:
+            ValueError: If a node with that name already exists
+        """
+        if node.name in self.nodes:
+            raise ValueError(f"Duplicate node: {node.name}")
+        self.nodes[node.name] = node
+        return node
+
+    def order(self) -> list[str]:
+        """
+        Node names in dependency order (inputs first, otherwise as added).
+
+        Raises:
+            ValueError: If an input isn't a node, or nodes depend on each
+                        other in a cycle
+        """
+        for node in self.nodes.values():
+            unknown = [name for name in node.inputs if name not in self.nodes]
+            if unknown:
+                raise ValueError(f"Node '{node.name}' needs unknown node(s): {', '.join(unknown)}")
+
+        ordered: list[str] = []
+        remaining = list(self.nodes)
+        while remaining:
+            ready = [name for name in remaining if all(i in ordered for i in self.nodes[name].inputs)]
+            if not ready:
+                raise ValueError(f"Dependency cycle between: {', '.join(remaining)}")
+            ordered.extend(ready)
+            remaining = [name for name in remaining if name not in ready]
+        return ordered
+
+    # -------------------------------------------------------------------------
+    # Running
+    # -------------------------------------------------------------------------
+
+    def run(self) -> GraphRun:
+        """
+        Run every node once its inputs have results.
+
+        Failures and skips are printed and recorded, never raised; only
+        BaseExceptions (Ctrl-C, typer.Exit from an exclusive node) stop
+        the run.
+
+        Returns:
+            GraphRun with a NodeResult for every node
+
+        Raises:
+            ValueError: If the graph is invalid (see order())
+        """
+        order = self.order()
+        started = time.perf_counter()
+        graph_run = GraphRun()
+        results = graph_run.results
+        running: dict[Future, str] = {}
+
+        pool = ThreadPoolExecutor(
+            max_workers=self.max_workers or max(len(self.nodes), 1),
+            thread_name_prefix="pipeline",
+        )
+        try:
+            while len(results) < len(order):
+                for name in order:
+                    if name in results or name in running.values():
+                        continue
+                    node = self.nodes[name]
+                    if not all(i in results for i in node.inputs):
+                        continue
+
+                    # An input without a result: nothing to run on
+                    blocked = [i for i in node.inputs if not results[i].ok]
+                    if blocked:
+                        reason = f"no result from {self.nodes[blocked[0]].title}"
+                        results[name] = NodeResult(name, SKIPPED, reason=reason)
+                        print(f"\n({_capitalize(node.title)} skipped - {reason})")
+                        continue
+
+                    previous = node.cached() if node.cached is not None else None
+                    if previous is not None:
+                        results[name] = NodeResult(name, CACHED, value=previous)
+                        print(f"\n({_capitalize(node.title)} skipped - up to date)")
+                        continue
+
+                    inputs = {i: results[i].value for i in node.inputs}
+                    if node.exclusive:
+                        if running:
+                            break  # Wait for the others; don't start anything new meanwhile
+                        results[name] = self._run_node(node, inputs, started)
+                        continue
+                    running[pool.submit(self._run_node, node, inputs, started)] = name
+
+                if not running:
+                    continue  # Exclusive node (or skips) made progress inline
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results[running.pop(future)] = future.result()
+        finally:
+            # Ctrl-C: don't start queued nodes; running ones finish on their own
+            pool.shutdown(wait=not running, cancel_futures=True)
+
+        graph_run.seconds = time.perf_counter() - started
+        graph_run.critical_path = self._critical_path(results)
+        return graph_run
+
+    def _run_node(self, node: Node, inputs: dict[str, Any], graph_start: float) -> NodeResult:
+        """Run one node, turning NodeSkipped and exceptions into a result."""
+        start = time.perf_counter()
+        result = NodeResult(node.name, DONE, start=start - graph_start)
+        with span(f"pipeline.{node.name}") as s:
+            try:
+                result.value = node.run(inputs)
+            except NodeSkipped as e:
+                result.status, result.reason = SKIPPED, str(e)
+                print(f"\n({_capitalize(node.title)} skipped - {e})")
+            except Exception as e:
+                result.status, result.reason = FAILED, str(e)
+                print(f"Warning: {_capitalize(node.title)} failed: {e}")
+            s.set(status=result.status)
+        result.seconds = time.perf_counter() - start
+        return result
+
+    def _critical_path(self, results: dict[str, NodeResult]) -> list[str]:
+        """The chain of dependent nodes with the largest total run time."""
+        longest: dict[str, tuple[float, list[str]]] = {}
+        for name in self.order():
+            seconds = results[name].seconds if name in results else 0.0
+            best = max((longest[i] for i in self.nodes[name].inputs), default=(0.0, []), key=lambda item: item[0])
+            longest[name] = (best[0] + seconds, best[1] + [name])
+        if not longest:
+            return []
+        return max(longest.values(), key=lambda item: item[0])[1]
+
+
+def _capitalize(text: str) -> str:
+    """First letter upper case, the rest untouched ("LLM refinement" stays)."""
+    return text[:1].upper() + text[1:]
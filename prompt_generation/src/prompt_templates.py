@@ -0,0 +1,316 @@
+# prompt_templates.py - Compiled Templates for the Static Prompts
+#
+# Pipeline Stage: Stages 1, 2a, and 3 (everything that needs no API call)
+#
+# The static prompts are plain text with the spec's fields filled in.
+# Instead of each generator formatting the spec again with its own
+# f-string, this module provides:
+#
+#   1. compile_template()  - parse a template ONCE (at import time) and
+#                            check that every {placeholder} is a known,
+#                            plain field - a typo fails at import, not
+#                            halfway through a bulk run
+#   2. spec_fields()       - format a spec's fields ONCE ("a sword and a
+#                            shield", "teal, black", ...) into a read-only
+#                            mapping that every template can share
+#
+# So generating all six static prompts formats the spec one time, and
+# rendering a template is a single str.format_map() over the shared
+# fields. This matters for bulk runs - thousands of spec variants for A/B
+# prompt studies - where the old per-generator formatting added up.
+#
+# The output is the same as the old f-strings
+# (tests/data/static_prompts_golden.json pins it).
+#
+# Example:
+#   >>> template = compile_template("greeting", "{name} the {role}")
+#   >>> template.render(spec_fields(spec))
+#   'Aethel the Android archaeologist'
+
+from dataclasses import dataclass
+from string import Formatter
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+from .metrics import record_cache_lookup
+from .models import CharacterSpec
+
+
+# -----------------------------------------------------------------------------
+# HELPER FUNCTIONS: Format CharacterSpec fields for use in prompts
+# -----------------------------------------------------------------------------
+# These functions convert raw data into natural-sounding prompt phrases.
+# Keeping them separate makes the code easier to test and modify.
+# (stage1_base_prompts re-exports them, so older imports keep working.)
+
+def format_color_palette(colors: list[str]) -> str:
+    """
+    Format a list of colors into a comma-separated string.
+
+    Args:
+        colors: List of color strings, e.g., ["teal", "black", "orange accents"]
+
+    Returns:
+        A formatted string like "teal, black, orange accents"
+        Returns "unspecified" if the list is empty.
+
+    Example:
+        >>> format_color_palette(["red", "blue"])
+        "red, blue"
+        >>> format_color_palette([])
+        "unspecified"
+    """
+    # Handle empty list case - return a placeholder
+    if not colors:
+        return "unspecified"
+
+    # Join list items with ", " separator
+    # ["a", "b", "c"] -> "a, b, c"
+    return ", ".join(colors)
+
+
+def format_key_props(props: list[str]) -> str:
+    """
+    Format a list of props into a natural English phrase.
+
+    We want prompts to read naturally, so we add "a/an" and "and".
+
+    Args:
+        props: List of prop strings, e.g., ["data tablet", "scanner"]
+
+    Returns:
+        A natural phrase like "a data tablet and a scanner"
+        Returns empty string if no props.
+
+    Examples:
+        >>> format_key_props([])
+        ""
+        >>> format_key_props(["sword"])
+        "a sword"
+        >>> format_key_props(["sword", "shield"])
+        "a sword and a shield"
+        >>> format_key_props(["sword", "shield", "helmet"])
+        "a sword, a shield, and a helmet"
+    """
+    # Case 1: Empty list - return empty string to allow conditional checks
+    if not props:
+        return ""
+
+    # Case 2: Single item - just add "a"
+    if len(props) == 1:
+        return f"a {props[0]}"
+
+    # Case 3: Two items - use "and" between them
+    if len(props) == 2:
+        return f"a {props[0]} and a {props[1]}"
+
+    # Case 4: Three or more items - use Oxford comma style
+    # ["X", "Y", "Z"] -> "a X, a Y, and a Z"
+
+    # Add "a " to each item except the last
+    items_with_article = [f"a {prop}" for prop in props[:-1]]
+
+    # Join them with commas, then add ", and a <last item>"
+    return ", ".join(items_with_article) + f", and a {props[-1]}"
+
+
+def format_animation_focus(anims: list[str]) -> str:
+    """
+    Format animation types into a comma-separated string.
+
+    Args:
+        anims: List of animation types, e.g., ["walk", "idle", "attack"]
+
+    Returns:
+        A formatted string like "walk, idle, attack"
+        Returns "standard animations" if the list is empty.
+    """
+    if not anims:
+        return "standard animations"
+
+    return ", ".join(anims)
+
+
+def format_extra_notes(notes: Optional[str]) -> str:
+    """
+    Format extra notes, handling None values.
+
+    Args:
+        notes: Optional string with extra notes
+
+    Returns:
+        The notes string, or empty string if notes is None/empty
+    """
+    # In Python, empty strings and None are both "falsy"
+    # So "if notes" handles both cases
+    # Return empty string to allow conditional checks in calling code
+    return notes if notes else ""
+
+
+# -----------------------------------------------------------------------------
+# SPEC FIELDS (formatted once per spec)
+# -----------------------------------------------------------------------------
+
+# Every placeholder a template may use
+SPEC_FIELD_NAMES = (
+    "name",           # spec.name as-is
+    "role",           # spec.role as-is
+    "game_style",     # spec.game_style as-is
+    "silhouette",     # spec.silhouette as-is
+    "colors",         # format_color_palette()
+    "props",          # format_key_props()
+    "props_clause",   # "holding <props>, " - or "" when there are no props
+    "animations",     # format_animation_focus()
+    "notes",          # format_extra_notes()
+)
+
+# Bulk runs often render the same spec many times (once per stage, or
+# per A/B template variant), so formatted fields are kept for recent specs.
+# When the cache is full it is simply emptied - cheap, and safe without a
+# lock because single dict operations are atomic in CPython.
+SPEC_FIELDS_CACHE_SIZE = 1024
+
+_fields_cache: dict[tuple, Mapping[str, str]] = {}
+
+
+def _spec_key(spec: CharacterSpec) -> tuple:
+    """
+    Hashable snapshot of a spec (lists → tuples), used as the cache key.
+
+    A list field can be None (an empty `key_props:` in YAML); the format_*
+    helpers treat that like an empty list, so the key does too.
+    """
+    return (
+        spec.name,
+        spec.role,
+        spec.game_style,
+        spec.silhouette,
+        tuple(spec.color_palette or ()),
+        tuple(spec.key_props or ()),
+        tuple(spec.animation_focus or ()),
+        spec.extra_notes,
+    )
+
+
+def _format_fields(spec: CharacterSpec) -> Mapping[str, str]:
+    """Run every format_* helper once for this spec."""
+    props = format_key_props(spec.key_props)
+    return MappingProxyType({
+        "name": spec.name,
+        "role": spec.role,
+        "game_style": spec.game_style,
+        "silhouette": spec.silhouette,
+        "colors": format_color_palette(spec.color_palette),
+        "props": props,
+        "props_clause": f"holding {props}, " if props else "",
+        "animations": format_animation_focus(spec.animation_focus),
+        "notes": format_extra_notes(spec.extra_notes),
+    })
+
+
+def spec_fields(spec: CharacterSpec) -> Mapping[str, str]:
+    """
+    Formatted prompt fields for a spec (see SPEC_FIELD_NAMES).
+
+    The result is read-only, so it can be shared by every template.
+    Results are cached by the spec's CONTENT (not identity), so editing a
+    spec and calling again gives fresh fields.
+
+    Args:
+        spec: The character specification
+
+    Returns:
+        Read-only mapping of field name → formatted text
+    """
+    key = _spec_key(spec)
+    fields = _fields_cache.get(key)
+    record_cache_lookup("spec_fields", hit=fields is not None)
+    if fields is not None:
+        return fields
+
+    fields = _format_fields(spec)
+    if len(_fields_cache) >= SPEC_FIELDS_CACHE_SIZE:
+        _fields_cache.clear()
+    _fields_cache[key] = fields
+    return fields
+
+
+def clear_spec_fields_cache() -> None:
+    """Forget all cached spec fields (mainly for tests and benchmarks)."""
+    _fields_cache.clear()
+
+
+# -----------------------------------------------------------------------------
+# COMPILED TEMPLATES
+# -----------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """
+    A template that has been parsed and checked once.
+
+    Attributes:
+        name: Prompt key this template produces, e.g. "base_2d_sheet"
+        text: Template text with {field} placeholders
+        fields: Placeholders used, in order of first appearance
+    """
+    name: str
+    text: str
+    fields: tuple[str, ...]
+
+    def render(self, fields: Mapping[str, str]) -> str:
+        """
+        Fill in the template.
+
+        Args:
+            fields: Formatted spec fields, from spec_fields()
+
+        Returns:
+            The finished prompt text
+        """
+        return self.text.format_map(fields)
+
+
+def compile_template(name: str, text: str) -> PromptTemplate:
+    """
+    Parse a template and check its placeholders.
+
+    Only plain {field} placeholders are allowed (no {field!r} or
+    {field:>10}), so rendering is a straight substitution - the field
+    values themselves are never parsed, even if they contain braces.
+    Use {{ and }} for literal braces.
+
+    Args:
+        name: Prompt key this template produces
+        text: Template text
+
+    Returns:
+        PromptTemplate ready to render
+
+    Raises:
+        ValueError: If a placeholder is unknown, positional, or formatted
+    """
+    used: list[str] = []
+    try:
+        parsed = list(Formatter().parse(text))
+    except ValueError as e:
+        raise ValueError(f"Template {name!r}: {e}") from e
+
+    for _literal, field_name, format_spec, conversion in parsed:
+        if field_name is None:
+            continue
+        if field_name not in SPEC_FIELD_NAMES:
+            raise ValueError(
+                f"Template {name!r} uses unknown field {{{field_name}}}. "
+                f"Valid fields: {', '.join(SPEC_FIELD_NAMES)}"
+            )
+        if format_spec or conversion:
+            raise ValueError(f"Template {name!r}: {{{field_name}}} must not use !conversion or :format")
+        if field_name not in used:
+            used.append(field_name)
+
+    return PromptTemplate(
+        name=name,
+        text=text,
+        fields=tuple(used),
+    )
@@ -4,6 +4,8 @@
 # The provider abstraction allows for different implementations:
 #   - sdk: Uses official Tencent Cloud SDK (default, recommended)
 #   - http: Direct HTTP calls with Tencent Cloud signing (fallback)
+#
+# The httpx-based clients share one connection pool (http_pool.py).
 
 from .hunyuan3d_provider import (
     Hunyuan3DProvider,
@@ -26,6 +28,7 @@ from .raw_http_hunyuan3d import (
     HUNYUAN3D_POLYGON_TYPE_ENV,
     VALID_GENERATE_TYPES,
     VALID_POLYGON_TYPES,
+    HUNYUAN3D_API_ENDPOINT_ENV,
 )
 
 from .tencent_cos import (
@@ -34,6 +37,7 @@ from .tencent_cos import (
     get_cos_uploader,
     TENCENT_COS_BUCKET_ENV,
     TENCENT_COS_REGION_ENV,
+    TENCENT_COS_ENDPOINT_ENV,
     COSUploadError,
 )
 
@@ -43,6 +47,13 @@ from .sdk_hunyuan3d import (
     get_sdk_install_instructions,
 )
 
+from .http_pool import (
+    HttpPool,
+    get_http_pool,
+    close_http_pool,
+    is_http2_available,
+)
+
 __all__ = [
     # Provider abstraction
     "Hunyuan3DProvider",
@@ -67,13 +78,20 @@ __all__ = [
     "HUNYUAN3D_POLYGON_TYPE_ENV",
     "VALID_GENERATE_TYPES",
     "VALID_POLYGON_TYPES",
+    "HUNYUAN3D_API_ENDPOINT_ENV",
     # COS uploader (SDK-based by default)
     "TencentCOSUploader",
     "SDKCOSUploader",
     "get_cos_uploader",
     "TENCENT_COS_BUCKET_ENV",
     "TENCENT_COS_REGION_ENV",
+    "TENCENT_COS_ENDPOINT_ENV",
     "COSUploadError",
+    # Shared HTTP connection pool
+    "HttpPool",
+    "get_http_pool",
+    "close_http_pool",
+    "is_http2_available",
 ]
 
 
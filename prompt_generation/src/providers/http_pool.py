@@ -0,0 +1,194 @@
+# http_pool.py - Shared HTTP Connection Pool for the Tencent Cloud Clients
+#
+# The Hunyuan providers and the COS uploader used to create their own
+# httpx.Client each, and generate_3d_model() creates a provider and an
+# uploader per call - so every job (and every speculative job, every
+# re-attach in `jobs --orphans`) opened fresh TCP + TLS connections and
+# threw them away again, whenever the garbage collector ran __del__.
+#
+# Now one process-wide pool owns the connections:
+#
+#   - tuned limits (POOL_MAX_CONNECTIONS / POOL_MAX_KEEPALIVE)
+#   - keep-alive, so the COS upload, submit, polls, and the result
+#     download of a job reuse connections - and so does the next job
+#   - HTTP/2 when the optional `h2` package is installed
+#     (uv add "httpx[http2]"), HTTP/1.1 keep-alive otherwise
+#
+# Clients only borrow the pool: each provider/uploader still owns a small
+# httpx.Client (its own timeout) and closes it deterministically when
+# used as a context manager, but closing it leaves the pool open.
+#
+# Every request records on the current span whether it opened a new
+# connection or reused one (connections_new / connections_reused in
+# trace.json, pipeline_http_connections in the metrics).
+#
+# Usage:
+#   client = get_http_pool().client(timeout=60.0)
+#   response = client.get(url)   # counted on the current span
+#   client.close()               # the pool stays open
+
+import atexit
+import threading
+from typing import Optional
+
+import httpx
+
+from ..tracing import current_span
+
+
+# -----------------------------------------------------------------------------
+# CONFIGURATION
+# -----------------------------------------------------------------------------
+
+# Connections across all hosts (API, COS, result downloads) and threads
+POOL_MAX_CONNECTIONS = 20
+
+# Idle connections kept open for reuse
+POOL_MAX_KEEPALIVE = 10
+
+# Seconds an idle connection stays in the pool (polls are usually 10s+ apart)
+KEEPALIVE_EXPIRY = 60.0
+
+
+def is_http2_available() -> bool:
+    """True if the optional `h2` package (httpx[http2]) is installed."""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+# -----------------------------------------------------------------------------
+# POOL
+# -----------------------------------------------------------------------------
+
+class HttpPool:
+    """
+    Connection pool shared by every client borrowed from it.
+
+    Thread-safe (the `all` command uploads, submits, and polls from
+    worker threads).
+
+    Args:
+        max_connections: Connections across all hosts
+        max_keepalive: Idle connections kept for reuse
+        keepalive_expiry: Seconds an idle connection is kept
+        http2: Use HTTP/2 (None = if `h2` is installed)
+    """
+
+    def __init__(
+        self,
+        max_connections: int = POOL_MAX_CONNECTIONS,
+        max_keepalive: int = POOL_MAX_KEEPALIVE,
+        keepalive_expiry: float = KEEPALIVE_EXPIRY,
+        http2: Optional[bool] = None,
+    ):
+        self.http2 = is_http2_available() if http2 is None else http2
+        self._transport = httpx.HTTPTransport(
+            http2=self.http2,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive,
+                keepalive_expiry=keepalive_expiry,
+            ),
+        )
+        self._lock = threading.Lock()
+        self.connections_new = 0
+        self.connections_reused = 0
+        self.closed = False
+
+    def client(self, timeout: float) -> httpx.Client:
+        """
+        A client that sends its requests through this pool.
+
+        Args:
+            timeout: Default request timeout in seconds
+
+        Returns:
+            httpx.Client (closing it doesn't close the pool)
+        """
+        return httpx.Client(transport=_BorrowedTransport(self), timeout=timeout)
+
+    def _count(self, reused: bool) -> None:
+        with self._lock:
+            if reused:
+                self.connections_reused += 1
+            else:
+                self.connections_new += 1
+
+    def close(self) -> None:
+        """Close every pooled connection."""
+        self.closed = True
+        self._transport.close()
+
+    def __enter__(self) -> "HttpPool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class _BorrowedTransport(httpx.BaseTransport):
+    """
+    Sends requests through an HttpPool and counts connection reuse.
+
+    httpcore reports a "connection.connect_tcp" trace event only when it
+    opens a connection, so a request that sends its headers without one
+    went over a pooled connection. Requests that report neither (e.g. a
+    mocked transport in tests) are not counted.
+    """
+
+    def __init__(self, pool: HttpPool):
+        self._pool = pool
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        events = set()
+        outer_trace = request.extensions.get("trace")
+
+        def trace(event_name: str, info: dict) -> None:
+            events.add(event_name)
+            if outer_trace is not None:
+                outer_trace(event_name, info)
+
+        request.extensions["trace"] = trace
+        response = self._pool._transport.handle_request(request)
+
+        opened = "connection.connect_tcp.started" in events
+        sent = any(name.endswith("send_request_headers.started") for name in events)
+        if opened or sent:
+            self._pool._count(reused=not opened)
+            current_span().add_connection(reused=not opened)
+        return response
+
+    def close(self) -> None:
+        """Borrowed: the pool outlives the client."""
+
+
+# -----------------------------------------------------------------------------
+# PROCESS-WIDE POOL
+# -----------------------------------------------------------------------------
+
+_shared_pool: Optional[HttpPool] = None
+_shared_lock = threading.Lock()
+
+
+def get_http_pool() -> HttpPool:
+    """The process-wide pool (created on first use, closed at exit)."""
+    global _shared_pool
+    with _shared_lock:
+        if _shared_pool is None or _shared_pool.closed:
+            _shared_pool = HttpPool()
+        return _shared_pool
+
+
+def close_http_pool() -> None:
+    """Close the process-wide pool (the next get_http_pool() opens a new one)."""
+    global _shared_pool
+    with _shared_lock:
+        pool, _shared_pool = _shared_pool, None
+    if pool is not None:
+        pool.close()
+
+
+atexit.register(close_http_pool)
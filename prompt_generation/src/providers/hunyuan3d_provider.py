@@ -96,14 +96,27 @@ class Hunyuan3DProvider(ABC):
     Providers can use different HTTP clients (httpx, openai, etc.) and
     authentication methods.
     
+    Providers are context managers: leaving the block closes their
+    client (pooled connections go back to the shared pool, see
+    http_pool.py).
+    
     Usage:
-        provider = RawHttpHunyuan3DProvider(secret_id, secret_key)
-        job_id = provider.submit(prompt="A cute panda")
-        result = provider.poll(job_id)
-        if result.status == JobStatus.DONE:
-            files = provider.download_result(result, output_dir)
+        with RawHttpHunyuan3DProvider(secret_id, secret_key) as provider:
+            job_id = provider.submit(prompt="A cute panda")
+            result = provider.poll(job_id)
+            if result.status == JobStatus.DONE:
+                files = provider.download_result(result, output_dir)
     """
     
+    def close(self) -> None:
+        """Release the provider's client (nothing to do by default)."""
+    
+    def __enter__(self) -> "Hunyuan3DProvider":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+    
     @abstractmethod
     def submit(
         self,
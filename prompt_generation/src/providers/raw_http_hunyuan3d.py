@@ -28,8 +28,8 @@ from pathlib import Path
 from typing import Optional, Any
 from io import BytesIO
 
-import httpx
-
+from ..tracing import traced, current_span
+from .http_pool import get_http_pool
 from .hunyuan3d_provider import (
     Hunyuan3DProvider,
     Hunyuan3DJobResult,
@@ -63,6 +63,10 @@ MAX_FACE_COUNT = 1500000
 
 # API Configuration
 API_HOST = "ai3d.tencentcloudapi.com"
+
+# Optional endpoint override (e.g., http://127.0.0.1:8400 for the local
+# stand-in servers in benchmarks/). The signature still uses API_HOST.
+HUNYUAN3D_API_ENDPOINT_ENV = "HUNYUAN3D_API_ENDPOINT"
 API_VERSION = "2025-05-13"
 API_REGION = "ap-guangzhou"
 
@@ -196,7 +200,8 @@ class RawHttpHunyuan3DProvider(Hunyuan3DProvider):
             secret_id=os.environ["TENCENT_SECRET_ID"],
             secret_key=os.environ["TENCENT_SECRET_KEY"],
         )
-        job_id = provider.submit(prompt="A cute panda")
+        with provider:
+            job_id = provider.submit(prompt="A cute panda")
     """
     
     def __init__(
@@ -224,7 +229,8 @@ class RawHttpHunyuan3DProvider(Hunyuan3DProvider):
                 f"environment variables, or pass them to the constructor."
             )
         
-        self._client = httpx.Client(timeout=HTTP_TIMEOUT)
+        # Borrows the shared connection pool (see http_pool.py)
+        self._client = get_http_pool().client(timeout=HTTP_TIMEOUT)
     
     def _call_api(self, action: str, params: dict[str, Any]) -> dict[str, Any]:
         """
@@ -253,7 +259,7 @@ class RawHttpHunyuan3DProvider(Hunyuan3DProvider):
             timestamp=timestamp,
         )
         
-        url = f"https://{API_HOST}"
+        url = os.environ.get(HUNYUAN3D_API_ENDPOINT_ENV) or f"https://{API_HOST}"
         
         response = self._client.post(
             url,
@@ -262,6 +268,7 @@ class RawHttpHunyuan3DProvider(Hunyuan3DProvider):
         )
         
         response.raise_for_status()
+        current_span().record(bytes_out=len(payload), bytes_in=len(response.content))
         data = response.json()
         
         # Check for API errors
@@ -277,6 +284,7 @@ class RawHttpHunyuan3DProvider(Hunyuan3DProvider):
         
         return data
     
+    @traced("hunyuan3d.submit", category="api")
     def submit(
         self,
         *,
@@ -390,6 +398,7 @@ class RawHttpHunyuan3DProvider(Hunyuan3DProvider):
                 print(f"Warning: Invalid {HUNYUAN3D_POLYGON_TYPE_ENV}={polygon_type}, "
                       f"valid options: {', '.join(VALID_POLYGON_TYPES)}")
     
+    @traced("hunyuan3d.poll", category="api")
     def poll(self, job_id: str) -> Hunyuan3DJobResult:
         """
         Poll the status of a Hunyuan 3D job.
@@ -420,6 +429,8 @@ class RawHttpHunyuan3DProvider(Hunyuan3DProvider):
                     preview_url=f.get("PreviewImageUrl"),
                 ))
         
+        current_span().set(status=status.value)
+        
         return Hunyuan3DJobResult(
             job_id=job_id,
             status=status,
@@ -428,6 +439,7 @@ class RawHttpHunyuan3DProvider(Hunyuan3DProvider):
             error_message=response.get("ErrorMessage"),
         )
     
+    @traced("hunyuan3d.download_result", category="api")
     def download_result(
         self,
         result: Hunyuan3DJobResult,
@@ -460,6 +472,7 @@ class RawHttpHunyuan3DProvider(Hunyuan3DProvider):
             response.raise_for_status()
             
             content = response.content
+            current_span().record(bytes_in=len(content))
             
             # Check if it's a ZIP file
             if file_info.url.endswith(".zip") or content[:4] == b"PK\x03\x04":
@@ -479,6 +492,7 @@ class RawHttpHunyuan3DProvider(Hunyuan3DProvider):
                 try:
                     preview_resp = self._client.get(file_info.preview_url)
                     preview_resp.raise_for_status()
+                    current_span().record(bytes_in=len(preview_resp.content))
                     preview_path = output_dir / "preview.png"
                     preview_path.write_bytes(preview_resp.content)
                     downloaded_paths.append(preview_path)
@@ -487,6 +501,7 @@ class RawHttpHunyuan3DProvider(Hunyuan3DProvider):
         
         return downloaded_paths
     
+    @traced("hunyuan3d.extract_zip", category="io")
     def _extract_zip(self, content: bytes, output_dir: Path) -> list[Path]:
         """
         Extract a ZIP file to the output directory.
@@ -513,9 +528,10 @@ class RawHttpHunyuan3DProvider(Hunyuan3DProvider):
                 
                 extracted_paths.append(extracted_path)
         
+        current_span().set(files=len(extracted_paths))
+        current_span().record(bytes_in=len(content))
         return extracted_paths
     
-    def __del__(self):
-        """Clean up the HTTP client."""
-        if hasattr(self, "_client"):
-            self._client.close()
+    def close(self) -> None:
+        """Close the HTTP client (its connections stay in the shared pool)."""
+        self._client.close()
@@ -24,8 +24,8 @@ from io import BytesIO
 from pathlib import Path
 from typing import Optional, Any
 
-import httpx
-
+from ..tracing import traced, current_span
+from .http_pool import get_http_pool
 from .hunyuan3d_provider import (
     Hunyuan3DProvider,
     Hunyuan3DJobResult,
@@ -101,7 +101,8 @@ class SDKHunyuan3DProvider(Hunyuan3DProvider):
             secret_id=os.environ["TENCENT_SECRET_ID"],
             secret_key=os.environ["TENCENT_SECRET_KEY"],
         )
-        job_id = provider.submit(prompt="A cute panda")
+        with provider:
+            job_id = provider.submit(prompt="A cute panda")
     """
     
     def __init__(
@@ -139,7 +140,9 @@ class SDKHunyuan3DProvider(Hunyuan3DProvider):
         
         self.region = region
         self._client = None
-        self._http_client = httpx.Client(timeout=120.0)
+        # Result downloads borrow the shared connection pool (the SDK
+        # client makes its own API connections)
+        self._http_client = get_http_pool().client(timeout=120.0)
     
     def _get_client(self):
         """Get or create the SDK client (lazy initialization)."""
@@ -161,6 +164,7 @@ class SDKHunyuan3DProvider(Hunyuan3DProvider):
         
         return self._client
     
+    @traced("hunyuan3d.submit", category="api")
     def submit(
         self,
         *,
@@ -215,7 +219,9 @@ class SDKHunyuan3DProvider(Hunyuan3DProvider):
         # Add optional settings from environment variables
         self._add_optional_params(params)
         
-        req.from_json_string(json.dumps(params))
+        payload = json.dumps(params)
+        req.from_json_string(payload)
+        current_span().record(bytes_out=len(payload))
         
         # Submit
         try:
@@ -273,6 +279,7 @@ class SDKHunyuan3DProvider(Hunyuan3DProvider):
                 print(f"Warning: Invalid {HUNYUAN3D_POLYGON_TYPE_ENV}={polygon_type}, "
                       f"valid options: {', '.join(VALID_POLYGON_TYPES)}")
     
+    @traced("hunyuan3d.poll", category="api")
     def poll(self, job_id: str) -> Hunyuan3DJobResult:
         """
         Poll the status of a Hunyuan 3D job using SDK.
@@ -315,6 +322,8 @@ class SDKHunyuan3DProvider(Hunyuan3DProvider):
                     preview_url=getattr(f, 'PreviewImageUrl', None),
                 ))
         
+        current_span().set(status=status.value)
+        
         return Hunyuan3DJobResult(
             job_id=job_id,
             status=status,
@@ -323,6 +332,7 @@ class SDKHunyuan3DProvider(Hunyuan3DProvider):
             error_message=getattr(resp, 'ErrorMessage', None),
         )
     
+    @traced("hunyuan3d.download_result", category="api")
     def download_result(
         self,
         result: Hunyuan3DJobResult,
@@ -353,6 +363,7 @@ class SDKHunyuan3DProvider(Hunyuan3DProvider):
             response.raise_for_status()
             
             content = response.content
+            current_span().record(bytes_in=len(content))
             
             # Check if it's a ZIP file
             if file_info.url.endswith(".zip") or content[:4] == b"PK\x03\x04":
@@ -372,6 +383,7 @@ class SDKHunyuan3DProvider(Hunyuan3DProvider):
                 try:
                     preview_resp = self._http_client.get(file_info.preview_url)
                     preview_resp.raise_for_status()
+                    current_span().record(bytes_in=len(preview_resp.content))
                     preview_path = output_dir / "preview.png"
                     preview_path.write_bytes(preview_resp.content)
                     downloaded_paths.append(preview_path)
@@ -380,6 +392,7 @@ class SDKHunyuan3DProvider(Hunyuan3DProvider):
         
         return downloaded_paths
     
+    @traced("hunyuan3d.extract_zip", category="io")
     def _extract_zip(self, content: bytes, output_dir: Path) -> list[Path]:
         """Extract a ZIP file to the output directory."""
         extracted_paths: list[Path] = []
@@ -397,12 +410,13 @@ class SDKHunyuan3DProvider(Hunyuan3DProvider):
                 
                 extracted_paths.append(extracted_path)
         
+        current_span().set(files=len(extracted_paths))
+        current_span().record(bytes_in=len(content))
         return extracted_paths
     
-    def __del__(self):
-        """Clean up resources."""
-        if hasattr(self, "_http_client"):
-            self._http_client.close()
+    def close(self) -> None:
+        """Close the download client (its connections stay in the shared pool)."""
+        self._http_client.close()
 
 
 # -----------------------------------------------------------------------------
@@ -458,3 +472,13 @@ class SDKCOSUploader:
     def upload_file(self, file_path: Path, object_key: Optional[str] = None) -> str:
         """Upload a file to COS and return the URL."""
         return self._uploader.upload_file(file_path, object_key)
+    
+    def close(self) -> None:
+        """Close the wrapped uploader."""
+        self._uploader.close()
+    
+    def __enter__(self) -> "SDKCOSUploader":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
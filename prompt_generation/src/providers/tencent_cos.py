@@ -7,6 +7,10 @@
 #   - SDKCOSUploader: Uses official cos-python-sdk-v5 (default, recommended)
 #   - TencentCOSUploader: Uses raw HTTP requests with manual signing (fallback)
 #
+# Both are context managers. The raw HTTP uploader borrows the shared
+# connection pool (http_pool.py), so uploads reuse the connections of
+# earlier uploads in the same process.
+#
 # Reference: https://cloud.tencent.com/document/api/436/7751
 #
 # Environment Variables:
@@ -25,7 +29,8 @@ from pathlib import Path
 from typing import Optional, Protocol
 import mimetypes
 
-import httpx
+from ..tracing import traced, current_span
+from .http_pool import get_http_pool
 
 
 # -----------------------------------------------------------------------------
@@ -37,6 +42,10 @@ TENCENT_SECRET_KEY_ENV = "TENCENT_SECRET_KEY"
 TENCENT_COS_BUCKET_ENV = "TENCENT_COS_BUCKET"
 TENCENT_COS_REGION_ENV = "TENCENT_COS_REGION"
 
+# Optional endpoint override (e.g., http://127.0.0.1:8400 for the local
+# stand-in servers in benchmarks/). Only the raw HTTP uploader supports it.
+TENCENT_COS_ENDPOINT_ENV = "TENCENT_COS_ENDPOINT"
+
 # Default timeout
 HTTP_TIMEOUT = 120.0
 
@@ -52,6 +61,16 @@ class COSUploaderProtocol(Protocol):
         """Upload a local file to COS and return the public URL."""
         ...
     
+    def close(self) -> None:
+        """Release the uploader's connections."""
+        ...
+    
+    def __enter__(self) -> "COSUploaderProtocol":
+        ...
+    
+    def __exit__(self, *exc_info) -> None:
+        ...
+    
     def upload_bytes(self, content: bytes, object_key: str, content_type: str = "image/png") -> str:
         """Upload bytes directly to COS and return the public URL."""
         ...
@@ -177,7 +196,8 @@ class TencentCOSUploader:
             bucket="mybucket-1250000000",
             region="ap-guangzhou",
         )
-        url = uploader.upload_file(Path("image.png"))
+        with uploader:
+            url = uploader.upload_file(Path("image.png"))
     """
     
     def __init__(
@@ -220,9 +240,15 @@ class TencentCOSUploader:
                 f"COS region required. Set {TENCENT_COS_REGION_ENV}."
             )
         
-        self._client = httpx.Client(timeout=HTTP_TIMEOUT)
+        # Borrows the shared connection pool (see http_pool.py)
+        self._client = get_http_pool().client(timeout=HTTP_TIMEOUT)
         self._host = f"{self.bucket}.cos.{self.region}.myqcloud.com"
+        self._base_url = (
+            os.environ.get(TENCENT_COS_ENDPOINT_ENV, "").rstrip("/")
+            or f"https://{self._host}"
+        )
     
+    @traced("cos.upload_file", category="api")
     def upload_file(
         self,
         file_path: Path,
@@ -256,6 +282,7 @@ class TencentCOSUploader:
         
         # Read file content
         content = file_path.read_bytes()
+        current_span().record(bytes_out=len(content))
         
         # Determine content type
         content_type = mimetypes.guess_type(file_path.name)[0] or "application/octet-stream"
@@ -279,12 +306,13 @@ class TencentCOSUploader:
         headers["Authorization"] = auth
         
         # Upload the file
-        url = f"https://{self._host}{object_key}"
+        url = f"{self._base_url}{object_key}"
         response = self._client.put(url, headers=headers, content=content)
         response.raise_for_status()
         
         return url
     
+    @traced("cos.upload_bytes", category="api")
     def upload_bytes(
         self,
         content: bytes,
@@ -325,16 +353,22 @@ class TencentCOSUploader:
         headers["Authorization"] = auth
         
         # Upload
-        url = f"https://{self._host}{object_key}"
+        current_span().record(bytes_out=len(content))
+        url = f"{self._base_url}{object_key}"
         response = self._client.put(url, headers=headers, content=content)
         response.raise_for_status()
         
         return url
     
-    def __del__(self):
-        """Clean up the HTTP client."""
-        if hasattr(self, "_client"):
-            self._client.close()
+    def close(self) -> None:
+        """Close the HTTP client (its connections stay in the shared pool)."""
+        self._client.close()
+    
+    def __enter__(self) -> "TencentCOSUploader":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
 
 
 class COSUploadError(Exception):
@@ -362,7 +396,8 @@ class SDKCOSUploader:
             bucket="mybucket-1250000000",
             region="ap-guangzhou",
         )
-        url = uploader.upload_file(Path("image.png"))
+        with uploader:
+            url = uploader.upload_file(Path("image.png"))
     """
     
     def __init__(
@@ -424,6 +459,7 @@ class SDKCOSUploader:
         self._client = CosS3Client(config)
         self._host = f"{self.bucket}.cos.{self.region}.myqcloud.com"
     
+    @traced("cos.upload_file", category="api")
     def upload_file(
         self,
         file_path: Path,
@@ -457,6 +493,7 @@ class SDKCOSUploader:
         
         # Determine content type
         content_type = mimetypes.guess_type(file_path.name)[0] or "application/octet-stream"
+        current_span().record(bytes_out=file_path.stat().st_size)
         
         try:
             # Use put_object for simpler upload (avoids multipart complexity)
@@ -474,6 +511,7 @@ class SDKCOSUploader:
         
         return f"https://{self._host}/{object_key}"
     
+    @traced("cos.upload_bytes", category="api")
     def upload_bytes(
         self,
         content: bytes,
@@ -498,6 +536,8 @@ class SDKCOSUploader:
         if object_key.startswith("/"):
             object_key = object_key[1:]
         
+        current_span().record(bytes_out=len(content))
+        
         try:
             from io import BytesIO
             # Set ACL to public-read so Hunyuan 3D API can access the file
@@ -512,6 +552,15 @@ class SDKCOSUploader:
             raise COSUploadError(f"Failed to upload bytes to {object_key}: {e}") from e
         
         return f"https://{self._host}/{object_key}"
+    
+    def close(self) -> None:
+        """Nothing to release (the COS SDK manages its own connections)."""
+    
+    def __enter__(self) -> "SDKCOSUploader":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
 
 
 # -----------------------------------------------------------------------------
@@ -531,8 +580,9 @@ def get_cos_uploader(use_sdk: bool = True) -> COSUploaderProtocol:
         
     Note:
         If use_sdk=True but SDK is not installed, will fall back to raw HTTP.
+        An endpoint override (TENCENT_COS_ENDPOINT) always uses raw HTTP.
     """
-    if use_sdk:
+    if use_sdk and not os.environ.get(TENCENT_COS_ENDPOINT_ENV):
         try:
             return SDKCOSUploader()
         except ImportError:
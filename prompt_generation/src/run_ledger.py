@@ -0,0 +1,541 @@
+# run_ledger.py - Structured Run Ledger (SQLite) for Cross-Run Analytics
+#
+# Every run writes files under its own timestamped folder, so questions
+# that span runs ("median Hunyuan time for LowPoly at 100k faces last
+# week", "tokens spent per character") meant opening dozens of JSON files.
+#
+# This module appends one row per run to a local SQLite database:
+#
+#   runs          command, character, spec hash, version, duration, outcome
+#   stages        time per stage function (from the run's spans)
+#   api_calls     calls, time, bytes, tokens, retries per provider/call/model
+#   images        bytes and format of every saved image
+#   hunyuan_jobs  EnablePBR / FaceCount / GenerateType / PolygonType, timings
+#
+# Everything is derived from data the run already produces: the spans
+# recorded by tracing.py and the files in the run folder (images/,
+# metadata.json). The `stats` CLI command queries it.
+#
+# SQLite is in the standard library - no extra dependency.
+#
+# Usage:
+#   with RunLedger(Path("output/ledger.sqlite")) as ledger:
+#       ledger.record_run(record, spans, run_output_dir)
+#       print(ledger.hunyuan_summary(since=seven_days_ago))
+
+import json
+import re
+import sqlite3
+import statistics
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+from .image_encoding import detect_image_format
+from .models import spec_hash  # noqa: F401 - re-exported (moved to models)
+from .tracing import Span
+
+
+# -----------------------------------------------------------------------------
+# CONFIGURATION
+# -----------------------------------------------------------------------------
+
+# Ledger file name (created next to the timestamped run folders by default)
+DEFAULT_LEDGER_NAME = "ledger.sqlite"
+
+# Bump when the schema changes; migrations run in _migrate()
+#   1  initial schema
+#   2  api_calls.cached_tokens / reasoning_tokens
+SCHEMA_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id               INTEGER PRIMARY KEY AUTOINCREMENT,
+    command          TEXT NOT NULL,
+    character        TEXT,
+    spec_hash        TEXT,
+    version          TEXT,
+    started_at       TEXT NOT NULL,
+    finished_at      TEXT NOT NULL,
+    duration_seconds REAL NOT NULL,
+    outcome          TEXT NOT NULL,
+    error            TEXT,
+    output_dir       TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_started_at ON runs (started_at);
+CREATE INDEX IF NOT EXISTS runs_character ON runs (character);
+
+CREATE TABLE IF NOT EXISTS stages (
+    run_id  INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    name    TEXT NOT NULL,
+    calls   INTEGER NOT NULL,
+    seconds REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS api_calls (
+    run_id        INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    provider      TEXT NOT NULL,
+    call          TEXT NOT NULL,
+    model         TEXT,
+    calls         INTEGER NOT NULL,
+    seconds       REAL NOT NULL,
+    bytes_in      INTEGER NOT NULL,
+    bytes_out     INTEGER NOT NULL,
+    input_tokens  INTEGER NOT NULL,
+    output_tokens INTEGER NOT NULL,
+    retries       INTEGER NOT NULL,
+    errors        INTEGER NOT NULL,
+    cached_tokens    INTEGER NOT NULL DEFAULT 0,
+    reasoning_tokens INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS images (
+    run_id   INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    view     TEXT,
+    filename TEXT NOT NULL,
+    bytes    INTEGER NOT NULL,
+    format   TEXT
+);
+
+CREATE TABLE IF NOT EXISTS hunyuan_jobs (
+    run_id          INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    job_id          TEXT,
+    status          TEXT,
+    enable_pbr      INTEGER,
+    face_count      INTEGER,
+    generate_type   TEXT,
+    polygon_type    TEXT,
+    elapsed_seconds REAL,
+    queue_seconds   REAL,
+    run_seconds     REAL,
+    uploaded_bytes  INTEGER
+);
+"""
+
+# Saved image names look like "aethel_tpose_front_v1.jpg"
+_VIEW_PATTERN = re.compile(r"_tpose_([a-z]+)_")
+
+
+# -----------------------------------------------------------------------------
+# DATA CLASSES
+# -----------------------------------------------------------------------------
+
+@dataclass
+class RunRecord:
+    """
+    Run-level facts that don't come from spans.
+
+    Attributes:
+        command: CLI command ("all", "images", "hunyuan3d")
+        started_at: ISO timestamp when the command started
+        finished_at: ISO timestamp when it finished
+        outcome: "ok", "partial" (some stage failed), or "failed"
+        character: Character name (None for prompt/image-only runs)
+        spec_hash: Content hash of the character spec (see spec_hash())
+        version: Version tag used in filenames
+        error: Error message for failed runs
+        output_dir: The run's timestamped output folder
+    """
+    command: str
+    started_at: str
+    finished_at: str
+    outcome: str
+    character: Optional[str] = None
+    spec_hash: Optional[str] = None
+    version: Optional[str] = None
+    error: Optional[str] = None
+    output_dir: Optional[str] = None
+
+    @property
+    def duration_seconds(self) -> float:
+        start = datetime.fromisoformat(self.started_at)
+        end = datetime.fromisoformat(self.finished_at)
+        return (end - start).total_seconds()
+
+
+def parse_since(value: str, now: Optional[datetime] = None) -> datetime:
+    """
+    Parse a --since value: a relative age ("30m", "24h", "7d", "2w")
+    or an ISO date/datetime ("2025-01-31").
+
+    Raises:
+        ValueError: If the value is neither
+    """
+    now = now or datetime.now()
+    match = re.fullmatch(r"(\d+)\s*([mhdw])", value.strip().lower())
+    if match:
+        amount, unit = int(match.group(1)), match.group(2)
+        minutes = {"m": 1, "h": 60, "d": 60 * 24, "w": 60 * 24 * 7}[unit]
+        return now - timedelta(minutes=amount * minutes)
+    try:
+        return datetime.fromisoformat(value.strip())
+    except ValueError:
+        raise ValueError(
+            f"Invalid --since value: {value!r}. "
+            "Use an age like 24h, 7d, 2w or a date like 2025-01-31."
+        )
+
+
+def outcome_from_spans(spans: Iterable[Span]) -> str:
+    """
+    "partial" if any span recorded an error or a failed job, else "ok".
+
+    Commands like `all` turn stage failures into warnings, so the spans
+    are the reliable record of what went wrong.
+    """
+    for s in spans:
+        if "error" in s.args or s.args.get("status") == "FAIL":
+            return "partial"
+    return "ok"
+
+
+# -----------------------------------------------------------------------------
+# LEDGER
+# -----------------------------------------------------------------------------
+
+class RunLedger:
+    """
+    Append-only SQLite ledger of pipeline runs.
+
+    Safe to share between concurrent runs on one machine (WAL mode,
+    one short transaction per run).
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._migrate()
+
+    def __enter__(self) -> "RunLedger":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def _migrate(self) -> None:
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version > SCHEMA_VERSION:
+            raise RuntimeError(
+                f"Ledger {self.path} has schema version {version}, "
+                f"newer than this code ({SCHEMA_VERSION}). Update the pipeline."
+            )
+        with self._conn:
+            if version == 1:
+                for column in ("cached_tokens", "reasoning_tokens"):
+                    self._conn.execute(
+                        f"ALTER TABLE api_calls ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0"
+                    )
+            self._conn.executescript(_SCHEMA)
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    # --- writing -------------------------------------------------------------
+
+    def record_run(
+        self,
+        record: RunRecord,
+        spans: Iterable[Span] = (),
+        run_output_dir: Optional[Path] = None,
+    ) -> int:
+        """
+        Append one run.
+
+        Args:
+            record: Run-level facts
+            spans: Finished spans from the run's tracer
+            run_output_dir: Run folder to scan for images and metadata.json
+
+        Returns:
+            The new run's id
+        """
+        spans = list(spans)
+
+        with self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO runs (command, character, spec_hash, version, started_at,"
+                " finished_at, duration_seconds, outcome, error, output_dir)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    record.command, record.character, record.spec_hash, record.version,
+                    record.started_at, record.finished_at, record.duration_seconds,
+                    record.outcome, record.error, record.output_dir,
+                ),
+            )
+            run_id = cursor.lastrowid
+
+            self._conn.executemany(
+                "INSERT INTO stages (run_id, name, calls, seconds) VALUES (?, ?, ?, ?)",
+                [(run_id, *row) for row in _stage_rows(spans)],
+            )
+            self._conn.executemany(
+                "INSERT INTO api_calls (run_id, provider, call, model, calls, seconds,"
+                " bytes_in, bytes_out, input_tokens, output_tokens, retries, errors,"
+                " cached_tokens, reasoning_tokens)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(run_id, *row) for row in _api_rows(spans)],
+            )
+
+            if run_output_dir is not None:
+                self._conn.executemany(
+                    "INSERT INTO images (run_id, view, filename, bytes, format)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    [(run_id, *row) for row in _image_rows(run_output_dir)],
+                )
+                self._conn.executemany(
+                    "INSERT INTO hunyuan_jobs (run_id, job_id, status, enable_pbr, face_count,"
+                    " generate_type, polygon_type, elapsed_seconds, queue_seconds,"
+                    " run_seconds, uploaded_bytes)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(run_id, *row) for row in _hunyuan_rows(run_output_dir)],
+                )
+
+        return run_id
+
+    # --- queries -------------------------------------------------------------
+
+    def _filters(self, since: Optional[datetime], character: Optional[str]) -> tuple[str, list]:
+        clauses, params = [], []
+        if since is not None:
+            clauses.append("r.started_at >= ?")
+            params.append(since.isoformat())
+        if character is not None:
+            clauses.append("r.character = ?")
+            params.append(character)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def _grouped(self, sql: str, params: list, key_columns: int) -> dict[tuple, list[sqlite3.Row]]:
+        groups: dict[tuple, list[sqlite3.Row]] = {}
+        for row in self._conn.execute(sql, params):
+            groups.setdefault(tuple(row)[:key_columns], []).append(row)
+        return groups
+
+    def run_summary(
+        self,
+        since: Optional[datetime] = None,
+        character: Optional[str] = None,
+    ) -> list[dict[str, Any]]:
+        """Runs per command: counts by outcome and median/p95 duration."""
+        where, params = self._filters(since, character)
+        groups = self._grouped(
+            f"SELECT r.command, r.outcome, r.duration_seconds FROM runs r{where}"
+            " ORDER BY r.command",
+            params, key_columns=1,
+        )
+        summary = []
+        for (command,), rows in groups.items():
+            durations = [row["duration_seconds"] for row in rows]
+            outcomes = [row["outcome"] for row in rows]
+            summary.append({
+                "command": command,
+                "runs": len(rows),
+                "ok": outcomes.count("ok"),
+                "partial": outcomes.count("partial"),
+                "failed": outcomes.count("failed"),
+                "median_seconds": _median(durations),
+                "p95_seconds": _p95(durations),
+            })
+        return summary
+
+    def stage_summary(
+        self,
+        since: Optional[datetime] = None,
+        character: Optional[str] = None,
+    ) -> list[dict[str, Any]]:
+        """Per-stage median/p95 time (one sample per run), slowest first."""
+        where, params = self._filters(since, character)
+        groups = self._grouped(
+            "SELECT s.name, s.seconds FROM stages s JOIN runs r ON r.id = s.run_id"
+            f"{where}",
+            params, key_columns=1,
+        )
+        summary = [
+            {
+                "stage": name,
+                "runs": len(rows),
+                "median_seconds": _median([row["seconds"] for row in rows]),
+                "p95_seconds": _p95([row["seconds"] for row in rows]),
+            }
+            for (name,), rows in groups.items()
+        ]
+        return sorted(summary, key=lambda row: row["median_seconds"] or 0, reverse=True)
+
+    def hunyuan_summary(
+        self,
+        since: Optional[datetime] = None,
+        character: Optional[str] = None,
+    ) -> list[dict[str, Any]]:
+        """Hunyuan job timings grouped by GenerateType/PolygonType/FaceCount/PBR."""
+        where, params = self._filters(since, character)
+        groups = self._grouped(
+            "SELECT h.generate_type, h.polygon_type, h.face_count, h.enable_pbr,"
+            " h.elapsed_seconds, h.queue_seconds, h.run_seconds"
+            f" FROM hunyuan_jobs h JOIN runs r ON r.id = h.run_id{where}"
+            " ORDER BY h.generate_type, h.polygon_type, h.face_count",
+            params, key_columns=4,
+        )
+        return [
+            {
+                "generate_type": generate_type,
+                "polygon_type": polygon_type,
+                "face_count": face_count,
+                "enable_pbr": bool(enable_pbr),
+                "jobs": len(rows),
+                "median_seconds": _median([row["elapsed_seconds"] for row in rows]),
+                "median_queue_seconds": _median([row["queue_seconds"] for row in rows]),
+                "median_run_seconds": _median([row["run_seconds"] for row in rows]),
+            }
+            for (generate_type, polygon_type, face_count, enable_pbr), rows in groups.items()
+        ]
+
+    def token_summary(
+        self,
+        since: Optional[datetime] = None,
+        character: Optional[str] = None,
+    ) -> list[dict[str, Any]]:
+        """OpenAI calls and tokens (input/cached/output/reasoning) per character and model."""
+        where, params = self._filters(since, character)
+        where = f"{where} {'AND' if where else 'WHERE'} a.input_tokens + a.output_tokens > 0"
+        rows = self._conn.execute(
+            "SELECT r.character, a.model, COUNT(DISTINCT r.id) AS runs, SUM(a.calls) AS calls,"
+            " SUM(a.input_tokens) AS input_tokens, SUM(a.cached_tokens) AS cached_tokens,"
+            " SUM(a.output_tokens) AS output_tokens, SUM(a.reasoning_tokens) AS reasoning_tokens"
+            f" FROM api_calls a JOIN runs r ON r.id = a.run_id{where}"
+            " GROUP BY r.character, a.model ORDER BY output_tokens DESC",
+            params,
+        )
+        return [dict(row) for row in rows]
+
+    def image_summary(
+        self,
+        since: Optional[datetime] = None,
+        character: Optional[str] = None,
+    ) -> list[dict[str, Any]]:
+        """Saved image size per view and format."""
+        where, params = self._filters(since, character)
+        groups = self._grouped(
+            "SELECT i.view, i.format, i.bytes FROM images i JOIN runs r ON r.id = i.run_id"
+            f"{where} ORDER BY i.view, i.format",
+            params, key_columns=2,
+        )
+        return [
+            {
+                "view": view,
+                "format": image_format,
+                "images": len(rows),
+                "median_bytes": _median([row["bytes"] for row in rows]),
+            }
+            for (view, image_format), rows in groups.items()
+        ]
+
+
+# -----------------------------------------------------------------------------
+# ROW BUILDERS
+# -----------------------------------------------------------------------------
+
+def _stage_rows(spans: list[Span]) -> list[tuple]:
+    totals: dict[str, list] = {}
+    for s in spans:
+        if s.category in ("stage", "io"):
+            entry = totals.setdefault(s.name, [0, 0.0])
+            entry[0] += 1
+            entry[1] += s.duration
+    return [(name, calls, round(seconds, 4)) for name, (calls, seconds) in totals.items()]
+
+
+def _api_rows(spans: list[Span]) -> list[tuple]:
+    # (provider, call, model) → [calls, seconds, in, out, in_tok, out_tok,
+    #                            retries, errors, cached_tok, reasoning_tok]
+    totals: dict[tuple, list] = {}
+    for s in spans:
+        if s.category != "api":
+            continue
+        provider, _, call = s.name.partition(".")
+        entry = totals.setdefault((provider, call or provider, s.args.get("model")), [0] * 10)
+        entry[0] += 1
+        entry[1] += s.duration
+        entry[2] += s.args.get("bytes_in", 0)
+        entry[3] += s.args.get("bytes_out", 0)
+        entry[4] += s.args.get("input_tokens", 0)
+        entry[5] += s.args.get("output_tokens", 0)
+        entry[6] += s.args.get("retries", 0)
+        entry[7] += 1 if "error" in s.args else 0
+        entry[8] += s.args.get("cached_tokens", 0)
+        entry[9] += s.args.get("reasoning_tokens", 0)
+    return [
+        (*key, values[0], round(values[1], 4), *values[2:])
+        for key, values in totals.items()
+    ]
+
+
+def _image_rows(run_output_dir: Path) -> list[tuple]:
+    # `all` saves into images/ (next to refined/*_tpose_*.txt prompts);
+    # `images` saves straight into the run folder
+    images_dir = run_output_dir / "images"
+    if not images_dir.is_dir():
+        images_dir = run_output_dir
+    rows = []
+    for path in sorted(images_dir.glob("*_tpose_*")):
+        if not path.is_file():
+            continue
+        with path.open("rb") as f:
+            header = f.read(16)
+        image_format = detect_image_format(header)
+        if image_format is None:
+            continue  # Not an image (e.g. a prompt file)
+        match = _VIEW_PATTERN.search(path.name)
+        rows.append((
+            match.group(1) if match else None,
+            path.name,
+            path.stat().st_size,
+            image_format,
+        ))
+    return rows
+
+
+def _hunyuan_rows(run_output_dir: Path) -> list[tuple]:
+    rows = []
+    for path in sorted(run_output_dir.rglob("metadata.json")):
+        try:
+            metadata = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        if "job_id" not in metadata:
+            continue
+        settings = metadata.get("settings") or {}
+        uploads = metadata.get("uploads") or []
+        rows.append((
+            metadata.get("job_id"),
+            metadata.get("status"),
+            int(settings["EnablePBR"]) if "EnablePBR" in settings else None,
+            settings.get("FaceCount"),
+            settings.get("GenerateType"),
+            settings.get("PolygonType"),
+            metadata.get("elapsed_seconds"),
+            metadata.get("queue_seconds"),
+            metadata.get("run_seconds"),
+            sum(u.get("uploaded_bytes", 0) for u in uploads) or None,
+        ))
+    return rows
+
+
+# -----------------------------------------------------------------------------
+# STATISTICS
+# -----------------------------------------------------------------------------
+
+def _median(values: list[Optional[float]]) -> Optional[float]:
+    present = [v for v in values if v is not None]
+    return round(statistics.median(present), 3) if present else None
+
+
+def _p95(values: list[Optional[float]]) -> Optional[float]:
+    present = sorted(v for v in values if v is not None)
+    if not present:
+        return None
+    return round(present[min(len(present) - 1, int(0.95 * len(present)))], 3)
@@ -0,0 +1,311 @@
+# spec_library.py - Load a Whole Folder of Character Specs
+#
+# Pipeline Stage: INPUT (many CharacterSpecs at once)
+#
+# load_character_spec() is fine for one file. A spec library has
+# thousands, and loading them one by one is slow for three reasons:
+#
+#   1. PyYAML's pure-Python parser      → models.YAML_LOADER uses libyaml
+#   2. One core does all the parsing    → files are parsed in a process pool
+#   3. Every run re-parses every file   → parsed specs are cached on disk
+#
+# The cache (.spec_cache.json in the library folder) stores each file's
+# mtime, size, and content hash next to its parsed fields:
+#   - same mtime and size      → use the cached spec, don't open the file
+#   - only the mtime changed   → read and hash the file; same hash → cached
+#   - anything else            → parse it again
+#
+# Missing optional fields are counted instead of logging one warning per
+# field per file, so loading 5,000 minimal specs prints a few summary lines.
+#
+# Example:
+#   >>> library = load_spec_library(Path("specs/"))
+#   >>> print(f"{len(library.specs)} specs, {library.cache_hits} from cache")
+#   >>> for line in library.warning_summary():
+#   ...     print(line)
+
+import hashlib
+import json
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, fields
+from pathlib import Path
+from typing import Any, Optional
+
+from .file_utils import atomic_write_bytes
+from .metrics import record_cache_lookup
+from .models import (
+    SPEC_FILE_EXTENSIONS,
+    AnySpec,
+    CharacterSpec,
+    FrozenCharacterSpec,
+    parse_spec_content,
+    spec_from_dict,
+)
+from .tracing import span, traced
+
+
+# -----------------------------------------------------------------------------
+# CONFIGURATION
+# -----------------------------------------------------------------------------
+
+# Parsed-spec cache, written into the library folder (hidden, so it is
+# never mistaken for a spec)
+SPEC_CACHE_NAME = ".spec_cache.json"
+SPEC_CACHE_VERSION = 1
+
+# Below this many files to parse, a process pool costs more than it saves
+PARALLEL_THRESHOLD = 64
+
+# Files per task sent to a worker (fewer, bigger messages between processes)
+PARSE_CHUNK_SIZE = 32
+
+# CharacterSpec fields, in the order they are stored in the cache
+_FIELD_NAMES = tuple(f.name for f in fields(CharacterSpec))
+
+
+# -----------------------------------------------------------------------------
+# DISCOVERY
+# -----------------------------------------------------------------------------
+
+def _is_skipped(name: str) -> bool:
+    """Names starting with "_" (templates, drafts) or "." (hidden) are skipped."""
+    return name.startswith(("_", "."))
+
+
+def discover_spec_files(root: Path, recursive: bool = True) -> list[Path]:
+    """
+    Find the spec files in a library folder.
+
+    Args:
+        root: Library folder (or a single spec file)
+        recursive: Also look in subfolders (skipped ones excluded)
+
+    Returns:
+        Sorted list of *.yaml / *.yml / *.json files
+
+    Raises:
+        FileNotFoundError: If root doesn't exist
+    """
+    root = Path(root)
+    if root.is_file():
+        return [root]
+    if not root.is_dir():
+        raise FileNotFoundError(f"Spec library not found: {root}")
+
+    found: list[Path] = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        # Pruning dirnames in place stops os.walk from descending into them
+        dirnames[:] = [d for d in dirnames if recursive and not _is_skipped(d)]
+        found.extend(
+            Path(dirpath) / name
+            for name in filenames
+            if not _is_skipped(name) and os.path.splitext(name)[1].lower() in SPEC_FILE_EXTENSIONS
+        )
+    return sorted(found)
+
+
+# -----------------------------------------------------------------------------
+# PARSING (runs in worker processes)
+# -----------------------------------------------------------------------------
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def _parse_spec_file(path: str) -> list[Any]:
+    """
+    Parse one spec file into a cache row.
+
+    Returns plain lists and strings rather than a CharacterSpec, so the
+    result is cheap to send back from a worker and can go straight into
+    the cache:
+        [mtime_ns, size, digest, field values or None, missing fields or error]
+    """
+    file_path = Path(path)
+    try:
+        stat = file_path.stat()
+        data = file_path.read_bytes()
+    except OSError as e:  # Deleted or unreadable since discovery
+        return [0, -1, "", None, str(e)]
+    try:
+        missing: list[str] = []
+        spec = spec_from_dict(parse_spec_content(data.decode("utf-8"), file_path.suffix), missing)
+    except ValueError as e:  # Includes UnicodeDecodeError and JSONDecodeError
+        return [stat.st_mtime_ns, stat.st_size, _digest(data), None, str(e)]
+    return [
+        stat.st_mtime_ns,
+        stat.st_size,
+        _digest(data),
+        [getattr(spec, name) for name in _FIELD_NAMES],
+        missing,
+    ]
+
+
+def _parse_all(paths: list[str], max_workers: Optional[int]) -> list[list[Any]]:
+    """Parse files in a process pool (or inline when there are only a few)."""
+    if len(paths) < PARALLEL_THRESHOLD or max_workers == 1:
+        return [_parse_spec_file(path) for path in paths]
+
+    workers = max_workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_parse_spec_file, paths, chunksize=PARSE_CHUNK_SIZE))
+
+
+# -----------------------------------------------------------------------------
+# CACHE FILE
+# -----------------------------------------------------------------------------
+
+def _load_cache(cache_path: Path) -> dict[str, list[Any]]:
+    """Relative path → cache row; empty if missing, unreadable, or outdated."""
+    try:
+        data = json.loads(cache_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("version") != SPEC_CACHE_VERSION:
+        return {}
+    if data.get("fields") != list(_FIELD_NAMES):
+        return {}  # CharacterSpec gained or lost a field
+    return data.get("files", {})
+
+
+def _save_cache(cache_path: Path, rows: dict[str, list[Any]]) -> None:
+    """Write the cache atomically; a read-only library just goes uncached."""
+    payload = {"version": SPEC_CACHE_VERSION, "fields": list(_FIELD_NAMES), "files": rows}
+    try:
+        atomic_write_bytes(
+            cache_path,
+            json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8"),
+        )
+    except OSError:
+        pass
+
+
+def _is_current(row: Optional[list[Any]], path: Path, stat: os.stat_result) -> bool:
+    """True if the cached row still describes the file on disk."""
+    if row is None or row[1] != stat.st_size:
+        return False
+    if row[0] == stat.st_mtime_ns:
+        return True
+    # Touched (git checkout, copy) but maybe not changed: compare content
+    return row[2] == _digest(path.read_bytes())
+
+
+# -----------------------------------------------------------------------------
+# LIBRARY LOADER
+# -----------------------------------------------------------------------------
+
+@dataclass
+class SpecLibrary:
+    """
+    The result of loading a spec library.
+
+    Attributes:
+        root: The library folder (or single file) that was loaded
+        specs: Spec file → CharacterSpec (or FrozenCharacterSpec), in
+               sorted path order
+        errors: Spec file → error message, for files that didn't load
+        missing_fields: Optional field → number of specs without it
+        cache_hits: Specs taken from the cache without parsing
+        parsed: Specs (or errors) produced by parsing a file
+    """
+    root: Path
+    specs: dict[Path, AnySpec] = field(default_factory=dict)
+    errors: dict[Path, str] = field(default_factory=dict)
+    missing_fields: Counter = field(default_factory=Counter)
+    cache_hits: int = 0
+    parsed: int = 0
+
+    def warning_summary(self) -> list[str]:
+        """One line per missing optional field (instead of one per file)."""
+        total = len(self.specs)
+        return [
+            f"{count} of {total} specs have no '{name}' - using the default value"
+            for name, count in sorted(self.missing_fields.items(), key=lambda item: _FIELD_NAMES.index(item[0]))
+        ]
+
+
+@traced("input.load_spec_library")
+def load_spec_library(
+    root: Path,
+    recursive: bool = True,
+    use_cache: bool = True,
+    cache_path: Optional[Path] = None,
+    max_workers: Optional[int] = None,
+    frozen: bool = False,
+) -> SpecLibrary:
+    """
+    Load every spec in a folder, reusing the parsed-spec cache.
+
+    Errors don't stop the load: each bad file is reported in
+    SpecLibrary.errors, and the caller decides what to do with them.
+
+    Args:
+        root: Library folder (or a single spec file - never cached)
+        recursive: Also load specs from subfolders
+        use_cache: Read and update the parsed-spec cache
+        cache_path: Cache file (default: <root>/.spec_cache.json)
+        max_workers: Process pool size (None = one per CPU, 1 = no pool)
+        frozen: Return FrozenCharacterSpecs (much smaller for big libraries)
+
+    Returns:
+        SpecLibrary with the specs, errors, and warning counts
+
+    Raises:
+        FileNotFoundError: If root doesn't exist
+    """
+    root = Path(root)
+    paths = discover_spec_files(root, recursive=recursive)
+    library = SpecLibrary(root=root)
+
+    use_cache = use_cache and root.is_dir()
+    cache_path = cache_path or root / SPEC_CACHE_NAME
+    cached = _load_cache(cache_path) if use_cache else {}
+
+    # Step 1: Keep every file whose cache row is still current
+    rows: dict[str, list[Any]] = {}
+    to_parse: list[tuple[str, Path]] = []
+    touched = False
+    with span("input.check_spec_cache", files=len(paths)):
+        for path in paths:
+            key = path.relative_to(root).as_posix() if use_cache else str(path)
+            if not use_cache:
+                to_parse.append((key, path))
+                continue
+            row = cached.get(key)
+            stat = path.stat()
+            hit = _is_current(row, path, stat)
+            record_cache_lookup("spec_library", hit=hit)
+            if hit:
+                if row[0] != stat.st_mtime_ns:
+                    row[0] = stat.st_mtime_ns  # Same content, new mtime
+                    touched = True
+                rows[key] = row
+                library.cache_hits += 1
+            else:
+                to_parse.append((key, path))
+
+    # Step 2: Parse the rest (in parallel for big libraries)
+    if to_parse:
+        with span("input.parse_specs", files=len(to_parse)):
+            for (key, _), row in zip(to_parse, _parse_all([str(p) for _, p in to_parse], max_workers)):
+                rows[key] = row
+        library.parsed = len(to_parse)
+
+    # Step 3: Build the specs and count warnings, in path order
+    spec_class = FrozenCharacterSpec if frozen else CharacterSpec
+    for path in paths:
+        key = path.relative_to(root).as_posix() if use_cache else str(path)
+        _, _, _, values, extra = rows[key]
+        if values is None:
+            library.errors[path] = extra
+            continue
+        library.specs[path] = spec_class(**dict(zip(_FIELD_NAMES, values)))
+        library.missing_fields.update(extra)
+
+    # Step 4: Save the cache (only rows for files that still exist)
+    if use_cache and (to_parse or touched or rows.keys() != cached.keys()):
+        _save_cache(cache_path, rows)
+
+    return library
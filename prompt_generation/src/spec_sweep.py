@@ -0,0 +1,239 @@
+# spec_sweep.py - Spec Variant Sweeps for Prompt Studies
+#
+# Pipeline Stage: INPUT (many CharacterSpecs from one base spec)
+#
+# A sweep file lists a base character and the fields to vary:
+#
+#   base: ../aethel.yaml            # spec file (relative to this file),
+#                                   # or the spec fields inline
+#   axes:
+#     game_style:
+#       - "stylized sci-fi"
+#       - "painterly fantasy"
+#     color_palette:                # list fields take a list per value
+#       - ["teal", "black"]
+#       - ["crimson", "gold"]
+#     silhouette:
+#       - "tall, long coat"
+#       - "short, bulky armor"
+#
+# expand_sweep() yields every combination (here 2 x 2 x 2 = 8 variants)
+# ONE AT A TIME, so a sweep with thousands of variants never sits in
+# memory as a list. Each variant carries a content hash of its spec:
+#   - combinations that produce the same spec are skipped
+#   - the `sweep` command records finished hashes in variants.jsonl, so
+#     an interrupted run picks up where it stopped
+#
+# Usage:
+#   uv run generate_prompts.py sweep -i configs/sweeps/aethel_study.yaml
+
+import itertools
+import json
+import math
+from dataclasses import dataclass, field, fields, replace
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+from .models import (
+    LIST_FIELDS,
+    CharacterSpec,
+    FrozenCharacterSpec,
+    freeze_spec,
+    load_character_spec,
+    parse_spec_content,
+    spec_from_dict,
+    spec_hash,
+)
+
+
+# -----------------------------------------------------------------------------
+# CONFIGURATION
+# -----------------------------------------------------------------------------
+
+# Fields that can be swept (name stays fixed - it names the output files)
+SWEEPABLE_FIELDS = tuple(f.name for f in fields(CharacterSpec) if f.name != "name")
+
+# One line per finished variant (hash, index, overrides) - the resume log
+VARIANTS_LOG_NAME = "variants.jsonl"
+
+
+# -----------------------------------------------------------------------------
+# DATA CLASSES
+# -----------------------------------------------------------------------------
+
+@dataclass
+class SweepSpec:
+    """
+    A parsed sweep file.
+
+    Attributes:
+        base: The spec every variant starts from
+        axes: Field name → values to try (in file order)
+        source: The sweep file (None for sweeps built in code)
+    """
+    base: CharacterSpec
+    axes: dict[str, list[Any]] = field(default_factory=dict)
+    source: Optional[Path] = None
+
+    @property
+    def num_combinations(self) -> int:
+        """Size of the Cartesian product (before duplicates are skipped)."""
+        return math.prod(len(values) for values in self.axes.values())
+
+
+@dataclass
+class SpecVariant:
+    """
+    One point of a sweep.
+
+    Attributes:
+        index: Position in the Cartesian product (stable for a given file)
+        spec: The base spec with this variant's overrides applied (frozen:
+              list fields are tuples, repeated strings are shared, so a
+              big sweep held in memory stays small)
+        overrides: Field → value for each axis
+        content_hash: spec_hash(spec) - identical specs share a hash
+    """
+    index: int
+    spec: FrozenCharacterSpec
+    overrides: dict[str, Any]
+    content_hash: str
+
+
+# -----------------------------------------------------------------------------
+# LOADING
+# -----------------------------------------------------------------------------
+
+def _check_axis(name: str, values: Any) -> list[Any]:
+    """Validate one axis and return its values."""
+    if name not in SWEEPABLE_FIELDS:
+        raise ValueError(
+            f"Unknown sweep axis: {name}. "
+            f"Valid options: {', '.join(SWEEPABLE_FIELDS)}"
+        )
+    if not isinstance(values, list) or not values:
+        raise ValueError(f"Sweep axis '{name}' must be a non-empty list of values")
+
+    for value in values:
+        if name in LIST_FIELDS:
+            if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+                raise ValueError(f"Each value of sweep axis '{name}' must be a list of strings, got {value!r}")
+        elif not isinstance(value, str):
+            raise ValueError(f"Each value of sweep axis '{name}' must be a string, got {value!r}")
+    return values
+
+
+def load_sweep(path: Path) -> SweepSpec:
+    """
+    Load a sweep file (YAML or JSON).
+
+    Args:
+        path: Sweep file with "base" and "axes" keys
+
+    Returns:
+        SweepSpec ready for expand_sweep()
+
+    Raises:
+        FileNotFoundError: If the sweep file or its base spec doesn't exist
+        ValueError: If the file is malformed (unknown axis, bad values, ...)
+    """
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"Sweep file not found: {path}")
+
+    # Same parser (and clean YAML errors) as spec files
+    try:
+        data = parse_spec_content(path.read_text(encoding="utf-8"), path.suffix)
+    except ValueError as e:
+        raise ValueError(f"Sweep file {path}: {e}") from e
+
+    if "base" not in data or "axes" not in data:
+        raise ValueError(f"Sweep file {path} needs 'base' and 'axes' keys")
+
+    # base: a path to a spec file, or the spec fields inline
+    base = data["base"]
+    if isinstance(base, str):
+        base_spec = load_character_spec(path.parent / base)
+    elif isinstance(base, dict):
+        base_spec = spec_from_dict(base)
+    else:
+        raise ValueError("Sweep 'base' must be a spec file path or a mapping of spec fields")
+
+    axes = data["axes"]
+    if not isinstance(axes, dict) or not axes:
+        raise ValueError("Sweep 'axes' must map at least one field to a list of values")
+
+    return SweepSpec(
+        base=base_spec,
+        axes={name: _check_axis(name, values) for name, values in axes.items()},
+        source=path,
+    )
+
+
+# -----------------------------------------------------------------------------
+# EXPANSION
+# -----------------------------------------------------------------------------
+
+def expand_sweep(sweep: SweepSpec, skip_hashes: Optional[set[str]] = None) -> Iterator[SpecVariant]:
+    """
+    Yield every distinct variant of a sweep, lazily.
+
+    itertools.product walks the combinations in order without building
+    them all first. A variant is skipped if its spec matches one already
+    yielded, or if its hash is in skip_hashes (finished in an earlier run).
+
+    Args:
+        sweep: The sweep to expand
+        skip_hashes: Content hashes to skip (e.g., from read_finished_hashes())
+
+    Yields:
+        SpecVariant for each new spec
+    """
+    seen = set(skip_hashes or ())
+    names = list(sweep.axes)
+    base = freeze_spec(sweep.base)
+
+    for index, values in enumerate(itertools.product(*sweep.axes.values())):
+        # Copy list values so the recorded overrides never share one list
+        # (the spec itself gets tuples)
+        overrides = {
+            name: list(value) if isinstance(value, list) else value
+            for name, value in zip(names, values)
+        }
+        spec = replace(base, **overrides)
+        content_hash = spec_hash(spec)
+        if content_hash in seen:
+            continue
+        seen.add(content_hash)
+        yield SpecVariant(index=index, spec=spec, overrides=overrides, content_hash=content_hash)
+
+
+# -----------------------------------------------------------------------------
+# RESUME LOG
+# -----------------------------------------------------------------------------
+
+def read_finished_hashes(sweep_dir: Path) -> set[str]:
+    """
+    Hashes of variants an earlier run already wrote.
+
+    A torn last line (the run was killed mid-write) is ignored, so that
+    variant is simply generated again.
+    """
+    log_path = sweep_dir / VARIANTS_LOG_NAME
+    if not log_path.exists():
+        return set()
+
+    finished = set()
+    for line in log_path.read_text(encoding="utf-8").splitlines():
+        try:
+            finished.add(json.loads(line)["hash"])
+        except (ValueError, KeyError, TypeError):
+            continue
+    return finished
+
+
+def record_finished_variant(sweep_dir: Path, variant: SpecVariant) -> None:
+    """Append a finished variant to variants.jsonl (after its files are written)."""
+    entry = {"hash": variant.content_hash, "index": variant.index, "overrides": variant.overrides}
+    with (sweep_dir / VARIANTS_LOG_NAME).open("a", encoding="utf-8") as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
@@ -12,126 +12,67 @@
 #   - {name}_2d_base_{version}.txt   - Full-body concept prompt
 #   - {name}_2d_sheet_{version}.txt  - Multi-view character sheet prompt
 
-from typing import Optional
+from typing import Mapping, Optional
 
 from .models import CharacterSpec
+from .tracing import traced
+
+# The format_* helpers live with the template engine now; they are
+# re-exported here because stage 2a/3/4 (and older scripts) import them
+# from this module.
+from .prompt_templates import (  # noqa: F401 - re-exported
+    compile_template,
+    spec_fields,
+    format_color_palette,
+    format_key_props,
+    format_animation_focus,
+    format_extra_notes,
+)
 
 
 # -----------------------------------------------------------------------------
-# HELPER FUNCTIONS: Format CharacterSpec fields for use in prompts
+# STAGE 1 TEMPLATES
 # -----------------------------------------------------------------------------
-# These functions convert raw data into natural-sounding prompt phrases.
-# Keeping them separate makes the code easier to test and modify.
-
-def format_color_palette(colors: list[str]) -> str:
-    """
-    Format a list of colors into a comma-separated string.
-    
-    Args:
-        colors: List of color strings, e.g., ["teal", "black", "orange accents"]
-        
-    Returns:
-        A formatted string like "teal, black, orange accents"
-        Returns "unspecified" if the list is empty.
-        
-    Example:
-        >>> format_color_palette(["red", "blue"])
-        "red, blue"
-        >>> format_color_palette([])
-        "unspecified"
-    """
-    # Handle empty list case - return a placeholder
-    if not colors:
-        return "unspecified"
-    
-    # Join list items with ", " separator
-    # ["a", "b", "c"] -> "a, b, c"
-    return ", ".join(colors)
-
-
-def format_key_props(props: list[str]) -> str:
-    """
-    Format a list of props into a natural English phrase.
-    
-    We want prompts to read naturally, so we add "a/an" and "and".
-    
-    Args:
-        props: List of prop strings, e.g., ["data tablet", "scanner"]
-        
-    Returns:
-        A natural phrase like "a data tablet and a scanner"
-        Returns empty string if no props.
-        
-    Examples:
-        >>> format_key_props([])
-        ""
-        >>> format_key_props(["sword"])
-        "a sword"
-        >>> format_key_props(["sword", "shield"])
-        "a sword and a shield"
-        >>> format_key_props(["sword", "shield", "helmet"])
-        "a sword, a shield, and a helmet"
-    """
-    # Case 1: Empty list - return empty string to allow conditional checks
-    if not props:
-        return ""
-    
-    # Case 2: Single item - just add "a"
-    if len(props) == 1:
-        return f"a {props[0]}"
-    
-    # Case 3: Two items - use "and" between them
-    if len(props) == 2:
-        return f"a {props[0]} and a {props[1]}"
-    
-    # Case 4: Three or more items - use Oxford comma style
-    # ["X", "Y", "Z"] -> "a X, a Y, and a Z"
-    
-    # Add "a " to each item except the last
-    items_with_article = [f"a {prop}" for prop in props[:-1]]
-    
-    # Join them with commas, then add ", and a <last item>"
-    return ", ".join(items_with_article) + f", and a {props[-1]}"
-
-
-def format_animation_focus(anims: list[str]) -> str:
-    """
-    Format animation types into a comma-separated string.
-    
-    Args:
-        anims: List of animation types, e.g., ["walk", "idle", "attack"]
-        
-    Returns:
-        A formatted string like "walk, idle, attack"
-        Returns "standard animations" if the list is empty.
-    """
-    if not anims:
-        return "standard animations"
-    
-    return ", ".join(anims)
-
-
-def format_extra_notes(notes: Optional[str]) -> str:
-    """
-    Format extra notes, handling None values.
-    
-    Args:
-        notes: Optional string with extra notes
-        
-    Returns:
-        The notes string, or empty string if notes is None/empty
-    """
-    # In Python, empty strings and None are both "falsy"
-    # So "if notes" handles both cases
-    # Return empty string to allow conditional checks in calling code
-    return notes if notes else ""
+# Compiled once at import time. {placeholders} are the fields listed in
+# prompt_templates.SPEC_FIELD_NAMES - e.g. {colors} is the formatted
+# color palette and {props_clause} is "holding <props>, " (or nothing).
+
+BASE_2D_FULL_BODY_TEMPLATE = compile_template("base_2d_full_body", (
+    "full-body concept art of a {role}, "     # WHO: Character role
+    "{game_style}, "                           # STYLE: Visual style
+    "{silhouette}, "                           # SHAPE: Body description
+    "color palette {colors}, "                 # COLORS: Main colors
+    "{props_clause}"                           # PROPS: "holding ..., " if any
+    "front view, "                             # ANGLE: Camera angle
+    "neutral pose, "                           # POSE: Standing pose
+    "simple background, "                      # BG: Clean background
+    "high detail, "                            # QUALITY: Detail level
+    "game-ready character concept, "           # PURPOSE: Game art
+    "no text, no logo"                         # EXCLUDE: Unwanted elements
+))
+
+BASE_2D_SHEET_TEMPLATE = compile_template("base_2d_sheet", (
+    "character sheet of {name}, "              # WHO: Character name
+    "a {role}, "                               # ROLE: What they do
+    "{game_style}, "                           # STYLE: Visual style
+    "including front and side views on a single canvas, "  # VIEWS: Multiple angles
+    "clear {silhouette}, "                     # SHAPE: Distinct silhouette
+    "neutral pose, "                           # POSE: Standard pose
+    "simple light background, "                # BG: Clean background
+    "high detail, "                            # QUALITY: Detail level
+    "consistent design, "                      # CONSISTENCY: Same across views
+    "no text, no logo"                         # EXCLUDE: Unwanted elements
+))
 
 
 # -----------------------------------------------------------------------------
 # STAGE 1 PROMPT GENERATORS
 # -----------------------------------------------------------------------------
 
-def generate_base_2d_full_body(spec: CharacterSpec) -> str:
+def generate_base_2d_full_body(
+    spec: CharacterSpec,
+    fields: Optional[Mapping[str, str]] = None,
+) -> str:
     """
     Generate a base 2D full-body concept art prompt.
     
@@ -146,40 +87,18 @@ def generate_base_2d_full_body(spec: CharacterSpec) -> str:
          
     Args:
         spec: The character specification
+        fields: Pre-formatted fields from spec_fields(spec) (computed if omitted)
         
     Returns:
         A formatted prompt string ready to paste into any 2D image generator
     """
-    # Pre-format the spec fields using our helper functions
-    color_str = format_color_palette(spec.color_palette)
-    props_str = format_key_props(spec.key_props)
-    
-    # Build the prompt using an f-string
-    # We break it into multiple lines for readability (Python joins them)
-    prompt = (
-        f"full-body concept art of a {spec.role}, "      # WHO: Character role
-        f"{spec.game_style}, "                            # STYLE: Visual style
-        f"{spec.silhouette}, "                            # SHAPE: Body description
-        f"color palette {color_str}, "                    # COLORS: Main colors
-    )
-    
-    # Add props if present
-    if props_str:
-        prompt += f"holding {props_str}, "
-    
-    prompt += (
-        f"front view, "                                   # ANGLE: Camera angle
-        f"neutral pose, "                                 # POSE: Standing pose
-        f"simple background, "                            # BG: Clean background
-        f"high detail, "                                  # QUALITY: Detail level
-        f"game-ready character concept, "                 # PURPOSE: Game art
-        f"no text, no logo"                               # EXCLUDE: Unwanted elements
-    )
-    
-    return prompt
+    return BASE_2D_FULL_BODY_TEMPLATE.render(fields or spec_fields(spec))
 
 
-def generate_base_2d_sheet(spec: CharacterSpec) -> str:
+def generate_base_2d_sheet(
+    spec: CharacterSpec,
+    fields: Optional[Mapping[str, str]] = None,
+) -> str:
     """
     Generate a base 2D character sheet prompt (multi-view).
     
@@ -194,31 +113,23 @@ def generate_base_2d_sheet(spec: CharacterSpec) -> str:
          
     Args:
         spec: The character specification
+        fields: Pre-formatted fields from spec_fields(spec) (computed if omitted)
         
     Returns:
         A formatted prompt string for generating a character sheet
     """
-    prompt = (
-        f"character sheet of {spec.name}, "              # WHO: Character name
-        f"a {spec.role}, "                               # ROLE: What they do
-        f"{spec.game_style}, "                           # STYLE: Visual style
-        f"including front and side views on a single canvas, "  # VIEWS: Multiple angles
-        f"clear {spec.silhouette}, "                     # SHAPE: Distinct silhouette
-        f"neutral pose, "                                # POSE: Standard pose
-        f"simple light background, "                     # BG: Clean background
-        f"high detail, "                                 # QUALITY: Detail level
-        f"consistent design, "                           # CONSISTENCY: Same across views
-        f"no text, no logo"                              # EXCLUDE: Unwanted elements
-    )
-    
-    return prompt
+    return BASE_2D_SHEET_TEMPLATE.render(fields or spec_fields(spec))
 
 
 # -----------------------------------------------------------------------------
 # MAIN EXPORT FUNCTION
 # -----------------------------------------------------------------------------
 
-def generate_base_prompts(spec: CharacterSpec) -> dict[str, str]:
+@traced("stage1.generate_base_prompts")
+def generate_base_prompts(
+    spec: CharacterSpec,
+    fields: Optional[Mapping[str, str]] = None,
+) -> dict[str, str]:
     """
     Generate all Stage 1 (Base 2D) prompts for a character.
     
@@ -227,6 +138,8 @@ def generate_base_prompts(spec: CharacterSpec) -> dict[str, str]:
     
     Args:
         spec: The character specification
+        fields: Pre-formatted fields from spec_fields(spec), so several
+                stages can share one formatting pass (computed if omitted)
         
     Returns:
         A dictionary with keys:
@@ -238,8 +151,9 @@ def generate_base_prompts(spec: CharacterSpec) -> dict[str, str]:
         >>> print(prompts["base_2d_full_body"])
         "full-body concept art of a..."
     """
+    fields = fields or spec_fields(spec)
     return {
-        "base_2d_full_body": generate_base_2d_full_body(spec),
-        "base_2d_sheet": generate_base_2d_sheet(spec),
+        "base_2d_full_body": generate_base_2d_full_body(spec, fields),
+        "base_2d_sheet": generate_base_2d_sheet(spec, fields),
     }
 
@@ -16,23 +16,62 @@
 #   - {name}_2d_refiner_{version}.txt   - Meta-prompt for prompt refinement
 #   - {name}_tpose_prompt_{version}.txt - Meta-prompt for T-pose generation
 
+from typing import Mapping, Optional
+
 from .models import CharacterSpec
+from .tracing import traced
+from .prompt_templates import compile_template, spec_fields
+
+
+# -----------------------------------------------------------------------------
+# STAGE 2 TEMPLATES
+# -----------------------------------------------------------------------------
+# Compiled once at import time (see prompt_templates.py for the fields).
+# Each meta-prompt is structured as:
+#   1. Role assignment (tell Gemini who to be)
+#   2. Task description (what to do)
+#   3. Character spec data (the information to work with)
+
+# Part 3 is the same in both meta-prompts
+SPEC_SUMMARY = """Character spec:
+
+* Name: {name}
+* Role: {role}
+* Game style: {game_style}
+* Silhouette: {silhouette}
+* Color palette: {colors}
+* Key props: {props}
+* Animation focus: {animations}
+* Extra notes: {notes}"""
+
+GEMINI_2D_REFINER_TEMPLATE = compile_template("gemini_2d_refiner", """You are an expert game art prompt engineer. Given the following character specification, rewrite and refine a prompt for a 2D image model to produce a clean, full-body front-view concept of this character. The result must be suitable as reference for 3D modeling (clear silhouette, neutral pose, simple background, no overlays or text). Output only the final refined prompt, with no explanation.
+
+""" + SPEC_SUMMARY)
+
+# We list the T-pose requirements explicitly so Gemini includes them
+GEMINI_TPOSE_TEMPLATE = compile_template("gemini_tpose_prompt", """You are a prompt engineer helping a game artist generate a T-pose reference image for 3D character modeling. Using the character specification below, produce a single, detailed prompt for a 2D image model that will generate a full-body T-pose of this character. Requirements:
+
+* Neutral T-pose (arms extended horizontally).
+* Full body visible, front view.
+* Legs clearly visible, no cropping of feet or hands.
+* Simple, clean background (flat grey or white).
+* Even, neutral lighting (no heavy shadows or dramatic color lighting).
+* No UI, overlays in the image.
+* Design consistent with the game style and color palette.
+
+Output only the final T-pose image prompt, no explanation.
 
-# Import helper functions from stage1 to avoid code duplication
-# DRY principle: Don't Repeat Yourself
-from .stage1_base_prompts import (
-    format_color_palette,
-    format_key_props,
-    format_animation_focus,
-    format_extra_notes,
-)
+""" + SPEC_SUMMARY)
 
 
 # -----------------------------------------------------------------------------
 # STAGE 2 PROMPT GENERATORS
 # -----------------------------------------------------------------------------
 
-def generate_gemini_2d_refiner(spec: CharacterSpec) -> str:
+def generate_gemini_2d_refiner(
+    spec: CharacterSpec,
+    fields: Optional[Mapping[str, str]] = None,
+) -> str:
     """
     Generate a meta-prompt for Gemini to refine 2D image prompts.
     
@@ -51,39 +90,18 @@ def generate_gemini_2d_refiner(spec: CharacterSpec) -> str:
     
     Args:
         spec: The character specification
+        fields: Pre-formatted fields from spec_fields(spec) (computed if omitted)
         
     Returns:
         A meta-prompt string to paste into Gemini NanoBanana Pro
     """
-    # Pre-format all the spec fields
-    color_str = format_color_palette(spec.color_palette)
-    props_str = format_key_props(spec.key_props)
-    anim_str = format_animation_focus(spec.animation_focus)
-    notes_str = format_extra_notes(spec.extra_notes)
-    
-    # Build the meta-prompt using a multi-line f-string
-    # We structure it as:
-    #   1. Role assignment (tell Gemini who to be)
-    #   2. Task description (what to do)
-    #   3. Character spec data (the information to work with)
-    
-    prompt = f"""You are an expert game art prompt engineer. Given the following character specification, rewrite and refine a prompt for a 2D image model to produce a clean, full-body front-view concept of this character. The result must be suitable as reference for 3D modeling (clear silhouette, neutral pose, simple background, no overlays or text). Output only the final refined prompt, with no explanation.
-
-Character spec:
-
-* Name: {spec.name}
-* Role: {spec.role}
-* Game style: {spec.game_style}
-* Silhouette: {spec.silhouette}
-* Color palette: {color_str}
-* Key props: {props_str}
-* Animation focus: {anim_str}
-* Extra notes: {notes_str}"""
-    
-    return prompt
+    return GEMINI_2D_REFINER_TEMPLATE.render(fields or spec_fields(spec))
 
 
-def generate_gemini_tpose_prompt(spec: CharacterSpec) -> str:
+def generate_gemini_tpose_prompt(
+    spec: CharacterSpec,
+    fields: Optional[Mapping[str, str]] = None,
+) -> str:
     """
     Generate a meta-prompt for Gemini to create a T-pose image prompt.
     
@@ -103,50 +121,23 @@ def generate_gemini_tpose_prompt(spec: CharacterSpec) -> str:
     
     Args:
         spec: The character specification
+        fields: Pre-formatted fields from spec_fields(spec) (computed if omitted)
         
     Returns:
         A meta-prompt string for T-pose generation
     """
-    # Pre-format all the spec fields
-    color_str = format_color_palette(spec.color_palette)
-    props_str = format_key_props(spec.key_props)
-    anim_str = format_animation_focus(spec.animation_focus)
-    notes_str = format_extra_notes(spec.extra_notes)
-    
-    # Build the meta-prompt with specific T-pose requirements
-    # We list the requirements explicitly so Gemini includes them
-    
-    prompt = f"""You are a prompt engineer helping a game artist generate a T-pose reference image for 3D character modeling. Using the character specification below, produce a single, detailed prompt for a 2D image model that will generate a full-body T-pose of this character. Requirements:
-
-* Neutral T-pose (arms extended horizontally).
-* Full body visible, front view.
-* Legs clearly visible, no cropping of feet or hands.
-* Simple, clean background (flat grey or white).
-* Even, neutral lighting (no heavy shadows or dramatic color lighting).
-* No UI, overlays in the image.
-* Design consistent with the game style and color palette.
-
-Output only the final T-pose image prompt, no explanation.
-
-Character spec:
-
-* Name: {spec.name}
-* Role: {spec.role}
-* Game style: {spec.game_style}
-* Silhouette: {spec.silhouette}
-* Color palette: {color_str}
-* Key props: {props_str}
-* Animation focus: {anim_str}
-* Extra notes: {notes_str}"""
-    
-    return prompt
+    return GEMINI_TPOSE_TEMPLATE.render(fields or spec_fields(spec))
 
 
 # -----------------------------------------------------------------------------
 # MAIN EXPORT FUNCTION
 # -----------------------------------------------------------------------------
 
-def generate_gemini_prompts(spec: CharacterSpec) -> dict[str, str]:
+@traced("stage2a.generate_gemini_prompts")
+def generate_gemini_prompts(
+    spec: CharacterSpec,
+    fields: Optional[Mapping[str, str]] = None,
+) -> dict[str, str]:
     """
     Generate all Stage 2 (Gemini) prompts for a character.
     
@@ -155,6 +146,8 @@ def generate_gemini_prompts(spec: CharacterSpec) -> dict[str, str]:
     
     Args:
         spec: The character specification
+        fields: Pre-formatted fields from spec_fields(spec), so several
+                stages can share one formatting pass (computed if omitted)
         
     Returns:
         A dictionary with keys:
@@ -167,8 +160,9 @@ def generate_gemini_prompts(spec: CharacterSpec) -> dict[str, str]:
         3. Copy "gemini_tpose_prompt" into Gemini → get T-pose prompt
         4. Use Gemini's output in your 2D image generator
     """
+    fields = fields or spec_fields(spec)
     return {
-        "gemini_2d_refiner": generate_gemini_2d_refiner(spec),
-        "gemini_tpose_prompt": generate_gemini_tpose_prompt(spec),
+        "gemini_2d_refiner": generate_gemini_2d_refiner(spec, fields),
+        "gemini_tpose_prompt": generate_gemini_tpose_prompt(spec, fields),
     }
 
@@ -21,15 +21,45 @@
 #   
 #   See: https://platform.openai.com/docs/guides/tools-web-search
 #
+# PROMPT CACHING:
+#   Each character needs 4 calls (concept + 3 T-pose views) that share the
+#   same long system prompt. The system prompt is sent as `instructions`
+#   (never pasted into the input) and every T-pose request puts the part
+#   that changes - the view - LAST. That keeps the start of every request
+#   byte-identical, so OpenAI's automatic prompt caching can reuse it:
+#   cached input tokens are cheaper and faster. Caching only kicks in once
+#   the shared prefix reaches 1,024 tokens; `refine --preview` shows the
+#   estimated sizes.
+#
+# REFINEMENT MODES:
+#   per-view  4 requests: concept + front/side/back T-pose (default)
+#   single    1 request that returns all four prompts as JSON, validated
+#             against REFINED_PROMPTS_SCHEMA. The model reads the spec and
+#             reasons about the character once, which keeps the views
+#             consistent. Falls back to per-view if the JSON is unusable.
+#
+# STREAMING (refine --stream):
+#   Responses are streamed and written to "<file>.partial" as the text
+#   arrives, then renamed to the final file when complete (see
+#   StreamingFileWriter). A live line shows progress per prompt. If a
+#   stream times out, the .partial file is kept for inspection.
+#
 # Output:
 #   - Refined prompts ready to use directly in image generators
 #   - T-pose specific prompts for 3D modeling reference
+#   - Token usage (input / cached / output / reasoning) per call and per run
 
+import json
 import os
-from dataclasses import dataclass
-from typing import Optional
+import re
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Optional
 
+from .file_utils import StreamingFileWriter
 from .models import CharacterSpec
+from .tracing import traced, span, current_span
 from .stage1_base_prompts import (
     format_color_palette,
     format_key_props,
@@ -69,11 +99,102 @@ DEFAULT_MODEL = "gpt-5.2"
 # Responses API is recommended for GPT-5 models with web_search tool
 USE_RESPONSES_API = True
 
+# Routing hint for OpenAI's prompt cache: requests with the same key and
+# the same prefix land on the same cache. One key per system prompt.
+PROMPT_CACHE_KEY_PREFIX = "character-prompt-refiner"
+
+# OpenAI only caches prompts whose shared prefix is at least this long
+PROMPT_CACHE_MIN_TOKENS = 1024
+
+# Rough characters-per-token ratio for English prompts (size estimates only)
+CHARS_PER_TOKEN = 4
+
+# Refinement modes (see the header comment)
+REFINE_MODES = ("per-view", "single")
+DEFAULT_REFINE_MODE = "per-view"
+
+# The four prompts, in order. These are also the JSON keys in single mode.
+PROMPT_FIELDS = ("concept_prompt", "tpose_front", "tpose_side", "tpose_back")
+
+# Prompt field → key in refine_prompts_to_dict() (and file_utils.PROMPT_FILE_MAP)
+PROMPT_FILE_KEYS = {
+    "concept_prompt": "refined_concept",
+    "tpose_front": "refined_tpose_front",
+    "tpose_side": "refined_tpose_side",
+    "tpose_back": "refined_tpose_back",
+}
+
+# Streaming: give up if no data arrives for this many seconds (the
+# partial output written so far is kept)
+STREAM_IDLE_TIMEOUT = 60.0
+
+# Structured output schema for single mode (strict mode requires every
+# property to be required and no extras)
+REFINED_PROMPTS_SCHEMA = {
+    "type": "object",
+    "properties": {name: {"type": "string"} for name in PROMPT_FIELDS},
+    "required": list(PROMPT_FIELDS),
+    "additionalProperties": False,
+}
+
 
 # -----------------------------------------------------------------------------
 # DATA CLASSES
 # -----------------------------------------------------------------------------
 
+@dataclass
+class TokenUsage:
+    """
+    Token counts for one or more LLM calls.
+    
+    cached_tokens is the part of input_tokens served from the provider's
+    prompt cache; reasoning_tokens is the part of output_tokens the model
+    spent thinking (billed, but not in the returned text).
+    
+    Attributes:
+        input_tokens: Prompt tokens (including cached)
+        output_tokens: Completion tokens (including reasoning)
+        cached_tokens: Input tokens that hit the prompt cache
+        reasoning_tokens: Output tokens used for reasoning
+        calls: Number of API calls counted
+    """
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_tokens: int = 0
+    reasoning_tokens: int = 0
+    calls: int = 0
+    
+    @property
+    def cache_hit_rate(self) -> float:
+        """Fraction of input tokens served from the cache (0.0 - 1.0)."""
+        return self.cached_tokens / self.input_tokens if self.input_tokens else 0.0
+    
+    def add(self, other: "TokenUsage") -> None:
+        """Add another usage record to this one (for per-run totals)."""
+        self.input_tokens += other.input_tokens
+        self.output_tokens += other.output_tokens
+        self.cached_tokens += other.cached_tokens
+        self.reasoning_tokens += other.reasoning_tokens
+        self.calls += other.calls
+    
+    def span_args(self) -> dict[str, int]:
+        """The counts as span args (picked up by trace.json, metrics, and the ledger)."""
+        return {
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cached_tokens": self.cached_tokens,
+            "reasoning_tokens": self.reasoning_tokens,
+        }
+    
+    def summary(self) -> str:
+        """One-line summary, e.g. "4 calls, 5,210 in (3,072 cached, 59%), 1,840 out (1,200 reasoning)"."""
+        return (
+            f"{self.calls} call{'s' if self.calls != 1 else ''}, "
+            f"{self.input_tokens:,} in ({self.cached_tokens:,} cached, {self.cache_hit_rate:.0%}), "
+            f"{self.output_tokens:,} out ({self.reasoning_tokens:,} reasoning)"
+        )
+
+
 @dataclass
 class RefinedPrompts:
     """
@@ -89,6 +210,11 @@ class RefinedPrompts:
         tpose_back: T-pose back view prompt
         model_used: Which LLM model was used
         web_search_used: Whether web search was enabled
+        usage: Token usage summed over all calls
+        mode_used: "per-view" or "single" (after any fallback)
+        wall_seconds: Wall-clock time for the whole refinement
+        first_output_seconds: Time until the first prompt text was
+            available (first streamed delta, or first finished call)
     """
     concept_prompt: str
     tpose_front: str
@@ -96,6 +222,15 @@ class RefinedPrompts:
     tpose_back: str
     model_used: str
     web_search_used: bool
+    usage: TokenUsage = field(default_factory=TokenUsage)
+    mode_used: str = DEFAULT_REFINE_MODE
+    wall_seconds: float = 0.0
+    first_output_seconds: Optional[float] = None
+    
+    @property
+    def view_consistency(self) -> float:
+        """How much the three T-pose prompts agree (see view_consistency())."""
+        return view_consistency([self.tpose_front, self.tpose_side, self.tpose_back])
 
 
 # -----------------------------------------------------------------------------
@@ -196,10 +331,12 @@ def build_tpose_request(spec: CharacterSpec, view: str) -> str:
         "back": "BACK VIEW - character facing away from camera",
     }
     
+    # The view goes LAST: everything before it is identical for the three
+    # T-pose calls of a character, so the provider can cache that prefix.
     return f"""You are a prompt engineer helping a game artist generate a T-pose reference image for 3D character modeling. Using the character specification below, produce a single, detailed prompt for a 2D image model that will generate a full-body T-pose of this character. Requirements:
 ## follow best practices for gemini-3-pro-image-preview model ##
 * Neutral T-pose (arms extended horizontally).
-* Full body visible, {view_descriptions.get(view, view)} No cropping of feet or hands.
+* Full body visible in the view given at the end. No cropping of feet or hands.
 * Legs clearly visible, no cropping of feet or hands.
 * CRITICAL: Knee structure must be visible, full leg anatomy must be visible.
 * Simple, clean background (flat grey or white).
@@ -220,9 +357,113 @@ Character spec:
 * Key props: {props_str}
 * Animation focus: {anim_str}
 * Extra notes: {notes_str}
+
+View: {view_descriptions.get(view, view)}
 """
 
 
+def build_combined_request(spec: CharacterSpec) -> str:
+    """Build the single-mode user request: all four prompts as one JSON object."""
+    color_str = format_color_palette(spec.color_palette)
+    props_str = format_key_props(spec.key_props)
+    anim_str = format_animation_focus(spec.animation_focus)
+    notes_str = format_extra_notes(spec.extra_notes)
+    
+    return f"""Create four prompts for the character below, for the gemini-3-pro-image-preview model. First decide on ONE consistent design (outfit, materials, colors, props, proportions), then describe that same design in every prompt.
+
+1. concept_prompt: a full-body character concept art, clean and professional, suitable for game development.
+2. tpose_front: T-pose reference, FRONT VIEW - character facing the camera directly.
+3. tpose_side: T-pose reference, SIDE VIEW - character in profile, facing left.
+4. tpose_back: T-pose reference, BACK VIEW - character facing away from camera.
+
+Every T-pose prompt must ask for:
+* Neutral T-pose (arms extended horizontally), full body visible, no cropping of feet or hands.
+* CRITICAL: Knee structure must be visible, full leg anatomy must be visible.
+* Simple, clean background (flat grey or white), even neutral lighting.
+* No UI or overlays. Professional game character art quality.
+
+Character spec:
+
+* Name: {spec.name}
+* Role: {spec.role}
+* Game style: {spec.game_style}
+* Silhouette: {spec.silhouette}
+* Color palette: {color_str}
+* Key props: {props_str}
+* Animation focus: {anim_str}
+* Extra notes: {notes_str}
+
+Return a JSON object with the keys concept_prompt, tpose_front, tpose_side, tpose_back. Each value is the final prompt text only, no explanation.
+"""
+
+
+def parse_refined_json(text: str) -> dict[str, str]:
+    """
+    Parse and validate the single-mode JSON output.
+    
+    Args:
+        text: Model output (should be a JSON object matching REFINED_PROMPTS_SCHEMA)
+        
+    Returns:
+        Dictionary with the four PROMPT_FIELDS
+        
+    Raises:
+        ValueError: If the text isn't JSON or a prompt is missing/empty
+    """
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"output is not valid JSON ({e})")
+    
+    if not isinstance(data, dict):
+        raise ValueError(f"expected a JSON object, got {type(data).__name__}")
+    
+    prompts = {}
+    for name in PROMPT_FIELDS:
+        value = data.get(name)
+        if not isinstance(value, str) or not value.strip():
+            raise ValueError(f"missing or empty '{name}'")
+        prompts[name] = value.strip()
+    return prompts
+
+
+# Words that SHOULD differ between views; ignored when comparing them
+_VIEW_WORDS = {
+    "front", "side", "back", "profile", "facing", "view", "views", "camera",
+    "away", "left", "right", "rear", "behind", "toward", "towards", "directly",
+}
+
+
+def view_consistency(prompts: list[str]) -> float:
+    """
+    Score how consistently several prompts describe the same character.
+    
+    Mean pairwise Jaccard similarity of the descriptive words (4+ letters,
+    view words removed). 1.0 means identical vocabulary; prompts that
+    describe different outfits or colors score lower. A rough signal for
+    comparing refinement modes, not a quality metric.
+    
+    Args:
+        prompts: Two or more prompt texts
+        
+    Returns:
+        Score from 0.0 to 1.0
+    """
+    word_sets = [
+        set(re.findall(r"[a-z]{4,}", prompt.lower())) - _VIEW_WORDS
+        for prompt in prompts
+    ]
+    pairs = [
+        (a, b)
+        for i, a in enumerate(word_sets)
+        for b in word_sets[i + 1:]
+    ]
+    if not pairs:
+        return 1.0
+    scores = [len(a & b) / len(a | b) if a | b else 1.0 for a, b in pairs]
+    return sum(scores) / len(scores)
+
+
 # -----------------------------------------------------------------------------
 # OPENAI API INTEGRATION
 # -----------------------------------------------------------------------------
@@ -249,11 +490,176 @@ def get_openai_api_key() -> str:
     return api_key
 
 
+def system_prompt_for(use_web_search: bool) -> str:
+    """The system prompt (sent as `instructions`) for a request."""
+    return SYSTEM_PROMPT_WITH_SEARCH if use_web_search else SYSTEM_PROMPT_BASE
+
+
+def prompt_cache_key(use_web_search: bool) -> str:
+    """Prompt cache routing key: one per system prompt variant."""
+    return f"{PROMPT_CACHE_KEY_PREFIX}-{'search' if use_web_search else 'base'}"
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for prompt-size budgeting (no tokenizer needed)."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _common_prefix_length(texts: list[str]) -> int:
+    """Length of the longest prefix shared by all texts."""
+    first, last = min(texts), max(texts)
+    length = 0
+    while length < len(first) and first[length] == last[length]:
+        length += 1
+    return length
+
+
+def _responses_usage(usage) -> TokenUsage:
+    """Token usage from a Responses API `usage` object."""
+    input_details = getattr(usage, "input_tokens_details", None)
+    output_details = getattr(usage, "output_tokens_details", None)
+    return TokenUsage(
+        input_tokens=usage.input_tokens or 0,
+        output_tokens=usage.output_tokens or 0,
+        cached_tokens=getattr(input_details, "cached_tokens", 0) or 0,
+        reasoning_tokens=getattr(output_details, "reasoning_tokens", 0) or 0,
+        calls=1,
+    )
+
+
+def _chat_usage(usage) -> TokenUsage:
+    """Token usage from a Chat Completions `usage` object."""
+    prompt_details = getattr(usage, "prompt_tokens_details", None)
+    completion_details = getattr(usage, "completion_tokens_details", None)
+    return TokenUsage(
+        input_tokens=usage.prompt_tokens or 0,
+        output_tokens=usage.completion_tokens or 0,
+        cached_tokens=getattr(prompt_details, "cached_tokens", 0) or 0,
+        reasoning_tokens=getattr(completion_details, "reasoning_tokens", 0) or 0,
+        calls=1,
+    )
+
+
+def build_responses_request(
+    user_message: str,
+    model: str = DEFAULT_MODEL,
+    use_web_search: bool = False,
+    json_schema: Optional[dict] = None,
+) -> dict:
+    """
+    Build the Responses API request body for one refinement call.
+    
+    Shared by the interactive calls and the Batch API (batch_refiner.py),
+    so both send exactly the same request. The system prompt goes in
+    `instructions` so it forms a stable, cacheable prefix ahead of the
+    per-request input.
+    
+    Args:
+        user_message: The user's request (character spec + instructions)
+        model: Model to use
+        use_web_search: Whether to enable the web_search tool
+        json_schema: If given, ask for JSON output matching this schema
+        
+    Returns:
+        Keyword arguments for client.responses.create() (also the JSON body)
+    """
+    request = {
+        "model": model,
+        "instructions": system_prompt_for(use_web_search),
+        "input": user_message,
+        "prompt_cache_key": prompt_cache_key(use_web_search),
+        "reasoning": {"effort": "high"},
+    }
+    
+    # Configure tools
+    if use_web_search:
+        request["tools"] = [{"type": "web_search"}]
+    
+    # Structured output (single mode)
+    if json_schema is not None:
+        request["text"] = {
+            "format": {
+                "type": "json_schema",
+                "name": "refined_prompts",
+                "schema": json_schema,
+                "strict": True,
+            }
+        }
+    
+    return request
+
+
+def _consume_response_stream(
+    stream,
+    on_delta: Callable[[str], None],
+) -> tuple[str, Optional[object]]:
+    """
+    Read a Responses API event stream.
+    
+    Args:
+        stream: Iterable of stream events from responses.create(stream=True)
+        on_delta: Called with each piece of output text as it arrives
+        
+    Returns:
+        (full output text, final response object or None)
+        
+    Raises:
+        RuntimeError: If the stream reports a failure
+    """
+    parts: list[str] = []
+    final = None
+    
+    for event in stream:
+        if event.type == "response.output_text.delta":
+            parts.append(event.delta)
+            on_delta(event.delta)
+        elif event.type == "response.completed":
+            final = event.response
+        elif event.type == "response.failed":
+            error = getattr(event.response, "error", None)
+            raise RuntimeError(f"Streamed response failed: {getattr(error, 'message', error)}")
+        elif event.type == "error":
+            raise RuntimeError(f"Streamed response failed: {getattr(event, 'message', event)}")
+    
+    return "".join(parts), final
+
+
+class _StreamProgress:
+    """One live console line per streamed prompt."""
+    
+    def __init__(self, label: str, on_first_delta: Optional[Callable[[], None]] = None):
+        self.label = label
+        self.chars = 0
+        self.started = time.perf_counter()
+        self.first_delta_seconds: Optional[float] = None
+        self._on_first_delta = on_first_delta
+    
+    def update(self, delta: str) -> None:
+        if self.first_delta_seconds is None:
+            self.first_delta_seconds = time.perf_counter() - self.started
+            current_span().set(first_token_seconds=round(self.first_delta_seconds, 3))
+            if self._on_first_delta:
+                self._on_first_delta()
+        self.chars += len(delta)
+        print(
+            f"\r    {self.label}: {self.chars:,} chars "
+            f"(first text after {self.first_delta_seconds:.1f}s)",
+            end="", flush=True,
+        )
+    
+    def finish(self) -> None:
+        if self.chars:
+            print()
+
+
 def call_openai_responses_api(
     user_message: str,
     api_key: str,
     model: str = DEFAULT_MODEL,
     use_web_search: bool = False,
+    usage: Optional[TokenUsage] = None,
+    json_schema: Optional[dict] = None,
+    on_delta: Optional[Callable[[str], None]] = None,
 ) -> str:
     """
     Call OpenAI using the Responses API (supports web_search tool).
@@ -266,6 +672,10 @@ def call_openai_responses_api(
         api_key: OpenAI API key
         model: Model to use (default: gpt-5)
         use_web_search: Whether to enable web search tool
+        usage: If given, this call's token usage is added to it
+        json_schema: If given, ask for JSON output matching this schema
+        on_delta: If given, stream the response and call this with each
+                  piece of text as it arrives
         
     Returns:
         The generated prompt text
@@ -279,27 +689,32 @@ def call_openai_responses_api(
             "Or: uv add openai"
         )
     
-    client = OpenAI(api_key=api_key)
+    # Streaming: the timeout applies per read, so it's an idle timeout -
+    # a stalled stream fails instead of hanging, keeping what arrived
+    client = OpenAI(
+        api_key=api_key,
+        **({"timeout": STREAM_IDLE_TIMEOUT} if on_delta is not None else {}),
+    )
     
-    # Build the full input with system context
-    system_context = SYSTEM_PROMPT_WITH_SEARCH if use_web_search else SYSTEM_PROMPT_BASE
-    full_input = f"{system_context}\n\n---\n\n{user_message}"
+    request = build_responses_request(user_message, model, use_web_search, json_schema)
     
-    # Configure tools
-    tools = [{"type": "web_search"}] if use_web_search else None
+    if on_delta is not None:
+        text, response = _consume_response_stream(
+            client.responses.create(**request, stream=True), on_delta,
+        )
+    else:
+        response = client.responses.create(**request)
+        text = response.output_text
     
-    # Make the API call using Responses API
-    response = client.responses.create(
-        model=model,
-        input=full_input,
-        tools=tools,
-        reasoning={
-        "effort": "high"
-        }
-    )
+    # Token usage for the run ledger / metrics
+    if getattr(response, "usage", None) is not None:
+        call_usage = _responses_usage(response.usage)
+        current_span().set(**call_usage.span_args())
+        if usage is not None:
+            usage.add(call_usage)
     
     # Extract the response text
-    return response.output_text.strip()
+    return text.strip()
 
 
 def call_openai_chat_completions(
@@ -307,6 +722,8 @@ def call_openai_chat_completions(
     api_key: str,
     model: str = DEFAULT_MODEL,
     use_web_search: bool = False,
+    usage: Optional[TokenUsage] = None,
+    json_schema: Optional[dict] = None,
 ) -> str:
     """
     Call OpenAI using the Chat Completions API (fallback).
@@ -320,6 +737,8 @@ def call_openai_chat_completions(
         api_key: OpenAI API key
         model: Model to use (default: gpt-5)
         use_web_search: Whether web search was requested (not supported here)
+        usage: If given, this call's token usage is added to it
+        json_schema: If given, ask for JSON output matching this schema
         
     Returns:
         The generated prompt text
@@ -338,21 +757,38 @@ def call_openai_chat_completions(
     if use_web_search:
         print("  Note: Web search requires Responses API. Using standard completion.")
     
-    system_prompt = SYSTEM_PROMPT_BASE
-    
     client = OpenAI(api_key=api_key)
     
-    # Make the API call using Chat Completions
+    # Structured output (single mode) needs room for all four prompts
+    extra = {}
+    max_tokens = 1000
+    if json_schema is not None:
+        extra["response_format"] = {
+            "type": "json_schema",
+            "json_schema": {"name": "refined_prompts", "schema": json_schema, "strict": True},
+        }
+        max_tokens = 4000
+    
+    # Make the API call using Chat Completions (system message first,
+    # so it is the same cacheable prefix as in the Responses API path)
     response = client.chat.completions.create(
         model=model,
         messages=[
-            {"role": "system", "content": system_prompt},
+            {"role": "system", "content": system_prompt_for(False)},
             {"role": "user", "content": user_message},
         ],
+        prompt_cache_key=prompt_cache_key(False),
         temperature=0.7,
-        max_tokens=1000,
+        max_tokens=max_tokens,
+        **extra,
     )
     
+    if getattr(response, "usage", None) is not None:
+        call_usage = _chat_usage(response.usage)
+        current_span().set(**call_usage.span_args())
+        if usage is not None:
+            usage.add(call_usage)
+    
     return response.choices[0].message.content.strip()
 
 
@@ -361,6 +797,9 @@ def call_openai(
     api_key: str,
     model: str = DEFAULT_MODEL,
     use_web_search: bool = False,
+    usage: Optional[TokenUsage] = None,
+    json_schema: Optional[dict] = None,
+    on_delta: Optional[Callable[[str], None]] = None,
 ) -> str:
     """
     Call the OpenAI API to generate a refined prompt.
@@ -374,6 +813,10 @@ def call_openai(
         api_key: OpenAI API key
         model: Model to use (default: gpt-5)
         use_web_search: Whether to enable web search capability
+        usage: If given, this call's token usage is added to it
+        json_schema: If given, ask for JSON output matching this schema
+        on_delta: If given, stream the response and call this with each
+                  piece of text as it arrives
         
     Returns:
         The generated prompt text
@@ -382,62 +825,221 @@ def call_openai(
         ImportError: If openai package is not installed
         Exception: If the API call fails
     """
-    if USE_RESPONSES_API:
-        try:
-            return call_openai_responses_api(
-                user_message=user_message,
-                api_key=api_key,
-                model=model,
-                use_web_search=use_web_search,
-            )
-        except Exception as e:
-            # Fall back to Chat Completions if Responses API fails
-            print(f"  Warning: Responses API failed ({e}), falling back to Chat Completions...")
-            return call_openai_chat_completions(
+    with span("openai.call_openai", category="api", model=model) as s:
+        s.record(bytes_out=len(user_message.encode("utf-8")))
+        
+        if USE_RESPONSES_API:
+            try:
+                text = call_openai_responses_api(
+                    user_message=user_message,
+                    api_key=api_key,
+                    model=model,
+                    use_web_search=use_web_search,
+                    usage=usage,
+                    json_schema=json_schema,
+                    on_delta=on_delta,
+                )
+            except Exception as e:
+                # Fall back to Chat Completions if Responses API fails
+                # (not streamed; the caller gets the full text at once)
+                print(f"  Warning: Responses API failed ({e}), falling back to Chat Completions...")
+                s.add_retry()
+                text = call_openai_chat_completions(
+                    user_message=user_message,
+                    api_key=api_key,
+                    model=model,
+                    use_web_search=use_web_search,
+                    usage=usage,
+                    json_schema=json_schema,
+                )
+        else:
+            # Chat Completions path: not streamed
+            text = call_openai_chat_completions(
                 user_message=user_message,
                 api_key=api_key,
                 model=model,
                 use_web_search=use_web_search,
+                usage=usage,
+                json_schema=json_schema,
             )
-    else:
-        return call_openai_chat_completions(
+        
+        s.record(bytes_in=len(text.encode("utf-8")))
+        return text
+
+
+# -----------------------------------------------------------------------------
+# MAIN REFINEMENT FUNCTION
+# -----------------------------------------------------------------------------
+
+def _request_prompt(
+    user_message: str,
+    label: str,
+    api_key: str,
+    model: str,
+    use_web_search: bool,
+    usage: TokenUsage,
+    mark_output: Callable[[], None],
+    stream: bool = False,
+    stream_path: Optional[Path] = None,
+    json_schema: Optional[dict] = None,
+) -> str:
+    """
+    One refinement call, optionally streamed.
+    
+    With stream=True the text is shown as a live progress line and, if
+    stream_path is given, written to "<stream_path>.partial" as it
+    arrives and renamed to stream_path when complete. On failure the
+    partial file is left in place.
+    
+    Args:
+        mark_output: Called when the first text is available
+        (other args: see call_openai)
+        
+    Returns:
+        The generated text
+    """
+    if not stream:
+        text = call_openai(
+            user_message=user_message,
+            api_key=api_key,
+            model=model,
+            use_web_search=use_web_search,
+            usage=usage,
+            json_schema=json_schema,
+        )
+        mark_output()
+        return text
+    
+    writer = StreamingFileWriter(stream_path) if stream_path is not None else None
+    progress = _StreamProgress(label, on_first_delta=mark_output)
+    
+    def on_delta(delta: str) -> None:
+        if writer is not None:
+            writer.write(delta)
+        progress.update(delta)
+    
+    try:
+        text = call_openai(
             user_message=user_message,
             api_key=api_key,
             model=model,
             use_web_search=use_web_search,
+            usage=usage,
+            json_schema=json_schema,
+            on_delta=on_delta,
         )
+    finally:
+        progress.finish()
+        if writer is not None:
+            writer.close()
+    
+    # Publish the final (stripped) text - also covers a non-streamed fallback
+    if writer is not None:
+        writer.commit(text)
+    mark_output()
+    return text
 
 
-# -----------------------------------------------------------------------------
-# MAIN REFINEMENT FUNCTION
-# -----------------------------------------------------------------------------
+def _refine_per_view(
+    spec: CharacterSpec,
+    call: Callable[..., str],
+    stream_to: Optional[dict[str, Path]],
+) -> dict[str, str]:
+    """Per-view mode: one request for the concept, one per T-pose view."""
+    stream_to = stream_to or {}
+    
+    # Generate concept prompt
+    print("  Generating concept art prompt...")
+    prompts = {
+        "concept_prompt": call(
+            build_concept_request(spec), "concept",
+            stream_path=stream_to.get("concept_prompt"),
+        ),
+    }
+    
+    # Generate T-pose prompts for each view
+    for view in ["front", "side", "back"]:
+        print(f"  Generating {view} T-pose prompt...")
+        prompts[f"tpose_{view}"] = call(
+            build_tpose_request(spec, view), view,
+            stream_path=stream_to.get(f"tpose_{view}"),
+        )
+    
+    return prompts
 
+
+def _refine_single_call(
+    spec: CharacterSpec,
+    call: Callable[..., str],
+    stream_to: Optional[dict[str, Path]],
+) -> dict[str, str]:
+    """
+    Single mode: all four prompts from one structured-output request.
+    
+    When streaming, the JSON is only shown as progress; the four files
+    are written (atomically) once it parses.
+    
+    Raises:
+        ValueError: If the output doesn't match REFINED_PROMPTS_SCHEMA
+    """
+    print("  Generating all four prompts in one request...")
+    text = call(build_combined_request(spec), "all prompts", json_schema=REFINED_PROMPTS_SCHEMA)
+    prompts = parse_refined_json(text)
+    
+    for name, path in (stream_to or {}).items():
+        StreamingFileWriter(path).commit(prompts[name])
+    
+    return prompts
+
+
+@traced("stage2b.refine_prompts_with_llm")
 def refine_prompts_with_llm(
     spec: CharacterSpec,
     api_key: Optional[str] = None,
     model: str = DEFAULT_MODEL,
     use_web_search: bool = False,
+    mode: str = DEFAULT_REFINE_MODE,
+    stream: bool = False,
+    stream_to: Optional[dict[str, Path]] = None,
 ) -> RefinedPrompts:
     """
     Use OpenAI GPT to refine prompts for a character.
     
-    This function makes multiple API calls to generate:
+    Generates:
     1. A refined concept art prompt
     2. T-pose prompts for front, side, and back views
     
+    In "per-view" mode that is four API calls; in "single" mode it is one
+    call returning JSON (falling back to per-view if the JSON is invalid).
+    
     Args:
         spec: The character specification
         api_key: Optional API key (uses OPENAI_API_KEY env var if not provided)
         model: OpenAI model to use (default: gpt-5)
         use_web_search: Enable web search tool for current trends (default: False)
+        mode: "per-view" or "single" (see REFINE_MODES)
+        stream: Stream responses and show live progress
+        stream_to: Prompt field (PROMPT_FIELDS) → file path. With stream=True,
+                   each prompt is written there as it arrives (via
+                   "<path>.partial" and an atomic rename)
         
     Returns:
-        RefinedPrompts object containing all generated prompts
+        RefinedPrompts object containing all generated prompts, plus token
+        usage, timings, and the mode actually used
+        
+    Raises:
+        ValueError: If mode is not one of REFINE_MODES
         
     Example:
-        >>> prompts = refine_prompts_with_llm(spec, use_web_search=True)
+        >>> prompts = refine_prompts_with_llm(spec, use_web_search=True, mode="single")
         >>> print(prompts.tpose_front)
     """
+    if mode not in REFINE_MODES:
+        raise ValueError(
+            f"Invalid refinement mode: {mode}. "
+            f"Valid options: {', '.join(REFINE_MODES)}"
+        )
+    
     # Get API key
     if api_key is None:
         api_key = get_openai_api_key()
@@ -447,40 +1049,70 @@ def refine_prompts_with_llm(
     
     print(f"  Using: {api_type}")
     print(f"  Model: {model}")
+    print(f"  Mode: {mode}{' (streaming)' if stream else ''}")
     print(f"  Web search: {'enabled (web_search tool)' if use_web_search else 'disabled'}")
     
-    # Generate concept prompt
-    print("  Generating concept art prompt...")
-    concept_request = build_concept_request(spec)
-    concept_prompt = call_openai(
-        user_message=concept_request,
-        api_key=api_key,
-        model=model,
-        use_web_search=use_web_search,
-    )
+    usage = TokenUsage()
+    started = time.perf_counter()
+    first_output: Optional[float] = None
     
-    # Generate T-pose prompts for each view
-    tpose_prompts = {}
-    for view in ["front", "side", "back"]:
-        print(f"  Generating {view} T-pose prompt...")
-        tpose_request = build_tpose_request(spec, view)
-        tpose_prompts[view] = call_openai(
-            user_message=tpose_request,
-            api_key=api_key,
-            model=model,
-            use_web_search=use_web_search,
+    def mark_output() -> None:
+        nonlocal first_output
+        if first_output is None:
+            first_output = time.perf_counter() - started
+    
+    def call(user_message: str, label: str, **kwargs) -> str:
+        return _request_prompt(
+            user_message, label, api_key, model, use_web_search, usage,
+            mark_output, stream=stream, **kwargs,
         )
     
-    print("  ✓ All prompts refined")
+    # Files are only written here when streaming; otherwise the caller
+    # saves the returned prompts (write_prompts)
+    stream_to = stream_to if stream else None
+    
+    prompts = None
+    mode_used = mode
+    if mode == "single":
+        try:
+            prompts = _refine_single_call(spec, call, stream_to)
+        except ValueError as e:
+            print(f"  Warning: Single-call output was unusable ({e}), falling back to per-view...")
+            current_span().set(single_call_fallback=str(e))
+            mode_used = "per-view"
+    
+    if prompts is None:
+        prompts = _refine_per_view(spec, call, stream_to)
     
-    return RefinedPrompts(
-        concept_prompt=concept_prompt,
-        tpose_front=tpose_prompts["front"],
-        tpose_side=tpose_prompts["side"],
-        tpose_back=tpose_prompts["back"],
+    refined = RefinedPrompts(
+        concept_prompt=prompts["concept_prompt"],
+        tpose_front=prompts["tpose_front"],
+        tpose_side=prompts["tpose_side"],
+        tpose_back=prompts["tpose_back"],
         model_used=model,
         web_search_used=use_web_search,
+        usage=usage,
+        mode_used=mode_used,
+        wall_seconds=time.perf_counter() - started,
+        first_output_seconds=first_output,
+    )
+    
+    # Report the numbers that matter when comparing modes
+    print("  ✓ All prompts refined")
+    print(
+        f"  Wall time: {refined.wall_seconds:.1f}s ({mode_used}), "
+        f"first output after {refined.first_output_seconds or 0:.1f}s"
+    )
+    if usage.calls:
+        print(f"  Tokens: {usage.summary()}")
+    print(f"  View consistency: {refined.view_consistency:.2f}")
+    current_span().set(
+        mode=mode_used,
+        streamed=stream,
+        view_consistency=round(refined.view_consistency, 3),
     )
+    
+    return refined
 
 
 # -----------------------------------------------------------------------------
@@ -492,6 +1124,8 @@ def refine_prompts_to_dict(
     api_key: Optional[str] = None,
     model: str = DEFAULT_MODEL,
     use_web_search: bool = False,
+    mode: str = DEFAULT_REFINE_MODE,
+    stream_to: Optional[dict[str, Path]] = None,
 ) -> dict[str, str]:
     """
     Refine prompts and return as a dictionary (for saving to files).
@@ -501,6 +1135,11 @@ def refine_prompts_to_dict(
         api_key: Optional API key
         model: OpenAI model to use
         use_web_search: Enable web search
+        mode: "per-view" or "single" (see REFINE_MODES)
+        stream_to: If given, stream the responses and write each prompt
+                   progressively to these paths (keyed like the returned
+                   dictionary, e.g. "refined_concept" - the paths
+                   write_prompts() would use)
         
     Returns:
         Dictionary mapping prompt keys to prompt content
@@ -510,21 +1149,25 @@ def refine_prompts_to_dict(
         api_key=api_key,
         model=model,
         use_web_search=use_web_search,
+        mode=mode,
+        stream=stream_to is not None,
+        stream_to=(
+            {name: stream_to[key] for name, key in PROMPT_FILE_KEYS.items()}
+            if stream_to is not None else None
+        ),
     )
     
-    return {
-        "refined_concept": refined.concept_prompt,
-        "refined_tpose_front": refined.tpose_front,
-        "refined_tpose_side": refined.tpose_side,
-        "refined_tpose_back": refined.tpose_back,
-    }
+    return {key: getattr(refined, name) for name, key in PROMPT_FILE_KEYS.items()}
 
 
 # -----------------------------------------------------------------------------
 # PREVIEW MODE (NO API CALLS)
 # -----------------------------------------------------------------------------
 
-def preview_llm_requests(spec: CharacterSpec) -> dict[str, str]:
+def preview_llm_requests(
+    spec: CharacterSpec,
+    mode: str = DEFAULT_REFINE_MODE,
+) -> dict[str, str]:
     """
     Preview the requests that would be sent to the LLM.
     
@@ -533,10 +1176,14 @@ def preview_llm_requests(spec: CharacterSpec) -> dict[str, str]:
     
     Args:
         spec: The character specification
+        mode: "per-view" (four requests) or "single" (one JSON request)
         
     Returns:
         Dictionary mapping request names to request content
     """
+    if mode == "single":
+        return {"combined_request": build_combined_request(spec)}
+    
     return {
         "concept_request": build_concept_request(spec),
         "tpose_front_request": build_tpose_request(spec, "front"),
@@ -544,3 +1191,47 @@ def preview_llm_requests(spec: CharacterSpec) -> dict[str, str]:
         "tpose_back_request": build_tpose_request(spec, "back"),
     }
 
+
+def estimate_request_sizes(
+    spec: CharacterSpec,
+    use_web_search: bool = False,
+) -> dict[str, int]:
+    """
+    Estimate the prompt size of a refinement run (no API calls).
+    
+    The T-pose requests share everything up to the view line, so after
+    the first one the shared prefix can come from the prompt cache - if
+    it is at least PROMPT_CACHE_MIN_TOKENS long.
+    
+    Args:
+        spec: The character specification
+        use_web_search: Whether web search (and its system prompt) is used
+        
+    Returns:
+        Dictionary with estimated token counts: "system", "concept_request",
+        "tpose_request" (largest view), "tpose_shared_prefix" (system
+        prompt + shared part of the T-pose requests), "total_input"
+        (per-view mode, 4 calls), "single_total_input" (single mode, 1 call)
+    """
+    system_prompt = system_prompt_for(use_web_search)
+    tpose_requests = [build_tpose_request(spec, view) for view in ("front", "side", "back")]
+    concept_request = build_concept_request(spec)
+    
+    shared = tpose_requests[0][:_common_prefix_length(tpose_requests)]
+    
+    return {
+        "system": estimate_tokens(system_prompt),
+        "concept_request": estimate_tokens(concept_request),
+        "tpose_request": max(estimate_tokens(r) for r in tpose_requests),
+        "tpose_shared_prefix": estimate_tokens(system_prompt + shared),
+        "total_input": (
+            4 * estimate_tokens(system_prompt)
+            + estimate_tokens(concept_request)
+            + sum(estimate_tokens(r) for r in tpose_requests)
+        ),
+        "single_total_input": (
+            estimate_tokens(system_prompt)
+            + estimate_tokens(build_combined_request(spec))
+        ),
+    }
+
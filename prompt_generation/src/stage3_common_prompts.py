@@ -15,22 +15,69 @@
 #   - {name}_2d_refinement_criteria_{version}.txt - Image validation checklist
 #   - {name}_design_notes_{version}.txt           - Human design reference
 
+from typing import Mapping, Optional
+
 from .models import CharacterSpec
+from .tracing import traced
+from .prompt_templates import compile_template, spec_fields
+
+
+# -----------------------------------------------------------------------------
+# STAGE 3 TEMPLATES
+# -----------------------------------------------------------------------------
+# Compiled once at import time (see prompt_templates.py for the fields).
+
+# Using [ ] for checkbox items (Markdown task list syntax)
+REFINEMENT_CRITERIA_TEMPLATE = compile_template("common_2d_refinement_criteria", """2D T-POSE IMAGE REFINEMENT CHECKLIST for {name} ({role})
+
+GOAL: This image will be used as input to a 3D character generation tool (e.g., Hunyuan.3D). It must be clean and unambiguous.
+
+CHECKLIST:
+[ ] Full body visible, no cropping of feet or hands
+[ ] Clear T-pose (arms extended horizontally, not bent)
+[ ] Character facing forward, no extreme perspective
+[ ] Simple, uncluttered background (flat or gradient)
+[ ] Neutral, even lighting (no strong shadows or colored lights)
+[ ] Silhouette matches description: {silhouette}
+[ ] Color palette approximately matches: {colors}
+[ ] Key props visible and readable: {props}
+[ ] No text, watermarks, or logos
+[ ] No heavy motion blur or depth-of-field effects
+
+NOTES:
+
+* If any box is unchecked, revise the prompt or regenerate the image.
+* This image will be manually uploaded to Hunyuan.3D or similar 3D tool after approval.""")
+
+# A summary of everything about the character
+DESIGN_NOTES_TEMPLATE = compile_template("common_design_notes", """DESIGN NOTES for {name} ({role})
+
+* Game style: {game_style}
+* Silhouette: {silhouette}
+* Color palette: {colors}
+* Key props: {props}
+* Animation focus: {animations}
+* Extra notes: {notes}
+
+PIPELINE CONTEXT:
+
+1. Use base 2D prompts to generate initial concepts.
+2. Use Gemini NanoBanana Pro prompts to refine into a T-pose-specific image prompt.
+3. Use the 2D refinement checklist to validate the final T-pose image.
+4. MANUAL: Upload final 2D T-pose image to Hunyuan.3D or similar 3D tool.
+5. MANUAL: Download the resulting 3D asset (.fbx/.obj) and feed into a separate assessment pipeline.
 
-# Reuse helper functions from stage1 (DRY principle)
-from .stage1_base_prompts import (
-    format_color_palette,
-    format_key_props,
-    format_animation_focus,
-    format_extra_notes,
-)
+This file is for human reference and documentation of the character's intended look.""")
 
 
 # -----------------------------------------------------------------------------
 # STAGE 3 GENERATORS: Human Reference Documents
 # -----------------------------------------------------------------------------
 
-def generate_2d_refinement_criteria(spec: CharacterSpec) -> str:
+def generate_2d_refinement_criteria(
+    spec: CharacterSpec,
+    fields: Optional[Mapping[str, str]] = None,
+) -> str:
     """
     Generate a checklist for validating T-pose images.
     
@@ -52,42 +99,18 @@ def generate_2d_refinement_criteria(spec: CharacterSpec) -> str:
     
     Args:
         spec: The character specification
+        fields: Pre-formatted fields from spec_fields(spec) (computed if omitted)
         
     Returns:
         A Markdown-formatted checklist string
     """
-    # Pre-format spec fields for insertion into the checklist
-    color_str = format_color_palette(spec.color_palette)
-    props_str = format_key_props(spec.key_props)
-    
-    # Build the checklist document
-    # Using [ ] for checkbox items (Markdown task list syntax)
-    
-    checklist = f"""2D T-POSE IMAGE REFINEMENT CHECKLIST for {spec.name} ({spec.role})
-
-GOAL: This image will be used as input to a 3D character generation tool (e.g., Hunyuan.3D). It must be clean and unambiguous.
-
-CHECKLIST:
-[ ] Full body visible, no cropping of feet or hands
-[ ] Clear T-pose (arms extended horizontally, not bent)
-[ ] Character facing forward, no extreme perspective
-[ ] Simple, uncluttered background (flat or gradient)
-[ ] Neutral, even lighting (no strong shadows or colored lights)
-[ ] Silhouette matches description: {spec.silhouette}
-[ ] Color palette approximately matches: {color_str}
-[ ] Key props visible and readable: {props_str}
-[ ] No text, watermarks, or logos
-[ ] No heavy motion blur or depth-of-field effects
+    return REFINEMENT_CRITERIA_TEMPLATE.render(fields or spec_fields(spec))
 
-NOTES:
 
-* If any box is unchecked, revise the prompt or regenerate the image.
-* This image will be manually uploaded to Hunyuan.3D or similar 3D tool after approval."""
-    
-    return checklist
-
-
-def generate_design_notes(spec: CharacterSpec) -> str:
+def generate_design_notes(
+    spec: CharacterSpec,
+    fields: Optional[Mapping[str, str]] = None,
+) -> str:
     """
     Generate internal design notes for human reference.
     
@@ -104,46 +127,23 @@ def generate_design_notes(spec: CharacterSpec) -> str:
     
     Args:
         spec: The character specification
+        fields: Pre-formatted fields from spec_fields(spec) (computed if omitted)
         
     Returns:
         A Markdown-formatted design notes document
     """
-    # Pre-format all spec fields
-    color_str = format_color_palette(spec.color_palette)
-    props_str = format_key_props(spec.key_props)
-    anim_str = format_animation_focus(spec.animation_focus)
-    notes_str = format_extra_notes(spec.extra_notes)
-    
-    # Build the design notes document
-    # This is a summary of everything about the character
-    
-    design_notes = f"""DESIGN NOTES for {spec.name} ({spec.role})
-
-* Game style: {spec.game_style}
-* Silhouette: {spec.silhouette}
-* Color palette: {color_str}
-* Key props: {props_str}
-* Animation focus: {anim_str}
-* Extra notes: {notes_str}
-
-PIPELINE CONTEXT:
-
-1. Use base 2D prompts to generate initial concepts.
-2. Use Gemini NanoBanana Pro prompts to refine into a T-pose-specific image prompt.
-3. Use the 2D refinement checklist to validate the final T-pose image.
-4. MANUAL: Upload final 2D T-pose image to Hunyuan.3D or similar 3D tool.
-5. MANUAL: Download the resulting 3D asset (.fbx/.obj) and feed into a separate assessment pipeline.
-
-This file is for human reference and documentation of the character's intended look."""
-    
-    return design_notes
+    return DESIGN_NOTES_TEMPLATE.render(fields or spec_fields(spec))
 
 
 # -----------------------------------------------------------------------------
 # MAIN EXPORT FUNCTION
 # -----------------------------------------------------------------------------
 
-def generate_common_prompts(spec: CharacterSpec) -> dict[str, str]:
+@traced("stage3.generate_common_prompts")
+def generate_common_prompts(
+    spec: CharacterSpec,
+    fields: Optional[Mapping[str, str]] = None,
+) -> dict[str, str]:
     """
     Generate all Stage 3 (Common) documents for a character.
     
@@ -152,6 +152,8 @@ def generate_common_prompts(spec: CharacterSpec) -> dict[str, str]:
     
     Args:
         spec: The character specification
+        fields: Pre-formatted fields from spec_fields(spec), so several
+                stages can share one formatting pass (computed if omitted)
         
     Returns:
         A dictionary with keys:
@@ -164,8 +166,9 @@ def generate_common_prompts(spec: CharacterSpec) -> dict[str, str]:
         3. If all boxes are checked, image is ready for 3D conversion
         4. Keep "common_design_notes" for reference during the pipeline
     """
+    fields = fields or spec_fields(spec)
     return {
-        "common_2d_refinement_criteria": generate_2d_refinement_criteria(spec),
-        "common_design_notes": generate_design_notes(spec),
+        "common_2d_refinement_criteria": generate_2d_refinement_criteria(spec, fields),
+        "common_design_notes": generate_design_notes(spec, fields),
     }
 
@@ -11,18 +11,24 @@
 #   - GEMINI_API_KEY environment variable set
 #   - google-genai package installed (pip install google-genai)
 #
-# Output files:
+# Output files (extension matches the actual image format):
 #   - output/{name}_tpose_front_{version}.jpg
 #   - output/{name}_tpose_side_{version}.jpg
 #   - output/{name}_tpose_back_{version}.jpg
+#   - output/candidates/{name}_tpose_front_{version}_candidate{n}.jpg
+#     (best-of-N candidates that weren't picked)
 
 import os
 import io
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional
 from dataclasses import dataclass
 
 from .models import CharacterSpec
+from .tracing import traced, current_span
+from .image_encoding import ImageEncoding, encode_images, extension_for, mime_type_for
 from .stage1_base_prompts import (
     format_color_palette,
     format_key_props,
@@ -37,6 +43,10 @@ from .stage1_base_prompts import (
 # Environment variable name for the API key
 GEMINI_API_KEY_ENV = "GEMINI_API_KEY"
 
+# Optional endpoint override (e.g., http://127.0.0.1:8400 for the local
+# stand-in servers in benchmarks/). Same name the google-genai SDK uses.
+GEMINI_BASE_URL_ENV = "GOOGLE_GEMINI_BASE_URL"
+
 # Model name for image generation
 # gemini-3-pro-image-preview (Nano Banana Pro) - Advanced image generation model
 # Supports: 1K, 2K, 4K resolutions, up to 14 reference images, thinking mode
@@ -49,6 +59,13 @@ IMAGE_ASPECT_RATIO = "1:1"  # Square format works best for character refs
 # Image size: "1K", "2K", "4K" (must be uppercase)
 IMAGE_SIZE = "2K"  # 2K resolution for good quality
 
+# Best-of-N: the candidates that weren't picked are kept in this subfolder
+# of the images folder ({name}_tpose_{view}_{version}_candidate{n}.jpg)
+CANDIDATES_DIR_NAME = "candidates"
+
+# Candidates can be saved from background threads (review menu)
+_candidates_lock = threading.Lock()
+
 
 # -----------------------------------------------------------------------------
 # DATA CLASSES
@@ -61,7 +78,8 @@ class GeneratedImage:
     
     Attributes:
         view: The view type ("front", "side", "back")
-        image_data: Raw image bytes (PNG format)
+        image_data: Raw image bytes (format as returned by Gemini or
+                    as re-encoded by save_generated_images)
         prompt_used: The prompt that generated this image
     """
     view: str
@@ -69,10 +87,20 @@ class GeneratedImage:
     prompt_used: str
     
     def get_filename(self, character_name: str, version: str) -> str:
-        """Generate the output filename for this image."""
+        """
+        Generate the output filename for this image.
+        
+        The extension is detected from the image bytes, so PNG data is
+        saved as .png and JPEG data as .jpg.
+        """
         # Sanitize name: lowercase, replace spaces with underscores
         safe_name = character_name.lower().replace(" ", "_")
-        return f"{safe_name}_tpose_{self.view}_{version}.jpg"
+        return f"{safe_name}_tpose_{self.view}_{version}{extension_for(self.image_data)}"
+    
+    @property
+    def mime_type(self) -> str:
+        """MIME type of the image bytes (e.g., "image/jpeg")."""
+        return mime_type_for(self.image_data)
 
 
 # -----------------------------------------------------------------------------
@@ -101,6 +129,24 @@ def get_api_key() -> str:
     return api_key
 
 
+def _create_gemini_client(api_key: str):
+    """
+    Create a Gemini client, honoring the GOOGLE_GEMINI_BASE_URL override.
+    
+    Callers import google-genai first (with a helpful ImportError).
+    """
+    from google import genai
+    from google.genai import types
+    
+    base_url = os.environ.get(GEMINI_BASE_URL_ENV)
+    if base_url:
+        return genai.Client(
+            api_key=api_key,
+            http_options=types.HttpOptions(base_url=base_url),
+        )
+    return genai.Client(api_key=api_key)
+
+
 # -----------------------------------------------------------------------------
 # PROMPT BUILDERS FOR EACH VIEW
 # -----------------------------------------------------------------------------
@@ -187,6 +233,7 @@ def build_tpose_prompt(spec: CharacterSpec, view: str) -> str:
 # GEMINI API INTEGRATION
 # -----------------------------------------------------------------------------
 
+@traced("gemini.generate_content", category="api")
 def generate_image_with_gemini(
     prompt: str,
     api_key: str,
@@ -208,7 +255,7 @@ def generate_image_with_gemini(
             Options: "1K", "2K", "4K" (must be uppercase)
         
     Returns:
-        Image data as bytes (PNG format)
+        Image data as bytes (usually JPEG; use image_encoding.detect_image_format)
         
     Raises:
         ImportError: If google-genai is not installed
@@ -226,7 +273,7 @@ def generate_image_with_gemini(
         )
     
     # Create the Gemini client with the API key
-    client = genai.Client(api_key=api_key)
+    client = _create_gemini_client(api_key)
     
     # Configure image generation settings
     config = types.GenerateContentConfig(
@@ -238,6 +285,8 @@ def generate_image_with_gemini(
     )
     
     # Generate the image using gemini-3-pro-image-preview
+    current_span().record(bytes_out=len(prompt.encode("utf-8")))
+    current_span().set(model=IMAGE_MODEL)
     response = client.models.generate_content(
         model=IMAGE_MODEL,
         contents=[prompt],
@@ -249,6 +298,7 @@ def generate_image_with_gemini(
         if part.inline_data is not None:
             # inline_data.data is already raw bytes (not base64 encoded)
             # The image is typically JPEG format (mime_type: image/jpeg)
+            current_span().record(bytes_in=len(part.inline_data.data))
             return part.inline_data.data
     
     raise Exception("No image was generated. The API returned an empty response.")
@@ -274,7 +324,7 @@ def generate_image_with_gemini_and_text(
         
     Returns:
         Tuple of (image_data, text_response)
-        - image_data: Image as PNG bytes
+        - image_data: Image bytes (usually JPEG)
         - text_response: Any text the model generated, or None
     """
     try:
@@ -288,7 +338,7 @@ def generate_image_with_gemini_and_text(
         )
     
     # Create the Gemini client
-    client = genai.Client(api_key=api_key)
+    client = _create_gemini_client(api_key)
     
     # Configure for both text and image output
     config = types.GenerateContentConfig(
@@ -324,6 +374,7 @@ def generate_image_with_gemini_and_text(
     return image_data, text_response
 
 
+@traced("gemini.edit_image", category="api")
 def edit_image_with_gemini(
     source_image_path: Path,
     edit_prompt: str,
@@ -345,7 +396,7 @@ def edit_image_with_gemini(
         image_size: Output resolution (default: "2K")
         
     Returns:
-        Edited image data as bytes (JPEG format)
+        Edited image data as bytes (usually JPEG)
         
     Raises:
         ImportError: If google-genai is not installed
@@ -375,18 +426,13 @@ def edit_image_with_gemini(
     # Read the source image
     image_bytes = source_image_path.read_bytes()
     
-    # Determine mime type from file extension
-    suffix = source_image_path.suffix.lower()
-    mime_type = {
-        ".jpg": "image/jpeg",
-        ".jpeg": "image/jpeg",
-        ".png": "image/png",
-        ".webp": "image/webp",
-        ".gif": "image/gif",
-    }.get(suffix, "image/jpeg")
+    # Determine mime type from the content (older runs saved PNG data as .jpg)
+    mime_type = mime_type_for(image_bytes)
+    if mime_type == "application/octet-stream":
+        mime_type = "image/jpeg"
     
     # Create the Gemini client
-    client = genai.Client(api_key=api_key)
+    client = _create_gemini_client(api_key)
     
     # Create image part from the source image
     image_part = types.Part.from_bytes(
@@ -404,6 +450,8 @@ def edit_image_with_gemini(
     )
     
     # Generate edited image - pass both text prompt and source image
+    current_span().record(bytes_out=len(image_bytes) + len(edit_prompt.encode("utf-8")))
+    current_span().set(model=IMAGE_MODEL)
     response = client.models.generate_content(
         model=IMAGE_MODEL,
         contents=[edit_prompt, image_part],
@@ -413,11 +461,13 @@ def edit_image_with_gemini(
     # Extract the image from the response
     for part in response.parts:
         if part.inline_data is not None:
+            current_span().record(bytes_in=len(part.inline_data.data))
             return part.inline_data.data
     
     raise Exception("No image was generated. The API returned an empty response.")
 
 
+@traced("stage4.regenerate_single_view")
 def regenerate_single_view(
     spec: "CharacterSpec",
     view: str,
@@ -461,10 +511,76 @@ def regenerate_single_view(
     )
 
 
+@traced("stage4.generate_view_candidates")
+def generate_view_candidates(
+    spec: "CharacterSpec",
+    view: str,
+    count: int,
+    api_key: Optional[str] = None,
+    aspect_ratio: str = IMAGE_ASPECT_RATIO,
+    image_size: str = IMAGE_SIZE,
+) -> list[GeneratedImage]:
+    """
+    Generate several candidates of one view at the same time.
+    
+    Gemini returns a different image for the same prompt every time, so
+    instead of regenerating after each bad image, N requests go out at
+    once (each one waits on HTTP, so N take about as long as one). Rank
+    the results with image_preflight.rank_images().
+    
+    Args:
+        spec: The character specification
+        view: The view to generate ("front", "side", or "back")
+        count: Number of candidates (1 = a single request)
+        api_key: Optional API key (uses env var if not provided)
+        aspect_ratio: Image aspect ratio
+        image_size: Output resolution
+        
+    Returns:
+        The candidates that were generated, in request order (failed
+        requests are reported and left out)
+        
+    Raises:
+        ValueError: If count is less than 1
+        Exception: The first error, if no candidate could be generated
+    """
+    if count < 1:
+        raise ValueError(f"count must be at least 1, got {count}")
+    if api_key is None:
+        api_key = get_api_key()
+    
+    prompt = build_tpose_prompt(spec, view)
+    print(f"  Generating {count} {view} candidates at once...")
+    print(f"  Using model: {IMAGE_MODEL}")
+    
+    results: dict[int, bytes] = {}
+    errors: list[Exception] = []
+    with ThreadPoolExecutor(max_workers=max(count, 1), thread_name_prefix="candidates") as pool:
+        futures = {
+            pool.submit(generate_image_with_gemini, prompt, api_key, aspect_ratio, image_size): i
+            for i in range(count)
+        }
+        for future in as_completed(futures):
+            try:
+                results[futures[future]] = future.result()
+            except Exception as e:
+                print(f"    ✗ {view} candidate {futures[future] + 1} failed: {e}")
+                errors.append(e)
+    
+    if not results:
+        raise errors[0]
+    
+    return [
+        GeneratedImage(view=view, image_data=results[i], prompt_used=prompt)
+        for i in sorted(results)
+    ]
+
+
 # -----------------------------------------------------------------------------
 # MAIN GENERATION FUNCTION
 # -----------------------------------------------------------------------------
 
+@traced("stage4.generate_tpose_images")
 def generate_tpose_images(
     spec: CharacterSpec,
     version: str,
@@ -472,6 +588,7 @@ def generate_tpose_images(
     views: list[str] = ["front", "side", "back"],
     aspect_ratio: str = IMAGE_ASPECT_RATIO,
     image_size: str = IMAGE_SIZE,
+    on_image: Optional[Callable[[GeneratedImage], None]] = None,
 ) -> list[GeneratedImage]:
     """
     Generate T-pose images for all specified views using Gemini 3 Pro Image Preview.
@@ -489,6 +606,9 @@ def generate_tpose_images(
             Options: "1:1", "2:3", "3:2", "3:4", "4:3", "4:5", "5:4", "9:16", "16:9", "21:9"
         image_size: Output resolution (default: "2K")
             Options: "1K", "2K", "4K" (must be uppercase)
+        on_image: Called with each image as soon as it is generated, e.g.
+            to start Stage 5 on the front view while the other views are
+            still being generated
         
     Returns:
         List of GeneratedImage objects
@@ -530,6 +650,9 @@ def generate_tpose_images(
         
         generated_images.append(generated_image)
         print(f"    ✓ {view} view generated")
+        
+        if on_image is not None:
+            on_image(generated_image)
     
     return generated_images
 
@@ -538,23 +661,28 @@ def generate_tpose_images(
 # FILE SAVING
 # -----------------------------------------------------------------------------
 
+@traced("stage4.save_generated_images", category="io")
 def save_generated_images(
     images: list[GeneratedImage],
     spec: CharacterSpec,
     output_dir: Path,
     version: str,
+    encoding: Optional[ImageEncoding] = None,
 ) -> list[Path]:
     """
     Save generated images to the output directory.
     
-    Creates the output directory if it doesn't exist,
-    then saves each image as a PNG file.
+    Creates the output directory if it doesn't exist, optionally re-encodes
+    the images (in a thread pool), then saves each one with an extension
+    that matches its content.
     
     Args:
-        images: List of GeneratedImage objects
+        images: List of GeneratedImage objects (image_data is updated
+                in place when re-encoded)
         spec: The character specification
         output_dir: Base output directory (e.g., Path("output"))
         version: Version string for filenames
+        encoding: Optional output encoding (None = save bytes as returned)
         
     Returns:
         List of paths to saved files
@@ -562,6 +690,12 @@ def save_generated_images(
     # Create output directory if it doesn't exist
     output_dir.mkdir(parents=True, exist_ok=True)
     
+    # Re-encode all views in parallel before writing
+    if encoding is not None and not encoding.is_noop:
+        encoded = encode_images([image.image_data for image in images], encoding)
+        for image, data in zip(images, encoded):
+            image.image_data = data
+    
     saved_paths: list[Path] = []
     
     for image in images:
@@ -577,6 +711,62 @@ def save_generated_images(
     return saved_paths
 
 
+def save_image_candidates(
+    images: list[GeneratedImage],
+    spec: CharacterSpec,
+    output_dir: Path,
+    version: str,
+    encoding: Optional[ImageEncoding] = None,
+) -> list[Path]:
+    """
+    Keep candidates that weren't picked, to choose from later.
+    
+    They are saved to output_dir/candidates/ and numbered after the ones
+    already there, so earlier candidates are never overwritten.
+    
+    Args:
+        images: Candidates (image_data is updated in place when re-encoded)
+        spec: The character specification
+        output_dir: The images folder
+        version: Version string for filenames
+        encoding: Optional output encoding (None = save bytes as returned)
+        
+    Returns:
+        List of paths to saved files
+    """
+    if encoding is not None and not encoding.is_noop and images:
+        encoded = encode_images([image.image_data for image in images], encoding)
+        for image, data in zip(images, encoded):
+            image.image_data = data
+    
+    candidates_dir = output_dir / CANDIDATES_DIR_NAME
+    saved_paths: list[Path] = []
+    with _candidates_lock:
+        candidates_dir.mkdir(parents=True, exist_ok=True)
+        for image in images:
+            stem = Path(image.get_filename(spec.name, version)).stem
+            number = len(list(candidates_dir.glob(f"{stem}_candidate*"))) + 1
+            while (candidates_dir / f"{stem}_candidate{number}{extension_for(image.image_data)}").exists():
+                number += 1
+            file_path = candidates_dir / f"{stem}_candidate{number}{extension_for(image.image_data)}"
+            file_path.write_bytes(image.image_data)
+            saved_paths.append(file_path)
+    
+    return saved_paths
+
+
+def find_image_candidates(
+    spec: CharacterSpec,
+    output_dir: Path,
+    version: str,
+    view: str = "front",
+) -> list[Path]:
+    """Saved candidates of a view (see save_image_candidates), oldest first."""
+    candidates_dir = output_dir / CANDIDATES_DIR_NAME
+    stem = Path(GeneratedImage(view, b"", "").get_filename(spec.name, version)).stem
+    return sorted(candidates_dir.glob(f"{stem}_candidate*"), key=lambda p: p.stat().st_mtime)
+
+
 # -----------------------------------------------------------------------------
 # PROMPT-ONLY MODE (NO API CALLS)
 # -----------------------------------------------------------------------------
@@ -6,10 +6,26 @@
 #
 # This module orchestrates the Hunyuan 3D API workflow:
 #   1. Submit a job (with prompt OR image OR image_url)
+#      Local images are optionally downscaled/recompressed in memory
+#      before the COS upload (see UploadTransform in image_encoding.py)
 #   2. Poll for completion with timeout and backoff
 #   3. Download results (ZIP with .obj, .mtl, textures)
 #   4. Extract and identify the main .obj file
-#   5. Write metadata.json with job info
+#   5. Optionally downscale/convert textures (see texture_processing.py)
+#   6. Write metadata.json with job info
+#
+# Every submitted job can be recorded in a JobRegistry (job_registry.py)
+# before polling starts, so a timeout or Ctrl-C doesn't lose a paid job:
+# the `jobs` command re-attaches to it and downloads the result.
+#
+# With prepare_3d_input(), the uploads (and optionally the submit) can
+# happen earlier - e.g., while the user is still reviewing the images -
+# and generate_3d_model(prepared=...) picks up from there.
+#
+# With a ViewFeed, Step 1 doesn't need every image up front: the `all`
+# command starts Stage 5 as soon as the front view is generated, and
+# side/back views that Stage 4 finishes within the view window are
+# uploaded as they arrive and attached to the same (multi-view) job.
 #
 # REQUIRES:
 #   - TENCENT_SECRET_ID: Tencent Cloud SecretId
@@ -19,7 +35,9 @@
 
 import json
 import os
+import threading
 import time
+from contextlib import nullcontext
 from dataclasses import dataclass, asdict
 from datetime import datetime
 from pathlib import Path
@@ -51,6 +69,15 @@ from .providers import (
     VALID_GENERATE_TYPES,
     VALID_POLYGON_TYPES,
 )
+from .providers.raw_http_hunyuan3d import DEFAULT_FACE_COUNT, MIN_FACE_COUNT, MAX_FACE_COUNT
+from .image_encoding import UploadTransform, transform_for_upload, extension_for, mime_type_for
+from .tracing import span, traced, current_span
+from .job_registry import DONE, ERRORED, FAILED, INTERRUPTED, SUBMITTED, TIMED_OUT, JobRegistry, stop_polling
+from .texture_processing import (
+    TextureOptions,
+    process_textures,
+    summarize_texture_results,
+)
 
 # Re-export env var names for convenience
 __all__ = [
@@ -70,6 +97,16 @@ __all__ = [
     # Multi-view support
     "ViewImage",
     "VALID_VIEW_TYPES",
+    # Texture post-processing
+    "TextureOptions",
+    # Pre-upload image transform
+    "UploadTransform",
+    # Views that arrive while Stage 5 runs
+    "ViewFeed",
+    # Uploads/submit ahead of time (during review)
+    "PreparedInput",
+    "prepare_3d_input",
+    "TPOSE_VIEW_TYPES",
 ]
 
 # Valid provider types (sdk is default, http is fallback)
@@ -90,6 +127,10 @@ OBJ_EXTENSION = ".obj"
 MTL_EXTENSION = ".mtl"
 TEXTURE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".tga", ".bmp")
 
+# Stage 4 T-pose view → Hunyuan multi-view type. The side view is drawn
+# "facing left", which shows the character's left side.
+TPOSE_VIEW_TYPES = {"side": "left", "back": "back"}
+
 
 # -----------------------------------------------------------------------------
 # DATA CLASSES
@@ -137,6 +178,11 @@ class Hunyuan3DMetadata:
         elapsed_seconds: Time taken
         files: List of generated file names
         main_obj: Name of the main .obj file
+        textures: Texture post-processing summary (byte savings per texture)
+        uploads: Per-image upload records (bytes saved, upload time)
+        queue_seconds: Time the job spent queued (WAIT) after submission
+        run_seconds: Time the job spent running (RUN) until DONE/FAIL
+        settings: EnablePBR / FaceCount / GenerateType / PolygonType used
     """
     job_id: str
     status: str
@@ -148,6 +194,119 @@ class Hunyuan3DMetadata:
     files: list[str]
     main_obj: Optional[str] = None
     error_message: Optional[str] = None
+    textures: Optional[dict] = None
+    uploads: Optional[list[dict]] = None
+    queue_seconds: Optional[float] = None
+    run_seconds: Optional[float] = None
+    settings: Optional[dict] = None
+
+
+@dataclass
+class UploadRecord:
+    """
+    What was uploaded to COS for one input image.
+    
+    Attributes:
+        view: "front", "left", "right", or "back"
+        source: Local file name
+        original_bytes: Size of the local file
+        uploaded_bytes: Size of what was actually uploaded
+        saved_bytes: original_bytes - uploaded_bytes
+        transform_seconds: Time spent resizing/recompressing
+        upload_seconds: Time spent uploading
+    """
+    view: str
+    source: str
+    original_bytes: int
+    uploaded_bytes: int
+    saved_bytes: int
+    transform_seconds: float
+    upload_seconds: float
+
+
+@dataclass
+class PreparedInput:
+    """
+    Images uploaded (and maybe a job submitted) before generate_3d_model().
+    
+    Attributes:
+        image: The local front image that was uploaded
+        image_url: Its COS URL
+        multi_view_images: Extra views, already uploaded
+        uploads: Upload records for metadata.json
+        job_id: Job submitted with these images (None = not submitted yet)
+        submitted_at: time.time() of the submit (for the queue/run split)
+    """
+    image: Path
+    image_url: str
+    multi_view_images: list[ViewImage]
+    uploads: list[UploadRecord]
+    job_id: Optional[str] = None
+    submitted_at: Optional[float] = None
+
+
+class ViewFeed:
+    """
+    View images handed to Stage 5 while it is already running.
+    
+    Stage 4 put()s each view as soon as it is saved and close()s the feed
+    when it is done (or failed). Stage 5 waits for the front view with
+    get() and takes extra views with next_view() until its window ends.
+    Thread-safe.
+    
+    View names: "front", or a Hunyuan view type ("left", "right", "back").
+    """
+    
+    def __init__(self):
+        self._views: dict[str, Path] = {}
+        self._closed = False
+        self._changed = threading.Condition()
+    
+    def put(self, view: str, path: Path) -> None:
+        """Make a view image available."""
+        with self._changed:
+            self._views[view] = Path(path)
+            self._changed.notify_all()
+    
+    def close(self) -> None:
+        """No more views will arrive."""
+        with self._changed:
+            self._closed = True
+            self._changed.notify_all()
+    
+    def get(self, view: str, timeout: Optional[float] = None) -> Optional[Path]:
+        """
+        Wait for one view.
+        
+        Returns:
+            The image path, or None if the feed was closed (or the timeout
+            passed) without it
+        """
+        with self._changed:
+            self._changed.wait_for(lambda: view in self._views or self._closed, timeout)
+            return self._views.get(view)
+    
+    def next_view(self, views: set[str], deadline: float) -> Optional[tuple[str, Path]]:
+        """
+        Wait for the first of several views.
+        
+        Args:
+            views: View names still wanted
+            deadline: time.monotonic() after which to stop waiting
+            
+        Returns:
+            (view, path) of an arrived view, or None once the deadline
+            passes or the feed is closed without any of them
+        """
+        with self._changed:
+            while True:
+                arrived = next((v for v in self._views if v in views), None)
+                if arrived is not None:
+                    return arrived, self._views[arrived]
+                remaining = deadline - time.monotonic()
+                if self._closed or remaining <= 0:
+                    return None
+                self._changed.wait(remaining)
 
 
 # -----------------------------------------------------------------------------
@@ -176,6 +335,66 @@ def _find_largest_obj(files: list[Path]) -> Optional[Path]:
     return max(obj_files, key=lambda f: f.stat().st_size if f.exists() else 0)
 
 
+def _upload_image(
+    uploader,
+    image_path: Path,
+    view: str,
+    upload_transform: Optional[UploadTransform],
+) -> tuple[str, UploadRecord]:
+    """
+    Upload one local image to COS, optionally transforming it first.
+    
+    Without a transform the file is uploaded as-is via upload_file().
+    With a transform the image is shrunk in memory and sent via
+    upload_bytes() - nothing extra is written to disk.
+    
+    Args:
+        uploader: COS uploader from get_cos_uploader()
+        image_path: Local image file
+        view: View name (for the upload record)
+        upload_transform: Pre-upload transform (None = upload original)
+        
+    Returns:
+        Tuple of (public URL, UploadRecord)
+    """
+    image_path = Path(image_path)
+    original_bytes = image_path.stat().st_size
+    
+    if upload_transform is None:
+        upload_start = time.perf_counter()
+        url = uploader.upload_file(image_path)
+        return url, UploadRecord(
+            view=view,
+            source=image_path.name,
+            original_bytes=original_bytes,
+            uploaded_bytes=original_bytes,
+            saved_bytes=0,
+            transform_seconds=0.0,
+            upload_seconds=time.perf_counter() - upload_start,
+        )
+    
+    transform_start = time.perf_counter()
+    content = transform_for_upload(image_path.read_bytes(), upload_transform)
+    transform_seconds = time.perf_counter() - transform_start
+    
+    # Same key scheme as upload_file(), with the extension of the new content
+    object_key = f"hunyuan3d/{int(time.time())}_{image_path.stem}{extension_for(content)}"
+    
+    upload_start = time.perf_counter()
+    url = uploader.upload_bytes(content, object_key, content_type=mime_type_for(content))
+    upload_seconds = time.perf_counter() - upload_start
+    
+    return url, UploadRecord(
+        view=view,
+        source=image_path.name,
+        original_bytes=original_bytes,
+        uploaded_bytes=len(content),
+        saved_bytes=original_bytes - len(content),
+        transform_seconds=transform_seconds,
+        upload_seconds=upload_seconds,
+    )
+
+
 def _validate_inputs(
     prompt: Optional[str],
     image: Optional[Path],
@@ -217,6 +436,33 @@ def _validate_inputs(
     return provided[0]
 
 
+def _effective_settings() -> dict:
+    """
+    Hunyuan 3D settings as they will be applied to the job.
+    
+    Reads the same env vars as the providers, filling in the API defaults
+    for anything unset or invalid. Stored in metadata.json so runs can be
+    compared later (see run_ledger.py).
+    """
+    face_count = DEFAULT_FACE_COUNT
+    try:
+        requested = int(os.environ.get(HUNYUAN3D_FACE_COUNT_ENV, ""))
+        if MIN_FACE_COUNT <= requested <= MAX_FACE_COUNT:
+            face_count = requested
+    except ValueError:
+        pass
+    
+    generate_type = os.environ.get(HUNYUAN3D_GENERATE_TYPE_ENV, "")
+    polygon_type = os.environ.get(HUNYUAN3D_POLYGON_TYPE_ENV, "")
+    
+    return {
+        "EnablePBR": os.environ.get(HUNYUAN3D_ENABLE_PBR_ENV, "").lower() in ("true", "1", "yes"),
+        "FaceCount": face_count,
+        "GenerateType": generate_type if generate_type in VALID_GENERATE_TYPES else "Normal",
+        "PolygonType": polygon_type if polygon_type in VALID_POLYGON_TYPES else "triangle",
+    }
+
+
 def _print_request_debug_info(
     *,
     prompt: Optional[str],
@@ -301,6 +547,7 @@ def _print_request_debug_info(
 # MAIN ORCHESTRATION FUNCTION
 # -----------------------------------------------------------------------------
 
+@traced("stage5.generate_3d_model")
 def generate_3d_model(
     *,
     prompt: Optional[str] = None,
@@ -314,17 +561,25 @@ def generate_3d_model(
     timeout: int = DEFAULT_TIMEOUT,
     verbose: bool = True,
     provider_type: str = "sdk",
+    texture_options: Optional[TextureOptions] = None,
+    upload_transform: Optional[UploadTransform] = None,
+    view_feed: Optional[ViewFeed] = None,
+    view_window: float = 0.0,
+    prepared: Optional[PreparedInput] = None,
+    registry: Optional[JobRegistry] = None,
+    existing_job_id: Optional[str] = None,
 ) -> Hunyuan3DResult:
     """
     Generate a 3D model using the Hunyuan 3D API.
     
     This is the main orchestration function that:
     1. Validates inputs (exactly one of prompt/image/image_url)
-    2. Uploads local image(s) to COS if needed
+    2. Uploads local image(s) to COS if needed (optionally shrunk first)
     3. Submits the job to Hunyuan 3D (with optional multi-view images)
     4. Polls for completion with exponential backoff
     5. Downloads and extracts results
-    6. Writes metadata.json
+    6. Optionally post-processes textures (resize, mips, format)
+    7. Writes metadata.json
     
     Args:
         prompt: Text description to generate 3D model from
@@ -338,6 +593,20 @@ def generate_3d_model(
         timeout: Maximum seconds to wait for completion
         verbose: Print progress messages
         provider_type: "sdk" (default, recommended) or "http" (fallback)
+        texture_options: Texture post-processing settings (None = keep as-is)
+        upload_transform: Resize/recompress local images before the COS
+                          upload (None = upload the original files)
+        view_feed: Extra views still being generated; those that arrive
+                   within view_window are attached to the job
+        view_window: Seconds (from the start of this call) to wait for
+                     views from view_feed before submitting
+        prepared: prepare_3d_input() result for `image` - its uploads are
+                  reused, and its job (if submitted) is polled instead of
+                  submitting a new one
+        registry: Records the job right after submit, and why polling
+                  stopped if it stops early (see job_registry.py)
+        existing_job_id: Re-attach to this job instead of submitting one
+                         (the inputs may then be omitted)
         
     Returns:
         Hunyuan3DResult with paths to downloaded files
@@ -346,6 +615,7 @@ def generate_3d_model(
         ValueError: If inputs are invalid
         Hunyuan3DAPIError: If the API returns an error
         TimeoutError: If job doesn't complete within timeout
+        KeyboardInterrupt: On Ctrl-C (the job is recorded as interrupted)
         ImportError: If SDK provider requested but SDK not installed
         
     Example:
@@ -365,6 +635,7 @@ def generate_3d_model(
         )
     """
     start_time = time.time()
+    window_ends = time.monotonic() + view_window
     created_at = datetime.now().isoformat()
     
     # Validate provider type
@@ -375,71 +646,211 @@ def generate_3d_model(
         )
     
     # Step 1: Validate inputs
-    input_type, input_value = _validate_inputs(prompt, image, image_url)
+    if existing_job_id is not None and not (prompt or image or image_url):
+        input_type, input_value = "job", existing_job_id
+    else:
+        input_type, input_value = _validate_inputs(prompt, image, image_url)
+    if prepared is not None and (image is None or Path(image) != prepared.image):
+        raise ValueError("prepared input belongs to another image")
     
     if verbose:
         print(f"Input: {input_type} = {input_value[:50]}..." if len(input_value) > 50 else f"Input: {input_type} = {input_value}")
         print(f"Provider: {provider_type}")
     
-    # Step 2: Upload local images to COS if needed
+    # Step 2: Upload local images to COS if needed (prepared images were
+    # uploaded already)
     final_image_url = image_url
     multi_view_images: list[ViewImage] = []
+    upload_records: list[UploadRecord] = []
     
-    # Use SDK-based COS uploader (more reliable than raw HTTP)
+    if prepared is not None:
+        final_image_url = prepared.image_url
+        multi_view_images.extend(prepared.multi_view_images)
+        upload_records.extend(prepared.uploads)
+        if verbose:
+            print(f"Using {len(prepared.uploads)} image(s) uploaded in advance")
+    
+    # Use SDK-based COS uploader (more reliable than raw HTTP), closed as
+    # soon as the uploads are done
     uploader = None
-    if image or left_view or right_view or back_view:
+    if prepared is None and (image or left_view or right_view or back_view or view_feed):
         uploader = get_cos_uploader(use_sdk=True)
     
-    # Upload main/front image
-    if image:
-        if verbose:
-            print(f"Uploading front image to Tencent COS...")
-        final_image_url = uploader.upload_file(Path(image))
-        if verbose:
-            print(f"  ✓ Front: {final_image_url[:60]}...")
-    
-    # Upload multi-view images
-    view_uploads = [
-        ("left", left_view),
-        ("right", right_view),
-        ("back", back_view),
-    ]
+    def report_upload(record: UploadRecord) -> None:
+        upload_records.append(record)
+        if verbose and upload_transform is not None:
+            print(
+                f"    {record.original_bytes / 1024:.0f} KB → "
+                f"{record.uploaded_bytes / 1024:.0f} KB "
+                f"in {record.upload_seconds:.1f}s"
+            )
     
-    for view_name, view_path in view_uploads:
-        if view_path:
+    with uploader or nullcontext():
+        # Upload main/front image
+        if image and prepared is None:
             if verbose:
-                print(f"Uploading {view_name} view to Tencent COS...")
-            view_url = uploader.upload_file(Path(view_path))
-            multi_view_images.append(ViewImage(view=view_name, image_url=view_url))
+                print(f"Uploading front image to Tencent COS...")
+            final_image_url, record = _upload_image(uploader, image, "front", upload_transform)
+            report_upload(record)
             if verbose:
-                print(f"  ✓ {view_name.capitalize()}: {view_url[:60]}...")
+                print(f"  ✓ Front: {final_image_url[:60]}...")
+        
+        # Upload multi-view images
+        view_uploads = [
+            ("left", left_view),
+            ("right", right_view),
+            ("back", back_view),
+        ] if prepared is None else []
+        
+        for view_name, view_path in view_uploads:
+            if view_path:
+                if verbose:
+                    print(f"Uploading {view_name} view to Tencent COS...")
+                view_url, record = _upload_image(uploader, view_path, view_name, upload_transform)
+                report_upload(record)
+                multi_view_images.append(ViewImage(view=view_name, image_url=view_url))
+                if verbose:
+                    print(f"  ✓ {view_name.capitalize()}: {view_url[:60]}...")
+        
+        # Views still being generated: upload each one as it arrives, until
+        # the window ends (the front upload above already used part of it)
+        if view_feed is not None and view_window > 0 and prepared is None:
+            wanted = set(VALID_VIEW_TYPES) - {v.view for v in multi_view_images}
+            with span("stage5.wait_for_views", window=view_window) as s:
+                while wanted:
+                    arrived = view_feed.next_view(wanted, window_ends)
+                    if arrived is None:
+                        break
+                    view_name, view_path = arrived
+                    wanted.discard(view_name)
+                    if verbose:
+                        waited = time.time() - start_time
+                        print(f"Uploading {view_name} view to Tencent COS (arrived after {waited:.1f}s)...")
+                    view_url, record = _upload_image(uploader, view_path, view_name, upload_transform)
+                    report_upload(record)
+                    multi_view_images.append(ViewImage(view=view_name, image_url=view_url))
+                s.set(attached=len(multi_view_images))
+            if verbose:
+                print(f"  ✓ {len(multi_view_images)} extra view(s) within the {view_window:g}s window")
     
     # Step 3: Create provider and submit job
-    # Print detailed debug info about the request
-    if verbose:
-        _print_request_debug_info(
-            prompt=prompt,
-            image_url=final_image_url,
-            multi_view_images=multi_view_images,
-            provider_type=provider_type,
-        )
-        print("Submitting job to Hunyuan 3D API...")
-        if multi_view_images:
-            print(f"  (with {len(multi_view_images)} additional view(s))")
-    
-    # Get provider class based on type
+    # Get provider class based on type (closed after the download; its
+    # connections stay in the shared pool for the next job)
     provider_class = get_provider(provider_type)
     provider = provider_class()
+    with provider:
+        job_id = existing_job_id or (prepared.job_id if prepared is not None else None)
+        if job_id:
+            if verbose:
+                print(f"Re-attaching to job: {job_id}" if existing_job_id else f"Using the job submitted in advance: {job_id}")
+            # This process polls it now
+            entry = registry.update(job_id, SUBMITTED, output_dir=output_dir) if registry is not None else None
+            if registry is not None and entry is None:
+                registry.record_submit(job_id, provider_type, input_type, input_value, final_image_url, output_dir)
+            # The job has been queued since its submit, not since now
+            if prepared is not None and prepared.job_id == job_id and prepared.submitted_at is not None:
+                submitted_at = prepared.submitted_at
+            elif entry is not None:
+                submitted_at = datetime.fromisoformat(entry.submitted_at).timestamp()
+            else:
+                submitted_at = time.time()
+        else:
+            # Print detailed debug info about the request
+            if verbose:
+                _print_request_debug_info(
+                    prompt=prompt,
+                    image_url=final_image_url,
+                    multi_view_images=multi_view_images,
+                    provider_type=provider_type,
+                )
+                print("Submitting job to Hunyuan 3D API...")
+                if multi_view_images:
+                    print(f"  (with {len(multi_view_images)} additional view(s))")
+        
+            job_id = provider.submit(
+                prompt=prompt,
+                image_url=final_image_url,
+                multi_view_images=multi_view_images if multi_view_images else None,
+            )
+            submitted_at = time.time()
+        
+            if registry is not None:
+                registry.record_submit(job_id, provider_type, input_type, input_value, final_image_url, output_dir)
+            if verbose:
+                print(f"  ✓ Job ID: {job_id}")
+        
+        # Steps 4-8: Poll, download, post-process. The job is in the registry
+        # from here on; if polling stops early, the registry says why
+        try:
+            result = _wait_and_download(
+                provider,
+                job_id,
+                output_dir,
+                poll_interval=poll_interval,
+                timeout=timeout,
+                verbose=verbose,
+                texture_options=texture_options,
+                start_time=start_time,
+                submitted_at=submitted_at,
+                created_at=created_at,
+                input_type=input_type,
+                input_value=input_value,
+                upload_records=upload_records,
+            )
+        except KeyboardInterrupt:
+            _record_stopped(registry, job_id, INTERRUPTED, "interrupted (Ctrl-C)")
+            raise
+        except TimeoutError as e:
+            _record_stopped(registry, job_id, TIMED_OUT, str(e))
+            raise
+        except Exception as e:
+            _record_stopped(registry, job_id, ERRORED, f"{type(e).__name__}: {e}")
+            raise
+        
+        if registry is not None:
+            if result.status == "DONE":
+                registry.update(job_id, DONE, output_dir=output_dir)
+            else:
+                registry.update(job_id, FAILED, error=result.error_message)
+        return result
+
+
+def _record_stopped(registry: Optional[JobRegistry], job_id: str, status: str, reason: str) -> None:
+    """Record a job whose polling stopped early, and say how to get its result."""
+    if registry is not None:
+        registry.update(job_id, status, error=reason)
+    print(f"\nJob {job_id} keeps running on Hunyuan's side. Download it later with:")
+    print(f"  uv run generate_prompts.py jobs --attach {job_id}")
+
+
+def _wait_and_download(
+    provider,
+    job_id: str,
+    output_dir: Path,
+    *,
+    poll_interval: float,
+    timeout: float,
+    verbose: bool,
+    texture_options: Optional[TextureOptions],
+    start_time: float,
+    submitted_at: float,
+    created_at: str,
+    input_type: str,
+    input_value: str,
+    upload_records: list[UploadRecord],
+) -> Hunyuan3DResult:
+    """
+    Steps 4-8 of generate_3d_model(): poll the job until it's done, then
+    download, post-process, and describe the result.
     
-    job_id = provider.submit(
-        prompt=prompt,
-        image_url=final_image_url,
-        multi_view_images=multi_view_images if multi_view_images else None,
-    )
-    
-    if verbose:
-        print(f"  ✓ Job ID: {job_id}")
+    submitted_at is the time.time() of the submit - earlier than now for
+    jobs submitted during review or re-attached - so queue_seconds
+    counts the whole wait.
     
+    Raises:
+        TimeoutError: If the job doesn't complete within timeout
+        KeyboardInterrupt: On Ctrl-C (see job_registry.handle_interrupts)
+    """
     # Step 4: Poll for completion with exponential backoff
     if verbose:
         print(f"Polling for completion (timeout: {timeout}s)...")
@@ -448,8 +859,14 @@ def generate_3d_model(
     elapsed = 0
     result: Optional[Hunyuan3DJobResult] = None
     
+    # Queue (WAIT) vs run (RUN) time, to the resolution of the poll interval
+    running_since: Optional[float] = None
+    phases: dict[str, Optional[float]] = {"queue_seconds": None, "run_seconds": None}
+    
     while elapsed < timeout:
-        time.sleep(current_interval)
+        # Ctrl-C on the main thread also stops polling on other threads
+        if stop_polling.wait(current_interval):
+            raise KeyboardInterrupt
         elapsed = time.time() - start_time
         
         result = provider.poll(job_id)
@@ -457,6 +874,14 @@ def generate_3d_model(
         if verbose:
             print(f"  [{int(elapsed)}s] Status: {result.status.value}")
         
+        if result.status != JobStatus.WAIT and running_since is None:
+            running_since = time.time()
+            phases["queue_seconds"] = round(running_since - submitted_at, 3)
+        
+        if result.status in (JobStatus.DONE, JobStatus.FAIL):
+            phases["run_seconds"] = round(time.time() - running_since, 3)
+            current_span().set(**phases)
+        
         if result.status == JobStatus.DONE:
             break
         elif result.status == JobStatus.FAIL:
@@ -488,13 +913,42 @@ def generate_3d_model(
         for f in downloaded_files:
             print(f"    - {f.name}")
     
-    # Step 6: Find the main .obj file
+    # Step 6: Post-process textures (optional)
+    texture_summary: Optional[dict] = None
+    if texture_options is not None:
+        if verbose:
+            print(
+                f"Processing textures (max {texture_options.max_size}px, "
+                f"{texture_options.output_format})..."
+            )
+        # The model is downloaded (and paid for) by now, so a texture problem
+        # is recorded in metadata.json instead of failing the job
+        try:
+            downloaded_files, texture_results = process_textures(
+                downloaded_files,
+                texture_options,
+                texture_extensions=TEXTURE_EXTENSIONS,
+            )
+        except Exception as e:
+            texture_results = []
+            texture_summary = {"error": f"{type(e).__name__}: {e}"}
+            print(f"  Warning: Texture processing failed ({e}), keeping the downloaded files")
+        if texture_results:
+            texture_summary = summarize_texture_results(texture_results)
+            for r in texture_results:
+                if r.error:
+                    print(f"  Warning: Could not process texture {r.source} ({r.error}), kept as downloaded")
+            if verbose:
+                saved_mb = texture_summary["saved_bytes"] / (1024 * 1024)
+                print(f"  ✓ {len(texture_results)} textures, saved {saved_mb:.1f} MB")
+    
+    # Step 7: Find the main .obj file
     main_obj = _find_largest_obj(downloaded_files)
     
     if verbose and main_obj:
         print(f"  ✓ Main OBJ: {main_obj.name}")
     
-    # Step 7: Write metadata.json
+    # Step 8: Write metadata.json
     completed_at = datetime.now().isoformat()
     total_elapsed = time.time() - start_time
     
@@ -508,6 +962,10 @@ def generate_3d_model(
         elapsed_seconds=total_elapsed,
         files=[f.name for f in downloaded_files],
         main_obj=main_obj.name if main_obj else None,
+        textures=texture_summary,
+        uploads=[asdict(r) for r in upload_records] or None,
+        settings=_effective_settings(),
+        **phases,
     )
     
     metadata_path = output_dir / "metadata.json"
@@ -529,6 +987,60 @@ def generate_3d_model(
     )
 
 
+@traced("stage5.prepare_3d_input")
+def prepare_3d_input(
+    image: Path,
+    extra_views: Optional[dict[str, Path]] = None,
+    upload_transform: Optional[UploadTransform] = None,
+    submit: bool = False,
+    provider_type: str = "sdk",
+    registry: Optional[JobRegistry] = None,
+) -> PreparedInput:
+    """
+    Upload the images for a 3D job ahead of time, optionally submitting it.
+    
+    Meant to run in the background while the user reviews the images: if
+    they approve, generate_3d_model(prepared=...) skips straight to
+    polling; if they pick another image, the result is just not used (a
+    submitted job can't be cancelled - it still runs and counts as a job).
+    
+    Args:
+        image: Local front image
+        extra_views: Hunyuan view type ("left", "right", "back") → image
+        upload_transform: Pre-upload transform (None = upload original)
+        submit: Also submit the job
+        provider_type: "sdk" or "http" (only used with submit)
+        registry: Records the submitted job (an unused one can be
+                  downloaded later with the `jobs` command)
+        
+    Returns:
+        PreparedInput for generate_3d_model(image=image, prepared=...)
+    """
+    uploader = get_cos_uploader(use_sdk=True)
+    with uploader:
+        image_url, record = _upload_image(uploader, image, "front", upload_transform)
+        prepared = PreparedInput(image=Path(image), image_url=image_url, multi_view_images=[], uploads=[record])
+        
+        for view_name, view_path in (extra_views or {}).items():
+            view_url, record = _upload_image(uploader, view_path, view_name, upload_transform)
+            prepared.uploads.append(record)
+            prepared.multi_view_images.append(ViewImage(view=view_name, image_url=view_url))
+    
+    if submit:
+        provider = get_provider(provider_type)()
+        with provider:
+            prepared.job_id = provider.submit(
+                prompt=None,
+                image_url=image_url,
+                multi_view_images=prepared.multi_view_images or None,
+            )
+            prepared.submitted_at = time.time()
+        if registry is not None:
+            registry.record_submit(prepared.job_id, provider_type, "image", str(image), image_url)
+    
+    return prepared
+
+
 # -----------------------------------------------------------------------------
 # CONVENIENCE FUNCTIONS
 # -----------------------------------------------------------------------------
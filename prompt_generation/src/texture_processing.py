@@ -0,0 +1,413 @@
+# texture_processing.py - Texture Post-Processing for Stage 5 Output
+#
+# Pipeline Stage: ... → Hunyuan 3D → Download/Extract → [TEXTURE PROCESSING]
+#                                                       ^^^^^^^^^^^^^^^^^^^^
+#                                                       THIS STEP
+#
+# Hunyuan 3D returns textures at whatever resolution it rendered them
+# (PBR runs produce several 2K-4K maps per model). This module shrinks them
+# to a target budget before they reach disk / the downstream importer:
+#   1. Downscale each texture so its longest edge fits the budget
+#   2. Convert to a target format (WebP, PNG, or KTX2-ready PNG)
+#   3. Optionally write a mip chain next to each texture
+#   4. Rewrite .mtl references when the file extension changes
+#   5. Report per-texture byte savings (stored in metadata.json)
+#
+# Textures are independent, so they are processed in a thread pool -
+# Pillow releases the GIL while it resizes, decodes, and encodes.
+# A texture that fails is left as downloaded and its error is recorded,
+# so one bad file never costs the (already paid for) model.
+#
+# REQUIRES:
+#   - Pillow package installed (pip install Pillow)
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Optional
+
+from .tracing import traced
+
+
+# -----------------------------------------------------------------------------
+# CONFIGURATION
+# -----------------------------------------------------------------------------
+
+# Supported output formats:
+#   webp     - Smallest files, good for preview/web pipelines
+#   png      - Lossless, universally supported
+#   ktx2-png - PNG resized to power-of-two dimensions, ready for a
+#              KTX2/Basis encoder (toktx, basisu) in the import pipeline
+VALID_TEXTURE_FORMATS = ("webp", "png", "ktx2-png")
+
+# File extension written for each output format
+FORMAT_EXTENSIONS = {
+    "webp": ".webp",
+    "png": ".png",
+    "ktx2-png": ".png",
+}
+
+# Default texture budget (longest edge, in pixels)
+DEFAULT_MAX_TEXTURE_SIZE = 2048
+
+# Smallest mip level we bother writing
+DEFAULT_MIN_MIP_SIZE = 16
+
+# Texture names containing these words are data maps (normals, etc.),
+# which must not be compressed lossily or the shading breaks.
+LOSSLESS_NAME_HINTS = ("normal", "nrm", "_n.")
+
+# .mtl statements that reference texture files
+MTL_MAP_PREFIXES = ("map_", "bump", "disp", "decal", "norm", "refl")
+
+
+# -----------------------------------------------------------------------------
+# DATA CLASSES
+# -----------------------------------------------------------------------------
+
+@dataclass
+class TextureOptions:
+    """
+    Settings for the texture post-processing step.
+
+    Attributes:
+        max_size: Longest edge in pixels after downscaling
+        output_format: One of VALID_TEXTURE_FORMATS
+        quality: Lossy quality for WebP (1-100)
+        generate_mips: Also write a mip chain (name_mip1, name_mip2, ...)
+        min_mip_size: Stop the mip chain when the longest edge gets this small
+        max_workers: Thread pool size (None = one per CPU)
+    """
+    max_size: int = DEFAULT_MAX_TEXTURE_SIZE
+    output_format: str = "webp"
+    quality: int = 90
+    generate_mips: bool = False
+    min_mip_size: int = DEFAULT_MIN_MIP_SIZE
+    max_workers: Optional[int] = None
+
+    def __post_init__(self):
+        if self.output_format not in VALID_TEXTURE_FORMATS:
+            raise ValueError(
+                f"Invalid texture format: {self.output_format}. "
+                f"Valid options: {', '.join(VALID_TEXTURE_FORMATS)}"
+            )
+        if self.max_size < 1:
+            raise ValueError(f"max_size must be positive, got {self.max_size}")
+
+
+@dataclass
+class TextureResult:
+    """
+    Outcome of processing one texture (written into metadata.json).
+
+    Attributes:
+        source: Original file name
+        output: Processed file name
+        original_bytes: Size of the original file
+        output_bytes: Size of the processed file (mip 0 only)
+        original_size: (width, height) before processing
+        output_size: (width, height) after processing
+        mip_files: Names of extra mip levels (if generated)
+        mip_bytes: Total size of the extra mip levels
+        saved_bytes: original_bytes - output_bytes (negative = grew)
+        error: Why processing failed (the original file is kept), or None
+    """
+    source: str
+    output: str
+    original_bytes: int
+    output_bytes: int
+    original_size: tuple[int, int]
+    output_size: tuple[int, int]
+    mip_files: list[str] = field(default_factory=list)
+    mip_bytes: int = 0
+    saved_bytes: int = 0
+    error: Optional[str] = None
+
+
+# -----------------------------------------------------------------------------
+# HELPER FUNCTIONS
+# -----------------------------------------------------------------------------
+
+def _import_pillow():
+    """Import Pillow lazily so the rest of the pipeline works without it."""
+    try:
+        from PIL import Image
+    except ImportError:
+        raise ImportError(
+            "Pillow package is required for texture processing.\n"
+            "Install it with: pip install Pillow\n"
+            "Or: uv add Pillow"
+        )
+    return Image
+
+
+def _previous_power_of_two(value: int) -> int:
+    """Largest power of two <= value (minimum 1)."""
+    return 1 << (max(value, 1).bit_length() - 1)
+
+
+def _target_size(
+    width: int,
+    height: int,
+    max_size: int,
+    power_of_two: bool,
+) -> tuple[int, int]:
+    """
+    Compute the output size for a texture.
+
+    Keeps the aspect ratio, never upscales, and optionally snaps
+    both edges down to a power of two (required by KTX2/Basis).
+    """
+    scale = min(1.0, max_size / max(width, height))
+    new_w = max(1, round(width * scale))
+    new_h = max(1, round(height * scale))
+
+    if power_of_two:
+        new_w = _previous_power_of_two(new_w)
+        new_h = _previous_power_of_two(new_h)
+
+    return new_w, new_h
+
+
+def _is_data_map(name: str) -> bool:
+    """True if the file name suggests a normal/data map (keep lossless)."""
+    lowered = name.lower()
+    return any(hint in lowered for hint in LOSSLESS_NAME_HINTS)
+
+
+def _save_image(image, path: Path, options: TextureOptions, lossless: bool) -> None:
+    """Encode one image level in the configured format."""
+    if options.output_format == "webp":
+        # WebP needs RGB/RGBA input
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+        image.save(
+            path,
+            format="WEBP",
+            quality=options.quality,
+            lossless=lossless,
+            method=4,  # Good speed/size tradeoff
+        )
+    else:
+        # PNG (plain or KTX2-ready) - optimize=True runs the extra zlib pass
+        image.save(path, format="PNG", optimize=True)
+
+
+# -----------------------------------------------------------------------------
+# SINGLE TEXTURE (runs in a worker thread)
+# -----------------------------------------------------------------------------
+
+def process_texture(texture_path: Path, options: TextureOptions) -> TextureResult:
+    """
+    Downscale, convert, and (optionally) mip one texture file.
+
+    The processed file is written next to the original. If the extension
+    changes, the original is deleted so only the optimized copy remains.
+
+    Args:
+        texture_path: Path to the texture file
+        options: Texture processing settings
+
+    Returns:
+        TextureResult describing the conversion
+
+    Raises:
+        ImportError: If Pillow is not installed
+        OSError: If the file can't be read as an image
+    """
+    Image = _import_pillow()
+
+    texture_path = Path(texture_path)
+    original_bytes = texture_path.stat().st_size
+    power_of_two = options.output_format == "ktx2-png"
+    lossless = _is_data_map(texture_path.name)
+
+    with Image.open(texture_path) as src:
+        src.load()
+        original_size = src.size
+
+        # Step 1: Downscale to the budget
+        target = _target_size(*src.size, options.max_size, power_of_two)
+        image = src if target == src.size else src.resize(target, Image.LANCZOS)
+
+        # Step 2: Write mip 0 in the target format
+        output_path = texture_path.with_suffix(FORMAT_EXTENSIONS[options.output_format])
+        _save_image(image, output_path, options, lossless)
+
+        # Step 3: Optional mip chain (each level is half the previous one)
+        mip_files: list[str] = []
+        mip_bytes = 0
+        if options.generate_mips:
+            level = 1
+            mip = image
+            while max(mip.size) // 2 >= options.min_mip_size:
+                mip = mip.resize(
+                    (max(1, mip.size[0] // 2), max(1, mip.size[1] // 2)),
+                    Image.BOX,  # Box filter = proper 2x2 average for mips
+                )
+                mip_path = output_path.with_name(
+                    f"{output_path.stem}_mip{level}{output_path.suffix}"
+                )
+                _save_image(mip, mip_path, options, lossless)
+                mip_files.append(mip_path.name)
+                mip_bytes += mip_path.stat().st_size
+                level += 1
+
+        output_size = image.size
+
+    # Step 4: Remove the original if we wrote a differently named file
+    if output_path != texture_path:
+        texture_path.unlink()
+
+    output_bytes = output_path.stat().st_size
+
+    return TextureResult(
+        source=texture_path.name,
+        output=output_path.name,
+        original_bytes=original_bytes,
+        output_bytes=output_bytes,
+        original_size=original_size,
+        output_size=output_size,
+        mip_files=mip_files,
+        mip_bytes=mip_bytes,
+        saved_bytes=original_bytes - output_bytes,
+    )
+
+
+def _process_texture_or_error(texture_path: Path, options: TextureOptions) -> TextureResult:
+    """process_texture(), but a failure becomes a result with the error."""
+    try:
+        return process_texture(texture_path, options)
+    except Exception as e:
+        size = texture_path.stat().st_size if texture_path.exists() else 0
+        return TextureResult(
+            source=texture_path.name,
+            output=texture_path.name,
+            original_bytes=size,
+            output_bytes=size,
+            original_size=(0, 0),
+            output_size=(0, 0),
+            error=f"{type(e).__name__}: {e}",
+        )
+
+
+# -----------------------------------------------------------------------------
+# MTL REFERENCE REWRITING
+# -----------------------------------------------------------------------------
+
+def _rewrite_mtl_references(mtl_files: list[Path], renames: dict[str, str]) -> None:
+    """
+    Point .mtl texture statements at the renamed texture files.
+
+    Only the last token of a map statement is the file name
+    (earlier tokens are options like "-bm 1.0").
+    """
+    if not renames:
+        return
+
+    for mtl_path in mtl_files:
+        lines = mtl_path.read_text(encoding="utf-8", errors="replace").splitlines()
+        changed = False
+
+        for i, line in enumerate(lines):
+            stripped = line.strip()
+            if not stripped.lower().startswith(MTL_MAP_PREFIXES):
+                continue
+
+            parts = line.rsplit(None, 1)
+            if len(parts) != 2:
+                continue
+
+            # Compare by base name - Hunyuan zips are flat after extraction
+            new_name = renames.get(Path(parts[1]).name)
+            if new_name:
+                lines[i] = line[: line.rfind(parts[1])] + new_name
+                changed = True
+
+        if changed:
+            mtl_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+# -----------------------------------------------------------------------------
+# MAIN ENTRY POINT
+# -----------------------------------------------------------------------------
+
+@traced("stage5.process_textures")
+def process_textures(
+    files: list[Path],
+    options: TextureOptions,
+    texture_extensions: tuple[str, ...] = (".png", ".jpg", ".jpeg", ".tga", ".bmp"),
+) -> tuple[list[Path], list[TextureResult]]:
+    """
+    Post-process every texture in a list of downloaded files.
+
+    Textures run in a ThreadPoolExecutor; everything else passes through.
+    The preview image from the API is left untouched (it's not a texture).
+    A texture that can't be processed is kept as it is, and its result
+    carries the error.
+
+    Args:
+        files: All files from download_result()
+        options: Texture processing settings
+        texture_extensions: Extensions treated as textures
+
+    Returns:
+        Tuple of (updated file list, per-texture results)
+
+    Example:
+        >>> files, results = process_textures(downloaded, TextureOptions(max_size=1024))
+        >>> sum(r.saved_bytes for r in results)
+        12582912
+    """
+    textures = [
+        f for f in files
+        if f.suffix.lower() in texture_extensions and f.name != "preview.png"
+    ]
+    others = [f for f in files if f not in textures]
+
+    if not textures:
+        return list(files), []
+
+    # A pool is only worth its startup cost with more than one texture
+    if len(textures) == 1:
+        results = [_process_texture_or_error(textures[0], options)]
+    else:
+        workers = options.max_workers or min(len(textures), os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_process_texture_or_error, textures, [options] * len(textures)))
+
+    # Keep .mtl files pointing at the new names
+    renames = {r.source: r.output for r in results if r.source != r.output}
+    _rewrite_mtl_references(
+        [f for f in others if f.suffix.lower() == ".mtl"],
+        renames,
+    )
+
+    # Build the updated file list: untouched files + processed textures + mips
+    updated = list(others)
+    for texture, result in zip(textures, results):
+        output_path = texture.with_name(result.output)
+        updated.append(output_path)
+        updated.extend(output_path.with_name(name) for name in result.mip_files)
+
+    return updated, results
+
+
+def summarize_texture_results(results: list[TextureResult]) -> dict:
+    """
+    Build the "textures" block written into metadata.json.
+
+    Args:
+        results: Per-texture results from process_textures()
+
+    Returns:
+        Dictionary with totals and per-texture entries
+    """
+    return {
+        "failed": sum(1 for r in results if r.error),
+        "original_bytes": sum(r.original_bytes for r in results),
+        "output_bytes": sum(r.output_bytes for r in results),
+        "saved_bytes": sum(r.saved_bytes for r in results),
+        "files": [asdict(r) for r in results],
+    }
@@ -0,0 +1,319 @@
+# tracing.py - Lightweight Span Tracing for the Whole Pipeline
+#
+# A full run (`all`) can take 15+ minutes, and until now the only timing
+# we recorded was Hunyuan's elapsed_seconds. This module records a "span"
+# for every stage function and every outbound API call:
+#
+#   - start/end time
+#   - bytes sent (bytes_out) and received (bytes_in)
+#   - retries / fallbacks
+#   - HTTP connections opened vs reused from the pool
+#   - errors
+#
+# At the end of a run the spans are written as trace.json in Chrome trace
+# format. Open it in chrome://tracing or https://ui.perfetto.dev to see a
+# timeline of where the time went.
+#
+# Tracing is OFF unless a command calls start_trace(), so library users
+# and tests pay almost nothing (one small object per span, never stored).
+#
+# Usage:
+#   with span("stage4.generate_image", category="api") as s:
+#       data = call_api(...)
+#       s.record(bytes_in=len(data))
+#
+#   @traced("stage1.generate_base_prompts")
+#   def generate_base_prompts(spec): ...
+
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional
+
+
+# -----------------------------------------------------------------------------
+# DATA CLASSES
+# -----------------------------------------------------------------------------
+
+@dataclass
+class Span:
+    """
+    One timed unit of work.
+
+    Attributes:
+        name: Span name (e.g., "stage5.poll")
+        category: "stage", "api", or "io" (shown as a filter in the viewer)
+        start: time.perf_counter() at start
+        end: time.perf_counter() at end (None while running)
+        thread_id: Thread that ran the span
+        args: Extra data (bytes_in, bytes_out, retries, connections_new, error, ...)
+    """
+    name: str
+    category: str
+    start: float
+    end: Optional[float] = None
+    thread_id: int = 0
+    args: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def duration(self) -> float:
+        """Duration in seconds (0 while still running)."""
+        return (self.end - self.start) if self.end is not None else 0.0
+
+    def record(self, bytes_in: int = 0, bytes_out: int = 0) -> None:
+        """Add to the byte counters for this span."""
+        if bytes_in:
+            self.args["bytes_in"] = self.args.get("bytes_in", 0) + bytes_in
+        if bytes_out:
+            self.args["bytes_out"] = self.args.get("bytes_out", 0) + bytes_out
+
+    def add_retry(self) -> None:
+        """Count one retry (or fallback to another API)."""
+        self.args["retries"] = self.args.get("retries", 0) + 1
+
+    def add_connection(self, reused: bool) -> None:
+        """Count one HTTP request by whether it reused a pooled connection."""
+        key = "connections_reused" if reused else "connections_new"
+        self.args[key] = self.args.get(key, 0) + 1
+
+    def set(self, **values: Any) -> None:
+        """Attach arbitrary key/value data (must be JSON-serializable)."""
+        self.args.update(values)
+
+
+# -----------------------------------------------------------------------------
+# TRACER
+# -----------------------------------------------------------------------------
+
+class Tracer:
+    """
+    Collects finished spans for one run.
+
+    Thread-safe: stage functions may run spans from worker threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.spans: list[Span] = []
+        self.started_at = time.perf_counter()
+        self._listeners: list[Callable[[Span], None]] = []
+
+    def add(self, finished: Span) -> None:
+        """Store a finished span and notify listeners."""
+        with self._lock:
+            self.spans.append(finished)
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(finished)
+
+    def add_listener(self, listener: Callable[[Span], None]) -> None:
+        """Call listener(span) for every finished span (e.g., metrics)."""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def to_chrome_trace(self) -> dict:
+        """
+        Convert spans to the Chrome trace event format.
+
+        Every span becomes a complete ("X") event with microsecond
+        timestamps relative to the start of the run.
+        """
+        pid = os.getpid()
+
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.start)
+
+        # Small, stable thread ids read better in the viewer than raw idents.
+        # The main thread is always 1, even when a worker records first.
+        main_ident = threading.main_thread().ident
+        thread_numbers: dict[int, int] = {main_ident: 1}
+        used: set[int] = set()
+        events: list[dict] = []
+        for s in spans:
+            tid = thread_numbers.setdefault(s.thread_id, len(thread_numbers) + 1)
+            used.add(s.thread_id)
+            events.append({
+                "name": s.name,
+                "cat": s.category,
+                "ph": "X",
+                "ts": round((s.start - self.started_at) * 1_000_000, 1),
+                "dur": round(s.duration * 1_000_000, 1),
+                "pid": pid,
+                "tid": tid,
+                "args": s.args,
+            })
+
+        for ident, tid in thread_numbers.items():
+            if ident not in used:
+                continue
+            events.append({
+                "name": "thread_name",
+                "ph": "M",
+                "pid": pid,
+                "tid": tid,
+                "args": {"name": "main" if ident == main_ident else f"worker-{tid - 1}"},
+            })
+
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write(self, path: Path) -> Path:
+        """Write trace.json (Chrome trace format)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_chrome_trace(), indent=1), encoding="utf-8")
+        return path
+
+    def summary(self, top: int = 8) -> list[tuple[str, int, float]]:
+        """
+        Total time per span name, largest first.
+
+        Returns:
+            List of (name, count, total_seconds)
+        """
+        totals: dict[str, list] = {}
+        with self._lock:
+            for s in self.spans:
+                entry = totals.setdefault(s.name, [0, 0.0])
+                entry[0] += 1
+                entry[1] += s.duration
+        ranked = sorted(totals.items(), key=lambda item: item[1][1], reverse=True)
+        return [(name, count, seconds) for name, (count, seconds) in ranked[:top]]
+
+    def connection_counts(self) -> tuple[int, int]:
+        """
+        HTTP connections over the whole run.
+
+        Returns:
+            Tuple of (opened, reused from the pool)
+        """
+        with self._lock:
+            opened = sum(s.args.get("connections_new", 0) for s in self.spans)
+            reused = sum(s.args.get("connections_reused", 0) for s in self.spans)
+        return opened, reused
+
+
+# -----------------------------------------------------------------------------
+# ACTIVE TRACER + SPAN STACK
+# -----------------------------------------------------------------------------
+
+# The tracer for the current run (None = tracing off)
+_active_tracer: Optional[Tracer] = None
+
+# Per-thread stack of open spans, so helpers can annotate the current one
+_local = threading.local()
+
+# Process-wide listeners that see every finished span, traced or not
+# (e.g., metrics.py for long-running workers)
+_span_listeners: list[Callable[[Span], None]] = []
+
+
+def start_trace() -> Tracer:
+    """Start collecting spans for this process and return the tracer."""
+    global _active_tracer
+    _active_tracer = Tracer()
+    return _active_tracer
+
+
+def stop_trace() -> Optional[Tracer]:
+    """Stop collecting spans and return the finished tracer."""
+    global _active_tracer
+    tracer, _active_tracer = _active_tracer, None
+    return tracer
+
+
+def get_tracer() -> Optional[Tracer]:
+    """The active tracer, or None if tracing is off."""
+    return _active_tracer
+
+
+def add_span_listener(listener: Callable[[Span], None]) -> None:
+    """
+    Call listener(span) for every finished span in this process.
+
+    Unlike Tracer.add_listener(), this works whether or not a trace is
+    running and survives start_trace()/stop_trace().
+    """
+    if listener not in _span_listeners:
+        _span_listeners.append(listener)
+
+
+def remove_span_listener(listener: Callable[[Span], None]) -> None:
+    """Stop calling a listener added with add_span_listener()."""
+    if listener in _span_listeners:
+        _span_listeners.remove(listener)
+
+
+def _stack() -> list[Span]:
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+def current_span() -> Span:
+    """
+    The innermost open span on this thread.
+
+    Returns a throwaway span if none is open, so callers never
+    need to check for None.
+    """
+    stack = _stack()
+    return stack[-1] if stack else Span(name="(none)", category="none", start=0.0)
+
+
+@contextmanager
+def span(name: str, category: str = "stage", **args: Any) -> Iterator[Span]:
+    """
+    Time a block of code.
+
+    Args:
+        name: Span name (e.g., "stage5.submit")
+        category: "stage", "api", or "io"
+        **args: Initial span data
+
+    Yields:
+        The Span, for recording bytes/retries while it runs
+    """
+    s = Span(
+        name=name,
+        category=category,
+        start=time.perf_counter(),
+        thread_id=threading.get_ident(),
+        args=dict(args),
+    )
+    stack = _stack()
+    stack.append(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.args["error"] = f"{type(e).__name__}: {e}"[:200]
+        raise
+    finally:
+        s.end = time.perf_counter()
+        stack.pop()
+        tracer = _active_tracer
+        if tracer is not None:
+            tracer.add(s)
+        for listener in list(_span_listeners):
+            listener(s)
+
+
+def traced(name: str, category: str = "stage") -> Callable:
+    """
+    Decorator form of span() for whole functions.
+
+    Example:
+        >>> @traced("stage3.generate_common_prompts")
+        ... def generate_common_prompts(spec): ...
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, category):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,526 @@
+# turntable_renderer.py - Headless Turntable Thumbnails for Finished Models
+#
+# Pipeline Stage: ... → Hunyuan 3D → .obj on disk → [TURNTABLE PREVIEW]
+#                                                    ^^^^^^^^^^^^^^^^^^^
+#                                                    THIS STEP
+#
+# The only preview the API gives us is a single preview.png (when it sends
+# one at all). For reviewing large batches we want to SEE the geometry from
+# every side, so this module renders N turntable views of each .obj with a
+# tiny CPU-only software rasterizer and packs them into a contact sheet.
+#
+# How the rasterizer works (no GPU, no OpenGL context needed):
+#   1. Parse the .obj into a vertex array and a triangle index array
+#   2. Rotate the mesh around the vertical (Y) axis for each view
+#   3. Project orthographically onto a small image (e.g., 192x192)
+#   4. Rasterize ALL triangles at once with NumPy: every triangle tests
+#      the pixels inside its bounding box using barycentric coordinates
+#   5. Keep the nearest fragment per pixel (z-buffer) and shade it with
+#      a simple Lambert light so the shape reads clearly
+#
+# Models are independent, so they are rendered in a process pool.
+#
+# REQUIRES:
+#   - numpy (array math)
+#   - Pillow (PNG output and contact sheet labels)
+
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+
+# -----------------------------------------------------------------------------
+# CONFIGURATION
+# -----------------------------------------------------------------------------
+
+DEFAULT_VIEW_COUNT = 8        # One frame every 45 degrees
+DEFAULT_FRAME_SIZE = 192      # Pixels per (square) frame
+TURNTABLE_FILENAME = "turntable.png"
+CONTACT_SHEET_FILENAME = "contact_sheet.png"
+
+# Triangles whose bounding box fits in SMALL_TRIANGLE_BOX x SMALL_TRIANGLE_BOX
+# pixels are rasterized in one vectorized batch. At thumbnail resolution this
+# is nearly every triangle of a Hunyuan mesh; the few big ones are handled
+# one at a time.
+SMALL_TRIANGLE_BOX = 8
+
+# Triangles processed per NumPy batch (bounds peak memory)
+TRIANGLE_CHUNK = 32768
+
+# Colors (RGB)
+BACKGROUND_COLOR = (255, 255, 255)
+MESH_COLOR = np.array([190.0, 200.0, 215.0])   # Light clay blue-grey
+
+# Light direction in view space (from upper-left-front)
+LIGHT_DIRECTION = np.array([-0.4, 0.6, 1.0]) / np.linalg.norm([-0.4, 0.6, 1.0])
+AMBIENT_LIGHT = 0.25
+
+
+# -----------------------------------------------------------------------------
+# DATA CLASSES
+# -----------------------------------------------------------------------------
+
+@dataclass
+class TurntableResult:
+    """
+    Result of rendering one model's turntable strip.
+
+    Attributes:
+        obj_path: The source .obj file
+        image_path: The rendered turntable strip (PNG)
+        triangle_count: Triangles after polygon triangulation
+        elapsed_seconds: Parse + render time for this model
+        error_message: Why rendering failed (None on success)
+    """
+    obj_path: Path
+    image_path: Optional[Path]
+    triangle_count: int = 0
+    elapsed_seconds: float = 0.0
+    error_message: Optional[str] = None
+
+
+# -----------------------------------------------------------------------------
+# OBJ PARSING
+# -----------------------------------------------------------------------------
+
+def load_obj_mesh(obj_path: Path) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Load vertex positions and triangles from a Wavefront .obj file.
+
+    Only geometry is read - normals, UVs and materials are ignored.
+    Polygons with more than 3 corners are fan-triangulated.
+
+    Args:
+        obj_path: Path to the .obj file
+
+    Returns:
+        Tuple of (vertices float64 [N, 3], triangles int64 [M, 3])
+
+    Raises:
+        ValueError: If the file has no vertices or no faces
+    """
+    vertices: list[list[str]] = []
+    triangles: list[tuple[int, int, int]] = []
+
+    with open(obj_path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            if line.startswith("v "):
+                vertices.append(line.split()[1:4])
+            elif line.startswith("f "):
+                # "f 1/1/1 2/2/2 3/3/3" -> [1, 2, 3] (position index only)
+                corners = [int(token.split("/")[0]) for token in line.split()[1:]]
+                for k in range(1, len(corners) - 1):
+                    triangles.append((corners[0], corners[k], corners[k + 1]))
+
+    if not vertices or not triangles:
+        raise ValueError(f"No renderable geometry in {obj_path}")
+
+    verts = np.asarray(vertices, dtype=np.float64)
+    tris = np.asarray(triangles, dtype=np.int64)
+
+    # OBJ indices are 1-based; negative indices count back from the end
+    tris = np.where(tris < 0, tris + len(verts), tris - 1)
+
+    return verts, tris
+
+
+# -----------------------------------------------------------------------------
+# RASTERIZER
+# -----------------------------------------------------------------------------
+
+def _normalize_mesh(vertices: np.ndarray) -> np.ndarray:
+    """Center the mesh and scale it so it fits the frame at every angle."""
+    center = (vertices.min(axis=0) + vertices.max(axis=0)) / 2
+    centered = vertices - center
+    radius = np.linalg.norm(centered, axis=1).max()
+    return centered / (radius if radius > 0 else 1.0)
+
+
+def _rotate_y(vertices: np.ndarray, angle: float) -> np.ndarray:
+    """Rotate vertices around the vertical (Y) axis."""
+    c, s = math.cos(angle), math.sin(angle)
+    rotation = np.array([
+        [c, 0.0, s],
+        [0.0, 1.0, 0.0],
+        [-s, 0.0, c],
+    ])
+    return vertices @ rotation.T
+
+
+def _write_fragments(
+    depth: np.ndarray,
+    color: np.ndarray,
+    pixel: np.ndarray,
+    z: np.ndarray,
+    shade: np.ndarray,
+) -> None:
+    """
+    Z-buffer update: keep the nearest fragment per pixel.
+
+    Fragments are sorted by (pixel, depth) so the first entry of each
+    pixel is the nearest one - a deterministic alternative to relying on
+    "last write wins" behavior of fancy-index assignment.
+    """
+    if pixel.size == 0:
+        return
+
+    order = np.lexsort((z, pixel))
+    pixel, z, shade = pixel[order], z[order], shade[order]
+    unique_pixels, first = np.unique(pixel, return_index=True)
+    nearest_z = z[first]
+
+    closer = nearest_z < depth[unique_pixels]
+    target = unique_pixels[closer]
+    depth[target] = nearest_z[closer]
+    color[target] = shade[first][closer]
+
+
+def _rasterize_batch(
+    screen: np.ndarray,
+    x0: np.ndarray,
+    y0: np.ndarray,
+    box_w: int,
+    box_h: int,
+    width: np.ndarray,
+    height: np.ndarray,
+    size: int,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Test every pixel in each triangle's bounding box.
+
+    Args:
+        screen: Triangle corners in screen space [T, 3, 3] (x, y, depth)
+        x0, y0: Top-left pixel of each bounding box [T]
+        box_w, box_h: Candidate grid size shared by the batch
+        width, height: Actual bounding box size per triangle [T]
+        size: Frame size in pixels
+
+    Returns:
+        Tuple of (triangle index, flat pixel index, depth) per fragment
+    """
+    oy, ox = np.mgrid[0:box_h, 0:box_w]
+    ox = ox.ravel()
+    oy = oy.ravel()
+
+    px = x0[:, None] + ox[None, :]        # [T, K]
+    py = y0[:, None] + oy[None, :]
+    valid = (ox[None, :] < width[:, None]) & (oy[None, :] < height[:, None])
+
+    # Sample at pixel centers
+    sx = px + 0.5
+    sy = py + 0.5
+
+    ax, ay, az = (screen[:, 0, i][:, None] for i in range(3))
+    bx, by, bz = (screen[:, 1, i][:, None] for i in range(3))
+    cx, cy, cz = (screen[:, 2, i][:, None] for i in range(3))
+
+    # Barycentric coordinates via edge functions
+    area = (bx - ax) * (cy - ay) - (by - ay) * (cx - ax)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        w0 = ((bx - sx) * (cy - sy) - (by - sy) * (cx - sx)) / area
+        w1 = ((cx - sx) * (ay - sy) - (cy - sy) * (ax - sx)) / area
+    w2 = 1.0 - w0 - w1
+
+    inside = valid & (area != 0) & (w0 >= 0) & (w1 >= 0) & (w2 >= 0)
+    z = w0 * az + w1 * bz + w2 * cz
+
+    tri_index = np.broadcast_to(np.arange(len(screen))[:, None], inside.shape)[inside]
+    pixel = (py * size + px)[inside]
+    return tri_index, pixel, z[inside]
+
+
+def render_view(
+    vertices: np.ndarray,
+    triangles: np.ndarray,
+    angle: float,
+    size: int = DEFAULT_FRAME_SIZE,
+) -> np.ndarray:
+    """
+    Render one orthographic view of a normalized mesh.
+
+    Args:
+        vertices: Normalized vertices [N, 3] (see _normalize_mesh)
+        triangles: Triangle indices [M, 3]
+        angle: Rotation around the Y axis in radians
+        size: Output frame size in pixels (square)
+
+    Returns:
+        RGB image as uint8 array [size, size, 3]
+    """
+    rotated = _rotate_y(vertices, angle)
+
+    # Per-triangle flat shading from the rotated (view-space) normals
+    corners = rotated[triangles]                                  # [M, 3, 3]
+    normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    lengths = np.linalg.norm(normals, axis=1)
+    lengths[lengths == 0] = 1.0
+    lambert = np.abs((normals / lengths[:, None]) @ LIGHT_DIRECTION)
+    shade = AMBIENT_LIGHT + (1.0 - AMBIENT_LIGHT) * lambert
+
+    # Orthographic projection: x right, y down, smaller depth = closer
+    half = size * 0.47
+    screen = np.empty_like(corners)
+    screen[..., 0] = size / 2 + corners[..., 0] * half
+    screen[..., 1] = size / 2 - corners[..., 1] * half
+    screen[..., 2] = -corners[..., 2]
+
+    # Pixel bounding boxes (inclusive), clipped to the frame
+    x0 = np.clip(np.ceil(screen[..., 0].min(axis=1) - 0.5), 0, size - 1).astype(np.int64)
+    x1 = np.clip(np.floor(screen[..., 0].max(axis=1) - 0.5), 0, size - 1).astype(np.int64)
+    y0 = np.clip(np.ceil(screen[..., 1].min(axis=1) - 0.5), 0, size - 1).astype(np.int64)
+    y1 = np.clip(np.floor(screen[..., 1].max(axis=1) - 0.5), 0, size - 1).astype(np.int64)
+    width = x1 - x0 + 1
+    height = y1 - y0 + 1
+
+    depth = np.full(size * size, np.inf)
+    color = np.zeros(size * size)
+
+    # Triangles that fall between pixel centers have width/height <= 0
+    visible = (width > 0) & (height > 0)
+    small = visible & (width <= SMALL_TRIANGLE_BOX) & (height <= SMALL_TRIANGLE_BOX)
+
+    # Pass 1: all small triangles, vectorized in chunks
+    small_ids = np.flatnonzero(small)
+    for start in range(0, len(small_ids), TRIANGLE_CHUNK):
+        ids = small_ids[start:start + TRIANGLE_CHUNK]
+        tri, pixel, z = _rasterize_batch(
+            screen[ids], x0[ids], y0[ids],
+            SMALL_TRIANGLE_BOX, SMALL_TRIANGLE_BOX,
+            width[ids], height[ids], size,
+        )
+        _write_fragments(depth, color, pixel, z, shade[ids][tri])
+
+    # Pass 2: the few large triangles, each with its own bounding box
+    for tri_id in np.flatnonzero(visible & ~small):
+        ids = np.array([tri_id])
+        tri, pixel, z = _rasterize_batch(
+            screen[ids], x0[ids], y0[ids],
+            int(width[tri_id]), int(height[tri_id]),
+            width[ids], height[ids], size,
+        )
+        _write_fragments(depth, color, pixel, z, shade[ids][tri])
+
+    # Compose: shaded mesh over a flat background
+    image = np.empty((size * size, 3))
+    image[:] = BACKGROUND_COLOR
+    covered = np.isfinite(depth)
+    image[covered] = color[covered, None] * MESH_COLOR
+    return image.reshape(size, size, 3).clip(0, 255).astype(np.uint8)
+
+
+def render_turntable(
+    obj_path: Path,
+    views: int = DEFAULT_VIEW_COUNT,
+    size: int = DEFAULT_FRAME_SIZE,
+) -> tuple[list[np.ndarray], int]:
+    """
+    Render evenly spaced turntable views of an .obj file.
+
+    Args:
+        obj_path: Path to the .obj file
+        views: Number of frames around the model
+        size: Frame size in pixels
+
+    Returns:
+        Tuple of (list of RGB frames, triangle count)
+    """
+    vertices, triangles = load_obj_mesh(obj_path)
+    normalized = _normalize_mesh(vertices)
+
+    frames = [
+        render_view(normalized, triangles, 2 * math.pi * i / views, size)
+        for i in range(views)
+    ]
+    return frames, len(triangles)
+
+
+# -----------------------------------------------------------------------------
+# IMAGE OUTPUT
+# -----------------------------------------------------------------------------
+
+def _import_pillow():
+    """Import Pillow lazily so the renderer math works without it."""
+    try:
+        from PIL import Image, ImageDraw
+    except ImportError:
+        raise ImportError(
+            "Pillow package is required for turntable thumbnails.\n"
+            "Install it with: pip install Pillow\n"
+            "Or: uv add Pillow"
+        )
+    return Image, ImageDraw
+
+
+def _render_model_strip(
+    obj_path: Path,
+    output_path: Path,
+    views: int,
+    size: int,
+) -> TurntableResult:
+    """
+    Render one model and save its frames side by side (worker function).
+
+    Errors are captured in the result so one broken model doesn't
+    abort a whole batch.
+    """
+    start_time = time.time()
+    try:
+        Image, _ = _import_pillow()
+        frames, triangle_count = render_turntable(obj_path, views, size)
+        Image.fromarray(np.concatenate(frames, axis=1)).save(output_path, format="PNG")
+        return TurntableResult(
+            obj_path=obj_path,
+            image_path=output_path,
+            triangle_count=triangle_count,
+            elapsed_seconds=time.time() - start_time,
+        )
+    except Exception as e:
+        return TurntableResult(
+            obj_path=obj_path,
+            image_path=None,
+            elapsed_seconds=time.time() - start_time,
+            error_message=str(e),
+        )
+
+
+def build_contact_sheet(results: list[TurntableResult], output_path: Path) -> Optional[Path]:
+    """
+    Stack per-model turntable strips into one labeled contact sheet.
+
+    Args:
+        results: Rendered strips (failed entries are skipped)
+        output_path: Where to write the sheet (PNG)
+
+    Returns:
+        Path to the sheet, or None if nothing rendered
+    """
+    Image, ImageDraw = _import_pillow()
+
+    strips = [r for r in results if r.image_path is not None]
+    if not strips:
+        return None
+
+    images = [Image.open(r.image_path).convert("RGB") for r in strips]
+    label_height = 16
+    sheet_width = max(img.width for img in images)
+    sheet_height = sum(img.height + label_height for img in images)
+
+    sheet = Image.new("RGB", (sheet_width, sheet_height), BACKGROUND_COLOR)
+    draw = ImageDraw.Draw(sheet)
+
+    y = 0
+    for result, img in zip(strips, images):
+        # Label each row with the model folder + file name
+        label = f"{result.obj_path.parent.name}/{result.obj_path.name}"
+        draw.text((4, y + 2), label, fill=(0, 0, 0))
+        sheet.paste(img, (0, y + label_height))
+        y += img.height + label_height
+        img.close()
+
+    sheet.save(output_path, format="PNG")
+    return output_path
+
+
+# -----------------------------------------------------------------------------
+# MAIN ENTRY POINT
+# -----------------------------------------------------------------------------
+
+def render_turntables(
+    obj_paths: list[Path],
+    output_dir: Path,
+    views: int = DEFAULT_VIEW_COUNT,
+    size: int = DEFAULT_FRAME_SIZE,
+    max_workers: Optional[int] = None,
+) -> tuple[list[TurntableResult], Optional[Path]]:
+    """
+    Render turntable strips for many models in parallel, plus a contact sheet.
+
+    Each model's strip is written next to its .obj as turntable.png
+    (or turntable_<stem>.png when a folder holds several models).
+
+    Args:
+        obj_paths: .obj files to render
+        output_dir: Where to write the contact sheet
+        views: Frames per model
+        size: Frame size in pixels
+        max_workers: Process pool size (None = one per CPU)
+
+    Returns:
+        Tuple of (per-model results, contact sheet path or None)
+
+    Example:
+        >>> results, sheet = render_turntables(objs, Path("output"), views=8)
+        >>> print(sheet)
+        output/contact_sheet.png
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    # Pick a strip filename per model (avoid collisions in shared folders)
+    per_folder: dict[Path, int] = {}
+    for obj_path in obj_paths:
+        per_folder[obj_path.parent] = per_folder.get(obj_path.parent, 0) + 1
+
+    strip_paths = [
+        obj_path.parent / (
+            TURNTABLE_FILENAME if per_folder[obj_path.parent] == 1
+            else f"turntable_{obj_path.stem}.png"
+        )
+        for obj_path in obj_paths
+    ]
+
+    if len(obj_paths) <= 1:
+        results = [
+            _render_model_strip(obj_path, strip_path, views, size)
+            for obj_path, strip_path in zip(obj_paths, strip_paths)
+        ]
+    else:
+        workers = max_workers or min(len(obj_paths), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(
+                _render_model_strip,
+                obj_paths,
+                strip_paths,
+                [views] * len(obj_paths),
+                [size] * len(obj_paths),
+            ))
+
+    sheet_path = build_contact_sheet(results, output_dir / CONTACT_SHEET_FILENAME)
+    return results, sheet_path
+
+
+def find_model_objs(root: Path) -> list[Path]:
+    """
+    Find the main .obj of every Hunyuan 3D output folder under root.
+
+    Uses metadata.json's main_obj when present, otherwise every .obj.
+
+    Args:
+        root: Directory to search (e.g., output/hunyuan3d)
+
+    Returns:
+        Sorted list of .obj paths
+    """
+    found: list[Path] = []
+    seen_dirs: set[Path] = set()
+
+    for metadata_path in sorted(root.rglob("metadata.json")):
+        try:
+            main_obj = json.loads(metadata_path.read_text(encoding="utf-8")).get("main_obj")
+        except (OSError, ValueError):
+            continue
+        if main_obj and (metadata_path.parent / main_obj).exists():
+            found.append(metadata_path.parent / main_obj)
+            seen_dirs.add(metadata_path.parent)
+
+    for obj_path in sorted(root.rglob("*.obj")):
+        if obj_path.parent not in seen_dirs:
+            found.append(obj_path)
+
+    return sorted(found)
@@ -0,0 +1,89 @@
+# test_background_review.py - Tests for background work during the image review
+
+import threading
+
+import pytest
+
+from src import background_review
+from src.background_review import ReviewWorker
+from src.stage5_hunyuan3d import PreparedInput
+
+
+@pytest.fixture
+def fake_prepare(monkeypatch):
+    """prepare_3d_input() stand-in: job IDs are "job-<file name>", "fail.png" fails."""
+    calls = []
+
+    def prepare(image, extra_views=None, upload_transform=None, submit=False, provider_type="sdk", registry=None):
+        calls.append((image.name, dict(extra_views or {}), submit))
+        if image.name == "fail.png":
+            raise RuntimeError("COS unreachable")
+        return PreparedInput(
+            image=image,
+            image_url=f"https://cos.example.com/{image.name}",
+            multi_view_images=[],
+            uploads=[],
+            job_id=f"job-{image.name}" if submit else None,
+        )
+
+    monkeypatch.setattr(background_review, "prepare_3d_input", prepare)
+    return calls
+
+
+class TestCandidates:
+    """Tests for uploading/submitting the front candidate."""
+
+    def test_use_returns_current_candidate(self, tmp_path, fake_prepare):
+        """Test that the approved image gets its upload, any other image none."""
+        worker = ReviewWorker(extra_views={"back": tmp_path / "back.png"})
+        worker.prepare(tmp_path / "front.png")
+
+        prepared = worker.use(tmp_path / "front.png")
+        assert prepared.image_url == "https://cos.example.com/front.png"
+        assert worker.use(tmp_path / "other.png") is None
+        assert fake_prepare == [("front.png", {"back": tmp_path / "back.png"}, False)]
+        worker.close(used=tmp_path / "front.png")
+
+    def test_replaced_speculative_job_is_reported(self, tmp_path, fake_prepare, capsys):
+        """Test that a job for an abandoned candidate is reported once, the used one never."""
+        worker = ReviewWorker(submit=True)
+        worker.prepare(tmp_path / "front.png")
+        assert worker.use(tmp_path / "front.png").job_id == "job-front.png"
+
+        worker.prepare(tmp_path / "front_edited.png")
+        assert worker.use(tmp_path / "front_edited.png").job_id == "job-front_edited.png"
+        worker.close(used=tmp_path / "front_edited.png")
+
+        out = capsys.readouterr().out
+        assert out.count("Speculative 3D job job-front.png for front.png is not used") == 1
+        assert "job-front_edited.png" not in out
+
+    def test_failed_upload(self, tmp_path, fake_prepare, capsys):
+        """Test that a failed upload is shown and use() falls back to None."""
+        worker = ReviewWorker()
+        worker.prepare(tmp_path / "fail.png")
+
+        assert worker.use(tmp_path / "fail.png") is None
+        assert "COS unreachable" in worker.status_lines(tmp_path / "fail.png")[0]
+        assert "uploading again" in capsys.readouterr().out
+        worker.close()
+
+
+class TestTasks:
+    """Tests for regenerations and edits running while the menu is shown."""
+
+    def test_running_then_finished(self, tmp_path, fake_prepare):
+        """Test that a task is listed as running until done, then handed out once."""
+        release = threading.Event()
+        worker = ReviewWorker()
+        task = worker.start("Edit 'shorter coat'", "edit", tmp_path / "front.png", lambda: release.wait(5) and b"jpeg")
+
+        assert worker.running() == [task]
+        assert worker.finished() == []
+        assert "Edit 'shorter coat'" in worker.status_lines(tmp_path / "front.png")[0]
+
+        release.set()
+        assert task.future.result(timeout=5) == b"jpeg"
+        assert worker.finished() == [task]
+        assert worker.finished() == [] and worker.running() == []
+        worker.close()
@@ -0,0 +1,165 @@
+# test_batch_refiner.py - Tests for the OpenAI Batch API refinement mode
+
+import json
+
+import pytest
+
+from benchmarks.stand_ins import StandInConfig, StandInServer
+from src.batch_refiner import (
+    BATCH_ENDPOINT,
+    build_batch_requests,
+    find_spec_files,
+    parse_batch_results,
+    refine_prompts_batch,
+)
+from src.models import CharacterSpec
+
+
+# Batches "complete" almost at once so the end-to-end tests stay fast
+FAST_CONFIG = StandInConfig(openai_latency=0, jitter=0, batch_seconds=0.2)
+
+
+def _specs() -> list[CharacterSpec]:
+    return [
+        CharacterSpec(name="Aethel", role="Scout", color_palette=["teal"]),
+        CharacterSpec(name="Borin", role="Smith", color_palette=["rust"]),
+    ]
+
+
+def _output_line(custom_id: str, text: str, status_code: int = 200) -> str:
+    """One line of a Batch API output file."""
+    body = {
+        "output": [{"type": "message", "content": [{"type": "output_text", "text": text}]}],
+        "usage": {"input_tokens": 100, "output_tokens": 50},
+    }
+    return json.dumps({
+        "custom_id": custom_id,
+        "response": {"status_code": status_code, "body": body},
+        "error": None,
+    })
+
+
+class TestBuildRequests:
+    """Tests for turning specs into Batch API input lines."""
+
+    def test_per_view_lines(self):
+        """Test four Responses API requests per character with unique custom_ids."""
+        lines = build_batch_requests(_specs(), model="gpt-5.2")
+
+        assert len(lines) == 8
+        assert len({line["custom_id"] for line in lines}) == 8
+        assert all(line["url"] == BATCH_ENDPOINT for line in lines)
+        assert lines[0]["custom_id"] == "00000:concept_prompt:aethel"
+        assert lines[0]["body"]["model"] == "gpt-5.2"
+        assert "instructions" in lines[0]["body"]
+
+    def test_single_mode_uses_schema(self):
+        """Test one structured-output request per character."""
+        lines = build_batch_requests(_specs(), mode="single")
+
+        assert len(lines) == 2
+        assert lines[1]["custom_id"] == "00001:all:borin"
+        assert lines[1]["body"]["text"]["format"]["type"] == "json_schema"
+
+    def test_invalid_mode(self):
+        """Test that an unknown mode is rejected."""
+        with pytest.raises(ValueError):
+            build_batch_requests(_specs(), mode="bulk")
+
+
+class TestParseResults:
+    """Tests for mapping batch output back to characters."""
+
+    def test_complete_and_incomplete_characters(self):
+        """Test that a character with a failed request is reported, not half-written."""
+        names = ["concept_prompt", "tpose_front", "tpose_side", "tpose_back"]
+        output = [_output_line(f"00000:{name}:aethel", f"{name} text") for name in names]
+        output += [_output_line(f"00001:{name}:borin", "text") for name in names[:3]]
+        errors = [json.dumps({
+            "custom_id": "00001:tpose_back:borin",
+            "response": None,
+            "error": {"code": "server_error", "message": "boom"},
+        })]
+
+        prompts, failures, usage = parse_batch_results("\n".join(output), "\n".join(errors), 2)
+
+        assert prompts == {0: {name: f"{name} text" for name in names}}
+        assert failures == {1: "tpose_back: boom"}
+        assert usage.calls == 7
+        assert usage.input_tokens == 700
+
+    def test_missing_results(self):
+        """Test that characters absent from the output are failures."""
+        prompts, failures, _ = parse_batch_results(None, None, 1)
+
+        assert prompts == {}
+        assert "no result" in failures[0]
+
+
+class TestFindSpecFiles:
+    """Tests for collecting spec files from a folder."""
+
+    def test_folder_and_file(self, tmp_path):
+        """Test sorted YAML/JSON files, skipping underscore-prefixed ones."""
+        for name in ("b.yaml", "a.json", "_draft.yaml", "notes.txt"):
+            (tmp_path / name).write_text("name: X\n")
+
+        assert [p.name for p in find_spec_files(tmp_path)] == ["a.json", "b.yaml"]
+        assert find_spec_files(tmp_path / "b.yaml") == [tmp_path / "b.yaml"]
+
+
+class TestEndToEnd:
+    """Tests against the local Files/Batches stand-in."""
+
+    @pytest.fixture
+    def server(self, monkeypatch):
+        """Start stand-ins with a given config and point OpenAI at them."""
+        started = []
+
+        def start(config: StandInConfig = FAST_CONFIG) -> StandInServer:
+            stand_in = StandInServer(config).start()
+            started.append(stand_in)
+            for key, value in stand_in.env().items():
+                monkeypatch.setenv(key, value)
+            return stand_in
+
+        yield start
+        for stand_in in started:
+            stand_in.stop()
+
+    @pytest.mark.parametrize("mode", ["per-view", "single"])
+    def test_round_trip(self, server, tmp_path, mode):
+        """Test submit → poll → download → prompts for every character."""
+        stand_in = server()
+
+        result = refine_prompts_batch(_specs(), tmp_path, mode=mode, poll_interval=0.05, timeout=10)
+
+        assert result.status == "completed"
+        assert sorted(result.prompts) == [0, 1]
+        assert set(result.prompts[0]) == {"concept_prompt", "tpose_front", "tpose_side", "tpose_back"}
+        assert result.failures == {}
+        assert (tmp_path / "requests.jsonl").exists()
+        assert json.loads((tmp_path / "batch.json").read_text())["batch_id"] == result.batch_id
+        assert stand_in.stats["requests"]["openai.batches"] == 1
+
+    def test_failed_requests_are_reported(self, server, tmp_path):
+        """Test that failed batch lines end up in failures."""
+        server(StandInConfig(openai_latency=0, jitter=0, batch_seconds=0.2, batch_fail_every=4))
+
+        result = refine_prompts_batch(_specs(), tmp_path, poll_interval=0.05, timeout=10)
+
+        assert len(result.prompts) + len(result.failures) == 2
+        assert result.failures
+        assert (tmp_path / "errors.jsonl").exists()
+
+    def test_attach_to_existing_batch(self, server, tmp_path):
+        """Test --batch-id: wait for a batch without submitting another."""
+        stand_in = server()
+        first = refine_prompts_batch(_specs(), tmp_path / "a", poll_interval=0.05, timeout=10)
+
+        again = refine_prompts_batch(
+            _specs(), tmp_path / "b", poll_interval=0.05, timeout=10, batch_id=first.batch_id,
+        )
+
+        assert again.prompts == first.prompts
+        assert stand_in.stats["requests"]["openai.batches"] == 1
@@ -0,0 +1,98 @@
+# test_benchmarks.py - Tests for the offline benchmark suite and its stand-ins
+
+import pytest
+
+from benchmarks.run_benchmarks import percentile, run_benchmarks
+from benchmarks.spec_memory import run_spec_memory
+from benchmarks.stand_ins import StandInConfig, StandInServer
+
+
+# Zero latency and tiny payloads keep these tests fast
+FAST_CONFIG = StandInConfig(
+    openai_latency=0,
+    gemini_latency=0,
+    tencent_latency=0,
+    cos_latency=0,
+    download_latency=0,
+    job_seconds=0.1,
+    jitter=0,
+    image_edge=256,
+    model_faces=200,
+    texture_edge=32,
+)
+
+
+class TestPercentile:
+    """Tests for the report statistics."""
+
+    def test_interpolates(self):
+        """Test linear interpolation between ranks."""
+        values = [1.0, 2.0, 3.0, 4.0]
+
+        assert percentile(values, 50) == 2.5
+        assert percentile(values, 100) == 4.0
+        assert percentile([], 95) is None
+
+
+class TestStandIns:
+    """Tests for the stand-in server itself."""
+
+    def test_scaled_only_touches_timing(self):
+        """Test that scaled() multiplies latencies but not payload sizes."""
+        config = StandInConfig(gemini_latency=1.0, job_seconds=2.0, image_edge=512).scaled(0.5)
+
+        assert (config.gemini_latency, config.job_seconds, config.image_edge) == (0.5, 1.0, 512)
+
+    def test_env_points_at_server(self):
+        """Test that every endpoint override targets the local server."""
+        with StandInServer(FAST_CONFIG) as server:
+            env = server.env()
+
+            assert env["OPENAI_BASE_URL"] == f"{server.base_url}/v1"
+            assert env["HUNYUAN3D_API_ENDPOINT"] == server.base_url
+            assert env["TENCENT_COS_ENDPOINT"] == server.base_url
+            assert env["GOOGLE_GEMINI_BASE_URL"] == server.base_url
+
+
+class TestRunBenchmarks:
+    """End-to-end runs against the stand-ins."""
+
+    def test_stage_scenarios(self):
+        """Test that the stage functions run offline and are reported."""
+        report = run_benchmarks(
+            ["static_prompts", "call_openai", "refine_prompts_single", "generate_image", "generate_3d_model"],
+            concurrency_levels=[2],
+            iterations=2,
+            config=FAST_CONFIG,
+        )
+
+        assert [r["scenario"] for r in report["results"]] == [
+            "static_prompts", "call_openai", "refine_prompts_single", "generate_image", "generate_3d_model",
+        ]
+        for result in report["results"]:
+            assert result["errors"] == 0, result["error_sample"]
+            assert result["completed"] == 2
+            assert result["latency_ms"]["p95"] >= result["latency_ms"]["p50"]
+
+        requests = report["server_requests"]
+        assert requests["openai.responses"] == 4  # 2 call_openai + 2 refine_prompts_single
+        assert requests["gemini.generateContent"] == 2
+        assert requests["cos.put"] == 2
+        assert requests["hunyuan3d.SubmitHunyuanTo3DProJob"] == 2
+
+    def test_unknown_scenario(self):
+        """Test that unknown scenario names are rejected up front."""
+        with pytest.raises(ValueError) as exc_info:
+            run_benchmarks(["nope"], [1], 1, FAST_CONFIG)
+        assert "unknown scenario" in str(exc_info.value).lower()
+
+
+class TestSpecMemory:
+    """Tests for the spec memory benchmark."""
+
+    def test_frozen_specs_are_smaller(self):
+        """Test that both representations hold the same specs and frozen ones use less memory."""
+        report = run_spec_memory(300)
+
+        assert report["mutable"]["unique"] == report["frozen"]["unique"] == 300
+        assert report["frozen"]["bytes"] < report["mutable"]["bytes"]
@@ -0,0 +1,99 @@
+# test_file_utils.py - Tests for atomic prompt writes and the run manifest
+
+import hashlib
+import json
+import os
+
+import pytest
+
+from src.file_utils import MANIFEST_NAME, atomic_write_bytes, load_manifest, write_prompts
+from src.models import CharacterSpec
+
+
+SPEC = CharacterSpec(name="Aethel")
+PROMPTS = {
+    "base_2d_full_body": "full-body concept art",
+    "base_2d_sheet": "character sheet",
+    "common_design_notes": "DESIGN NOTES ✓",
+}
+
+
+class TestAtomicWrite:
+    """Tests for temp-file + rename writes."""
+
+    def test_replaces_content(self, tmp_path):
+        """Test that the new content lands and no temp file is left over."""
+        path = tmp_path / "a.txt"
+        path.write_text("old")
+
+        atomic_write_bytes(path, b"new")
+
+        assert path.read_bytes() == b"new"
+        assert os.listdir(tmp_path) == ["a.txt"]
+
+    def test_failure_keeps_old_file(self, tmp_path, monkeypatch):
+        """Test that an interrupted write leaves the old file and no temp file."""
+        path = tmp_path / "a.txt"
+        path.write_text("old")
+
+        def fail(*args):
+            raise KeyboardInterrupt
+
+        monkeypatch.setattr(os, "replace", fail)
+        with pytest.raises(KeyboardInterrupt):
+            atomic_write_bytes(path, b"new")
+
+        assert path.read_text() == "old"
+        assert os.listdir(tmp_path) == ["a.txt"]
+
+
+class TestWritePrompts:
+    """Tests for write_prompts() and manifest.json."""
+
+    def test_manifest(self, tmp_path):
+        """Test one manifest entry per file with key, size, and SHA-256."""
+        paths = write_prompts(PROMPTS, SPEC, tmp_path, "v1")
+
+        manifest = load_manifest(tmp_path)
+        entry = manifest["common/aethel_design_notes_v1.txt"]
+        data = PROMPTS["common_design_notes"].encode("utf-8")
+
+        assert len(paths) == 3 and all(p.exists() for p in paths)
+        assert set(manifest) == {p.relative_to(tmp_path).as_posix() for p in paths}
+        assert entry["key"] == "common_design_notes"
+        assert entry["size"] == len(data)
+        assert entry["sha256"] == hashlib.sha256(data).hexdigest()
+
+    def test_unchanged_files_are_not_rewritten(self, tmp_path):
+        """Test that a second run only rewrites files whose content changed."""
+        write_prompts(PROMPTS, SPEC, tmp_path, "v1")
+        sheet = tmp_path / "base" / "aethel_2d_sheet_v1.txt"
+        full_body = tmp_path / "base" / "aethel_2d_base_v1.txt"
+        sheet_mtime = sheet.stat().st_mtime_ns
+        full_body_inode = full_body.stat().st_ino
+
+        write_prompts({**PROMPTS, "base_2d_full_body": "edited"}, SPEC, tmp_path, "v1")
+
+        assert sheet.stat().st_mtime_ns == sheet_mtime
+        assert full_body.read_text() == "edited"
+        assert full_body.stat().st_ino != full_body_inode  # Replaced, not edited in place
+
+    def test_external_edit_is_overwritten(self, tmp_path):
+        """Test that a file changed behind the manifest's back is rewritten."""
+        write_prompts(PROMPTS, SPEC, tmp_path, "v1")
+        sheet = tmp_path / "base" / "aethel_2d_sheet_v1.txt"
+        sheet.write_text("hand edit")
+
+        write_prompts(PROMPTS, SPEC, tmp_path, "v1")
+
+        assert sheet.read_text() == "character sheet"
+
+    def test_calls_merge_into_one_manifest(self, tmp_path):
+        """Test that later writes in the same run add to the manifest."""
+        write_prompts(PROMPTS, SPEC, tmp_path, "v1")
+        write_prompts({"refined_concept": "refined"}, SPEC, tmp_path, "v1")
+
+        files = json.loads((tmp_path / MANIFEST_NAME).read_text())["files"]
+
+        assert "refined/aethel_refined_concept_v1.txt" in files
+        assert len(files) == 4
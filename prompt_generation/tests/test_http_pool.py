@@ -0,0 +1,72 @@
+# test_http_pool.py - Tests for the shared HTTP connection pool
+
+import pytest
+
+from benchmarks.stand_ins import StandInConfig, StandInServer
+from src.providers import RawHttpHunyuan3DProvider, TencentCOSUploader
+from src.providers.http_pool import HttpPool, close_http_pool, get_http_pool
+from src.tracing import span, start_trace, stop_trace
+
+
+@pytest.fixture
+def stand_in(monkeypatch):
+    """Stand-in Hunyuan/COS APIs and a fresh process-wide pool."""
+    close_http_pool()
+    with StandInServer(StandInConfig(tencent_latency=0, cos_latency=0, download_latency=0, jitter=0)) as server:
+        for key, value in server.env().items():
+            monkeypatch.setenv(key, value)
+        monkeypatch.setenv("TENCENT_SECRET_ID", "test-id")
+        monkeypatch.setenv("TENCENT_SECRET_KEY", "test-key")
+        monkeypatch.setenv("TENCENT_COS_BUCKET", "bucket-1250000000")
+        monkeypatch.setenv("TENCENT_COS_REGION", "ap-guangzhou")
+        yield server
+    close_http_pool()
+
+
+@pytest.fixture
+def tracer():
+    active = start_trace()
+    yield active
+    stop_trace()
+
+
+class TestConnectionReuse:
+    """Tests for sharing connections between clients."""
+
+    def test_providers_share_connections(self, stand_in, tracer):
+        """Test that a second provider and uploader reuse the first one's connection."""
+        with RawHttpHunyuan3DProvider() as provider:
+            job_id = provider.submit(prompt="A robot")
+        with TencentCOSUploader() as uploader:
+            uploader.upload_bytes(b"jpeg", "hunyuan3d/front.jpg", content_type="image/jpeg")
+        with RawHttpHunyuan3DProvider() as provider:
+            provider.poll(job_id)
+
+        by_name = {s.name: s.args for s in tracer.spans}
+        assert by_name["hunyuan3d.submit"]["connections_new"] == 1
+        assert by_name["cos.upload_bytes"]["connections_reused"] == 1
+        assert by_name["hunyuan3d.poll"]["connections_reused"] == 1
+        assert tracer.connection_counts() == (1, 2)
+
+    def test_closing_a_client_keeps_the_pool(self, stand_in):
+        """Test that a closed borrowed client leaves pooled connections open."""
+        with HttpPool(http2=False) as pool:
+            url = f"{stand_in.base_url}/files/missing.zip"
+            first = pool.client(timeout=5)
+            first.get(url)
+            first.close()
+
+            with span("download") as s:
+                pool.client(timeout=5).get(url)
+
+            assert (pool.connections_new, pool.connections_reused) == (1, 1)
+            assert s.args == {"connections_reused": 1}
+
+    def test_closed_shared_pool_is_replaced(self):
+        """Test that get_http_pool() opens a new pool after close_http_pool()."""
+        pool = get_http_pool()
+        close_http_pool()
+
+        assert pool.closed
+        assert get_http_pool() is not pool
+        close_http_pool()
@@ -0,0 +1,234 @@
+# test_image_encoding.py - Tests for image format detection and encoding
+
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from src.image_encoding import (
+    ImageEncoding,
+    UploadTransform,
+    detect_image_format,
+    encode_image,
+    encode_images,
+    extension_for,
+    transform_for_upload,
+)
+from src.models import CharacterSpec
+from src import stage4_image_generation
+from src.stage4_image_generation import (
+    GeneratedImage,
+    find_image_candidates,
+    generate_view_candidates,
+    save_generated_images,
+    save_image_candidates,
+)
+
+
+def _image_bytes(fmt: str, size=(64, 64), color=(200, 80, 40)) -> bytes:
+    """Encode a gradient test image in the given Pillow format."""
+    img = Image.new("RGB", size, color)
+    for x in range(size[0]):
+        img.putpixel((x, x % size[1]), (x * 4 % 256, 10, 200))
+    buffer = BytesIO()
+    img.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def spec() -> CharacterSpec:
+    return CharacterSpec(
+        name="Test Hero",
+        role="tester",
+        game_style="stylized",
+        silhouette="tall",
+        color_palette=["red"],
+        key_props=[],
+        animation_focus=[],
+    )
+
+
+class TestDetectImageFormat:
+    """Tests for magic-byte format detection."""
+
+    @pytest.mark.parametrize(
+        "pil_format, expected, extension",
+        [("PNG", "png", ".png"), ("JPEG", "jpeg", ".jpg"), ("WEBP", "webp", ".webp")],
+    )
+    def test_known_formats(self, pil_format, expected, extension):
+        """Test that PNG/JPEG/WebP are recognized from their headers."""
+        data = _image_bytes(pil_format)
+
+        assert detect_image_format(data) == expected
+        assert extension_for(data) == extension
+
+    def test_unknown_format(self):
+        """Test that unknown bytes fall back to the historic .jpg extension."""
+        assert detect_image_format(b"not an image") is None
+        assert extension_for(b"not an image") == ".jpg"
+
+
+class TestEncodeImage:
+    """Tests for single-image encoding."""
+
+    def test_keep_is_noop(self):
+        """Test that the default settings return the exact input bytes."""
+        data = _image_bytes("PNG")
+
+        assert encode_image(data, ImageEncoding()) is data
+
+    def test_png_to_jpeg(self):
+        """Test conversion to JPEG."""
+        encoded = encode_image(_image_bytes("PNG"), ImageEncoding(format="jpeg", quality=80))
+
+        assert detect_image_format(encoded) == "jpeg"
+
+    def test_lossless_keeps_pixels(self):
+        """Test that lossless WebP output decodes to the same pixels."""
+        data = _image_bytes("PNG")
+
+        encoded = encode_image(data, ImageEncoding(format="webp", lossless=True))
+
+        assert detect_image_format(encoded) == "webp"
+        with Image.open(BytesIO(data)) as a, Image.open(BytesIO(encoded)) as b:
+            assert a.convert("RGB").tobytes() == b.convert("RGB").tobytes()
+
+    def test_lossless_keep_leaves_jpeg_alone(self):
+        """Test that recompressing a JPEG 'losslessly' is skipped."""
+        data = _image_bytes("JPEG")
+
+        assert encode_image(data, ImageEncoding(lossless=True)) is data
+
+    def test_jpeg_to_jpeg_is_not_reencoded(self):
+        """Test that JPEG input isn't recompressed (and degraded) when JPEG is requested."""
+        data = _image_bytes("JPEG")
+
+        assert encode_image(data, ImageEncoding(format="jpeg", quality=80)) is data
+
+    def test_invalid_format(self):
+        """Test that unknown output formats are rejected."""
+        with pytest.raises(ValueError) as exc_info:
+            ImageEncoding(format="tiff")
+        assert "invalid image format" in str(exc_info.value).lower()
+
+
+class TestEncodeImages:
+    """Tests for batch encoding."""
+
+    def test_pool_preserves_order(self):
+        """Test that pooled results come back in input order."""
+        images = [_image_bytes("PNG", size=(32 + i * 16, 32)) for i in range(3)]
+
+        encoded = encode_images(images, ImageEncoding(format="jpeg", max_workers=2))
+
+        sizes = []
+        for data in encoded:
+            with Image.open(BytesIO(data)) as img:
+                sizes.append(img.size)
+        assert sizes == [(32, 32), (48, 32), (64, 32)]
+
+
+class TestStage4Filenames:
+    """Tests for content-aware filenames in Stage 4."""
+
+    def test_png_bytes_get_png_extension(self):
+        """Test that PNG data is no longer written as .jpg."""
+        image = GeneratedImage(view="front", image_data=_image_bytes("PNG"), prompt_used="")
+
+        assert image.get_filename("Test Hero", "v1") == "test_hero_tpose_front_v1.png"
+        assert image.mime_type == "image/png"
+
+    def test_save_with_encoding(self, spec, tmp_path):
+        """Test that saving re-encodes and names files by content."""
+        images = [
+            GeneratedImage(view=view, image_data=_image_bytes("PNG"), prompt_used="")
+            for view in ("front", "side")
+        ]
+
+        paths = save_generated_images(
+            images, spec, tmp_path, "v1", encoding=ImageEncoding(format="jpeg"),
+        )
+
+        assert [p.name for p in paths] == [
+            "test_hero_tpose_front_v1.jpg",
+            "test_hero_tpose_side_v1.jpg",
+        ]
+        assert all(detect_image_format(p.read_bytes()) == "jpeg" for p in paths)
+
+
+class TestImageCandidates:
+    """Tests for best-of-N candidates in Stage 4."""
+
+    def test_generated_concurrently_failures_left_out(self, spec, monkeypatch):
+        """Test that N requests overlap and a failed one doesn't sink the rest."""
+        calls = []
+
+        def fake_generate(prompt, api_key, aspect_ratio, image_size):
+            calls.append(prompt)
+            if len(calls) == 2:
+                raise RuntimeError("rate limited")
+            return _image_bytes("PNG")
+
+        monkeypatch.setattr(stage4_image_generation, "generate_image_with_gemini", fake_generate)
+        images = generate_view_candidates(spec, "front", 3, api_key="key")
+
+        assert len(calls) == 3 and len(set(calls)) == 1
+        assert len(images) == 2 and all(image.view == "front" for image in images)
+        with pytest.raises(ValueError):
+            generate_view_candidates(spec, "front", 0, api_key="key")
+
+    def test_saved_candidates_are_numbered(self, spec, tmp_path):
+        """Test that saving more candidates never overwrites earlier ones."""
+        image = lambda: GeneratedImage(view="front", image_data=_image_bytes("PNG"), prompt_used="")
+
+        save_image_candidates([image(), image()], spec, tmp_path, "v1", encoding=ImageEncoding(format="jpeg"))
+        save_image_candidates([image()], spec, tmp_path, "v1", encoding=ImageEncoding(format="jpeg"))
+
+        assert sorted(p.name for p in find_image_candidates(spec, tmp_path, "v1")) == [
+            "test_hero_tpose_front_v1_candidate1.jpg",
+            "test_hero_tpose_front_v1_candidate2.jpg",
+            "test_hero_tpose_front_v1_candidate3.jpg",
+        ]
+        assert find_image_candidates(spec, tmp_path, "v1", view="back") == []
+
+
+class TestTransformForUpload:
+    """Tests for the in-memory pre-upload transform."""
+
+    def test_downscales_and_recompresses(self):
+        """Test that a large PNG becomes a smaller JPEG within max_edge."""
+        data = _image_bytes("PNG", size=(800, 400))
+
+        uploaded = transform_for_upload(data, UploadTransform(max_edge=200))
+
+        assert detect_image_format(uploaded) == "jpeg"
+        with Image.open(BytesIO(uploaded)) as img:
+            assert img.size == (200, 100)
+
+    def test_strips_exif(self):
+        """Test that EXIF metadata is dropped by default."""
+        img = Image.new("RGB", (300, 300), (255, 255, 255))
+        exif = Image.Exif()
+        exif[0x010F] = "Test Camera"  # Make
+        buffer = BytesIO()
+        img.save(buffer, format="JPEG", exif=exif.tobytes())
+
+        uploaded = transform_for_upload(buffer.getvalue(), UploadTransform(max_edge=100))
+
+        with Image.open(BytesIO(uploaded)) as result:
+            assert "exif" not in result.info
+
+    def test_keeps_original_when_not_smaller(self):
+        """Test that a tiny JPEG is uploaded unchanged."""
+        buffer = BytesIO()
+        Image.new("RGB", (16, 16), (90, 90, 90)).save(
+            buffer, format="JPEG", quality=20, optimize=True,
+        )
+        data = buffer.getvalue()
+
+        assert transform_for_upload(data, UploadTransform(quality=100)) is data
+
+    def test_invalid_upload_format(self):
+        """Test that unsupported upload formats are rejected."""
+        with pytest.raises(ValueError):
+            UploadTransform(format="png")
@@ -0,0 +1,223 @@
+# test_image_preflight.py - Tests for the Stage 4 → 5 image preflight
+
+from io import BytesIO
+
+from PIL import Image, ImageDraw
+
+from src.image_preflight import preflight_score, preflight_with_retries, rank_images, run_preflight
+
+
+def _tpose_image(
+    size: int = 512,
+    background=(255, 255, 255),
+    offset_x: int = 0,
+    arms: bool = True,
+    feet_cropped: bool = False,
+    noise: bool = False,
+) -> bytes:
+    """Draw a stick-figure T-pose silhouette and return PNG bytes."""
+    img = Image.new("RGB", (size, size), background)
+    draw = ImageDraw.Draw(img)
+    cx = size // 2 + offset_x
+    bottom = size if feet_cropped else int(size * 0.92)
+    color = (60, 60, 90)
+
+    # Head, torso, legs
+    draw.ellipse([cx - 25, 40, cx + 25, 90], fill=color)
+    draw.rectangle([cx - 40, 90, cx + 40, 280], fill=color)
+    draw.rectangle([cx - 35, 280, cx - 10, bottom], fill=color)
+    draw.rectangle([cx + 10, 280, cx + 35, bottom], fill=color)
+
+    if arms:
+        # Horizontal arms at shoulder height
+        draw.rectangle([cx - 200, 100, cx + 200, 125], fill=color)
+    else:
+        # Arms hanging down beside the torso
+        draw.rectangle([cx - 60, 95, cx - 45, 260], fill=color)
+        draw.rectangle([cx + 45, 95, cx + 60, 260], fill=color)
+
+    if noise:
+        # Busy background along the borders
+        for i in range(0, size, 8):
+            draw.line([(i, 0), (i, 12)], fill=(i % 255, 30, 200))
+            draw.line([(0, i), (12, i)], fill=(20, i % 255, 90))
+
+    buffer = BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _failed(report) -> set[str]:
+    return {check.name for check in report.failures}
+
+
+class TestRunPreflight:
+    """Tests for the individual preflight checks."""
+
+    def test_good_tpose_passes(self):
+        """Test that a centered, symmetric T-pose on white passes everything."""
+        report = run_preflight(_tpose_image(), view="front")
+
+        assert report.passed, report.summary()
+        names = {check.name for check in report.checks}
+        assert {"background", "margins", "centering", "symmetry", "arm_extension"} <= names
+
+    def test_cropped_feet(self):
+        """Test that a subject touching the bottom edge fails margins."""
+        report = run_preflight(_tpose_image(feet_cropped=True), view="front")
+
+        assert "margins" in _failed(report)
+        assert "feet" in next(c for c in report.failures if c.name == "margins").message
+
+    def test_busy_background(self):
+        """Test that a non-uniform border fails the background check."""
+        report = run_preflight(_tpose_image(noise=True), view="front")
+
+        assert "background" in _failed(report)
+
+    def test_dark_background(self):
+        """Test that a dark background fails even if it's uniform."""
+        report = run_preflight(_tpose_image(background=(20, 20, 20)), view="front")
+
+        assert "background" in _failed(report)
+
+    def test_off_center(self):
+        """Test that a shifted subject fails centering."""
+        report = run_preflight(_tpose_image(offset_x=-50), view="front")
+
+        assert "centering" in _failed(report)
+
+    def test_arms_down(self):
+        """Test that an arms-down pose fails arm extension."""
+        report = run_preflight(_tpose_image(arms=False), view="front")
+
+        assert "arm_extension" in _failed(report)
+
+    def test_side_view_skips_pose_checks(self):
+        """Test that symmetry/arm checks only apply to front/back views."""
+        report = run_preflight(_tpose_image(arms=False), view="side")
+
+        names = {check.name for check in report.checks}
+        assert "symmetry" not in names
+        assert "arm_extension" not in names
+
+    def test_empty_image(self):
+        """Test that a blank image reports a missing subject."""
+        buffer = BytesIO()
+        Image.new("RGB", (128, 128), (255, 255, 255)).save(buffer, format="PNG")
+
+        report = run_preflight(buffer.getvalue(), view="front")
+
+        assert _failed(report) == {"subject"}
+
+
+class TestPreflightWithRetries:
+    """Tests for the regenerate-until-pass loop."""
+
+    def test_regenerates_until_pass(self):
+        """Test that a failing image is replaced by a passing regeneration."""
+        bad = _tpose_image(feet_cropped=True)
+        good = _tpose_image()
+        calls = []
+
+        def regenerate():
+            calls.append(1)
+            return good
+
+        data, report, attempts = preflight_with_retries(
+            bad, "front", regenerate, max_regenerations=3,
+        )
+
+        assert report.passed
+        assert data == good
+        assert attempts == 1
+        assert len(calls) == 1
+
+    def test_blank_regeneration_does_not_replace_real_image(self):
+        """Test that a blank image (one failed check) loses to an imperfect real one."""
+        imperfect = _tpose_image(noise=True, feet_cropped=True, offset_x=120)
+        buffer = BytesIO()
+        Image.new("RGB", (512, 512), (255, 255, 255)).save(buffer, format="PNG")
+        blank = buffer.getvalue()
+
+        data, report, attempts = preflight_with_retries(
+            imperfect, "front", lambda: blank, max_regenerations=2,
+        )
+
+        assert len(_failed(run_preflight(imperfect))) > len(_failed(run_preflight(blank)))
+        assert data == imperfect
+        assert attempts == 2
+
+    def test_no_regeneration_when_passing(self):
+        """Test that a passing image never triggers regeneration."""
+        good = _tpose_image()
+
+        def regenerate():
+            raise AssertionError("should not regenerate")
+
+        data, report, attempts = preflight_with_retries(
+            good, "front", regenerate, max_regenerations=2,
+        )
+
+        assert report.passed
+        assert attempts == 0
+
+
+class TestRankImages:
+    """Tests for ranking best-of-N candidates."""
+
+    def test_best_first(self):
+        """Test that fewer failures rank higher, whatever the input order."""
+        cropped = _tpose_image(feet_cropped=True)
+        busy_and_cropped = _tpose_image(noise=True, feet_cropped=True)
+        good = _tpose_image()
+
+        ranked = rank_images([busy_and_cropped, cropped, good], view="front")
+
+        assert [candidate.index for candidate in ranked] == [2, 1, 0]
+        assert ranked[0].image_data == good and ranked[0].report.passed
+
+    def test_measured_values_break_ties(self):
+        """Test that among passing images the more symmetric one wins."""
+        img = Image.open(BytesIO(_tpose_image()))
+        ImageDraw.Draw(img).rectangle([300, 125, 330, 240], fill=(60, 60, 90))  # Prop in one hand
+        buffer = BytesIO()
+        img.save(buffer, format="PNG")
+
+        symmetric = run_preflight(_tpose_image(), view="front")
+        with_prop = run_preflight(buffer.getvalue(), view="front")
+
+        assert symmetric.passed and with_prop.passed
+        assert int(preflight_score(symmetric)) == int(preflight_score(with_prop)) == len(symmetric.checks)
+        assert preflight_score(symmetric) > preflight_score(with_prop)
+
+
+class TestAutoThreeDGate:
+    """Tests for the preflight gate in `all --auto-3d` (no review step)."""
+
+    def test_failed_front_is_not_sent_to_3d(self, tmp_path, monkeypatch, capsys):
+        """Test that a front image that failed preflight never starts a Hunyuan job."""
+        from benchmarks.stand_ins import StandInConfig, StandInServer
+        from generate_prompts import generate_all_command
+
+        spec_file = tmp_path / "aethel.yaml"
+        spec_file.write_text("name: Aethel\nrole: Scout\n", encoding="utf-8")
+        config = StandInConfig(
+            gemini_latency=0, tencent_latency=0, cos_latency=0, download_latency=0,
+            job_seconds=0.1, jitter=0, image_edge=256,
+        )
+        with StandInServer(config) as server:
+            for key, value in server.env().items():
+                monkeypatch.setenv(key, value)
+            monkeypatch.setattr("generate_prompts.preflight_front_image", lambda *args: False)
+
+            generate_all_command(
+                input_file=spec_file, output_dir=tmp_path / "out", auto_3d=True, skip_refine=True,
+                provider_3d="http", poll_interval_3d=0.05, no_ledger=True,
+                job_registry=tmp_path / "hunyuan_jobs.json",
+            )
+            requests = server.stats["requests"]
+
+        assert "hunyuan3d.SubmitHunyuanTo3DProJob" not in requests
+        assert list((tmp_path / "out").glob("*/images/*front*"))
+        assert "front image failed preflight" in capsys.readouterr().out
@@ -0,0 +1,144 @@
+# test_incremental.py - Tests for incremental regeneration
+
+from dataclasses import replace
+
+import yaml
+
+from generate_prompts import generate_all_prompts, generate_prompts_command
+from src.file_utils import resolve_output_path
+from src.incremental import (
+    IMAGES_KEY,
+    STAGE_REFINE,
+    STAGE_STATIC,
+    fields_read,
+    find_previous_run,
+    load_run_inputs,
+    plan_incremental,
+    record_outputs,
+    render_static_prompts,
+    track_outputs,
+)
+from src.models import CharacterSpec
+from src.prompt_templates import spec_fields
+from src.stage4_image_generation import build_tpose_prompt
+
+
+SPEC = CharacterSpec(
+    name="Aethel",
+    role="Scout",
+    color_palette=["teal", "black"],
+    key_props=["scanner"],
+    animation_focus=["walk"],
+    extra_notes="weathered coat",
+)
+
+
+class TestDependencies:
+    """Tests for which spec fields each output reads."""
+
+    def test_static_prompts_use_template_fields(self):
+        """Test that dependencies come from the template placeholders."""
+        tracked = track_outputs(SPEC)
+
+        assert "color_palette" not in tracked["base_2d_sheet"].fields
+        assert "extra_notes" not in tracked["base_2d_full_body"].fields
+        assert "extra_notes" in tracked["common_design_notes"].fields
+        assert {output.stage for output in tracked.values()} == {STAGE_STATIC}
+
+    def test_builders_are_recorded(self):
+        """Test that reading attributes through the stand-in is recorded."""
+        read = fields_read(lambda spec: build_tpose_prompt(spec, "front"), SPEC)
+
+        assert "silhouette" in read
+        assert "animation_focus" not in read  # Not a visual element
+
+    def test_render_matches_generators(self):
+        """Test that rendering a subset gives the same text as the full run."""
+        prompts = render_static_prompts(["base_2d_sheet", "common_design_notes"], spec_fields(SPEC))
+        full = generate_all_prompts(SPEC)
+
+        assert prompts == {key: full[key] for key in prompts}
+
+
+class TestPlan:
+    """Tests for comparing fingerprints with a previous run."""
+
+    def _finished_run(self, tmp_path, tracked):
+        """A run folder where every tracked output exists."""
+        for key in tracked:
+            if key == IMAGES_KEY:
+                path = tmp_path / "images" / "aethel_tpose_front_v1.jpg"
+            else:
+                path = resolve_output_path(tmp_path, SPEC, "v1", key)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text("x")
+        record_outputs(tmp_path, SPEC, "v1", tracked, list(tracked))
+
+    def test_only_affected_outputs_change(self, tmp_path):
+        """Test that editing extra_notes leaves the base prompts and checklist alone."""
+        tracked = track_outputs(SPEC, refine={}, images={"format": "jpeg"})
+        self._finished_run(tmp_path, tracked)
+
+        edited = replace(SPEC, extra_notes="shiny coat")
+        plan = plan_incremental(tmp_path, edited, "v1", track_outputs(edited, refine={}, images={"format": "jpeg"}))
+
+        assert plan.changed_fields == ["extra_notes"]
+        assert set(plan.unchanged) == {"base_2d_full_body", "base_2d_sheet", "common_2d_refinement_criteria"}
+        assert IMAGES_KEY in plan.changed
+        assert not plan.stage_is_current(STAGE_REFINE)
+
+    def test_settings_and_missing_files(self, tmp_path):
+        """Test that a new refine mode and a deleted file are both regenerated."""
+        tracked = track_outputs(SPEC, refine={"mode": "per-view"})
+        self._finished_run(tmp_path, tracked)
+        resolve_output_path(tmp_path, SPEC, "v1", "base_2d_sheet").unlink()
+
+        plan = plan_incremental(tmp_path, SPEC, "v1", track_outputs(SPEC, refine={"mode": "single"}))
+
+        assert sorted(plan.changed) == sorted(["base_2d_sheet", *plan.stage_keys(STAGE_REFINE, changed_only=False)])
+        assert plan.changed_fields == []
+
+    def test_no_previous_run(self):
+        """Test that everything is new without a previous run."""
+        tracked = track_outputs(SPEC)
+
+        assert plan_incremental(None, SPEC, "v1", tracked).changed == list(tracked)
+
+
+class TestPromptsCommand:
+    """Tests for `prompts --incremental`."""
+
+    def test_second_run_rewrites_only_changed_files(self, tmp_path):
+        """Test that a spec edit rewrites only the prompts that read the edited field."""
+        spec_file = tmp_path / "aethel.yaml"
+        spec_file.write_text(yaml.safe_dump({"name": "Aethel", "role": "Scout", "extra_notes": "old"}))
+        output_dir = tmp_path / "out"
+
+        generate_prompts_command(input_file=spec_file, output_dir=output_dir, incremental=True)
+        run_dir = find_previous_run(output_dir, CharacterSpec(name="Aethel", role="Scout"), "v1")
+        sheet = resolve_output_path(run_dir, SPEC, "v1", "base_2d_sheet")
+        notes = resolve_output_path(run_dir, SPEC, "v1", "common_design_notes")
+        sheet_mtime, notes_mtime = sheet.stat().st_mtime_ns, notes.stat().st_mtime_ns
+
+        spec_file.write_text(yaml.safe_dump({"name": "Aethel", "role": "Scout", "extra_notes": "new"}))
+        generate_prompts_command(input_file=spec_file, output_dir=output_dir, incremental=True)
+
+        assert [p for p in output_dir.iterdir() if p.is_dir()] == [run_dir]
+        assert sheet.stat().st_mtime_ns == sheet_mtime
+        assert notes.stat().st_mtime_ns != notes_mtime
+        assert "new" in notes.read_text()
+        assert load_run_inputs(run_dir).spec["extra_notes"] == "new"
+
+    def test_unchanged_run_prints_no_empty_list(self, tmp_path, capsys):
+        """Test that a rerun with nothing to write doesn't print "Generated 0 files"."""
+        spec_file = tmp_path / "aethel.yaml"
+        spec_file.write_text(yaml.safe_dump({"name": "Aethel", "role": "Scout"}))
+        output_dir = tmp_path / "out"
+
+        generate_prompts_command(input_file=spec_file, output_dir=output_dir, incremental=True)
+        capsys.readouterr()
+        generate_prompts_command(input_file=spec_file, output_dir=output_dir, incremental=True)
+
+        out = capsys.readouterr().out
+        assert "Generated" not in out
+        assert "unchanged files" in out
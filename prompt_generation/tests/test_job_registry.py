@@ -0,0 +1,181 @@
+# test_job_registry.py - Tests for recording Hunyuan jobs and re-attaching to them
+
+import json
+import subprocess
+import sys
+import threading
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.job_registry import (
+    DONE, ERRORED, INTERRUPTED, SUBMITTED, TIMED_OUT, JobRegistry, handle_interrupts, stop_polling,
+)
+from src.providers import Hunyuan3DFile, Hunyuan3DJobResult, JobStatus
+from src.stage5_hunyuan3d import generate_3d_model
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return JobRegistry(tmp_path / "hunyuan_jobs.json")
+
+
+@pytest.fixture
+def mock_provider():
+    """Provider stand-in: submits "job-1", polls WAIT unless told otherwise."""
+    provider = MagicMock()
+    provider.submit.return_value = "job-1"
+    provider.poll.return_value = Hunyuan3DJobResult(job_id="job-1", status=JobStatus.WAIT)
+    with patch("src.stage5_hunyuan3d.get_provider") as get_provider:
+        get_provider.return_value = MagicMock(return_value=provider)
+        yield provider
+    stop_polling.clear()
+
+
+class TestJobRegistry:
+    """Tests for the registry file."""
+
+    def test_record_update_forget(self, registry):
+        """Test that a job is kept across instances until forgotten."""
+        registry.record_submit("job-1", "sdk", "prompt", "A robot")
+        registry.update("job-1", TIMED_OUT, error="gave up after 600s")
+
+        entry = JobRegistry(registry.path).get("job-1")
+        assert (entry.status, entry.error, entry.input_value) == (TIMED_OUT, "gave up after 600s", "A robot")
+        assert registry.update("job-2", DONE) is None
+        assert registry.forget("job-1") and registry.entries() == []
+
+    def test_orphans(self, registry):
+        """Test that jobs nobody polls (stopped early, or their process is gone) are orphans."""
+        dead = subprocess.Popen([sys.executable, "-c", "pass"])
+        dead.wait()
+        for job_id in ("polled", "dead", "timed_out", "done"):
+            registry.record_submit(job_id, "sdk")
+        registry.update("timed_out", TIMED_OUT)
+        registry.update("done", DONE)
+        payload = json.loads(registry.path.read_text())
+        payload["jobs"]["dead"]["pid"] = dead.pid
+        registry.path.write_text(json.dumps(payload))
+
+        assert [entry.job_id for entry in registry.orphans()] == ["dead", "timed_out"]
+
+    def test_unreadable_file(self, registry):
+        """Test that a corrupt registry is an error, not an empty list."""
+        registry.path.write_text("{not json")
+
+        with pytest.raises(RuntimeError, match="Could not read job registry"):
+            registry.entries()
+
+
+class TestHandleInterrupts:
+    """Tests for routing Ctrl-C to polling loops."""
+
+    def test_off_main_thread_does_nothing(self):
+        """Test that entering it on a worker thread doesn't try to install a signal handler."""
+        errors = []
+
+        def worker():
+            try:
+                with handle_interrupts():
+                    pass
+            except Exception as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+        assert errors == []
+
+
+class TestGenerate3DModel:
+    """Tests for generate_3d_model() with a registry."""
+
+    def test_timeout_is_recorded(self, mock_env_vars, temp_output_dir, registry, mock_provider, capsys):
+        """Test that a timed-out job stays in the registry, with the way to get it."""
+        with pytest.raises(TimeoutError):
+            generate_3d_model(
+                prompt="A robot", output_dir=temp_output_dir, poll_interval=0.1, timeout=0.3,
+                verbose=False, registry=registry,
+            )
+
+        entry = registry.get("job-1")
+        assert entry.status == TIMED_OUT and entry.is_orphan
+        assert entry.output_dir == str(temp_output_dir)
+        assert "jobs --attach job-1" in capsys.readouterr().out
+
+    def test_ctrl_c_is_recorded(self, mock_env_vars, temp_output_dir, registry, mock_provider):
+        """Test that stop_polling (set by Ctrl-C) stops polling and marks the job interrupted."""
+        stop_polling.set()
+
+        with pytest.raises(KeyboardInterrupt):
+            generate_3d_model(
+                prompt="A robot", output_dir=temp_output_dir, poll_interval=5, timeout=60,
+                verbose=False, registry=registry,
+            )
+
+        assert registry.get("job-1").status == INTERRUPTED
+        mock_provider.poll.assert_not_called()
+
+    def test_download_error_is_recorded(self, mock_env_vars, temp_output_dir, registry, mock_provider):
+        """Test that a failed download is recorded as errored (the result may still be there)."""
+        mock_provider.poll.return_value = Hunyuan3DJobResult(
+            job_id="job-1", status=JobStatus.DONE,
+            files=[Hunyuan3DFile(file_type="OBJ", url="https://example.com/model.zip")],
+        )
+        mock_provider.download_result.side_effect = OSError("disk full")
+
+        with pytest.raises(OSError):
+            generate_3d_model(
+                prompt="A robot", output_dir=temp_output_dir, poll_interval=0.05, timeout=5,
+                verbose=False, registry=registry,
+            )
+
+        entry = registry.get("job-1")
+        assert entry.status == ERRORED and entry.is_orphan
+        assert "disk full" in entry.error
+
+    def test_attach_skips_submit(self, mock_env_vars, temp_output_dir, registry, mock_provider):
+        """Test that re-attaching polls the recorded job and downloads it."""
+        registry.record_submit("job-1", "sdk", "prompt", "A robot")
+        registry.update("job-1", INTERRUPTED)
+        mock_provider.poll.return_value = Hunyuan3DJobResult(
+            job_id="job-1", status=JobStatus.DONE,
+            files=[Hunyuan3DFile(file_type="OBJ", url="https://example.com/model.zip")],
+        )
+
+        def download(result, output_dir):
+            obj_file = output_dir / "model.obj"
+            obj_file.write_bytes(b"obj content")
+            return [obj_file]
+
+        mock_provider.download_result.side_effect = download
+
+        result = generate_3d_model(
+            output_dir=temp_output_dir, poll_interval=0.05, timeout=5, verbose=False,
+            registry=registry, existing_job_id="job-1",
+        )
+
+        assert result.obj_path.name == "model.obj"
+        mock_provider.submit.assert_not_called()
+        entry = registry.get("job-1")
+        assert entry.status == DONE and not entry.is_orphan
+        assert SUBMITTED not in [e.status for e in registry.entries()]
+
+    def test_attach_times_queue_from_submit(self, mock_env_vars, temp_output_dir, registry, mock_provider):
+        """Test that a re-attached job's queue time counts from its submit, not from the attach."""
+        registry.record_submit("job-1", "sdk", "prompt", "A robot")
+        payload = json.loads(registry.path.read_text())
+        payload["jobs"]["job-1"]["submitted_at"] = (datetime.now() - timedelta(minutes=5)).isoformat()
+        registry.path.write_text(json.dumps(payload))
+        mock_provider.poll.return_value = Hunyuan3DJobResult(job_id="job-1", status=JobStatus.DONE, files=[])
+        mock_provider.download_result.return_value = []
+
+        result = generate_3d_model(
+            output_dir=temp_output_dir, poll_interval=0.01, timeout=5, verbose=False,
+            registry=registry, existing_job_id="job-1",
+        )
+
+        metadata = json.loads(result.metadata_path.read_text())
+        assert metadata["queue_seconds"] >= 300
+
@@ -0,0 +1,261 @@
+# test_llm_refiner.py - Tests for token accounting and prompt caching in Stage 2b
+
+import json
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+
+import pytest
+
+from src.models import CharacterSpec
+from src.stage2_llm_refiner import (
+    REFINED_PROMPTS_SCHEMA,
+    SYSTEM_PROMPT_BASE,
+    TokenUsage,
+    build_tpose_request,
+    call_openai,
+    estimate_request_sizes,
+    parse_refined_json,
+    prompt_cache_key,
+    refine_prompts_to_dict,
+    refine_prompts_with_llm,
+    view_consistency,
+)
+from src.file_utils import StreamingFileWriter
+from src.tracing import start_trace, stop_trace
+
+
+SPEC = CharacterSpec(name="Aethel", role="Scout", color_palette=["teal", "bone"])
+
+
+def _response(text: str, input_tokens: int, cached: int, output_tokens: int, reasoning: int):
+    """A Responses API response object with usage details."""
+    return SimpleNamespace(
+        output_text=text,
+        usage=SimpleNamespace(
+            input_tokens=input_tokens,
+            input_tokens_details=SimpleNamespace(cached_tokens=cached),
+            output_tokens=output_tokens,
+            output_tokens_details=SimpleNamespace(reasoning_tokens=reasoning),
+        ),
+    )
+
+
+class TestTokenUsage:
+    """Tests for the TokenUsage accumulator."""
+
+    def test_add_and_summary(self):
+        """Test summing calls and the cache hit rate."""
+        total = TokenUsage()
+        total.add(TokenUsage(input_tokens=1000, cached_tokens=0, output_tokens=200, calls=1))
+        total.add(TokenUsage(input_tokens=1000, cached_tokens=500, output_tokens=300,
+                             reasoning_tokens=100, calls=1))
+
+        assert total.cache_hit_rate == 0.25
+        assert total.summary() == "2 calls, 2,000 in (500 cached, 25%), 500 out (100 reasoning)"
+
+
+class TestPromptCaching:
+    """Tests for the stable, cacheable request prefix."""
+
+    def test_tpose_requests_differ_only_at_the_end(self):
+        """Test that the view is the last thing in a T-pose request."""
+        front = build_tpose_request(SPEC, "front")
+        back = build_tpose_request(SPEC, "back")
+        shared = front.split("View:")[0]
+
+        assert back.startswith(shared)
+        assert "FRONT VIEW" in front.split("View:")[1]
+
+    def test_estimate_request_sizes(self):
+        """Test that the shared prefix covers the system prompt plus the shared request."""
+        sizes = estimate_request_sizes(SPEC)
+
+        assert sizes["system"] < sizes["tpose_shared_prefix"] < sizes["system"] + sizes["tpose_request"]
+        assert sizes["total_input"] > 4 * sizes["system"]
+
+    def test_system_prompt_sent_as_instructions(self, monkeypatch):
+        """Test that the system prompt is not pasted into the input."""
+        monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+        client = MagicMock()
+        client.responses.create.return_value = _response("prompt", 900, 0, 100, 40)
+
+        with patch("openai.OpenAI", return_value=client):
+            call_openai("Make a prompt", api_key="sk-test")
+
+        kwargs = client.responses.create.call_args.kwargs
+        assert kwargs["instructions"] == SYSTEM_PROMPT_BASE
+        assert kwargs["input"] == "Make a prompt"
+        assert kwargs["prompt_cache_key"] == prompt_cache_key(False)
+
+
+class TestUsageCapture:
+    """Tests for per-call and per-run token usage."""
+
+    def test_usage_on_spans_and_result(self):
+        """Test that every call records tokens on its span and the run total adds up."""
+        client = MagicMock()
+        client.responses.create.side_effect = [
+            _response("concept", 900, 0, 100, 40),
+            _response("front", 1100, 0, 120, 50),
+            _response("side", 1100, 1024, 110, 45),
+            _response("back", 1100, 1024, 115, 60),
+        ]
+
+        tracer = start_trace()
+        try:
+            with patch("openai.OpenAI", return_value=client):
+                refined = refine_prompts_with_llm(SPEC, api_key="sk-test")
+        finally:
+            stop_trace()
+
+        assert refined.tpose_back == "back"
+        assert refined.usage == TokenUsage(
+            input_tokens=4200, output_tokens=445, cached_tokens=2048, reasoning_tokens=195, calls=4,
+        )
+        api_spans = [s for s in tracer.spans if s.name == "openai.call_openai"]
+        assert [s.args["cached_tokens"] for s in api_spans] == [0, 0, 1024, 1024]
+        assert api_spans[0].args["reasoning_tokens"] == 40
+
+
+class TestSingleCallMode:
+    """Tests for refining all four prompts in one structured-output request."""
+
+    PROMPTS = {
+        "concept_prompt": "Full-body concept of Aethel, teal scout armor, bone trim",
+        "tpose_front": "T-pose front view of Aethel, teal scout armor, bone trim",
+        "tpose_side": "T-pose side view of Aethel, teal scout armor, bone trim",
+        "tpose_back": "T-pose back view of Aethel, teal scout armor, bone trim",
+    }
+
+    def test_one_request_with_schema(self):
+        """Test that single mode makes one call with the JSON schema attached."""
+        client = MagicMock()
+        client.responses.create.return_value = _response(json.dumps(self.PROMPTS), 800, 0, 300, 100)
+
+        with patch("openai.OpenAI", return_value=client):
+            refined = refine_prompts_with_llm(SPEC, api_key="sk-test", mode="single")
+
+        assert client.responses.create.call_count == 1
+        text_format = client.responses.create.call_args.kwargs["text"]["format"]
+        assert text_format["type"] == "json_schema"
+        assert text_format["schema"] == REFINED_PROMPTS_SCHEMA
+        assert refined.mode_used == "single"
+        assert refined.tpose_side == self.PROMPTS["tpose_side"]
+        assert refined.usage.calls == 1
+        assert refined.view_consistency == 1.0
+
+    def test_falls_back_to_per_view(self):
+        """Test that unusable JSON falls back to the four per-view requests."""
+        client = MagicMock()
+        client.responses.create.side_effect = [
+            _response('{"concept_prompt": "only one"}', 800, 0, 50, 10),
+            _response("concept", 900, 0, 100, 0),
+            _response("front", 900, 0, 100, 0),
+            _response("side", 900, 0, 100, 0),
+            _response("back", 900, 0, 100, 0),
+        ]
+
+        with patch("openai.OpenAI", return_value=client):
+            refined = refine_prompts_with_llm(SPEC, api_key="sk-test", mode="single")
+
+        assert refined.mode_used == "per-view"
+        assert refined.tpose_front == "front"
+        assert refined.usage.calls == 5  # The failed attempt still cost tokens
+
+    def test_invalid_mode(self):
+        """Test that unknown modes are rejected before any API call."""
+        with pytest.raises(ValueError) as exc_info:
+            refine_prompts_with_llm(SPEC, api_key="sk-test", mode="batch")
+        assert "per-view, single" in str(exc_info.value)
+
+    def test_parse_refined_json(self):
+        """Test validation of the structured output."""
+        assert parse_refined_json(json.dumps(self.PROMPTS))["tpose_back"] == self.PROMPTS["tpose_back"]
+
+        with pytest.raises(ValueError, match="not valid JSON"):
+            parse_refined_json("Here are your prompts:")
+        with pytest.raises(ValueError, match="tpose_side"):
+            parse_refined_json(json.dumps({**self.PROMPTS, "tpose_side": "  "}))
+
+    def test_view_consistency(self):
+        """Test that view words are ignored and different designs score lower."""
+        same = view_consistency([
+            "teal armor with bone trim, front view",
+            "teal armor with bone trim, side view facing left",
+        ])
+        different = view_consistency([
+            "teal armor with bone trim",
+            "crimson robe with golden belt",
+        ])
+
+        assert same == 1.0
+        assert different < 0.2
+
+
+def _stream(text: str, fail_after: int = None):
+    """Responses API stream events for text, optionally failing midway."""
+    chunks = [text[i:i + 5] for i in range(0, len(text), 5)]
+    for number, chunk in enumerate(chunks):
+        if fail_after is not None and number == fail_after:
+            raise TimeoutError("read timed out")
+        yield SimpleNamespace(type="response.output_text.delta", delta=chunk)
+    yield SimpleNamespace(
+        type="response.completed",
+        response=_response(text, 900, 0, len(text) // 4, 0),
+    )
+
+
+class TestStreaming:
+    """Tests for streamed refinement with progressive file writes."""
+
+    def test_writer_commit_and_abort(self, tmp_path):
+        """Test that text lands in .partial and only commit() publishes it."""
+        writer = StreamingFileWriter(tmp_path / "refined" / "a.txt")
+        writer.write("Hello, ")
+        assert writer.partial_path.read_text() == "Hello, "
+        assert not writer.path.exists()
+
+        writer.write("world ")
+        writer.commit("Hello, world")
+        assert writer.path.read_text() == "Hello, world"
+        assert not writer.partial_path.exists()
+
+        aborted = StreamingFileWriter(tmp_path / "b.txt")
+        aborted.write("half")
+        aborted.close()
+        assert aborted.partial_path.read_text() == "half"
+        assert not aborted.path.exists()
+
+    def test_streams_into_prompt_files(self, tmp_path):
+        """Test that every prompt is streamed into its final file."""
+        client = MagicMock()
+        client.responses.create.side_effect = lambda **kwargs: _stream(
+            f"prompt for {kwargs['input'][-20:]}"
+        )
+        paths = {key: tmp_path / f"{key}.txt" for key in (
+            "refined_concept", "refined_tpose_front", "refined_tpose_side", "refined_tpose_back",
+        )}
+
+        with patch("openai.OpenAI", return_value=client):
+            prompts = refine_prompts_to_dict(SPEC, api_key="sk-test", stream_to=paths)
+
+        assert client.responses.create.call_args.kwargs["stream"] is True
+        for key, path in paths.items():
+            assert path.read_text() == prompts[key]
+        assert not list(tmp_path.glob("*.partial"))
+
+    def test_timeout_keeps_partial_output(self, tmp_path):
+        """Test that a stalled stream leaves the text received so far on disk."""
+        client = MagicMock()
+        client.responses.create.side_effect = lambda **kwargs: _stream("A teal-armored scout", fail_after=2)
+        client.chat.completions.create.side_effect = TimeoutError("read timed out")
+        path = tmp_path / "concept.txt"
+
+        with patch("openai.OpenAI", return_value=client):
+            with pytest.raises(TimeoutError):
+                refine_prompts_with_llm(
+                    SPEC, api_key="sk-test", stream=True, stream_to={"concept_prompt": path},
+                )
+
+        assert not path.exists()
+        assert (tmp_path / "concept.txt.partial").read_text() == "A teal-arm"
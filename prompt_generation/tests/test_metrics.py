@@ -0,0 +1,173 @@
+# test_metrics.py - Tests for the Prometheus/OpenMetrics exporter
+
+import json
+import urllib.request
+from unittest.mock import patch, MagicMock
+
+import pytest
+
+from src.metrics import (
+    PipelineMetrics,
+    disable_metrics,
+    enable_metrics,
+    record_cache_lookup,
+    start_metrics_server,
+)
+from src.providers import JobStatus, Hunyuan3DJobResult, Hunyuan3DFile
+from src.stage5_hunyuan3d import generate_3d_model
+from src.tracing import span
+
+
+@pytest.fixture
+def metrics():
+    """Enable process-wide metrics for one test and always disable them."""
+    active = enable_metrics()
+    yield active
+    disable_metrics()
+
+
+class TestSpanMetrics:
+    """Tests for deriving metrics from spans."""
+
+    def test_api_span(self, metrics):
+        """Test that API spans count calls, bytes, and retries per provider."""
+        with span("openai.call_openai", category="api", model="gpt-5.2") as s:
+            s.record(bytes_out=300, bytes_in=1200)
+            s.add_retry()
+            s.set(input_tokens=1100, cached_tokens=1024)
+
+        assert metrics.api_calls.get(provider="openai", call="call_openai", outcome="ok") == 1
+        assert metrics.api_duration.count(provider="openai", call="call_openai") == 1
+        assert metrics.api_retries.get(provider="openai") == 1
+        assert metrics.bytes_uploaded.get(provider="openai") == 300
+        assert metrics.bytes_downloaded.get(provider="openai") == 1200
+        assert metrics.llm_tokens.get(provider="openai", model="gpt-5.2", kind="cached") == 1024
+
+    def test_connection_reuse(self, metrics):
+        """Test that requests on new and pooled connections are counted per provider."""
+        with span("hunyuan3d.poll", category="api") as s:
+            s.add_connection(reused=True)
+            s.add_connection(reused=True)
+            s.add_connection(reused=False)
+
+        assert metrics.http_connections.get(provider="hunyuan3d", connection="reused") == 2
+        assert metrics.http_connections.get(provider="hunyuan3d", connection="new") == 1
+
+    def test_failed_api_span(self, metrics):
+        """Test that errors are counted with outcome=error."""
+        with pytest.raises(RuntimeError):
+            with span("gemini.generate_content", category="api"):
+                raise RuntimeError("quota")
+
+        assert metrics.api_calls.get(provider="gemini", call="generate_content", outcome="error") == 1
+
+    def test_stage_span_and_cache(self, metrics):
+        """Test stage durations and cache lookups."""
+        with span("stage1.generate_base_prompts"):
+            pass
+        record_cache_lookup("templates", hit=True)
+        record_cache_lookup("templates", hit=False)
+
+        assert metrics.stage_duration.count(stage="stage1.generate_base_prompts") == 1
+        assert metrics.cache_lookups.get(cache="templates", result="hit") == 1
+        assert metrics.cache_lookups.get(cache="templates", result="miss") == 1
+
+    def test_nothing_recorded_when_disabled(self):
+        """Test that spans don't need metrics to be enabled."""
+        with span("openai.call_openai", category="api"):
+            pass
+        record_cache_lookup("templates", hit=True)  # No-op
+
+
+class TestHunyuanJobPhases:
+    """Tests for WAIT vs RUN timing."""
+
+    def test_queue_and_run_time(self, metrics, mock_env_vars, temp_output_dir):
+        """Test that queue/run time lands in metadata.json and the histogram."""
+        statuses = [JobStatus.WAIT, JobStatus.RUN, JobStatus.DONE]
+
+        with patch("src.stage5_hunyuan3d.get_provider") as mock_get_provider:
+            mock_provider = MagicMock()
+            mock_get_provider.return_value = MagicMock(return_value=mock_provider)
+            mock_provider.submit.return_value = "job-1"
+            mock_provider.poll.side_effect = [
+                Hunyuan3DJobResult(
+                    job_id="job-1",
+                    status=status,
+                    files=[Hunyuan3DFile(file_type="OBJ", url="https://example.com/m.zip")],
+                )
+                for status in statuses
+            ]
+
+            def mock_download(result, output_dir):
+                obj_file = output_dir / "model.obj"
+                obj_file.write_bytes(b"obj content")
+                return [obj_file]
+
+            mock_provider.download_result.side_effect = mock_download
+
+            result = generate_3d_model(
+                prompt="test prompt",
+                output_dir=temp_output_dir,
+                poll_interval=0.01,
+                timeout=5,
+                verbose=False,
+            )
+
+        metadata = json.loads(result.metadata_path.read_text())
+        assert metadata["queue_seconds"] > 0
+        assert metadata["run_seconds"] > 0
+        assert metrics.job_phase.count(phase="queue") == 1
+        assert metrics.job_phase.count(phase="run") == 1
+
+
+class TestExposition:
+    """Tests for the text formats, textfile, and HTTP endpoint."""
+
+    def _sample(self) -> PipelineMetrics:
+        metrics = PipelineMetrics()
+        metrics.api_calls.inc(provider="cos", call="upload_bytes", outcome="ok")
+        metrics.api_duration.observe(0.3, provider="cos", call="upload_bytes")
+        return metrics
+
+    def test_openmetrics_format(self):
+        """Test OpenMetrics naming, cumulative buckets, and the EOF marker."""
+        text = self._sample().render(openmetrics=True)
+
+        assert "# TYPE pipeline_api_calls counter" in text
+        assert 'pipeline_api_calls_total{provider="cos",call="upload_bytes",outcome="ok"} 1' in text
+        assert 'pipeline_api_call_duration_seconds_bucket{provider="cos",call="upload_bytes",le="0.25"} 0' in text
+        assert 'pipeline_api_call_duration_seconds_bucket{provider="cos",call="upload_bytes",le="0.5"} 1' in text
+        assert 'pipeline_api_call_duration_seconds_bucket{provider="cos",call="upload_bytes",le="+Inf"} 1' in text
+        assert text.endswith("# EOF\n")
+
+    def test_textfile_uses_prometheus_format(self, tmp_path):
+        """Test the node_exporter textfile (counter family includes _total, no EOF)."""
+        path = self._sample().write_textfile(tmp_path / "pipeline.prom")
+
+        text = path.read_text()
+        assert "# TYPE pipeline_api_calls_total counter" in text
+        assert "# EOF" not in text
+        assert list(tmp_path.iterdir()) == [path]  # No temp files left behind
+
+        # Same permissions as any new file (not mkstemp's 0600) - node_exporter runs as another user
+        reference = tmp_path / "reference.txt"
+        reference.touch()
+        assert path.stat().st_mode == reference.stat().st_mode
+
+    def test_http_endpoint(self, metrics):
+        """Test that /metrics serves the current values."""
+        metrics.api_calls.inc(provider="hunyuan3d", call="poll", outcome="ok")
+        server = start_metrics_server(port=0)
+        try:
+            request = urllib.request.Request(
+                server.url, headers={"Accept": "application/openmetrics-text"},
+            )
+            with urllib.request.urlopen(request, timeout=5) as response:
+                content_type = response.headers["Content-Type"]
+                body = response.read().decode()
+        finally:
+            server.stop()
+
+        assert content_type.startswith("application/openmetrics-text")
+        assert 'pipeline_api_calls_total{provider="hunyuan3d",call="poll",outcome="ok"} 1' in body
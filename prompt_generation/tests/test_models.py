@@ -0,0 +1,72 @@
+# test_models.py - Tests for the spec data models
+
+from dataclasses import FrozenInstanceError, replace
+
+import pytest
+
+from generate_prompts import generate_all_prompts
+from src.models import (
+    CharacterSpec,
+    FrozenCharacterSpec,
+    freeze_spec,
+    spec_hash,
+    spec_to_dict,
+)
+from src.stage2_llm_refiner import build_combined_request, build_tpose_request
+from src.stage4_image_generation import build_tpose_prompt
+
+
+SPEC = CharacterSpec(
+    name="Aethel",
+    role="Android archaeologist",
+    game_style="stylized sci-fi",
+    silhouette="tall, long coat",
+    color_palette=["teal", "black"],
+    key_props=["data tablet", "scanner", "rope"],
+    animation_focus=["walk", "idle"],
+    extra_notes="Weathered coat",
+)
+
+
+class TestFrozenCharacterSpec:
+    """Tests for the slotted, immutable spec."""
+
+    def test_tuples_interning_and_immutability(self):
+        """Test that lists become tuples, repeated strings are shared, and nothing can change."""
+        frozen = freeze_spec(SPEC)
+        other = FrozenCharacterSpec(name="B", game_style="".join(["stylized ", "sci-fi"]))
+
+        assert frozen.color_palette == ("teal", "black")
+        assert other.game_style is frozen.game_style
+        assert not hasattr(frozen, "__dict__")
+        with pytest.raises(FrozenInstanceError):
+            frozen.role = "Pilot"
+        assert freeze_spec(frozen) is frozen
+
+    def test_hash_and_digest(self):
+        """Test content-based hash() and the same content hash as the mutable spec."""
+        frozen = freeze_spec(SPEC)
+        variant = replace(frozen, key_props=["data tablet", "scanner", "rope"])
+
+        assert variant == frozen and hash(variant) == hash(frozen)
+        assert len({frozen, variant}) == 1
+        assert frozen.content_hash == spec_hash(SPEC)
+        assert spec_to_dict(frozen) == spec_to_dict(SPEC)
+        assert frozen.thaw() == SPEC
+
+    def test_none_lists(self):
+        """Test that None list fields (an empty YAML key) hash and serialize like empty lists."""
+        spec = CharacterSpec(name="A", key_props=None, color_palette=None, animation_focus=None)
+
+        assert spec_to_dict(spec)["key_props"] == []
+        assert spec_hash(spec) == spec_hash(CharacterSpec(name="A"))
+        assert freeze_spec(spec).content_hash == spec_hash(spec)
+
+    def test_drop_in_for_stage_functions(self):
+        """Test that every prompt builder gives the same text for both spec classes."""
+        frozen = freeze_spec(SPEC)
+
+        assert generate_all_prompts(frozen) == generate_all_prompts(SPEC)
+        assert build_combined_request(frozen) == build_combined_request(SPEC)
+        assert build_tpose_request(frozen, "side") == build_tpose_request(SPEC, "side")
+        assert build_tpose_prompt(frozen, "front") == build_tpose_prompt(SPEC, "front")
@@ -0,0 +1,112 @@
+# test_pipeline_graph.py - Tests for running pipeline stages as a graph
+
+import threading
+import time
+
+import pytest
+
+from src.pipeline_graph import CACHED, DONE, FAILED, SKIPPED, Node, NodeSkipped, PipelineGraph
+
+
+def _sleep(seconds, value=None):
+    def run(inputs):
+        time.sleep(seconds)
+        return value
+    return run
+
+
+class TestOrder:
+    """Tests for validating the graph."""
+
+    def test_dependency_order(self):
+        """Test that inputs come first, otherwise nodes keep the order they were added."""
+        graph = PipelineGraph([
+            Node("model_3d", _sleep(0), inputs=("images",)),
+            Node("refine", _sleep(0)),
+            Node("images", _sleep(0)),
+        ])
+
+        assert graph.order() == ["refine", "images", "model_3d"]
+
+    def test_invalid_graphs(self):
+        """Test unknown inputs, cycles, and duplicate names."""
+        with pytest.raises(ValueError, match="unknown"):
+            PipelineGraph([Node("a", _sleep(0), inputs=("b",))]).order()
+        with pytest.raises(ValueError, match="cycle"):
+            PipelineGraph([Node("a", _sleep(0), inputs=("b",)), Node("b", _sleep(0), inputs=("a",))]).order()
+        with pytest.raises(ValueError, match="Duplicate"):
+            PipelineGraph([Node("a", _sleep(0)), Node("a", _sleep(0))])
+
+
+class TestRun:
+    """Tests for running nodes concurrently."""
+
+    def test_independent_nodes_overlap(self):
+        """Test that the run takes as long as the critical path, not the sum."""
+        graph = PipelineGraph([
+            Node("images", _sleep(0.3, "front.png")),
+            Node("model_3d", lambda inputs: inputs["images"] + " → obj", inputs=("images",)),
+            Node("refine", _sleep(0.2)),
+        ])
+
+        result = graph.run()
+
+        assert result.value("model_3d") == "front.png → obj"
+        assert result.work_seconds >= 0.5
+        assert result.seconds < result.work_seconds * 0.9
+        assert result.critical_path[0] == "images"
+        assert "critical path: images" in result.summary()
+
+    def test_failures_and_skips_only_stop_dependents(self, capsys):
+        """Test that a failed or skipped node blocks its dependents and nothing else."""
+        def fail(inputs):
+            raise RuntimeError("quota exceeded")
+
+        def skip(inputs):
+            raise NodeSkipped("GEMINI_API_KEY not set")
+
+        result = PipelineGraph([
+            Node("refine", fail, title="LLM refinement"),
+            Node("images", skip, title="image generation"),
+            Node("model_3d", _sleep(0), inputs=("images",), title="3D model generation"),
+            Node("static_prompts", _sleep(0, ["a.txt"])),
+        ]).run()
+
+        statuses = {name: r.status for name, r in result.results.items()}
+        assert statuses == {"refine": FAILED, "images": SKIPPED, "model_3d": SKIPPED, "static_prompts": DONE}
+        assert result.value("static_prompts") == ["a.txt"]
+        out = capsys.readouterr().out
+        assert "Warning: LLM refinement failed: quota exceeded" in out
+        assert "(3D model generation skipped - no result from image generation)" in out
+
+    def test_cached_nodes_do_not_run(self):
+        """Test that a cached result is used instead of running the node."""
+        calls = []
+        result = PipelineGraph([
+            Node("images", lambda inputs: calls.append("images"), cached=lambda: ["old.png"]),
+            Node("refine", lambda inputs: calls.append("refine"), cached=lambda: None),
+            Node("model_3d", lambda inputs: inputs["images"], inputs=("images",)),
+        ]).run()
+
+        assert calls == ["refine"]
+        assert result.results["images"].status == CACHED
+        assert result.value("model_3d") == ["old.png"]
+
+    def test_exclusive_node_runs_alone_on_calling_thread(self):
+        """Test that an interactive node waits for running nodes and runs on the main thread."""
+        events = []
+
+        def background(inputs):
+            time.sleep(0.1)
+            events.append("background done")
+
+        def review(inputs):
+            events.append(("review", threading.current_thread() is threading.main_thread()))
+
+        PipelineGraph([
+            Node("images", _sleep(0)),
+            Node("refine", background),
+            Node("review", review, inputs=("images",), exclusive=True),
+        ]).run()
+
+        assert events == ["background done", ("review", True)]
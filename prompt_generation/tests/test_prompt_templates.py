@@ -0,0 +1,105 @@
+# test_prompt_templates.py - Tests for the compiled static-prompt templates
+
+import json
+from pathlib import Path
+
+import pytest
+
+from generate_prompts import generate_all_prompts
+from src.models import CharacterSpec
+from src.prompt_templates import (
+    clear_spec_fields_cache,
+    compile_template,
+    spec_fields,
+)
+
+
+# Output of the hand-written f-string generators, captured before the
+# switch to templates - the static prompts must not change by a byte
+GOLDEN_PATH = Path(__file__).parent / "data" / "static_prompts_golden.json"
+
+
+def _golden() -> dict:
+    return json.loads(GOLDEN_PATH.read_text(encoding="utf-8"))
+
+
+class TestGoldenOutput:
+    """Tests that templates reproduce the old prompts exactly."""
+
+    @pytest.mark.parametrize("case", sorted(_golden()))
+    def test_matches_golden(self, case):
+        """Test every static prompt against the captured f-string output."""
+        expected = _golden()[case]
+        spec = CharacterSpec(**expected["spec"])
+
+        assert generate_all_prompts(spec) == expected["prompts"]
+
+
+class TestSpecFields:
+    """Tests for formatting a spec once and sharing the result."""
+
+    def test_formatted_values(self):
+        """Test the formatted fields, including the optional props clause."""
+        fields = spec_fields(CharacterSpec(name="Kato", key_props=["katana", "smoke bomb"]))
+
+        assert fields["props"] == "a katana and a smoke bomb"
+        assert fields["props_clause"] == "holding a katana and a smoke bomb, "
+        assert fields["colors"] == "unspecified"
+        assert fields["animations"] == "standard animations"
+        assert spec_fields(CharacterSpec(name="Kato"))["props_clause"] == ""
+
+    def test_none_lists(self):
+        """Test that None list fields (an empty `key_props:` in YAML) format like empty lists."""
+        spec = CharacterSpec(name="Kato", color_palette=None, key_props=None, animation_focus=None)
+
+        assert spec_fields(spec) == spec_fields(CharacterSpec(name="Kato"))
+
+    def test_cached_by_content(self):
+        """Test that equal specs share fields and edited specs don't."""
+        clear_spec_fields_cache()
+        spec = CharacterSpec(name="Mira", color_palette=["white"])
+
+        first = spec_fields(spec)
+        assert spec_fields(CharacterSpec(name="Mira", color_palette=["white"])) is first
+
+        spec.color_palette.append("red")
+        assert spec_fields(spec)["colors"] == "white, red"
+
+    def test_fields_are_read_only(self):
+        """Test that a shared (cached) mapping can't be changed by a caller."""
+        fields = spec_fields(CharacterSpec(name="Mira"))
+
+        with pytest.raises(TypeError):
+            fields["name"] = "Other"
+
+
+class TestCompileTemplate:
+    """Tests for template parsing and validation."""
+
+    def test_render(self):
+        """Test placeholders, escaped braces, and values containing braces."""
+        template = compile_template("demo", "{name} {{literal}} the {role}")
+        fields = spec_fields(CharacterSpec(name="A {x}", role="medic"))
+
+        assert template.fields == ("name", "role")
+        assert template.render(fields) == "A {x} {literal} the medic"
+
+    def test_quotes_and_backslashes(self):
+        """Test that quotes and backslashes in the template text come out verbatim."""
+        text = 'say "hi" it\'s \\n done\n{name}'
+        template = compile_template("demo", text)
+
+        assert template.render(spec_fields(CharacterSpec(name="Z"))) == text.replace("{name}", "Z")
+
+    @pytest.mark.parametrize("text, message", [
+        ("{nmae}", "unknown field {nmae}"),
+        ("{name!r}", "must not use"),
+        ("{name:>10}", "must not use"),
+        ("{}", "unknown field"),
+        ("{name", "Template 'demo'"),
+    ])
+    def test_invalid_templates(self, text, message):
+        """Test that bad placeholders fail at compile time, not at render time."""
+        with pytest.raises(ValueError) as exc_info:
+            compile_template("demo", text)
+        assert message in str(exc_info.value)
@@ -0,0 +1,199 @@
+# test_run_ledger.py - Tests for the SQLite run ledger
+
+import json
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+import typer
+
+from src.models import CharacterSpec
+from src.run_ledger import (
+    RunLedger,
+    RunRecord,
+    outcome_from_spans,
+    parse_since,
+    spec_hash,
+)
+from src.tracing import Span, span
+
+
+def _spans(error: bool = False) -> list[Span]:
+    """Spans like the ones a short `all` run produces."""
+    refine = Span("openai.call_openai", "api", start=0.0, end=2.0,
+                  args={"model": "gpt-5.2", "input_tokens": 900, "output_tokens": 400,
+                        "cached_tokens": 512, "reasoning_tokens": 150,
+                        "bytes_in": 3000, "bytes_out": 1200})
+    stage = Span("stage2.refine_prompts", "stage", start=0.0, end=2.5)
+    upload = Span("cos.upload_bytes", "api", start=3.0, end=3.5, args={"retries": 1})
+    if error:
+        upload.args["error"] = "TimeoutError: boom"
+    return [refine, stage, upload]
+
+
+def _run_dir(tmp_path):
+    """A run folder with one saved image and one Hunyuan metadata.json."""
+    run_dir = tmp_path / "20250101_120000"
+    images = run_dir / "images"
+    images.mkdir(parents=True)
+    (images / "aethel_tpose_front_v1.png").write_bytes(b"\x89PNG\r\n\x1a\n" + b"\0" * 100)
+    # Prompt files share the *_tpose_* naming but aren't images
+    (run_dir / "refined").mkdir()
+    (run_dir / "refined" / "aethel_refined_tpose_side_v1.txt").write_text("side prompt")
+    (images / "aethel_tpose_prompt_v1.txt").write_text("prompt")
+
+    model_dir = run_dir / "3d_model"
+    model_dir.mkdir()
+    (model_dir / "metadata.json").write_text(json.dumps({
+        "job_id": "job-1",
+        "status": "DONE",
+        "elapsed_seconds": 120.0,
+        "queue_seconds": 20.0,
+        "run_seconds": 100.0,
+        "settings": {"EnablePBR": True, "FaceCount": 100000,
+                     "GenerateType": "LowPoly", "PolygonType": "triangle"},
+    }))
+    return run_dir
+
+
+def _record(command: str = "all", outcome: str = "ok", started: str = "2025-01-01T12:00:00",
+            character: str = "Aethel") -> RunRecord:
+    start = datetime.fromisoformat(started)
+    return RunRecord(
+        command=command,
+        started_at=start.isoformat(),
+        finished_at=(start + timedelta(seconds=150)).isoformat(),
+        outcome=outcome,
+        character=character,
+        spec_hash="abc123",
+        version="v1",
+    )
+
+
+class TestHelpers:
+    """Tests for the module-level helpers."""
+
+    def test_spec_hash_is_stable(self):
+        """Test that equal specs hash equally and edits change the hash."""
+        spec = CharacterSpec(name="Aethel", role="Scout", color_palette=["teal"])
+
+        assert spec_hash(spec) == spec_hash(CharacterSpec(name="Aethel", role="Scout", color_palette=["teal"]))
+        assert spec_hash(spec) != spec_hash(CharacterSpec(name="Aethel", role="Pilot", color_palette=["teal"]))
+        assert len(spec_hash(spec)) == 16
+
+    def test_outcome_from_spans(self):
+        """Test that a span error marks the run partial."""
+        assert outcome_from_spans(_spans()) == "ok"
+        assert outcome_from_spans(_spans(error=True)) == "partial"
+
+    def test_parse_since(self):
+        """Test relative ages, ISO dates, and bad input."""
+        now = datetime(2025, 1, 8, 12, 0)
+
+        assert parse_since("7d", now) == datetime(2025, 1, 1, 12, 0)
+        assert parse_since("2h", now) == datetime(2025, 1, 8, 10, 0)
+        assert parse_since("2025-01-03", now) == datetime(2025, 1, 3)
+        with pytest.raises(ValueError) as exc_info:
+            parse_since("last week", now)
+        assert "--since" in str(exc_info.value)
+
+
+class TestRunLedger:
+    """Tests for recording and querying runs."""
+
+    def test_record_and_summaries(self, tmp_path):
+        """Test that one run fills every table and shows up in each summary."""
+        with RunLedger(tmp_path / "ledger.sqlite") as ledger:
+            ledger.record_run(_record(), _spans(), _run_dir(tmp_path))
+
+            runs = ledger.run_summary()
+            stages = ledger.stage_summary()
+            hunyuan = ledger.hunyuan_summary()
+            tokens = ledger.token_summary()
+            images = ledger.image_summary()
+
+        assert runs == [{"command": "all", "runs": 1, "ok": 1, "partial": 0, "failed": 0,
+                         "median_seconds": 150.0, "p95_seconds": 150.0}]
+        assert stages[0]["stage"] == "stage2.refine_prompts"
+        assert hunyuan[0]["generate_type"] == "LowPoly"
+        assert hunyuan[0]["face_count"] == 100000
+        assert hunyuan[0]["enable_pbr"] is True
+        assert hunyuan[0]["median_queue_seconds"] == 20.0
+        assert tokens == [{"character": "Aethel", "model": "gpt-5.2", "runs": 1, "calls": 1,
+                           "input_tokens": 900, "cached_tokens": 512,
+                           "output_tokens": 400, "reasoning_tokens": 150}]
+        assert [(row["view"], row["format"]) for row in images] == [("front", "png")]
+
+    def test_filters(self, tmp_path):
+        """Test --since and --character filtering."""
+        with RunLedger(tmp_path / "ledger.sqlite") as ledger:
+            ledger.record_run(_record(started="2025-01-01T12:00:00"), _spans())
+            ledger.record_run(_record(started="2025-01-05T12:00:00", outcome="failed"), _spans())
+            ledger.record_run(_record(started="2025-01-05T13:00:00", character="Borin"), _spans())
+
+            recent = ledger.run_summary(since=datetime(2025, 1, 3))
+            aethel = ledger.run_summary(character="Aethel")
+
+        assert recent[0]["runs"] == 2
+        assert (aethel[0]["runs"], aethel[0]["failed"]) == (2, 1)
+
+    def test_reopen_keeps_runs(self, tmp_path):
+        """Test that reopening an existing ledger keeps data (migration is idempotent)."""
+        path = tmp_path / "ledger.sqlite"
+        with RunLedger(path) as ledger:
+            ledger.record_run(_record(), _spans())
+        with RunLedger(path) as ledger:
+            ledger.record_run(_record(command="images"), _spans())
+            commands = [row["command"] for row in ledger.run_summary()]
+
+        assert commands == ["all", "images"]
+
+    def test_migrates_v1_ledger(self, tmp_path):
+        """Test that a ledger from before cached/reasoning tokens gains the columns."""
+        path = tmp_path / "ledger.sqlite"
+        conn = sqlite3.connect(path)
+        conn.execute(
+            "CREATE TABLE api_calls (run_id INTEGER NOT NULL, provider TEXT NOT NULL,"
+            " call TEXT NOT NULL, model TEXT, calls INTEGER NOT NULL, seconds REAL NOT NULL,"
+            " bytes_in INTEGER NOT NULL, bytes_out INTEGER NOT NULL, input_tokens INTEGER NOT NULL,"
+            " output_tokens INTEGER NOT NULL, retries INTEGER NOT NULL, errors INTEGER NOT NULL)"
+        )
+        conn.execute("PRAGMA user_version = 1")
+        conn.commit()
+        conn.close()
+
+        with RunLedger(path) as ledger:
+            ledger.record_run(_record(), _spans())
+            tokens = ledger.token_summary()
+
+        assert tokens[0]["cached_tokens"] == 512
+
+
+class TestAllCommand:
+    """Tests for the `all` command's ledger row when the run is stopped."""
+
+    def test_interrupted_run_is_recorded(self, tmp_path, monkeypatch):
+        """Test that Ctrl-C still writes the ledger row and trace.json."""
+        from generate_prompts import generate_all_command
+
+        def interrupted_run(graph):
+            with span("stage1.generate_base_prompts"):
+                raise KeyboardInterrupt
+
+        monkeypatch.setattr("generate_prompts.PipelineGraph.run", interrupted_run)
+        spec_file = tmp_path / "aethel.yaml"
+        spec_file.write_text("name: Aethel\n", encoding="utf-8")
+        ledger_path = tmp_path / "ledger.sqlite"
+
+        with pytest.raises(typer.Exit) as exc_info:
+            generate_all_command(
+                input_file=spec_file, output_dir=tmp_path / "out", skip_refine=True,
+                skip_images=True, skip_3d=True, ledger=ledger_path,
+                job_registry=tmp_path / "hunyuan_jobs.json",
+            )
+
+        assert exc_info.value.exit_code == 130
+        assert list((tmp_path / "out").glob("*/trace.json"))
+        with RunLedger(ledger_path) as ledger:
+            assert ledger.run_summary()[0]["failed"] == 1
+
@@ -0,0 +1,117 @@
+# test_spec_library.py - Tests for loading spec folders with the parsed-spec cache
+
+import json
+import os
+
+import pytest
+import yaml
+
+from src import spec_library
+from src.models import YAML_LOADER, FrozenCharacterSpec, parse_spec_content
+from src.spec_library import SPEC_CACHE_NAME, discover_spec_files, load_spec_library
+
+
+def _write_spec(path, **fields):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(yaml.safe_dump(fields), encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def library_dir(tmp_path):
+    """A small library: two specs, a subfolder, a template, and a broken file."""
+    _write_spec(tmp_path / "aethel.yaml", name="Aethel", role="Scout", color_palette=["teal"])
+    _write_spec(tmp_path / "heroes" / "borin.yaml", name="Borin")
+    _write_spec(tmp_path / "_template.yaml", name="Template")
+    (tmp_path / "broken.json").write_text("{not json", encoding="utf-8")
+    return tmp_path
+
+
+class TestParsing:
+    """Tests for the shared parsing helpers in models.py."""
+
+    def test_yaml_loader_and_errors(self):
+        """Test the libyaml loader (when available) and ValueError for bad input."""
+        assert YAML_LOADER.__name__ in ("CSafeLoader", "SafeLoader")
+        assert parse_spec_content("name: X\n", ".YML") == {"name": "X"}
+        with pytest.raises(ValueError):
+            parse_spec_content("name: [unclosed\n", ".yaml")
+        with pytest.raises(ValueError):
+            parse_spec_content("- a list\n", ".yaml")
+
+
+class TestDiscovery:
+    """Tests for finding spec files."""
+
+    def test_recursive_and_flat(self, library_dir):
+        """Test that "_" and "." names are skipped, subfolders only when recursive."""
+        (library_dir / SPEC_CACHE_NAME).write_text("{}")
+
+        names = [p.relative_to(library_dir).as_posix() for p in discover_spec_files(library_dir)]
+        assert names == ["aethel.yaml", "broken.json", "heroes/borin.yaml"]
+        assert len(discover_spec_files(library_dir, recursive=False)) == 2
+
+
+class TestLoadSpecLibrary:
+    """Tests for the loader, its cache, and warning aggregation."""
+
+    def test_specs_errors_and_warnings(self, library_dir):
+        """Test that bad files are reported and missing fields are counted, not logged."""
+        library = load_spec_library(library_dir)
+
+        assert [spec.name for spec in library.specs.values()] == ["Aethel", "Borin"]
+        assert list(library.errors) == [library_dir / "broken.json"]
+        assert library.missing_fields["extra_notes"] == 2
+        assert library.missing_fields["role"] == 1
+        assert library.warning_summary()[0] == "1 of 2 specs have no 'role' - using the default value"
+
+    def test_frozen_specs(self, library_dir):
+        """Test that frozen=True gives hashable specs equal to the mutable ones."""
+        mutable = load_spec_library(library_dir)
+        frozen = load_spec_library(library_dir, frozen=True)
+
+        assert all(isinstance(spec, FrozenCharacterSpec) for spec in frozen.specs.values())
+        assert [spec.thaw() for spec in frozen.specs.values()] == list(mutable.specs.values())
+        assert frozen.specs[library_dir / "aethel.yaml"].color_palette == ("teal",)
+
+    def test_cache_hits_and_invalidation(self, library_dir, monkeypatch):
+        """Test that unchanged files aren't parsed again, and edited ones are."""
+        first = load_spec_library(library_dir)
+        assert (first.parsed, first.cache_hits) == (3, 0)
+
+        # Touch without changing: mtime differs, content hash matches
+        aethel = library_dir / "aethel.yaml"
+        os.utime(aethel, ns=(0, 12345))
+        parsed = []
+        original = spec_library._parse_spec_file
+        monkeypatch.setattr(spec_library, "_parse_spec_file", lambda p: parsed.append(p) or original(p))
+
+        second = load_spec_library(library_dir)
+        assert (second.parsed, second.cache_hits) == (0, 3)
+        assert second.specs == first.specs
+
+        _write_spec(library_dir / "heroes" / "borin.yaml", name="Borin", role="Smith with a longer role")
+        third = load_spec_library(library_dir)
+        assert parsed == [str(library_dir / "heroes" / "borin.yaml")]
+        assert third.specs[library_dir / "heroes" / "borin.yaml"].role == "Smith with a longer role"
+
+    def test_cache_prunes_deleted_files(self, library_dir):
+        """Test that the cache only keeps rows for files that still exist."""
+        load_spec_library(library_dir)
+        (library_dir / "broken.json").unlink()
+        load_spec_library(library_dir)
+
+        cache = json.loads((library_dir / SPEC_CACHE_NAME).read_text())
+        assert sorted(cache["files"]) == ["aethel.yaml", "heroes/borin.yaml"]
+
+    def test_process_pool(self, tmp_path, monkeypatch):
+        """Test that parsing in worker processes gives the same specs."""
+        monkeypatch.setattr(spec_library, "PARALLEL_THRESHOLD", 2)
+        for i in range(6):
+            _write_spec(tmp_path / f"c{i}.yaml", name=f"C{i}", key_props=["sword"])
+
+        library = load_spec_library(tmp_path, use_cache=False, max_workers=2)
+
+        assert [spec.name for spec in library.specs.values()] == [f"C{i}" for i in range(6)]
+        assert all(spec.key_props == ["sword"] for spec in library.specs.values())
+        assert not (tmp_path / SPEC_CACHE_NAME).exists()
@@ -0,0 +1,123 @@
+# test_spec_sweep.py - Tests for spec variant sweeps
+
+import json
+import types
+
+import pytest
+import yaml
+
+from generate_prompts import sweep_command
+from src.models import CharacterSpec, spec_hash
+from src.spec_sweep import (
+    SweepSpec,
+    expand_sweep,
+    load_sweep,
+    read_finished_hashes,
+)
+
+
+BASE = {"name": "Aethel", "role": "Scout", "color_palette": ["teal"]}
+
+
+def _write_sweep(tmp_path, data: dict):
+    path = tmp_path / "study.yaml"
+    path.write_text(yaml.safe_dump(data), encoding="utf-8")
+    return path
+
+
+class TestLoadSweep:
+    """Tests for parsing and validating sweep files."""
+
+    def test_base_file_and_inline(self, tmp_path):
+        """Test that base may be a spec file (relative path) or inline fields."""
+        (tmp_path / "aethel.yaml").write_text(yaml.safe_dump(BASE), encoding="utf-8")
+        from_file = load_sweep(_write_sweep(tmp_path, {"base": "aethel.yaml", "axes": {"role": ["Pilot"]}}))
+        inline = load_sweep(_write_sweep(tmp_path, {"base": BASE, "axes": {"role": ["Pilot"]}}))
+
+        assert from_file.base == inline.base == CharacterSpec(**BASE)
+
+    @pytest.mark.parametrize("axes, message", [
+        ({"name": ["B"]}, "Unknown sweep axis"),
+        ({"role": []}, "non-empty list"),
+        ({"role": [["a"]]}, "must be a string"),
+        ({"color_palette": ["teal"]}, "list of strings"),
+    ])
+    def test_invalid_axes(self, tmp_path, axes, message):
+        """Test that bad axes are rejected when the file is loaded."""
+        with pytest.raises(ValueError) as exc_info:
+            load_sweep(_write_sweep(tmp_path, {"base": BASE, "axes": axes}))
+        assert message in str(exc_info.value)
+
+
+    def test_invalid_yaml(self, tmp_path):
+        """Test that a YAML syntax error is a ValueError (a clean CLI error), not a traceback."""
+        path = tmp_path / "study.yaml"
+        path.write_text("base: [unclosed\naxes: {}\n", encoding="utf-8")
+
+        with pytest.raises(ValueError) as exc_info:
+            load_sweep(path)
+        assert "Invalid YAML" in str(exc_info.value)
+
+
+class TestExpandSweep:
+    """Tests for lazy Cartesian expansion."""
+
+    def _sweep(self) -> SweepSpec:
+        return SweepSpec(
+            base=CharacterSpec(**BASE),
+            axes={
+                "game_style": ["sci-fi", "fantasy", "sci-fi"],  # Duplicate value
+                "color_palette": [["teal"], ["red", "gold"]],
+            },
+        )
+
+    def test_lazy_product_without_duplicates(self):
+        """Test 3 x 2 combinations, minus the two that repeat a spec."""
+        sweep = self._sweep()
+        variants = expand_sweep(sweep)
+
+        assert isinstance(variants, types.GeneratorType)
+        variants = list(variants)
+        assert sweep.num_combinations == 6
+        assert [v.index for v in variants] == [0, 1, 2, 3]
+        assert variants[1].spec.color_palette == ("red", "gold")
+        assert variants[1].content_hash == spec_hash(variants[1].spec)
+        assert variants[0].spec.color_palette is not sweep.axes["color_palette"][0]
+
+    def test_skip_hashes(self):
+        """Test that finished variants from an earlier run are skipped."""
+        first = next(expand_sweep(self._sweep()))
+
+        remaining = list(expand_sweep(self._sweep(), skip_hashes={first.content_hash}))
+
+        assert first.content_hash not in {v.content_hash for v in remaining}
+        assert len(remaining) == 3
+
+
+class TestSweepCommand:
+    """Tests for the `sweep` command's streaming writes and resume."""
+
+    def test_limit_then_resume(self, tmp_path):
+        """Test that a second run writes only the variants the first one didn't."""
+        sweep_file = _write_sweep(tmp_path, {
+            "base": BASE,
+            "axes": {"game_style": ["sci-fi", "fantasy"], "silhouette": ["tall", "short"]},
+        })
+        output_dir = tmp_path / "out"
+
+        sweep_command(input_file=sweep_file, output_dir=output_dir, version="v1", limit=3)
+        assert len(read_finished_hashes(output_dir / "study")) == 3
+
+        sweep_command(input_file=sweep_file, output_dir=output_dir, version="v1", limit=None)
+        sweep_dir = output_dir / "study"
+        lines = [json.loads(line) for line in (sweep_dir / "variants.jsonl").read_text().splitlines()]
+
+        assert sorted(line["index"] for line in lines) == [0, 1, 2, 3]
+        for line in lines:
+            assert (sweep_dir / line["hash"] / "base" / "aethel_2d_base_v1.txt").exists()
+
+    def test_torn_log_line_is_ignored(self, tmp_path):
+        """Test that a half-written last line doesn't break resuming."""
+        (tmp_path / "variants.jsonl").write_text('{"hash": "abc", "index": 0}\n{"hash": "de', encoding="utf-8")
+
+        assert read_finished_hashes(tmp_path) == {"abc"}
@@ -1,6 +1,8 @@
 # test_stage5_hunyuan3d.py - Tests for Stage 5 orchestration
 
 import json
+import threading
+import time
 from pathlib import Path
 from unittest.mock import patch, MagicMock
 
@@ -12,6 +14,9 @@ from src.stage5_hunyuan3d import (
     _validate_inputs,
     check_required_env_vars,
     Hunyuan3DResult,
+    ViewFeed,
+    prepare_3d_input,
+    PreparedInput,
 )
 from src.providers import JobStatus, Hunyuan3DJobResult, Hunyuan3DFile
 
@@ -317,6 +322,55 @@ class TestGenerate3DModel:
             assert call_kwargs.get("image_url") == "https://cos.example.com/image.png"
             assert call_kwargs.get("prompt") is None
     
+    def test_upload_transform_uses_upload_bytes(self, mock_env_vars, temp_output_dir, tmp_path):
+        """Test that a transformed image goes through upload_bytes and is recorded."""
+        from io import BytesIO
+        from PIL import Image
+        from src.stage5_hunyuan3d import UploadTransform
+        
+        # A large, noisy PNG that will shrink a lot as a small JPEG
+        image_path = tmp_path / "front.png"
+        Image.effect_noise((1024, 1024), 64).convert("RGB").save(image_path, format="PNG")
+        
+        with patch("src.stage5_hunyuan3d.get_provider") as mock_get_provider, \
+             patch("src.stage5_hunyuan3d.get_cos_uploader") as mock_get_cos_uploader:
+            
+            mock_provider = MagicMock()
+            mock_get_provider.return_value = MagicMock(return_value=mock_provider)
+            mock_provider.submit.return_value = "test-job-123"
+            mock_provider.poll.return_value = Hunyuan3DJobResult(
+                job_id="test-job-123",
+                status=JobStatus.DONE,
+                files=[],
+            )
+            mock_provider.download_result.return_value = []
+            
+            mock_uploader = MagicMock()
+            mock_get_cos_uploader.return_value = mock_uploader
+            mock_uploader.upload_bytes.return_value = "https://cos.example.com/front.jpg"
+            
+            result = generate_3d_model(
+                image=image_path,
+                output_dir=temp_output_dir,
+                poll_interval=0.1,
+                timeout=5,
+                verbose=False,
+                upload_transform=UploadTransform(max_edge=256),
+            )
+            
+            mock_uploader.upload_file.assert_not_called()
+            content, object_key = mock_uploader.upload_bytes.call_args.args
+            assert object_key.endswith("_front.jpg")
+            assert mock_uploader.upload_bytes.call_args.kwargs["content_type"] == "image/jpeg"
+            with Image.open(BytesIO(content)) as uploaded:
+                assert max(uploaded.size) == 256
+            
+            metadata = json.loads(result.metadata_path.read_text())
+            upload = metadata["uploads"][0]
+            assert upload["view"] == "front"
+            assert upload["uploaded_bytes"] == len(content)
+            assert upload["saved_bytes"] > 0
+    
     def test_provider_selection(self, mock_env_vars, temp_output_dir):
         """Test that provider_type selects the correct provider."""
         with patch("src.stage5_hunyuan3d.get_provider") as mock_get_provider:
@@ -344,6 +398,110 @@ class TestGenerate3DModel:
             mock_get_provider.assert_called_once_with("http")
 
 
+class TestViewFeed:
+    """Tests for views that arrive while Stage 5 runs."""
+    
+    def test_views_within_window_are_attached(self, mock_env_vars, temp_output_dir, tmp_path):
+        """Test that a view arriving in the window is uploaded, and a late one is not."""
+        for name in ("front", "side", "back"):
+            (tmp_path / f"{name}.png").write_bytes(b"fake image content")
+        feed = ViewFeed()
+        feed.put("front", tmp_path / "front.png")
+        
+        def stage4():
+            time.sleep(0.1)
+            feed.put("left", tmp_path / "side.png")
+            time.sleep(0.6)  # Back view misses the window
+            feed.put("back", tmp_path / "back.png")
+            feed.close()
+        
+        with patch("src.stage5_hunyuan3d.get_provider") as mock_get_provider, \
+             patch("src.stage5_hunyuan3d.get_cos_uploader") as mock_get_cos_uploader:
+            mock_provider = MagicMock()
+            mock_get_provider.return_value = MagicMock(return_value=mock_provider)
+            mock_provider.submit.return_value = "test-job-123"
+            mock_provider.poll.return_value = Hunyuan3DJobResult(
+                job_id="test-job-123", status=JobStatus.DONE, files=[],
+            )
+            mock_provider.download_result.return_value = []
+            mock_uploader = MagicMock()
+            mock_get_cos_uploader.return_value = mock_uploader
+            mock_uploader.upload_file.side_effect = lambda path: f"https://cos.example.com/{path.name}"
+            
+            producer = threading.Thread(target=stage4)
+            producer.start()
+            generate_3d_model(
+                image=feed.get("front"),
+                output_dir=temp_output_dir,
+                poll_interval=0.01,
+                timeout=5,
+                verbose=False,
+                view_feed=feed,
+                view_window=0.4,
+            )
+            producer.join()
+        
+        views = mock_provider.submit.call_args.kwargs["multi_view_images"]
+        assert [(v.view, v.image_url) for v in views] == [("left", "https://cos.example.com/side.png")]
+    
+    def test_closed_feed_stops_waiting(self):
+        """Test that get() and next_view() return None once Stage 4 is done."""
+        feed = ViewFeed()
+        feed.close()
+        
+        started = time.monotonic()
+        assert feed.get("front") is None
+        assert feed.next_view({"left", "back"}, deadline=time.monotonic() + 10) is None
+        assert time.monotonic() - started < 1
+
+
+class TestPreparedInput:
+    """Tests for uploading/submitting ahead of time (the review menu does this)."""
+    
+    def test_prepared_job_is_polled_not_submitted(self, mock_env_vars, temp_output_dir, tmp_path):
+        """Test that generate_3d_model() reuses a prepared upload and job."""
+        image_path = tmp_path / "front.png"
+        image_path.write_bytes(b"fake image content")
+        
+        with patch("src.stage5_hunyuan3d.get_provider") as mock_get_provider, \
+             patch("src.stage5_hunyuan3d.get_cos_uploader") as mock_get_cos_uploader:
+            mock_provider = MagicMock()
+            mock_get_provider.return_value = MagicMock(return_value=mock_provider)
+            mock_provider.submit.return_value = "early-job"
+            mock_provider.poll.return_value = Hunyuan3DJobResult(
+                job_id="early-job", status=JobStatus.DONE, files=[],
+            )
+            mock_provider.download_result.return_value = []
+            mock_uploader = MagicMock()
+            mock_get_cos_uploader.return_value = mock_uploader
+            mock_uploader.upload_file.return_value = "https://cos.example.com/front.png"
+            
+            prepared = prepare_3d_input(image_path, submit=True)
+            prepared.submitted_at -= 60  # The user took a minute to approve
+            result = generate_3d_model(
+                image=image_path,
+                output_dir=temp_output_dir,
+                poll_interval=0.01,
+                timeout=5,
+                verbose=False,
+                prepared=prepared,
+            )
+        
+        assert prepared.job_id == "early-job"
+        assert result.job_id == "early-job"
+        mock_uploader.upload_file.assert_called_once()
+        mock_provider.submit.assert_called_once()
+        metadata = json.loads(result.metadata_path.read_text())
+        assert [u["view"] for u in metadata["uploads"]] == ["front"]
+        assert metadata["queue_seconds"] >= 60  # Counted from the early submit
+    
+    def test_prepared_for_another_image(self, tmp_path):
+        """Test that a prepared input for a different image is rejected."""
+        prepared = PreparedInput(image=tmp_path / "old.png", image_url="u", multi_view_images=[], uploads=[])
+        with pytest.raises(ValueError, match="another image"):
+            generate_3d_model(image=tmp_path / "new.png", output_dir=tmp_path, prepared=prepared)
+
+
 class TestHunyuan3DResult:
     """Tests for the result dataclass."""
     
@@ -0,0 +1,224 @@
+# test_texture_processing.py - Tests for texture post-processing
+
+import json
+from pathlib import Path
+from unittest.mock import patch, MagicMock
+
+import pytest
+from PIL import Image
+
+from src.texture_processing import (
+    TextureOptions,
+    process_texture,
+    process_textures,
+    summarize_texture_results,
+    _target_size,
+)
+from src.stage5_hunyuan3d import generate_3d_model
+from src.providers import JobStatus, Hunyuan3DJobResult
+
+
+def _write_texture(path: Path, size: tuple[int, int], color=(200, 40, 40)) -> Path:
+    """Write a solid-color PNG texture."""
+    Image.new("RGB", size, color).save(path, format="PNG")
+    return path
+
+
+class TestTargetSize:
+    """Tests for output size calculation."""
+
+    def test_downscales_to_budget(self):
+        """Test that the longest edge is clamped to max_size."""
+        assert _target_size(4096, 2048, 1024, power_of_two=False) == (1024, 512)
+
+    def test_never_upscales(self):
+        """Test that small textures keep their size."""
+        assert _target_size(300, 200, 1024, power_of_two=False) == (300, 200)
+
+    def test_power_of_two(self):
+        """Test KTX2-ready sizes snap down to powers of two."""
+        assert _target_size(300, 200, 1024, power_of_two=True) == (256, 128)
+
+
+class TestTextureOptions:
+    """Tests for option validation."""
+
+    def test_invalid_format(self):
+        """Test that unknown formats are rejected."""
+        with pytest.raises(ValueError) as exc_info:
+            TextureOptions(output_format="dds")
+        assert "invalid texture format" in str(exc_info.value).lower()
+
+
+class TestProcessTexture:
+    """Tests for single-texture processing."""
+
+    def test_webp_conversion(self, tmp_path):
+        """Test resize + WebP conversion replaces the original."""
+        src = _write_texture(tmp_path / "texture.png", (512, 256))
+
+        result = process_texture(src, TextureOptions(max_size=128, output_format="webp"))
+
+        assert result.output == "texture.webp"
+        assert result.original_size == (512, 256)
+        assert result.output_size == (128, 64)
+        assert not src.exists()
+        assert (tmp_path / "texture.webp").exists()
+        assert result.saved_bytes == result.original_bytes - result.output_bytes
+
+    def test_mip_chain(self, tmp_path):
+        """Test that mips are written down to min_mip_size."""
+        src = _write_texture(tmp_path / "albedo.png", (128, 128))
+
+        result = process_texture(
+            src,
+            TextureOptions(max_size=128, output_format="png", generate_mips=True, min_mip_size=16),
+        )
+
+        # 64, 32, 16
+        assert result.mip_files == ["albedo_mip1.png", "albedo_mip2.png", "albedo_mip3.png"]
+        with Image.open(tmp_path / "albedo_mip3.png") as mip:
+            assert mip.size == (16, 16)
+        # Same extension - original is overwritten in place
+        assert src.exists()
+
+
+class TestProcessTextures:
+    """Tests for batch processing and .mtl rewriting."""
+
+    def test_batch_with_mtl_rewrite(self, tmp_path):
+        """Test that textures run in the pool and .mtl references follow renames."""
+        diffuse = _write_texture(tmp_path / "texture.png", (256, 256))
+        normal = _write_texture(tmp_path / "texture_normal.png", (256, 256), (128, 128, 255))
+        preview = _write_texture(tmp_path / "preview.png", (64, 64))
+        mtl = tmp_path / "material.mtl"
+        mtl.write_text(
+            "newmtl material_0\n"
+            "map_Kd texture.png\n"
+            "map_Bump -bm 1.0 texture_normal.png\n",
+            encoding="utf-8",
+        )
+        obj = tmp_path / "model.obj"
+        obj.write_text("v 0 0 0\n", encoding="utf-8")
+
+        files, results = process_textures(
+            [obj, mtl, diffuse, normal, preview],
+            TextureOptions(max_size=64, output_format="webp", max_workers=2),
+        )
+
+        assert {r.output for r in results} == {"texture.webp", "texture_normal.webp"}
+        names = {f.name for f in files}
+        assert "texture.webp" in names
+        assert "preview.png" in names  # Preview is not a texture
+        assert "texture.png" not in names
+
+        mtl_text = mtl.read_text(encoding="utf-8")
+        assert "map_Kd texture.webp" in mtl_text
+        assert "map_Bump -bm 1.0 texture_normal.webp" in mtl_text
+
+    def test_bad_texture_is_kept(self, tmp_path):
+        """Test that a texture that can't be read is kept and its error recorded."""
+        good = _write_texture(tmp_path / "texture.png", (256, 256))
+        bad = tmp_path / "texture_rough.png"
+        bad.write_bytes(b"not a png")
+
+        files, results = process_textures([good, bad], TextureOptions(max_size=64, max_workers=2))
+
+        by_source = {r.source: r for r in results}
+        assert by_source["texture.png"].error is None
+        assert by_source["texture_rough.png"].error.startswith("UnidentifiedImageError")
+        assert {f.name for f in files} == {"texture.webp", "texture_rough.png"}
+        assert bad.read_bytes() == b"not a png"
+        assert summarize_texture_results(results)["failed"] == 1
+
+    def test_no_textures(self, tmp_path):
+        """Test that non-texture files pass through untouched."""
+        obj = tmp_path / "model.obj"
+        obj.write_text("v 0 0 0\n", encoding="utf-8")
+
+        files, results = process_textures([obj], TextureOptions())
+
+        assert files == [obj]
+        assert results == []
+
+    def test_summary_totals(self, tmp_path):
+        """Test that the metadata summary adds up per-texture savings."""
+        src = _write_texture(tmp_path / "texture.png", (256, 256))
+        result = process_texture(src, TextureOptions(max_size=32))
+
+        summary = summarize_texture_results([result])
+
+        assert summary["saved_bytes"] == result.saved_bytes
+        assert summary["files"][0]["source"] == "texture.png"
+
+
+class TestGenerate3DModelTextures:
+    """Tests for texture processing inside the Stage 5 orchestration."""
+
+    def test_metadata_records_savings(self, mock_env_vars, temp_output_dir):
+        """Test that texture savings end up in metadata.json."""
+        with patch("src.stage5_hunyuan3d.get_provider") as mock_get_provider:
+            mock_provider = MagicMock()
+            mock_get_provider.return_value = MagicMock(return_value=mock_provider)
+            mock_provider.submit.return_value = "test-job-123"
+            mock_provider.poll.return_value = Hunyuan3DJobResult(
+                job_id="test-job-123",
+                status=JobStatus.DONE,
+                files=[],
+            )
+
+            def mock_download(result, output_dir):
+                obj_file = output_dir / "model.obj"
+                obj_file.write_bytes(b"obj content")
+                texture = _write_texture(output_dir / "texture.png", (512, 512))
+                return [obj_file, texture]
+
+            mock_provider.download_result.side_effect = mock_download
+
+            result = generate_3d_model(
+                prompt="test prompt",
+                output_dir=temp_output_dir,
+                poll_interval=0.1,
+                timeout=5,
+                verbose=False,
+                texture_options=TextureOptions(max_size=64, output_format="webp"),
+            )
+
+            metadata = json.loads(result.metadata_path.read_text())
+            assert metadata["textures"]["files"][0]["output"] == "texture.webp"
+            assert "texture.webp" in metadata["files"]
+            assert metadata["textures"]["saved_bytes"] > 0
+
+    def test_texture_failure_still_writes_metadata(self, mock_env_vars, temp_output_dir):
+        """Test that a texture step error is recorded instead of losing the downloaded model."""
+        with patch("src.stage5_hunyuan3d.get_provider") as mock_get_provider, \
+                patch("src.stage5_hunyuan3d.process_textures", side_effect=OSError("disk full")):
+            mock_provider = MagicMock()
+            mock_get_provider.return_value = MagicMock(return_value=mock_provider)
+            mock_provider.submit.return_value = "test-job-123"
+            mock_provider.poll.return_value = Hunyuan3DJobResult(
+                job_id="test-job-123",
+                status=JobStatus.DONE,
+                files=[],
+            )
+
+            def mock_download(result, output_dir):
+                obj_file = output_dir / "model.obj"
+                obj_file.write_bytes(b"obj content")
+                return [obj_file, _write_texture(output_dir / "texture.png", (64, 64))]
+
+            mock_provider.download_result.side_effect = mock_download
+
+            result = generate_3d_model(
+                prompt="test prompt",
+                output_dir=temp_output_dir,
+                poll_interval=0.1,
+                timeout=5,
+                verbose=False,
+                texture_options=TextureOptions(max_size=32),
+            )
+
+            metadata = json.loads(result.metadata_path.read_text())
+            assert metadata["textures"] == {"error": "OSError: disk full"}
+            assert metadata["files"] == ["model.obj", "texture.png"]
+            assert result.obj_path.name == "model.obj"
@@ -0,0 +1,161 @@
+# test_tracing.py - Tests for span tracing and trace.json output
+
+import json
+import threading
+from unittest.mock import patch, MagicMock
+
+import pytest
+
+from src.tracing import (
+    span,
+    current_span,
+    start_trace,
+    stop_trace,
+    get_tracer,
+)
+from src.providers import JobStatus, Hunyuan3DJobResult, Hunyuan3DFile
+from src.providers.raw_http_hunyuan3d import RawHttpHunyuan3DProvider
+from src.stage1_base_prompts import generate_base_prompts
+from src.models import CharacterSpec
+
+
+@pytest.fixture
+def tracer():
+    """Start a trace for one test and always stop it afterwards."""
+    active = start_trace()
+    yield active
+    stop_trace()
+
+
+class TestSpans:
+    """Tests for span recording."""
+
+    def test_nothing_recorded_without_tracer(self):
+        """Test that spans are free no-ops when tracing is off."""
+        assert get_tracer() is None
+
+        with span("untraced") as s:
+            s.record(bytes_in=10)
+
+        assert s.args["bytes_in"] == 10  # Still usable, just not stored
+
+    def test_bytes_and_retries(self, tracer):
+        """Test that byte counters and retries accumulate."""
+        with span("api.call", category="api") as s:
+            s.record(bytes_out=100)
+            s.record(bytes_in=40, bytes_out=20)
+            s.add_retry()
+
+        recorded = tracer.spans[0]
+        assert recorded.args == {"bytes_out": 120, "bytes_in": 40, "retries": 1}
+        assert recorded.end >= recorded.start
+
+    def test_current_span_is_innermost(self, tracer):
+        """Test that helpers annotate the innermost open span."""
+        with span("outer"):
+            with span("inner"):
+                current_span().record(bytes_in=5)
+
+        by_name = {s.name: s for s in tracer.spans}
+        assert by_name["inner"].args == {"bytes_in": 5}
+        assert by_name["outer"].args == {}
+
+    def test_error_is_recorded(self, tracer):
+        """Test that exceptions are attached to the span and re-raised."""
+        with pytest.raises(ValueError):
+            with span("failing"):
+                raise ValueError("boom")
+
+        assert tracer.spans[0].args["error"] == "ValueError: boom"
+
+    def test_traced_decorator(self, tracer):
+        """Test that stage functions are traced by name."""
+        generate_base_prompts(CharacterSpec(name="Test"))
+
+        assert [s.name for s in tracer.spans] == ["stage1.generate_base_prompts"]
+
+
+class TestChromeTrace:
+    """Tests for the trace.json output."""
+
+    def test_write_chrome_trace(self, tracer, tmp_path):
+        """Test that spans become complete events with relative timestamps."""
+        with span("stage4.generate_tpose_images"):
+            with span("gemini.generate_content", category="api") as s:
+                s.record(bytes_in=2048)
+
+        path = tracer.write(tmp_path / "trace.json")
+        trace = json.loads(path.read_text())
+
+        events = [e for e in trace["traceEvents"] if e["ph"] == "X"]
+        assert [e["name"] for e in events] == [
+            "stage4.generate_tpose_images",
+            "gemini.generate_content",
+        ]
+        assert events[1]["cat"] == "api"
+        assert events[1]["args"]["bytes_in"] == 2048
+        assert events[0]["ts"] <= events[1]["ts"]
+        assert events[0]["dur"] >= events[1]["dur"]
+
+    def test_thread_names(self, tracer):
+        """Test that the main thread is labeled "main" even if a worker records first."""
+        def work():
+            with span("worker.task"):
+                pass
+
+        worker = threading.Thread(target=work)
+        worker.start()
+        worker.join()
+        with span("main.task"):
+            pass
+
+        trace = tracer.to_chrome_trace()
+        names = {e["tid"]: e["args"]["name"] for e in trace["traceEvents"] if e["ph"] == "M"}
+        tids = {e["name"]: e["tid"] for e in trace["traceEvents"] if e["ph"] == "X"}
+        assert names[tids["main.task"]] == "main"
+        assert names[tids["worker.task"]] == "worker-1"
+
+    def test_summary_totals(self, tracer):
+        """Test that the summary groups spans by name."""
+        for _ in range(3):
+            with span("hunyuan3d.poll"):
+                pass
+
+        name, count, _ = tracer.summary()[0]
+        assert (name, count) == ("hunyuan3d.poll", 3)
+
+
+class TestProviderSpans:
+    """Tests for spans around outbound provider calls."""
+
+    def test_poll_and_download_are_traced(
+        self, tracer, mock_env_vars, temp_output_dir, sample_zip_bytes, mock_poll_done_response,
+    ):
+        """Test that poll, download, and zip extraction record bytes and status."""
+        provider = RawHttpHunyuan3DProvider()
+
+        with patch.object(provider, "_client") as mock_client:
+            poll_response = MagicMock()
+            poll_response.json.return_value = mock_poll_done_response
+            poll_response.content = json.dumps(mock_poll_done_response).encode()
+            mock_client.post.return_value = poll_response
+
+            download_response = MagicMock()
+            download_response.content = sample_zip_bytes
+            mock_client.get.return_value = download_response
+
+            provider.poll("test-job-123")
+            provider.download_result(
+                Hunyuan3DJobResult(
+                    job_id="test-job-123",
+                    status=JobStatus.DONE,
+                    files=[Hunyuan3DFile(file_type="OBJ", url="https://example.com/model.zip")],
+                ),
+                temp_output_dir,
+            )
+
+        by_name = {s.name: s for s in tracer.spans}
+        assert by_name["hunyuan3d.poll"].args["status"] == "DONE"
+        assert by_name["hunyuan3d.poll"].args["bytes_in"] > 0
+        assert by_name["hunyuan3d.download_result"].args["bytes_in"] == len(sample_zip_bytes)
+        assert by_name["hunyuan3d.extract_zip"].args["files"] == 4
@@ -0,0 +1,132 @@
+# test_turntable_renderer.py - Tests for the headless turntable renderer
+
+import json
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.turntable_renderer import (
+    load_obj_mesh,
+    render_turntable,
+    render_turntables,
+    find_model_objs,
+    _normalize_mesh,
+    render_view,
+    BACKGROUND_COLOR,
+)
+
+
+class TestLoadObjMesh:
+    """Tests for .obj parsing."""
+
+    def test_quads_are_triangulated(self, tmp_path, sample_obj_bytes):
+        """Test that the 6 cube quads become 12 triangles."""
+        obj_path = tmp_path / "cube.obj"
+        obj_path.write_bytes(sample_obj_bytes)
+
+        vertices, triangles = load_obj_mesh(obj_path)
+
+        assert vertices.shape == (8, 3)
+        assert triangles.shape == (12, 3)
+        assert triangles.min() == 0
+        assert triangles.max() == 7
+
+    def test_slash_and_negative_indices(self, tmp_path):
+        """Test 'v/vt/vn' corners and negative (relative) indices."""
+        obj_path = tmp_path / "tri.obj"
+        obj_path.write_text(
+            "v 0 0 0\nv 1 0 0\nv 0 1 0\n"
+            "f 1/1/1 2/2/2 3/3/3\n"
+            "f -3 -2 -1\n",
+            encoding="utf-8",
+        )
+
+        _, triangles = load_obj_mesh(obj_path)
+
+        assert triangles.tolist() == [[0, 1, 2], [0, 1, 2]]
+
+    def test_empty_file(self, tmp_path):
+        """Test that a file without faces is rejected."""
+        obj_path = tmp_path / "empty.obj"
+        obj_path.write_text("# nothing here\n", encoding="utf-8")
+
+        with pytest.raises(ValueError):
+            load_obj_mesh(obj_path)
+
+
+class TestRenderView:
+    """Tests for the NumPy rasterizer."""
+
+    def test_cube_covers_center_not_corners(self, tmp_path, sample_obj_bytes):
+        """Test that the mesh lands in the middle of a clean background."""
+        obj_path = tmp_path / "cube.obj"
+        obj_path.write_bytes(sample_obj_bytes)
+        vertices, triangles = load_obj_mesh(obj_path)
+
+        frame = render_view(_normalize_mesh(vertices), triangles, angle=0.3, size=64)
+
+        assert frame.shape == (64, 64, 3)
+        assert frame.dtype == np.uint8
+        assert tuple(frame[0, 0]) == BACKGROUND_COLOR
+        assert tuple(frame[32, 32]) != BACKGROUND_COLOR
+
+    def test_turntable_frame_count(self, tmp_path, sample_obj_bytes):
+        """Test that one frame is rendered per view."""
+        obj_path = tmp_path / "cube.obj"
+        obj_path.write_bytes(sample_obj_bytes)
+
+        frames, triangle_count = render_turntable(obj_path, views=4, size=32)
+
+        assert len(frames) == 4
+        assert triangle_count == 12
+
+
+class TestRenderTurntables:
+    """Tests for batch rendering and the contact sheet."""
+
+    def test_contact_sheet(self, tmp_path, sample_obj_bytes):
+        """Test that each model gets a strip and the sheet stacks them."""
+        for name in ("run_a", "run_b"):
+            model_dir = tmp_path / name
+            model_dir.mkdir()
+            (model_dir / "model.obj").write_bytes(sample_obj_bytes)
+
+        obj_paths = find_model_objs(tmp_path)
+        results, sheet_path = render_turntables(
+            obj_paths, tmp_path, views=3, size=32, max_workers=2,
+        )
+
+        assert all(r.error_message is None for r in results)
+        assert (tmp_path / "run_a" / "turntable.png").exists()
+        with Image.open(sheet_path) as sheet:
+            assert sheet.width == 3 * 32
+            assert sheet.height > 2 * 32
+
+    def test_broken_model_does_not_abort_batch(self, tmp_path, sample_obj_bytes):
+        """Test that a bad .obj is reported instead of raising."""
+        good = tmp_path / "good.obj"
+        good.write_bytes(sample_obj_bytes)
+        bad = tmp_path / "bad.obj"
+        bad.write_text("not geometry\n", encoding="utf-8")
+
+        results, sheet_path = render_turntables([good, bad], tmp_path, views=2, size=16)
+
+        errors = {r.obj_path.name: r.error_message for r in results}
+        assert errors["good.obj"] is None
+        assert errors["bad.obj"] is not None
+        assert sheet_path is not None
+
+
+class TestFindModelObjs:
+    """Tests for locating finished models."""
+
+    def test_prefers_metadata_main_obj(self, tmp_path):
+        """Test that metadata.json's main_obj wins over other .obj files."""
+        (tmp_path / "model.obj").write_text("v 0 0 0\n", encoding="utf-8")
+        (tmp_path / "accessory.obj").write_text("v 0 0 0\n", encoding="utf-8")
+        (tmp_path / "metadata.json").write_text(
+            json.dumps({"main_obj": "model.obj"}), encoding="utf-8",
+        )
+
+        assert find_model_objs(tmp_path) == [tmp_path / "model.obj"]